@@ -0,0 +1,25 @@
+"""Add face_enrollment_pending field to User model
+
+Revision ID: 008_add_face_enrollment_pending
+Revises: 94b2dffee55f
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_face_enrollment_pending'
+down_revision = '94b2dffee55f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Usuarios existentes: ningún registro facial asíncrono en curso
+    op.add_column('users', sa.Column('face_enrollment_pending', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+    op.alter_column('users', 'face_enrollment_pending', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'face_enrollment_pending')
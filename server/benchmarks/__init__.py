@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento del sistema de reconocimiento facial.
+
+Ejecutar desde la carpeta server/, por ejemplo:
+    python -m benchmarks.bench_matching
+"""
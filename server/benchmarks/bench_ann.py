@@ -0,0 +1,91 @@
+"""
+Benchmark de recall vs latencia del índice IVF frente a la búsqueda exhaustiva.
+
+Para cada tamaño de galería y cada `nprobe` mide:
+- candidate_recall: fracción de probes cuya persona real está entre los candidatos
+- decision_agreement: fracción de probes con la misma decisión final que el
+  ensemble exhaustivo (`FaceRecognizer._compare_with_database`)
+- latencia p50/p95 de la búsqueda IVF + re-ordenado exacto vs exhaustiva
+
+Uso (desde server/):
+    python -m benchmarks.bench_ann
+    python -m benchmarks.bench_ann --persons 10000 --nprobe 4 8 16 32 --candidates 50
+"""
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import setup_environment, synthetic_gallery, probe_for, measure, print_table
+
+setup_environment()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--embeddings-per-person", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.recognize import reconocimiento
+    from src.recognize.ann_index import IVFIndex
+    from src.recognize.gallery import GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    reconocimiento.ANN_MIN_PERSONS = 0
+    reconocimiento.ANN_CANDIDATES = args.candidates
+
+    rows = []
+    for num_persons in args.persons:
+        gallery = synthetic_gallery(num_persons, args.embeddings_per_person, args.dim)
+        database = {
+            key: gallery.matrix[s:e] for key, s, e in zip(gallery.keys, gallery.offsets[:-1], gallery.offsets[1:])
+        }
+        index = IVFIndex.from_database(database)
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery, index), database={})
+        recognizer.database = recognizer.registration.database
+
+        rng = np.random.default_rng(7)
+        targets = rng.choice(num_persons, size=min(args.probes, num_persons), replace=False)
+        probes = [probe_for(gallery, int(t), seed=int(t)) for t in targets]
+
+        reconocimiento.SEARCH_ENGINE = "exhaustive"
+        exhaustive = [recognizer._compare_with_database(q)[0] for q in probes]
+        timing = measure(lambda: recognizer._compare_with_database(probes[0]), repeat=args.repeat)
+        rows.append({
+            "persons": num_persons, "nlist": len(index.centroids), "nprobe": "-",
+            "candidate_recall": 1.0, "decision_agreement": 1.0,
+            "p50_ms": timing["p50_ms"], "p95_ms": timing["p95_ms"]
+        })
+
+        reconocimiento.SEARCH_ENGINE = "ivf"
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            hits = sum(
+                gallery.keys[t] in index.search(q, args.candidates, gallery) for t, q in zip(targets, probes)
+            )
+            agree = sum(
+                recognizer._compare_with_database(q)[0] == ref for q, ref in zip(probes, exhaustive)
+            )
+            timing = measure(lambda: recognizer._compare_with_database(probes[0]), repeat=args.repeat)
+            rows.append({
+                "persons": num_persons, "nlist": len(index.centroids), "nprobe": nprobe,
+                "candidate_recall": hits / len(probes), "decision_agreement": agree / len(probes),
+                "p50_ms": timing["p50_ms"], "p95_ms": timing["p95_ms"]
+            })
+
+        print(f"✓ {num_persons} personas medidas")
+
+    print()
+    print_table(rows, ["persons", "nlist", "nprobe", "candidate_recall", "decision_agreement", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
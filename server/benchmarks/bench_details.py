@@ -0,0 +1,82 @@
+"""
+Benchmark del desglose de detalles: costo por marcación vs número de registrados.
+
+Mide `_compare_with_database` con cada `details_level` (none, top-k, full)
+sobre galerías sintéticas de distinto tamaño: latencia p50 y memoria pico
+asignada (tracemalloc) de una marcación, con y sin poda por centroides. Con
+"full" también se mide el costo de serializar la respuesta (listas y
+estadísticas por persona, que ahora se generan al leerse).
+
+Uso (desde server/):
+    python -m benchmarks.bench_details
+    python -m benchmarks.bench_details --persons 1000 5000 --embeddings 40
+"""
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+
+from benchmarks.common import setup_environment, synthetic_gallery, probe_for, measure, print_table
+
+setup_environment()
+
+
+def recognizer_for(gallery):
+    from src.recognize.gallery import GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery), database={})
+    recognizer.database = {}
+    return recognizer
+
+
+def peak_kb(fn) -> float:
+    """Memoria pico (KB) asignada durante una llamada."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--embeddings", type=int, default=40)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from src.recognize import reconocimiento
+
+    rows = []
+    for persons in args.persons:
+        gallery = synthetic_gallery(persons, args.embeddings, args.dim)
+        recognizer = recognizer_for(gallery)
+        query = probe_for(gallery, persons // 2)
+
+        for pruning in (False, True):
+            reconocimiento.CENTROID_PRUNING = pruning
+            for level in ("none", "top-k", "full"):
+                def punch():
+                    return jsonable_encoder(recognizer._compare_with_database(query, details_level=level)[2])
+
+                rows.append({
+                    "persons": persons,
+                    "pruning": "sí" if pruning else "no",
+                    "details_level": level,
+                    "p50_ms": measure(punch, repeat=args.repeat)["p50_ms"],
+                    "peak_kb": peak_kb(punch),
+                    "persons_in_details": len(punch().get('all_distances', {}))
+                })
+        print(f"✓ {persons} personas")
+
+    print()
+    print_table(rows, ["persons", "pruning", "details_level", "p50_ms", "peak_kb", "persons_in_details"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark de resolución de detección: tiempo y memoria pico vs tamaño de entrada.
+
+Reescala tests/powershell/test_images/image1.jpg a varios tamaños (webcam
+720p, 1080p, foto de teléfono de 12 MP) y mide `FaceDetector.detect` con y
+sin DETECTION_MAX_SIDE: latencia (p50/p95) y memoria pico asignada durante
+la detección (tracemalloc, incluye los buffers de NumPy/OpenCV).
+
+Para comprobar que las decisiones no cambian, cada fila se compara con la
+detección a resolución completa: resultado del control de calidad y
+diferencia media de pixeles del rostro recortado (0 = idéntico).
+
+Por defecto usa un backend stub cuyo costo crece con los pixeles de la
+imagen (una pirámide gaussiana completa, como el pre-procesamiento de
+RetinaFace) y retorna un rostro al centro; con `--real` usa el backend
+configurado (requiere deepface y los modelos).
+
+Uso (desde server/):
+    python -m benchmarks.bench_detection_resolution
+    python -m benchmarks.bench_detection_resolution --max-sides 0 960 1280 --real
+"""
+import argparse
+import sys
+import tracemalloc
+import types
+
+import cv2
+import numpy as np
+
+from benchmarks.common import SERVER_DIR, setup_environment, measure, print_table
+
+setup_environment()
+
+FIXTURE = SERVER_DIR / "tests" / "powershell" / "test_images" / "image1.jpg"
+SIZES = {"720p": (1280, 720), "1080p": (1920, 1080), "12MP": (4000, 3000)}
+
+
+def install_stub_backend() -> None:
+    """Instala un `deepface` falso con costo proporcional a los pixeles."""
+    def extract_faces(img_path, detector_backend=None, enforce_detection=False, align=True):
+        image = np.asarray(img_path)
+        level = image
+        while min(level.shape[:2]) > 32:
+            level = cv2.pyrDown(cv2.GaussianBlur(level, (5, 5), 0))
+
+        h, w = image.shape[:2]
+        size = int(min(h, w) * 0.4)
+        x, y = (w - size) // 2, (h - size) // 3
+        face = image[y:y + size, x:x + size]
+        return [{
+            'face': face[:, :, ::-1].astype(np.float32) / 255.0,
+            'facial_area': {'x': x, 'y': y, 'w': size, 'h': size},
+            'confidence': 0.99
+        }]
+
+    module = types.ModuleType("deepface")
+    module.DeepFace = types.SimpleNamespace(extract_faces=extract_faces)
+    sys.modules["deepface"] = module
+
+
+def peak_memory_mb(fn) -> float:
+    """Memoria pico (MB) asignada durante una llamada."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def face_difference(face, reference) -> str:
+    """Diferencia media de pixeles entre dos rostros detectados ('-' si falta alguno)."""
+    if face is None or reference is None:
+        return "-"
+    reference_img = reference['face_img']
+    face_img = face['face_img']
+    if face_img.shape != reference_img.shape:
+        face_img = cv2.resize(face_img, reference_img.shape[1::-1], interpolation=cv2.INTER_AREA)
+    return f"{np.abs(face_img.astype(np.int16) - reference_img.astype(np.int16)).mean():.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--max-sides", type=int, nargs="+", default=[0, 1280, 960],
+                        help="Valores de DETECTION_MAX_SIDE (0 = resolución completa)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--real", action="store_true", help="Usar el backend de detección real")
+    args = parser.parse_args()
+
+    if not args.real:
+        install_stub_backend()
+
+    from src.recognize import detector as detector_module
+    from src.recognize.detector import FaceDetector
+
+    base = cv2.imread(str(FIXTURE))
+    detector = FaceDetector()
+    detector._load_model()
+
+    rows = []
+    for name in args.sizes:
+        image = cv2.resize(base, SIZES[name], interpolation=cv2.INTER_CUBIC)
+
+        full = None
+        for max_side in [0] + [m for m in args.max_sides if m]:
+            detector_module.DETECTION_MAX_SIDE = max_side or None
+
+            def run():
+                detector.clear_cache()
+                return detector.detect(image=image)
+
+            result = run()
+            best = result.best()
+            if full is None:
+                full = result
+            timing = measure(run, repeat=args.repeat, warmup=1)
+            rows.append({
+                "input": f"{name} ({image.shape[1]}x{image.shape[0]})",
+                "max_side": max_side or "full",
+                "p50_ms": timing["p50_ms"],
+                "p95_ms": timing["p95_ms"],
+                "peak_mb": peak_memory_mb(run),
+                "face_px": "-" if best is None else f"{best['bbox'][2]}x{best['bbox'][3]}",
+                "quality": "ok" if result.quality_ok else "fail",
+                "same_quality": result.quality_ok == full.quality_ok,
+                "face_diff": face_difference(best, full.best())
+            })
+            print(f"✓ {name} max_side={max_side or 'full'}")
+
+    print()
+    print(f"Backend: {'real' if args.real else 'stub'}")
+    print_table(rows, ["input", "max_side", "p50_ms", "p95_ms", "peak_mb", "face_px",
+                       "quality", "same_quality", "face_diff"])
+
+
+if __name__ == "__main__":
+    main()
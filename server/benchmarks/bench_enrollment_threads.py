@@ -0,0 +1,99 @@
+"""
+Benchmark del pool de preprocesamiento: tiempo de registro vs hilos.
+
+Mide el tiempo de `FaceRegistration.embed_faces` (preprocesamiento +
+augmentation de los rostros de una persona y embedding por lotes) para cada
+cantidad de hilos de `PreprocessingPool`, sobre los rostros de
+tests/powershell/test_images (recorte fijo centrado, como
+bench_preprocessing).
+
+Por defecto el embedding es un stub con costo `--embed-ms` por variación,
+para aislar la etapa paralela; con `--real` usa `represent_faces` con el
+modelo configurado (requiere deepface y los modelos). OpenCV usa
+OPENCV_THREADS hilos internos en todas las corridas.
+
+Uso (desde server/):
+    python -m benchmarks.bench_enrollment_threads
+    python -m benchmarks.bench_enrollment_threads --threads 1 2 4 8 --faces 10
+    python -m benchmarks.bench_enrollment_threads --real
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import setup_environment, measure, print_table
+from benchmarks.bench_preprocessing import FIXTURES_DIR, load_fixture_faces
+
+setup_environment()
+
+
+def stub_represent_faces(embed_ms: float):
+    """Embedding por lotes con costo sintético por rostro."""
+    def represent_faces(faces, batch_size=None):
+        time.sleep(embed_ms * len(faces) / 1000.0)
+        return [np.ones(512) for _ in faces]
+    return represent_faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Hilos del pool a medir")
+    parser.add_argument("--faces", type=int, default=10, help="Rostros por registro")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por configuración")
+    parser.add_argument("--embed-ms", type=float, default=0.0, help="Costo del stub de embedding por variación")
+    parser.add_argument("--real", action="store_true", help="Usar el modelo de embeddings real")
+    parser.add_argument("--no-augmentation", action="store_true", help="Solo preprocesamiento")
+    args = parser.parse_args()
+
+    from src.recognize import registro
+    from src.recognize.config import OPENCV_THREADS
+    from src.recognize.preprocessing_pool import PreprocessingPool, configure_opencv_threads
+    from src.recognize.registro import FaceRegistration
+
+    configure_opencv_threads()
+
+    faces = load_fixture_faces(real=False)
+    if not faces:
+        raise SystemExit(f"No se encontraron imágenes en {FIXTURES_DIR}")
+    faces = [faces[i % len(faces)] for i in range(args.faces)]
+
+    if not args.real:
+        registro.represent_faces = stub_represent_faces(args.embed_ms)
+
+    registration = FaceRegistration.__new__(FaceRegistration)
+    use_augmentation = not args.no_augmentation
+
+    rows = []
+    baseline = None
+    for num_threads in args.threads:
+        pool = PreprocessingPool(num_threads)
+        registro.get_preprocessing_pool = lambda: pool
+        try:
+            timing = measure(
+                lambda: registration.embed_faces(faces, use_augmentation),
+                repeat=args.repeat, warmup=1
+            )
+        finally:
+            pool.shutdown()
+
+        baseline = baseline or timing["mean_ms"]
+        rows.append({
+            "threads": num_threads,
+            "mean_ms": timing["mean_ms"],
+            "p95_ms": timing["p95_ms"],
+            "ms_per_face": timing["mean_ms"] / len(faces),
+            "speedup": baseline / timing["mean_ms"]
+        })
+        print(f"✓ {num_threads} hilos")
+
+    print()
+    print(
+        f"{len(faces)} rostros, augmentation={'sí' if use_augmentation else 'no'}, "
+        f"embedding={'real' if args.real else f'stub {args.embed_ms} ms'}, OpenCV={OPENCV_THREADS} hilos"
+    )
+    print_table(rows, ["threads", "mean_ms", "p95_ms", "ms_per_face", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
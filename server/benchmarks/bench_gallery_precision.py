@@ -0,0 +1,86 @@
+"""
+Benchmark de precisión de la galería: memoria del scan vs latencia y decisiones.
+
+Compara la galería float32 con su copia compacta float16 e int8 (escala por
+fila, re-puntuando en float32 las GALLERY_RESCORE_CANDIDATES personas más
+cercanas):
+- memoria que recorre el scan, y su reducción frente a la lista original
+  de arrays float64 por embedding (embeddings.pkl cargado en memoria)
+- latencia p50 del scan (`gallery.score`) y de `_compare_with_database`
+  sin poda por centroides (el camino que recorre toda la galería)
+- decisiones que cambian respecto de float32 (probes genuinos e impostores)
+
+Uso (desde server/):
+    python -m benchmarks.bench_gallery_precision
+    python -m benchmarks.bench_gallery_precision --persons 5000 --embeddings 80
+"""
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import setup_environment, synthetic_gallery, probe_for, measure, print_table
+
+setup_environment()
+
+# Cabecera de un np.ndarray (sys.getsizeof sin datos) + puntero en la lista
+_ARRAY_OVERHEAD = 112 + 8
+
+
+def recognizer_for(gallery):
+    from src.recognize.gallery import GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery), database={})
+    recognizer.database = {}
+    return recognizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=1000)
+    parser.add_argument("--embeddings", type=int, default=80)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--probes", type=int, default=100)
+    parser.add_argument("--impostors", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.recognize import reconocimiento
+
+    reconocimiento.CENTROID_PRUNING = False
+    gallery = synthetic_gallery(args.persons, args.embeddings, args.dim)
+    rng = np.random.default_rng(3)
+    probes = [probe_for(gallery, int(p), seed=i) for i, p in enumerate(rng.integers(args.persons, size=args.probes))]
+    probes += list(rng.standard_normal((args.impostors, args.dim)))
+    timing_query = probes[0]
+
+    rows_count = gallery.num_embeddings
+    list_mb = rows_count * (args.dim * 8 + _ARRAY_OVERHEAD) / 2 ** 20
+    print(f"✓ galería {args.persons} x {args.embeddings} ({rows_count} filas), lista float64: {list_mb:.1f} MB")
+
+    rows, baseline = [], None
+    for precision in ("float32", "float16", "int8"):
+        current = gallery if precision == "float32" else gallery.quantize(precision)
+        recognizer = recognizer_for(current)
+        decided = [recognizer._compare_with_database(query)[0] for query in probes]
+        baseline = baseline or decided
+
+        scan_mb = current.scan_nbytes / 2 ** 20
+        rows.append({
+            "precision": precision,
+            "scan_mb": scan_mb,
+            "vs_float64": list_mb / scan_mb,
+            "score_ms": measure(lambda: current.score(timing_query), repeat=args.repeat)["p50_ms"],
+            "compare_ms": measure(lambda: recognizer._compare_with_database(timing_query), repeat=args.repeat)["p50_ms"],
+            "changed": sum(a != b for a, b in zip(decided, baseline))
+        })
+        print(f"✓ {precision}")
+
+    print()
+    print_table(rows, ["precision", "scan_mb", "vs_float64", "score_ms", "compare_ms", "changed"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de matching contra la galería (solo matching, sin modelos).
+
+Compara el bucle original por embedding (`utils.calculate_distance` por fila)
+con la galería vectorizada (`EmbeddingGallery.score`) y con
+`FaceRecognizer._compare_with_database` completo, para distintos tamaños de
+empresa.
+
+Uso (desde server/):
+    python -m benchmarks.bench_matching
+    python -m benchmarks.bench_matching --persons 100 1000 10000 --embeddings-per-person 80
+
+Nota: 10k personas x 80 embeddings x 512 dims ocupan ~1.6 GB en float32.
+"""
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import setup_environment, synthetic_gallery, probe_for, measure, print_table
+
+setup_environment()
+
+
+def legacy_scores(database, query, metric, k):
+    """Reproduce el cálculo original con bucles Python (referencia de latencia)."""
+    from src.recognize.utils import calculate_distance
+
+    all_distances = {}
+    for person_name, person_embeddings in database.items():
+        all_distances[person_name] = [
+            calculate_distance(query, emb, metric=metric) for emb in person_embeddings
+        ]
+
+    scores_min = {name: np.min(d) for name, d in all_distances.items()}
+    scores_avg = {name: np.mean(d) for name, d in all_distances.items()}
+    scores_median = {name: np.median(d) for name, d in all_distances.items()}
+
+    flat = [(name, dist) for name, dists in all_distances.items() for dist in dists]
+    flat.sort(key=lambda x: x[1])
+    votes = {}
+    for name, _ in flat[:k]:
+        votes[name] = votes.get(name, 0) + 1
+    return scores_min, scores_avg, scores_median, votes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--embeddings-per-person", type=int, default=80)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-max-persons", type=int, default=1000,
+                        help="Tamaño máximo para medir el bucle original (es lento)")
+    args = parser.parse_args()
+
+    from src.recognize.config import DISTANCE_METRIC, K_NEIGHBORS
+    from src.recognize.gallery import GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    rows = []
+    for num_persons in args.persons:
+        gallery = synthetic_gallery(num_persons, args.embeddings_per_person, args.dim)
+        query = probe_for(gallery, person_index=num_persons // 2)
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery), database={})
+        recognizer.database = recognizer.registration.database
+
+        row = {
+            "persons": num_persons,
+            "embeddings": gallery.num_embeddings,
+        }
+        row["vectorized_p50_ms"] = measure(
+            lambda: gallery.score(query, DISTANCE_METRIC, K_NEIGHBORS), repeat=args.repeat
+        )["p50_ms"]
+        row["compare_p50_ms"] = measure(
+            lambda: recognizer._compare_with_database(query), repeat=max(3, args.repeat // 4)
+        )["p50_ms"]
+
+        if num_persons <= args.legacy_max_persons:
+            database = {
+                key: list(gallery.matrix[s:e].astype(np.float64) * gallery.norms[s:e, None])
+                for key, s, e in zip(gallery.keys, gallery.offsets[:-1], gallery.offsets[1:])
+            }
+            row["legacy_p50_ms"] = measure(
+                lambda: legacy_scores(database, query, DISTANCE_METRIC, K_NEIGHBORS),
+                repeat=3, warmup=1
+            )["p50_ms"]
+            row["speedup"] = row["legacy_p50_ms"] / row["vectorized_p50_ms"]
+
+        rows.append(row)
+        print(f"✓ {num_persons} personas medidas")
+
+    print()
+    print_table(rows, ["persons", "embeddings", "legacy_p50_ms", "vectorized_p50_ms", "speedup", "compare_p50_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de micro-batching: ventana y tamaño de lote vs throughput.
+
+Simula un pico de inicio de turno: `--clients` hilos envían rostros a la vez
+a un `MicroBatcher`. Por defecto usa un backend stub con costo
+`overhead + por_rostro * n` (ms), que reproduce la forma del costo de una
+pasada de Facenet512 (overhead fijo por llamada grande, costo marginal por
+rostro pequeño). Con `--real` usa `embedder.represent_faces` (requiere
+deepface y descarga el modelo).
+
+Uso (desde server/):
+    python -m benchmarks.bench_microbatch
+    python -m benchmarks.bench_microbatch --windows 0 2 5 10 --sizes 4 16 --clients 32
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import setup_environment, print_table
+
+setup_environment()
+
+
+def stub_backend(overhead_ms: float, per_face_ms: float):
+    """Backend de lotes con costo sintético."""
+    def represent(faces):
+        time.sleep((overhead_ms + per_face_ms * len(faces)) / 1000.0)
+        return [np.ones(512) for _ in faces]
+    return represent
+
+
+def run_burst(batcher, clients: int, requests_per_client: int, face: np.ndarray) -> float:
+    """Ejecuta la ráfaga y retorna el tiempo total en segundos."""
+    barrier = threading.Barrier(clients + 1)
+
+    def client():
+        barrier.wait()
+        for _ in range(requests_per_client):
+            batcher.represent(face)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=24)
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5, 10])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--overhead-ms", type=float, default=40.0)
+    parser.add_argument("--per-face-ms", type=float, default=4.0)
+    parser.add_argument("--real", action="store_true", help="Usar el modelo real en lugar del stub")
+    args = parser.parse_args()
+
+    from src.recognize.batcher import MicroBatcher
+
+    if args.real:
+        from src.recognize.embedder import represent_faces
+        backend = None
+        face = np.random.default_rng(0).integers(0, 255, size=(160, 160, 3), dtype=np.uint8)
+        represent_faces([face])  # Cargar el modelo fuera de la medición
+    else:
+        backend = stub_backend(args.overhead_ms, args.per_face_ms)
+        face = np.zeros((160, 160, 3), dtype=np.uint8)
+
+    total = args.clients * args.requests_per_client
+    rows = []
+    for size in args.sizes:
+        for window in args.windows:
+            batcher = MicroBatcher(represent_fn=backend, max_batch_size=size, window_ms=window, stats_size=total)
+            elapsed = run_burst(batcher, args.clients, args.requests_per_client, face)
+            stats = batcher.stats()
+            batcher.shutdown()
+
+            rows.append({
+                "max_batch": size,
+                "window_ms": window,
+                "faces_per_s": total / elapsed,
+                "avg_batch": stats["avg_batch_size"],
+                "wait_p50_ms": stats["queue_wait"]["p50_ms"],
+                "wait_p95_ms": stats["queue_wait"]["p95_ms"],
+                "compute_p50_ms": stats["compute"]["p50_ms"],
+            })
+            print(f"✓ lote={size} ventana={window}ms")
+
+    print()
+    print_table(rows, ["max_batch", "window_ms", "faces_per_s", "avg_batch", "wait_p50_ms", "wait_p95_ms", "compute_p50_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Benchmark end-to-end del reconocimiento: detección, embedding, matching y total.
+
+Dos suites sobre galerías sintéticas de `--persons` personas:
+- matching: vectores unitarios aleatorios (sin modelos); latencia de
+  `_compare_with_database` con 1 y con `--concurrency` clientes
+- pipeline: las imágenes de tests/powershell/test_images (misma persona,
+  10 tomas). Las primeras `--enroll` se registran pasando por el pipeline
+  real y la galería se completa con personas sintéticas; el resto se usa
+  como probes. Mide `FaceDetector.detect`, el embedding, el matching y
+  `recognize()` completo (latencia y throughput con N clientes concurrentes),
+  más la tasa de aceptación de los probes genuinos
+
+Backend (`--backend`):
+- real: deepface con los pesos en caché local (~/.deepface/weights o
+  $DEEPFACE_HOME); sin red, CPU
+- stub: deepface falso sin modelos; el detector recorre una pirámide de la
+  imagen (costo proporcional a los pixeles, como RetinaFace) y el embedding
+  es una proyección aleatoria fija del rostro reducido a 32x32
+- auto (por defecto): real si deepface está instalado y los pesos existen
+
+Los resultados se escriben en JSON (por defecto
+benchmarks/results/pipeline-<commit>.json) con claves ordenadas, para
+diferenciarlos entre commits; `--compare` imprime el cociente de p50 contra
+un resultado anterior. La detección se mide sin el memo de detecciones.
+
+Uso (desde server/):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --persons 1000 5000 --concurrency 1 4 8
+    python -m benchmarks.bench_pipeline --backend stub --compare benchmarks/results/pipeline-abc1234.json
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from benchmarks.common import SERVER_DIR, setup_environment, synthetic_gallery, probe_for, measure, print_table
+
+setup_environment()
+
+FIXTURES_DIR = SERVER_DIR / "tests" / "powershell" / "test_images"
+RESULTS_DIR = SERVER_DIR / "benchmarks" / "results"
+WEIGHT_FILES = ("retinaface.h5", "facenet512_weights.h5")
+
+
+# ============================================================================
+# BACKEND
+# ============================================================================
+class StubDeepFace:
+    """Sustituto de `deepface.DeepFace` con costo de CPU y sin modelos."""
+
+    def __init__(self, dim: int = 512, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.projection = rng.standard_normal((32 * 32, dim)).astype(np.float32) / 32
+
+    def extract_faces(self, img_path, detector_backend=None, enforce_detection=False, align=True):
+        image = np.asarray(img_path)
+        level = image
+        while min(level.shape[:2]) > 32:
+            level = cv2.pyrDown(cv2.GaussianBlur(level, (5, 5), 0))
+
+        h, w = image.shape[:2]
+        size = int(min(h, w) * 0.4)
+        x, y = (w - size) // 2, (h - size) // 3
+        face = image[y:y + size, x:x + size]
+        return [{
+            'face': face[:, :, ::-1].astype(np.float32) / 255.0,
+            'facial_area': {'x': x, 'y': y, 'w': size, 'h': size},
+            'confidence': 0.99
+        }]
+
+    def represent(self, img_path, model_name=None, detector_backend=None, enforce_detection=True, align=True):
+        faces = img_path if isinstance(img_path, list) else [img_path]
+        results = [[{'embedding': self._embed(face).tolist()}] for face in faces]
+        return results if isinstance(img_path, list) else results[0]
+
+    def _embed(self, face: np.ndarray) -> np.ndarray:
+        face = np.asarray(face)
+        if face.ndim == 3:
+            face = cv2.cvtColor(face.astype(np.uint8), cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(face, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32).reshape(-1)
+        small = (small - small.mean()) / (small.std() + 1e-6)
+        return small @ self.projection
+
+
+def weights_available() -> bool:
+    """Indica si deepface está instalado y los pesos están en la caché local."""
+    if importlib.util.find_spec("deepface") is None:
+        return False
+    weights_dir = Path(os.getenv("DEEPFACE_HOME", str(Path.home()))) / ".deepface" / "weights"
+    return all((weights_dir / name).exists() for name in WEIGHT_FILES)
+
+
+def select_backend(name: str) -> str:
+    """Resuelve `auto` e instala el stub si corresponde."""
+    if name == "auto":
+        name = "real" if weights_available() else "stub"
+    if name == "stub":
+        module = types.ModuleType("deepface")
+        module.DeepFace = StubDeepFace()
+        sys.modules["deepface"] = module
+    return name
+
+
+# ============================================================================
+# GALERÍAS
+# ============================================================================
+def combine(first, second):
+    """Concatena dos EmbeddingGallery (personas de `first` primero)."""
+    from src.recognize.gallery import EmbeddingGallery
+
+    return EmbeddingGallery(
+        first.keys + second.keys,
+        np.vstack([first.matrix, second.matrix]),
+        np.concatenate([first.norms, second.norms]),
+        np.concatenate([first.offsets, second.offsets[1:] + first.offsets[-1]])
+    )
+
+
+def recognizer_for(gallery, detector=None):
+    from src.recognize.gallery import GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.detector = detector
+    recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery), gallery=gallery, database={})
+    recognizer.database = {}
+    return recognizer
+
+
+def load_fixtures():
+    paths = sorted(FIXTURES_DIR.glob("image*.jpg"), key=lambda p: int(p.stem[len("image"):]))
+    return [cv2.imread(str(p)) for p in paths]
+
+
+def fixture_face(detector, image: np.ndarray) -> np.ndarray:
+    """Rostro detectado y preprocesado, listo para el embedding."""
+    from src.recognize.config import ENABLE_PREPROCESSING
+    from src.recognize.utils import preprocess_face
+
+    face_img = detector.detect(image=image).best()['face_img']
+    return preprocess_face(face_img) if ENABLE_PREPROCESSING else face_img
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+def run_concurrent(fn, clients: int, requests_per_client: int):
+    """
+    Ejecuta `fn(i)` desde `clients` hilos a la vez.
+
+    Returns:
+        Diccionario con latencias (ms) por petición y throughput (peticiones/s)
+    """
+    barrier = threading.Barrier(clients + 1)
+    samples = [[] for _ in range(clients)]
+
+    def client(c):
+        barrier.wait()
+        for r in range(requests_per_client):
+            started = time.perf_counter()
+            fn(c * requests_per_client + r)
+            samples[c].append((time.perf_counter() - started) * 1000.0)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = np.concatenate([np.asarray(s) for s in samples])
+    return {
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "min_ms": float(latencies.min()),
+        "runs": int(latencies.size),
+        "throughput_rps": latencies.size / elapsed
+    }
+
+
+def row(suite: str, persons: int, stage: str, concurrency: int, stats):
+    result = {"suite": suite, "persons": persons, "stage": stage, "concurrency": concurrency}
+    result.update(stats)
+    result.setdefault("throughput_rps", 1000.0 / stats["mean_ms"] if stats["mean_ms"] else 0.0)
+    return result
+
+
+def matching_suite(args, persons: int):
+    gallery = synthetic_gallery(persons, args.embeddings, args.dim)
+    recognizer = recognizer_for(gallery)
+    rng = np.random.default_rng(persons)
+    probes = [probe_for(gallery, int(p), seed=i) for i, p in enumerate(rng.integers(persons, size=32))]
+
+    rows = [row("matching", persons, "matching", 1, measure(
+        lambda: recognizer._compare_with_database(probes[0]), repeat=args.repeat
+    ))]
+    for clients in args.concurrency:
+        if clients > 1:
+            rows.append(row("matching", persons, "matching", clients, run_concurrent(
+                lambda i: recognizer._compare_with_database(probes[i % len(probes)]), clients, args.requests
+            )))
+    return rows
+
+
+def pipeline_suite(args, persons: int, detector, images):
+    from src.recognize.embedder import represent_face
+    from src.recognize.gallery import EmbeddingGallery
+
+    enrolled, probes = images[:args.enroll], images[args.enroll:]
+    faces = [fixture_face(detector, image) for image in enrolled]
+    fixture = EmbeddingGallery.from_database({"fixture": [represent_face(face) for face in faces]})
+    padding = synthetic_gallery(max(persons - 1, 1), args.embeddings, fixture.matrix.shape[1])
+    recognizer = recognizer_for(combine(fixture, padding), detector)
+
+    probe_face = fixture_face(detector, probes[0])
+    query = represent_face(probe_face)
+    accepted = [recognizer.recognize(image=image)['person'] == "fixture" for image in probes]
+
+    rows = [
+        row("pipeline", persons, "detection", 1, measure(lambda: detector.detect(image=probes[0]), repeat=args.repeat)),
+        row("pipeline", persons, "embedding", 1, measure(lambda: represent_face(probe_face), repeat=args.repeat)),
+        row("pipeline", persons, "matching", 1, measure(lambda: recognizer._compare_with_database(query), repeat=args.repeat)),
+        row("pipeline", persons, "end_to_end", 1, measure(lambda: recognizer.recognize(image=probes[0]), repeat=args.repeat))
+    ]
+    for clients in args.concurrency:
+        if clients > 1:
+            rows.append(row("pipeline", persons, "end_to_end", clients, run_concurrent(
+                lambda i: recognizer.recognize(image=probes[i % len(probes)]), clients, args.requests
+            )))
+    for r in rows:
+        r["accept_rate"] = float(np.mean(accepted))
+    return rows
+
+
+# ============================================================================
+# RESULTADOS
+# ============================================================================
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def row_key(r) -> str:
+    return f"{r['suite']}/{r['persons']}/{r['stage']}/c{r['concurrency']}"
+
+
+def compare(rows, previous_path: Path) -> None:
+    """Imprime p50 y throughput contra un resultado anterior."""
+    previous = {row_key(r): r for r in json.loads(previous_path.read_text())["results"]}
+    table = []
+    for r in rows:
+        old = previous.get(row_key(r))
+        if old is not None:
+            table.append({
+                "key": row_key(r),
+                "old_p50_ms": old["p50_ms"], "new_p50_ms": r["p50_ms"],
+                "p50_ratio": r["p50_ms"] / old["p50_ms"] if old["p50_ms"] else None,
+                "rps_ratio": r["throughput_rps"] / old["throughput_rps"] if old["throughput_rps"] else None
+            })
+    print(f"\nComparación con {previous_path}:")
+    if not table:
+        print("  (sin filas con la misma suite/personas/etapa/concurrencia)")
+        return
+    print_table(table, ["key", "old_p50_ms", "new_p50_ms", "p50_ratio", "rps_ratio"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--embeddings", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=512, help="Dimensión de la suite de matching")
+    parser.add_argument("--enroll", type=int, default=5, help="Imágenes de prueba registradas (el resto son probes)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=10, help="Peticiones por cliente concurrente")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--backend", choices=["auto", "real", "stub"], default="auto")
+    parser.add_argument("--suites", nargs="+", choices=["matching", "pipeline"], default=["matching", "pipeline"])
+    parser.add_argument("--output", type=Path, default=None, help="Archivo JSON (por defecto results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Resultado JSON anterior")
+    args = parser.parse_args()
+
+    backend = select_backend(args.backend)
+
+    from src.recognize import detector as detector_module
+    from src.recognize.detector import FaceDetector
+    from src.recognize.profiling import get_profiler
+    from src.recognize.utils import logger
+
+    # El log por reconocimiento (INFO) ensucia la salida y no es parte del costo a comparar
+    logger.setLevel(logging.WARNING)
+    # Medir siempre la detección completa, no el memo
+    detector_module.DETECTION_CACHE_SIZE = 0
+    detector = FaceDetector()
+    if backend == "stub":
+        detector._model_loaded = True
+    images = load_fixtures()
+    print(f"✓ backend: {backend}, {len(images)} imágenes de prueba")
+
+    rows = []
+    for persons in args.persons:
+        if "matching" in args.suites:
+            rows += matching_suite(args, persons)
+        if "pipeline" in args.suites:
+            rows += pipeline_suite(args, persons, detector, images)
+        print(f"✓ {persons} personas")
+
+    stages = get_profiler().snapshot()["stages"]
+    commit = git_commit()
+    output = args.output or RESULTS_DIR / f"pipeline-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "backend": backend,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}
+        },
+        "results": rows,
+        "stages": stages
+    }, indent=2, sort_keys=True))
+
+    print()
+    print_table(rows, ["suite", "persons", "stage", "concurrency", "p50_ms", "p95_ms", "throughput_rps", "accept_rate"])
+    print("\nTiempos por etapa (profiler, todas las corridas):")
+    print_table(
+        [{"stage": stage, **stats} for stage, stats in stages.items()],
+        ["stage", "count", "p50_ms", "p95_ms", "p99_ms"]
+    )
+    print(f"\n✓ Resultados en {output}")
+
+    if args.compare is not None:
+        compare(rows, args.compare)
+
+
+if __name__ == "__main__":
+    main()
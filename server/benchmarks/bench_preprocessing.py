@@ -0,0 +1,139 @@
+"""
+Benchmark de perfiles de preprocesamiento: latencia por rostro vs precisión.
+
+Para cada perfil de PREPROCESSING_PROFILES mide los milisegundos de
+`preprocess_face` por rostro sobre las imágenes de
+tests/powershell/test_images (misma persona, 10 tomas) y una verificación
+de precisión:
+
+- Por defecto (sin modelo): fidelidad respecto al perfil "quality"
+  (diferencia media absoluta y PSNR de la imagen preprocesada).
+- Con `--real`: recorta los rostros con el detector configurado, registra
+  las primeras `--enroll` imágenes con el perfil "quality" (como una galería
+  ya existente), verifica el resto con cada perfil y reporta la distancia
+  genuina y la tasa de aceptación con RECOGNITION_THRESHOLD, más la deriva
+  del embedding respecto al de "quality" (requiere deepface y los modelos).
+
+Uso (desde server/):
+    python -m benchmarks.bench_preprocessing
+    python -m benchmarks.bench_preprocessing --real --enroll 5
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.common import SERVER_DIR, setup_environment, measure, print_table
+
+setup_environment()
+
+FIXTURES_DIR = SERVER_DIR / "tests" / "powershell" / "test_images"
+
+
+def load_fixture_faces(real: bool):
+    """
+    Rostros recortados de las imágenes de prueba.
+
+    Sin `real` se usa un recorte fijo centrado (las tomas son de webcam con
+    el rostro al centro); con `real` se usa el detector configurado.
+    """
+    paths = sorted(FIXTURES_DIR.glob("image*.jpg"), key=lambda p: int(p.stem[len("image"):]))
+    images = [cv2.imread(str(p)) for p in paths]
+
+    if real:
+        from src.recognize.detector import get_detector
+
+        detector = get_detector()
+        faces = [detector.detect(image=image).best() for image in images]
+        return [face['face_img'] for face in faces if face is not None]
+
+    faces = []
+    for image in images:
+        h, w = image.shape[:2]
+        faces.append(image[int(h * 0.2):int(h * 0.75), int(w * 0.38):int(w * 0.66)].copy())
+    return faces
+
+
+def pixel_fidelity(reference: np.ndarray, output: np.ndarray) -> dict:
+    """Diferencia media absoluta y PSNR (dB) respecto a la referencia."""
+    diff = reference.astype(np.float64) - output.astype(np.float64)
+    mse = float(np.mean(diff ** 2))
+    return {
+        "mad": float(np.mean(np.abs(diff))),
+        "psnr_db": float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+    }
+
+
+def cosine_distance(a: np.ndarray, b: np.ndarray) -> float:
+    return float(1.0 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=None, help="Perfiles a medir (por defecto todos)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por rostro")
+    parser.add_argument("--real", action="store_true", help="Verificar con detector y embeddings reales")
+    parser.add_argument("--enroll", type=int, default=5, help="Imágenes registradas con 'quality' (--real)")
+    args = parser.parse_args()
+
+    from src.recognize.config import PREPROCESSING_PROFILES, RECOGNITION_THRESHOLD
+    from src.recognize.utils import preprocess_face
+
+    profiles = args.profiles or list(PREPROCESSING_PROFILES)
+    faces = load_fixture_faces(args.real)
+    if not faces:
+        raise SystemExit(f"No se encontraron rostros en {FIXTURES_DIR}")
+
+    reference = [preprocess_face(face, profile="quality") for face in faces]
+
+    if args.real:
+        from src.recognize.embedder import represent_faces
+
+        reference_embeddings = represent_faces(reference)
+        gallery = [e for e in reference_embeddings[:args.enroll] if e is not None]
+
+    rows = []
+    for profile in profiles:
+        timing = measure(
+            lambda: [preprocess_face(face, profile=profile) for face in faces],
+            repeat=args.repeat, warmup=1
+        )
+        outputs = [preprocess_face(face, profile=profile) for face in faces]
+        fidelity = [pixel_fidelity(ref, out) for ref, out in zip(reference, outputs)]
+
+        row = {
+            "profile": profile,
+            "ms_per_face": timing["mean_ms"] / len(faces),
+            "p95_ms_per_face": timing["p95_ms"] / len(faces),
+            "mad_vs_quality": float(np.mean([f["mad"] for f in fidelity])),
+            "psnr_db": float(np.mean([f["psnr_db"] for f in fidelity]))
+        }
+
+        if args.real:
+            embeddings = represent_faces(outputs)
+            drift = [
+                cosine_distance(e, r) for e, r in zip(embeddings, reference_embeddings)
+                if e is not None and r is not None
+            ]
+            probes = [e for e in embeddings[args.enroll:] if e is not None]
+            genuine = [min(cosine_distance(p, g) for g in gallery) for p in probes]
+            row.update({
+                "drift_cos": float(np.mean(drift)),
+                "genuine_dist": float(np.mean(genuine)),
+                "accept_rate": float(np.mean([d <= RECOGNITION_THRESHOLD for d in genuine]))
+            })
+
+        rows.append(row)
+        print(f"✓ {profile}")
+
+    columns = ["profile", "ms_per_face", "p95_ms_per_face", "mad_vs_quality", "psnr_db"]
+    if args.real:
+        columns += ["drift_cos", "genuine_dist", "accept_rate"]
+
+    print()
+    print(f"{len(faces)} rostros de {FIXTURES_DIR.relative_to(SERVER_DIR)}")
+    print_table(rows, columns)
+
+
+if __name__ == "__main__":
+    main()
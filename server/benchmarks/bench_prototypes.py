@@ -0,0 +1,135 @@
+"""
+Benchmark de prototipos por persona: velocidad de matching vs decisiones.
+
+Genera una galería sintética con la forma de un registro real: cada persona
+tiene `--images` tomas (centros de pose/iluminación) y cada toma
+`--variants` augmentations casi idénticas. El set de validación son probes
+nuevos cerca de una toma al azar de cada persona, más probes de impostores
+(personas no registradas).
+
+Para cada k y método compara contra la galería completa:
+- latencia p50 del scan vectorizado (`gallery.score`) y de
+  `_compare_with_database` completo
+- decisiones que cambian (persona o reconocido/no reconocido)
+- tasa de aciertos de genuinos y falsos aceptados de impostores
+
+Uso (desde server/):
+    python -m benchmarks.bench_prototypes
+    python -m benchmarks.bench_prototypes --persons 2000 --k 8 16 24 --methods farthest kmedoids
+"""
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.common import setup_environment, measure, print_table
+
+setup_environment()
+
+
+def enrollment_database(num_persons: int, images: int, variants: int, dim: int, seed: int = 0):
+    """
+    Base {persona: embeddings} y centros de toma para generar probes.
+
+    Returns:
+        Tupla (database, shots) con shots[p] = matriz (images, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_persons, dim))
+    shots = centers[:, None, :] + 0.35 * rng.standard_normal((num_persons, images, dim))
+    database = {}
+    for p in range(num_persons):
+        augmented = np.repeat(shots[p], variants, axis=0)
+        augmented += 0.08 * rng.standard_normal(augmented.shape)
+        database[f"persona_{p:05d}"] = augmented
+    return database, shots
+
+
+def validation_probes(shots: np.ndarray, impostors: int, dim: int, seed: int = 1):
+    """Probes genuinos (persona esperada) e impostores (None)."""
+    rng = np.random.default_rng(seed)
+    probes = []
+    for p in range(len(shots)):
+        shot = shots[p, rng.integers(len(shots[p]))]
+        probes.append((f"persona_{p:05d}", shot + 0.2 * rng.standard_normal(dim)))
+    for _ in range(impostors):
+        probes.append((None, rng.standard_normal(dim)))
+    return probes
+
+
+def recognizer_for(database):
+    from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.registration = SimpleNamespace(
+        snapshot=GallerySnapshot(EmbeddingGallery.from_database(database)), database=database
+    )
+    recognizer.database = database
+    return recognizer
+
+
+def decisions(recognizer, probes):
+    return [recognizer._compare_with_database(query)[0] for _, query in probes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=500)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--variants", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--impostors", type=int, default=100)
+    parser.add_argument("--k", type=int, nargs="+", default=[8, 16, 24])
+    parser.add_argument("--methods", nargs="+", default=["farthest"], choices=["farthest", "kmedoids"])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.recognize.prototypes import compact_database
+
+    database, shots = enrollment_database(args.persons, args.images, args.variants, args.dim)
+    probes = validation_probes(shots, args.impostors, args.dim)
+    genuine = [expected for expected, _ in probes if expected is not None]
+    timing_query = probes[len(probes) // 2][1]
+
+    def summarize(name, k, db):
+        recognizer = recognizer_for(db)
+        gallery = recognizer.registration.snapshot.gallery
+        decided = decisions(recognizer, probes)
+        score = measure(lambda: gallery.score(timing_query), repeat=args.repeat)
+        timing = measure(lambda: recognizer._compare_with_database(timing_query), repeat=args.repeat)
+        return {
+            "config": name,
+            "k": k,
+            "embeddings": sum(len(v) for v in db.values()),
+            "score_ms": score["p50_ms"],
+            "p50_ms": timing["p50_ms"],
+            "genuine_acc": float(np.mean([d == e for d, (e, _) in zip(decided, probes) if e is not None])),
+            "impostor_far": float(np.mean([d is not None for d, (e, _) in zip(decided, probes) if e is None]))
+                if args.impostors else 0.0,
+            "_decided": decided
+        }
+
+    baseline = summarize("completa", args.images * args.variants, database)
+    baseline["score_speedup"] = baseline["speedup"] = 1.0
+    baseline["changed"] = 0
+    rows = [baseline]
+    print(f"✓ galería completa ({len(genuine)} genuinos, {args.impostors} impostores)")
+
+    for method in args.methods:
+        for k in args.k:
+            compacted = dict(database)
+            compacted.update(compact_database(database, k=k, method=method))
+            row = summarize(method, k, compacted)
+            row["score_speedup"] = baseline["score_ms"] / row["score_ms"]
+            row["speedup"] = baseline["p50_ms"] / row["p50_ms"]
+            row["changed"] = sum(a != b for a, b in zip(row["_decided"], baseline["_decided"]))
+            rows.append(row)
+            print(f"✓ {method} k={k}")
+
+    print()
+    print_table(rows, ["config", "k", "embeddings", "score_ms", "score_speedup", "p50_ms", "speedup", "changed", "genuine_acc", "impostor_far"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark de poda por centroides: latencia de matching vs tamaño de galería.
+
+Usa galerías sintéticas con la forma de un registro real (tomas por persona y
+augmentations casi idénticas, como `bench_prototypes`) y compara
+`_compare_with_database` con y sin CENTROID_PRUNING:
+- latencia p50/p95 de probes genuinos y de impostores
+- candidatos promedio que pasan al ensemble exacto
+- decisiones que cambian (deben ser 0)
+
+Uso (desde server/):
+    python -m benchmarks.bench_pruning
+    python -m benchmarks.bench_pruning --persons 500 2000 5000 --candidates 16 32 64
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import setup_environment, measure, print_table
+
+setup_environment()
+
+from benchmarks.bench_prototypes import enrollment_database, validation_probes, recognizer_for  # noqa: E402
+
+
+def run_probes(recognizer, probes):
+    """Decisiones y candidatos del ensemble exacto para cada probe."""
+    decided, candidates = [], []
+    for _, query in probes:
+        person, confidence, details = recognizer._compare_with_database(query)
+        decided.append((person, round(confidence, 6)))
+        candidates.append(details.get('pruning', {}).get('candidates', len(recognizer.registration.snapshot)))
+    return decided, candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--variants", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--probes", type=int, default=200, help="Probes genuinos a evaluar")
+    parser.add_argument("--impostors", type=int, default=50)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[32])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.recognize import reconocimiento
+
+    rows = []
+    for persons in args.persons:
+        database, shots = enrollment_database(persons, args.images, args.variants, args.dim)
+        probes = validation_probes(shots, args.impostors, args.dim)
+        probes = probes[:args.probes] + probes[persons:]
+        recognizer = recognizer_for(database)
+        genuine_query = probes[0][1]
+        impostor_query = probes[-1][1]
+
+        reconocimiento.CENTROID_PRUNING = False
+        baseline, _ = run_probes(recognizer, probes)
+        genuine = measure(lambda: recognizer._compare_with_database(genuine_query), repeat=args.repeat)
+        impostor = measure(lambda: recognizer._compare_with_database(impostor_query), repeat=args.repeat)
+        rows.append({
+            "persons": persons, "config": "completa",
+            "genuine_p50_ms": genuine["p50_ms"], "impostor_p50_ms": impostor["p50_ms"],
+            "speedup": 1.0, "avg_candidates": float(persons), "changed": 0
+        })
+
+        reconocimiento.CENTROID_PRUNING = True
+        reconocimiento.PRUNING_MIN_PERSONS = 0
+        for size in args.candidates:
+            reconocimiento.PRUNING_CANDIDATES = size
+            decided, candidates = run_probes(recognizer, probes)
+            timing = measure(lambda: recognizer._compare_with_database(genuine_query), repeat=args.repeat)
+            impostor_timing = measure(lambda: recognizer._compare_with_database(impostor_query), repeat=args.repeat)
+            rows.append({
+                "persons": persons, "config": f"poda M={size}",
+                "genuine_p50_ms": timing["p50_ms"], "impostor_p50_ms": impostor_timing["p50_ms"],
+                "speedup": genuine["p50_ms"] / timing["p50_ms"],
+                "avg_candidates": float(np.mean(candidates)),
+                "changed": sum(a != b for a, b in zip(decided, baseline))
+            })
+        print(f"✓ {persons} personas")
+
+    print()
+    print_table(rows, ["persons", "config", "genuine_p50_ms", "impostor_p50_ms", "speedup", "avg_candidates", "changed"])
+
+
+if __name__ == "__main__":
+    main()
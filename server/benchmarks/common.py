@@ -0,0 +1,152 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+- Configura variables de entorno mínimas para poder importar `src.*` sin `.env`
+- Genera galerías sintéticas (vectores aleatorios) para benchmarks de matching
+- Mide latencias y resume percentiles
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+SERVER_DIR = Path(__file__).parent.parent.absolute()
+
+# Valores mínimos para que `get_settings()` funcione fuera del servidor
+_DEFAULT_ENV = {
+    "DATABASE_URL": "sqlite:///:memory:",
+    "SECRET_KEY": "benchmark-secret-key",
+    "JWT_SECRET_KEY": "benchmark-jwt-secret",
+    "DEBUG": "false",
+    "UPLOAD_DIR": "./benchmark_uploads",
+    "REPORTS_DIR": "./benchmark_reports",
+    "TEMP_DIR": "./benchmark_temp",
+    "MAX_FILE_SIZE": "5242880",
+    "PASSWORD_MIN_LENGTH": "8",
+    "MAIL_API_URL": "http://localhost:8080",
+    "MAIL_API_CLIENT_ID": "benchmark",
+    "MAIL_API_SECRET": "benchmark",
+    "SMTP_FROM_EMAIL": "benchmark@localhost",
+    "SMTP_FROM_NAME": "Benchmark",
+    "TARDANZAS_MAX_ALERTA": "3",
+    "FALTAS_MAX_ALERTA": "2",
+    "MINUTOS_TARDANZA": "15",
+}
+
+
+def setup_environment() -> None:
+    """Prepara sys.path y variables de entorno antes de importar `src`."""
+    if str(SERVER_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVER_DIR))
+    for key, value in _DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+
+# ============================================================================
+# GALERÍAS SINTÉTICAS
+# ============================================================================
+def synthetic_matrix(
+    num_persons: int,
+    embeddings_per_person: int,
+    dim: int = 512,
+    seed: int = 0,
+    spread: float = 0.35
+) -> np.ndarray:
+    """
+    Genera embeddings float32 agrupados por persona (filas contiguas).
+
+    Cada persona tiene un centro aleatorio y sus embeddings son el centro más
+    ruido, de modo que las distancias se parecen a las de una galería real.
+
+    Returns:
+        Matriz (num_persons * embeddings_per_person, dim) float32
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_persons, dim), dtype=np.float32)
+    matrix = np.repeat(centers, embeddings_per_person, axis=0)
+    matrix += spread * rng.standard_normal(matrix.shape, dtype=np.float32)
+    return matrix
+
+
+def synthetic_database(
+    num_persons: int,
+    embeddings_per_person: int,
+    dim: int = 512,
+    seed: int = 0
+) -> Dict[str, List[np.ndarray]]:
+    """Genera una base {persona: [embeddings float64]} como la de embeddings.pkl."""
+    matrix = synthetic_matrix(num_persons, embeddings_per_person, dim, seed).astype(np.float64)
+    return {
+        f"persona_{p:05d}": list(matrix[p * embeddings_per_person:(p + 1) * embeddings_per_person])
+        for p in range(num_persons)
+    }
+
+
+def synthetic_gallery(num_persons: int, embeddings_per_person: int, dim: int = 512, seed: int = 0):
+    """Construye directamente una EmbeddingGallery sintética (sin pasar por dicts)."""
+    from src.recognize.gallery import EmbeddingGallery
+
+    matrix = synthetic_matrix(num_persons, embeddings_per_person, dim, seed)
+    norms = np.linalg.norm(matrix, axis=1)
+    matrix /= norms[:, None]
+    offsets = np.arange(num_persons + 1, dtype=np.int64) * embeddings_per_person
+    keys = [f"persona_{p:05d}" for p in range(num_persons)]
+    return EmbeddingGallery(keys, matrix, norms, offsets)
+
+
+def probe_for(gallery, person_index: int = 0, noise: float = 0.3, seed: int = 1) -> np.ndarray:
+    """Genera un probe cercano a una persona de la galería."""
+    rng = np.random.default_rng(seed)
+    row = gallery.offsets[person_index]
+    base = gallery.matrix[row].astype(np.float64) * float(gallery.norms[row])
+    return base + noise * rng.standard_normal(base.shape)
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """
+    Ejecuta `fn` varias veces y resume la latencia en milisegundos.
+
+    Returns:
+        Diccionario con mean/p50/p95/p99/min en ms
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    samples = np.asarray(samples)
+    return {
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "min_ms": float(samples.min()),
+        "runs": int(repeat)
+    }
+
+
+def print_table(rows: List[Dict[str, object]], columns: List[str]) -> None:
+    """Imprime una tabla simple alineada."""
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(_fmt(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import sys
 
@@ -17,7 +21,7 @@ os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
 
 from src.config.settings import get_settings, ensure_directories
-from src.config.database import init_db
+from src.config.database import init_db, get_db
 from src.config.migrations import run_migrations_upgrade_head
 # Nueva estructura modular
 from src.roles import router as role_router
@@ -32,9 +36,12 @@ from src.reportes import router as reportes_router
 from src.jobs.scheduler import start_scheduler, shutdown_scheduler
 
 # Sistema de reconocimiento - SOLO se importa, NO se inicializa aquí
-# La inicialización ocurre en el lifespan de la aplicación
-from src.recognize.reconocimiento import initialize_recognizer
-from src.recognize.registro import get_registration
+# La carga ocurre en segundo plano desde el lifespan de la aplicación
+from src.recognize.readiness import get_readiness, reset_readiness
+from src.recognize.inference_pool import shutdown_inference_pool
+from src.recognize.preprocessing_pool import configure_opencv_threads, reset_preprocessing_pool
+from src.users.enrollment import get_enrollment_jobs, reset_enrollment_jobs
+from src.users.bulk_import import reset_bulk_importer
 
 settings = get_settings()
 
@@ -121,28 +128,23 @@ async def lifespan(app: FastAPI):
         print("✓ Database initialized (create_all mode)")
     
     # ============================================================================
-    # INICIALIZAR SISTEMA DE RECONOCIMIENTO FACIAL PRIMERO
+    # SISTEMA DE RECONOCIMIENTO FACIAL EN SEGUNDO PLANO
     # ============================================================================
-    # Esto DEBE hacerse ANTES de los seeds para evitar:
-    # 1. Double-loading de modelos
-    # 2. Conflictos de memoria
-    # 3. Corruption de pointers
-    try:
-        print("\n" + "=" * 60)
-        print("🔍 Initializing facial recognition system...")
-        print("=" * 60)
-        initialize_recognizer()
-        get_registration()
-        print("✅ Facial recognition system initialized successfully")
-        print("=" * 60 + "\n")
-    except Exception as e:
-        print(f"⚠️  Warning: Facial recognition initialization failed: {e}")
-        print("⚠️  Application will continue without facial recognition")
-        import traceback
-        print(traceback.format_exc())
+    # TensorFlow, RetinaFace y Facenet512 tardan decenas de segundos en cargar:
+    # se cargan en una tarea de fondo (con inferencia de calentamiento) y el
+    # servidor atiende desde ya las rutas no faciales. Las rutas faciales
+    # responden 503 con Retry-After hasta que /health/ready indique listo.
+    configure_opencv_threads()  # Una vez por proceso (los workers lo hacen al iniciar)
+    get_readiness().start()
+    await asyncio.sleep(0)  # Que la carga arranque antes de los seeds
+    print("⏳ Facial recognition system loading in background (see /health/ready)")
+    
+    # Los jobs de registro facial solo viven en memoria: los que un reinicio
+    # dejó a medias se retoman (o descartan) cuando el sistema esté listo
+    get_enrollment_jobs().start_recovery(get_readiness())
     
     # ============================================================================
-    # EJECUTAR SEEDS DESPUÉS de cargar modelos de ML
+    # EJECUTAR SEEDS (no usan los modelos de ML)
     # ============================================================================
     try:
         _execute_seeds()
@@ -167,6 +169,11 @@ async def lifespan(app: FastAPI):
     print("\n" + "=" * 60)
     print("🛑 Shutting down application...")
     shutdown_scheduler()
+    reset_readiness()
+    reset_enrollment_jobs()
+    reset_bulk_importer()
+    shutdown_inference_pool()
+    reset_preprocessing_pool()
     print("✓ Application stopped")
     print("=" * 60)
 
@@ -236,16 +243,52 @@ async def root():
     }
 
 
+def _database_ready(db: Session) -> bool:
+    """Run a trivial query to check the database connection."""
+    try:
+        db.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(db: Session = Depends(get_db)):
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "database": "connected",
-        "scheduler": "running"
+        "database": "connected" if _database_ready(db) else "disconnected",
+        "scheduler": "running",
+        "recognition": get_readiness().state
     }
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready(db: Session = Depends(get_db)):
+    """
+    Readiness probe: models, gallery and database.
+    Returns 503 until the background model load finishes.
+    """
+    recognition = get_readiness().status()
+    database = _database_ready(db)
+    ready = database and recognition["state"] == "ready"
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": database,
+            "recognition": recognition
+        }
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     import os
@@ -16,6 +16,7 @@ RUTAS PROTEGIDAS (requieren autenticación):
 - GET /asistencia/usuario/{user_id} - Asistencias de un usuario
 - PUT /asistencia/actualizar-manual/{asistencia_id} - Actualizar asistencia
 - DELETE /asistencia/{asistencia_id} - Eliminar asistencia
+- GET /asistencia/admin/reconocimiento/tiempos - Tiempos por etapa del reconocimiento (solo ADMIN)
 
 NOTA: Las rutas de registro facial y manual son públicas pero se validan
 internamente por rol (ADMIN) en el servicio.
@@ -28,6 +29,7 @@ from typing import Optional, TYPE_CHECKING
 
 from src.config.database import get_db
 from src.auth import get_current_user, require_admin
+from src.utils.readiness import require_recognition_ready
 
 from src.horarios.model import DiaSemana
 from .schemas import (
@@ -147,7 +149,7 @@ async def registrar_asistencia_manual(
         )
 
 
-@router.post("/registro-facial")
+@router.post("/registro-facial", dependencies=[Depends(require_recognition_ready)])
 async def registrar_asistencia_facial(
     codigo: str = Query(...),
     image: UploadFile = File(...),
@@ -160,15 +162,18 @@ async def registrar_asistencia_facial(
     
     Flujo:
     - Se recibe `codigo` y una `image` (multipart/form-data).
-    - Se ejecuta el reconocedor facial sobre la imagen.
-    - Si el reconocedor identifica una persona y el nombre coincide con el `User.name`
-      asociado al `codigo`, se registra la asistencia (entrada/salida) usando el
-      servicio `asistencia_service.registrar_asistencia`.
+    - Se verifica (1:1) la imagen contra los embeddings del usuario asociado
+      al `codigo` (más una cohorte pequeña de impostores).
+    - Si la verificación es exitosa, se registra la asistencia (entrada/salida)
+      usando el servicio `asistencia_service.registrar_asistencia`.
     - Si no coincide, se devuelve error.
-    - La imagen se guarda de forma permanente en la carpeta de asistencias.
+    - La inferencia se ejecuta en el pool de inferencia (no bloquea el servidor);
+      si la cola está llena, o los modelos aún se están cargando, se responde
+      503 con Retry-After.
+    - La imagen se decodifica en memoria; no se escribe en disco.
     """
     try:
-        asistencia_resp = asistencia_service.registrar_asistencia_facial(db, codigo, image)
+        asistencia_resp = await asistencia_service.registrar_asistencia_facial(db, codigo, image)
 
         return create_single_response(data=asistencia_resp, message="Asistencia registrada por reconocimiento facial")
 
@@ -407,6 +412,28 @@ async def listar_todas_asistencias_admin(
         )
 
 
+@router.get("/admin/reconocimiento/tiempos")
+async def obtener_tiempos_reconocimiento(
+    current_user: "User" = Depends(require_admin)
+):
+    """
+    Obtiene los tiempos por etapa del reconocimiento facial (solo admin)
+    
+    🔐 ADMIN ONLY (requiere ser administrador)
+    
+    Por etapa (quality, detector, detection, preprocess, embedding, extract,
+    matching, recognize, verify y, con micro-batching, batch_wait y
+    batch_compute): muestras totales y mean/p50/p95/p99/max en ms de las
+    últimas `window` marcaciones.
+    """
+    from src.recognize.profiling import get_profiler
+    
+    return create_single_response(
+        data=get_profiler().snapshot(),
+        message="Tiempos de reconocimiento obtenidos exitosamente"
+    )
+
+
 @router.get("/usuario/{user_id}")
 async def obtener_asistencias_usuario(
     user_id: int,
@@ -18,10 +18,10 @@ from .model import Asistencia, TipoRegistro, EstadoAsistencia, MetodoRegistro
 from src.horarios.model import DiaSemana, Horario
 from src.horarios.service import horario_service
 from src.users.service import user_service
-from src.recognize.reconocimiento import get_recognizer
+from src.recognize.inference_pool import get_inference_pool, InferenceQueueFull
 from src.utils.base_service import BaseService
 import numpy as np
-from src.utils.file_handler import save_user_images, delete_user_folder
+from src.utils.file_handler import decode_upload_image
 import cv2
 
 
@@ -512,7 +512,7 @@ class AsistenciaService(BaseService):
                 detail=f"Error al eliminar asistencia: {str(e)}"
             )
 
-    def registrar_asistencia_facial(
+    async def registrar_asistencia_facial(
         self,
         db: Session,
         codigo_user: str,
@@ -521,82 +521,74 @@ class AsistenciaService(BaseService):
         """
         Registra asistencia mediante reconocimiento facial.
 
-        - Guarda temporalmente la imagen en disco
-        - Ejecuta el reconocedor pasándole la ruta (no bytes)
-        - Valida que la persona reconocida coincida con el usuario
+        - Decodifica la imagen en memoria (sin archivos temporales)
+        - Verifica 1:1 la imagen contra los embeddings del usuario del código
+          (más una cohorte pequeña de impostores), no contra toda la empresa
+        - La inferencia corre en el pool de inferencia, sin bloquear el event loop
         - Determina tipo_registro (entrada/salida)
-        - Elimina la imagen temporal después del reconocimiento
         """
         from datetime import datetime
         
         # Validar y obtener usuario
         user = self._validar_y_obtener_usuario(db, codigo_user)
 
-        try:
-            image_paths = save_user_images(codigo_user, [image])
-            image_save = image_paths[0]  # Obtener la primera (única) imagen guardada
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al procesar imagen: {str(e)}"
-            )
+        image_array = decode_upload_image(image)
 
         ahora = datetime.now()
 
+        # Verificación 1:1 contra el usuario reclamado por el código
+        user_key = self.user_service.get_face_key(user)
         try:
-            # Reconocer usando la ruta de la imagen (no bytes)
-            recognizer = get_recognizer()
-            result = recognizer.recognize(image_path=image_save, return_details=True)
-
-            if not result.get('recognized'):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Rostro no reconocido en la imagen"
-                )
-
-            person_name = result.get('person')
-            if person_name is None or person_name.strip().lower() != (user.name or "").strip().lower():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Persona reconocida ('{person_name}') no coincide con el usuario del código {codigo_user}"
-                )
+            result = await get_inference_pool().verify(user_key, image=image_array)
+        except InferenceQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de reconocimiento ocupado, intente nuevamente",
+                headers={"Retry-After": "2"}
+            )
 
-            # Obtener turno activo
-            dia_actual = self._get_dia_semana(ahora)
-            horario = self.horario_service.detectar_turno_activo(
-                db, user.id, dia_actual, ahora.time()
+        if result.get('error'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Rostro no reconocido en la imagen: {result['error']}"
             )
-            
-            # IMPORTANTE: Validar que exista turno activo
-            if not horario:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"El usuario {user.name} no tiene ningún turno activo en este momento para {dia_actual.value}"
-                )
 
-            # Determinar tipo de registro
-            tipo_registro = self._determinar_tipo_registro(
-                db, user.id, ahora.date(), horario.id
+        if not result.get('verified'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El rostro no coincide con el usuario del código {codigo_user}"
             )
 
-            # Delegar en la lógica común usando MetodoRegistro.FACIAL
-            asistencia_result = self._registrar_common(
-                db=db,
-                user=user,
-                horario=horario,
-                ahora=ahora,
-                tipo_registro=tipo_registro,
-                metodo=MetodoRegistro.FACIAL,
-                observaciones=None
+        # Obtener turno activo
+        dia_actual = self._get_dia_semana(ahora)
+        horario = self.horario_service.detectar_turno_activo(
+            db, user.id, dia_actual, ahora.time()
+        )
+        
+        # IMPORTANTE: Validar que exista turno activo
+        if not horario:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"El usuario {user.name} no tiene ningún turno activo en este momento para {dia_actual.value}"
             )
-            
-            return asistencia_result
 
-        finally:
-            try:
-               delete_user_folder(codigo_user)
-            except Exception as e:
-                print(f"⚠️ Advertencia: No se pudo eliminar imagen temporal: {str(e)}")
+        # Determinar tipo de registro
+        tipo_registro = self._determinar_tipo_registro(
+            db, user.id, ahora.date(), horario.id
+        )
+
+        # Delegar en la lógica común usando MetodoRegistro.FACIAL
+        asistencia_result = self._registrar_common(
+            db=db,
+            user=user,
+            horario=horario,
+            ahora=ahora,
+            tipo_registro=tipo_registro,
+            metodo=MetodoRegistro.FACIAL,
+            observaciones=None
+        )
+        
+        return asistencia_result
 
     def registrar_asistencia_huella(
         self,
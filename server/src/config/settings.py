@@ -43,6 +43,8 @@ class Settings(BaseSettings):
     TEMP_DIR: str  # Debe venir del .env
     MAX_FILE_SIZE: int  # Debe venir del .env
     ALLOWED_IMAGE_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+    ALLOWED_VIDEO_EXTENSIONS: set = {".mp4", ".mov", ".webm", ".avi", ".mkv"}
+    MAX_VIDEO_SIZE: int = 50 * 1024 * 1024  # Registro facial desde video (50MB)
     
     # ===== SECURITY & JWT =====
     PASSWORD_MIN_LENGTH: int  # Debe venir del .env
@@ -0,0 +1,442 @@
+"""
+Módulo de índice aproximado (ANN) para galerías grandes.
+Implementa un índice IVF (inverted file) en NumPy puro: los embeddings se
+agrupan con k-means esférico en `nlist` centroides y una búsqueda solo recorre
+las `nprobe` listas más cercanas al query. El índice no copia los vectores:
+los lee de la galería del snapshot. Solo propone candidatos; el ensemble de
+`FaceRecognizer` los re-ordena con distancias exactas.
+"""
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .config import ANN_NLIST, ANN_NPROBE, ANN_RETRAIN_FACTOR
+from .gallery import EmbeddingGallery
+from .utils import logger, atomic_open
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza filas a norma L2 = 1 (float32)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _person_count(database: Mapping[str, Sequence[np.ndarray]], key: str) -> int:
+    """Embeddings de una persona (sin leer la matriz si la base es un EmbeddingStore)."""
+    count = getattr(database, "count", None)
+    return count(key) if callable(count) else len(database[key])
+
+
+def _person_vectors(database: Mapping[str, Sequence[np.ndarray]], key: str) -> np.ndarray:
+    """Embeddings de una persona como matriz (n, D)."""
+    vectors = np.asarray(database[key])
+    return vectors.reshape(len(vectors), -1)
+
+
+def train_centroids(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int = 10,
+    sample_size: int = 64,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Entrena centroides con k-means esférico (similitud coseno).
+
+    Args:
+        vectors: Matriz (N, D) de vectores normalizados
+        nlist: Número de centroides
+        iterations: Iteraciones de Lloyd
+        sample_size: Puntos de entrenamiento por centroide (submuestreo)
+        seed: Semilla para resultados reproducibles
+
+    Returns:
+        Matriz (nlist, D) float32 de centroides normalizados
+    """
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, len(vectors)))
+
+    if len(vectors) > nlist * sample_size:
+        vectors = vectors[rng.choice(len(vectors), nlist * sample_size, replace=False)]
+
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=nlist)
+
+        # Re-sembrar centroides vacíos con puntos aleatorios
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+        centroids = _normalize(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Índice IVF de embeddings faciales.
+
+    El índice solo guarda los centroides y, por lista, qué filas le tocan:
+    pares (id de persona, posición del embedding dentro de la persona). Los
+    vectores no se copian; la búsqueda los lee de la galería del snapshot
+    (la matriz memmap del almacén). Cada lista es un buffer que crece por
+    duplicación, así `add` no re-copia el índice completo.
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: Optional[int] = None):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            nlist: Número de listas (None = automático, ~sqrt(N))
+            nprobe: Listas a recorrer por búsqueda
+        """
+        self.nlist = nlist or ANN_NLIST
+        self.nprobe = nprobe or ANN_NPROBE
+        self.centroids: Optional[np.ndarray] = None
+        self.keys: List[Optional[str]] = []
+        self._key_ids: Dict[str, int] = {}
+        self.trained_size = 0
+        # Por lista: buffer (capacidad, 2) de [id de persona, posición] y filas usadas
+        self._lists: List[np.ndarray] = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+        # (galería, fila base de cada persona en esa galería) de la última búsqueda
+        self._bound: Optional[Tuple[EmbeddingGallery, np.ndarray]] = None
+
+    # ========================================================================
+    # CONSTRUCCIÓN
+    # ========================================================================
+    @classmethod
+    def from_database(
+        cls,
+        database: Mapping[str, Sequence[np.ndarray]],
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> 'IVFIndex':
+        """
+        Construye y entrena el índice desde {persona: [embeddings]}.
+
+        Args:
+            database: Diccionario o EmbeddingStore
+            nlist: Número de listas (None = automático)
+            nprobe: Listas a recorrer por búsqueda
+
+        Returns:
+            Índice entrenado con todas las personas
+        """
+        index = cls(nlist=nlist, nprobe=nprobe)
+        index.train(database)
+        return index
+
+    def train(self, database: Mapping[str, Sequence[np.ndarray]], sample_size: int = 64, seed: int = 0) -> None:
+        """
+        Entrena los centroides y re-asigna todas las filas de la base de datos.
+
+        Recorre la base de datos persona por persona (dos pasadas): solo la
+        muestra de entrenamiento se copia en memoria.
+
+        Args:
+            database: Diccionario o EmbeddingStore con todas las personas
+            sample_size: Puntos de entrenamiento por centroide
+            seed: Semilla para resultados reproducibles
+        """
+        keys = [key for key in database if _person_count(database, key) > 0]
+        counts = np.array([_person_count(database, key) for key in keys], dtype=np.int64)
+        total = int(counts.sum())
+
+        self.keys = list(keys)
+        self._key_ids = {key: i for i, key in enumerate(keys)}
+        self._bound = None
+        if total == 0:
+            self.centroids = None
+            self.trained_size = 0
+            self._lists = []
+            self._list_sizes = np.zeros(0, dtype=np.int64)
+            return
+
+        nlist = max(1, min(self.nlist or int(np.sqrt(total)), total))
+        rng = np.random.default_rng(seed)
+        if total > nlist * sample_size:
+            sample_rows = np.sort(rng.choice(total, nlist * sample_size, replace=False))
+        else:
+            sample_rows = np.arange(total)
+
+        # Primera pasada: muestra de entrenamiento
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        bounds = np.searchsorted(sample_rows, offsets)
+        sample = [
+            _normalize(_person_vectors(database, key))[sample_rows[bounds[i]:bounds[i + 1]] - offsets[i]]
+            for i, key in enumerate(keys) if bounds[i + 1] > bounds[i]
+        ]
+        self.centroids = train_centroids(np.vstack(sample), nlist, seed=seed)
+
+        # Segunda pasada: lista de cada fila
+        assign = np.concatenate([
+            self._nearest_lists(_normalize(_person_vectors(database, key))) for key in keys
+        ])
+        person_ids = np.repeat(np.arange(len(keys)), counts)
+        positions = np.arange(total) - np.repeat(offsets[:-1], counts)
+
+        order = np.argsort(assign, kind='stable')
+        list_offsets = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        entries = np.column_stack([person_ids[order], positions[order]])
+        self._lists = [entries[list_offsets[c]:list_offsets[c + 1]] for c in range(len(self.centroids))]
+        self._list_sizes = np.diff(list_offsets)
+        self.trained_size = total
+        logger.debug(f"Índice IVF entrenado: {len(self.centroids)} listas, {total} vectores")
+
+    @property
+    def needs_training(self) -> bool:
+        """True si no hay centroides o el índice creció más de ANN_RETRAIN_FACTOR veces."""
+        return self.centroids is None or self.num_vectors > ANN_RETRAIN_FACTOR * self.trained_size
+
+    def copy(self) -> 'IVFIndex':
+        """
+        Copia para modificar sin afectar búsquedas en curso sobre el original.
+
+        Los buffers se comparten: `add` escribe solo después de las filas
+        usadas por el original (o reemplaza el buffer al crecer) y `remove`
+        reemplaza los buffers afectados, así el original nunca cambia.
+        """
+        clone = IVFIndex.__new__(IVFIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.keys = list(self.keys)
+        clone._key_ids = dict(self._key_ids)
+        clone._lists = list(self._lists)
+        clone._list_sizes = self._list_sizes.copy()
+        clone._bound = None
+        return clone
+
+    def _nearest_lists(self, vectors: np.ndarray) -> np.ndarray:
+        """Lista (centroide) más cercana para cada vector."""
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def _entries(self, list_id: int) -> np.ndarray:
+        """Filas [id de persona, posición] usadas de una lista (vista)."""
+        return self._lists[list_id][:self._list_sizes[list_id]]
+
+    # ========================================================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ========================================================================
+    def add(self, key: str, embeddings: Sequence[np.ndarray]) -> None:
+        """
+        Agrega (o reemplaza) los embeddings de una persona.
+
+        Los nuevos vectores se asignan a los centroides existentes. Si el
+        índice no está entrenado o creció más de ANN_RETRAIN_FACTOR veces
+        (`needs_training`), hay que re-entrenarlo con `train`.
+        """
+        if key in self._key_ids:
+            self.remove(key)
+        if len(embeddings) == 0:
+            return
+
+        vectors = _normalize(np.asarray(embeddings).reshape(len(embeddings), -1))
+        person_id = len(self.keys)
+        self.keys.append(key)
+        self._key_ids[key] = person_id
+        if self.centroids is None:
+            # Sin centroides no hay listas: la persona se indexa al entrenar
+            return
+
+        assign = self._nearest_lists(vectors)
+        for list_id in np.unique(assign):
+            positions = np.flatnonzero(assign == list_id)
+            new = np.column_stack([np.full(len(positions), person_id), positions])
+            size = int(self._list_sizes[list_id])
+            buffer = self._lists[list_id]
+            if size + len(new) > len(buffer):
+                grown = np.empty((max(2 * len(buffer), size + len(new), 16), 2), dtype=np.int64)
+                grown[:size] = buffer[:size]
+                buffer = self._lists[list_id] = grown
+            buffer[size:size + len(new)] = new
+            self._list_sizes[list_id] = size + len(new)
+
+    def remove(self, key: str) -> bool:
+        """Elimina todas las filas de una persona. Retorna False si no existía."""
+        person_id = self._key_ids.pop(key, None)
+        if person_id is None:
+            return False
+
+        for list_id in range(len(self._lists)):
+            entries = self._entries(list_id)
+            keep = entries[:, 0] != person_id
+            if not keep.all():
+                self._lists[list_id] = entries[keep]
+                self._list_sizes[list_id] = int(keep.sum())
+        self.keys[person_id] = None
+        self._bound = None
+        return True
+
+    def rename(self, old_key: str, new_key: str) -> bool:
+        """Cambia la clave de una persona sin tocar sus filas."""
+        person_id = self._key_ids.pop(old_key, None)
+        if person_id is None:
+            return False
+        self.keys[person_id] = new_key
+        self._key_ids[new_key] = person_id
+        self._bound = None
+        return True
+
+    # ========================================================================
+    # BÚSQUEDA
+    # ========================================================================
+    def __len__(self) -> int:
+        """Número de personas en el índice."""
+        return len(self._key_ids)
+
+    @property
+    def num_vectors(self) -> int:
+        return int(self._list_sizes.sum())
+
+    def person_counts(self) -> Dict[str, int]:
+        """Número de vectores por persona (para validar contra la base de datos)."""
+        person_ids = [self._entries(c)[:, 0] for c in range(len(self._lists))]
+        counts = np.bincount(
+            np.concatenate(person_ids) if person_ids else np.zeros(0, dtype=np.int64),
+            minlength=len(self.keys)
+        )
+        return {key: int(counts[i]) for key, i in self._key_ids.items()}
+
+    def _row_bases(self, gallery: EmbeddingGallery) -> np.ndarray:
+        """
+        Primera fila de cada persona del índice en la galería (-1 si no está).
+        Se calcula una vez por galería: un snapshot no cambia.
+        """
+        bound = self._bound
+        if bound is not None and bound[0] is gallery:
+            return bound[1]
+
+        bases = np.full(len(self.keys), -1, dtype=np.int64)
+        for key, person_id in self._key_ids.items():
+            position = gallery.index_of(key)
+            if position is not None:
+                bases[person_id] = gallery.offsets[position]
+        self._bound = (gallery, bases)
+        return bases
+
+    def search(
+        self,
+        query: np.ndarray,
+        num_candidates: int,
+        gallery: EmbeddingGallery,
+        nprobe: Optional[int] = None
+    ) -> List[str]:
+        """
+        Retorna las personas candidatas más cercanas al query.
+
+        Args:
+            query: Embedding a buscar
+            num_candidates: Número máximo de personas a retornar
+            gallery: Galería del mismo snapshot (de ella se leen los vectores)
+            nprobe: Listas a recorrer (None = valor del índice)
+
+        Returns:
+            Claves de persona ordenadas por similitud máxima descendente
+        """
+        if self.centroids is None or self.num_vectors == 0:
+            return []
+
+        unit_query = _normalize(query)[0]
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+
+        centroid_scores = self.centroids @ unit_query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < len(centroid_scores) else np.arange(len(centroid_scores))
+
+        entries = np.concatenate([self._entries(c) for c in probes])
+        bases = self._row_bases(gallery)[entries[:, 0]]
+        entries = entries[bases >= 0]
+        if len(entries) == 0:
+            return []
+
+        similarities = gallery.exact(bases[bases >= 0] + entries[:, 1]) @ unit_query
+        ranked_persons = entries[np.argsort(-similarities, kind='stable'), 0]
+
+        # Primera aparición de cada persona = su mejor similitud
+        _, first = np.unique(ranked_persons, return_index=True)
+        best_persons = ranked_persons[np.sort(first)][:num_candidates]
+        return [self.keys[i] for i in best_persons]
+
+    # ========================================================================
+    # PERSISTENCIA
+    # ========================================================================
+    def save(self, path: Path) -> bool:
+        """
+        Guarda el índice en un archivo .npz (sin pickle, escritura atómica).
+        Solo se guardan los centroides y la asignación de filas a listas;
+        los vectores ya están en el almacén de embeddings.
+
+        Returns:
+            True si se guardó correctamente
+        """
+        try:
+            # Compactar ids de persona (eliminar huecos de personas borradas)
+            live_ids = np.array(sorted(self._key_ids.values()), dtype=np.int64)
+            remap = np.full(len(self.keys), -1, dtype=np.int64)
+            remap[live_ids] = np.arange(len(live_ids))
+
+            lists = [self._entries(c) for c in range(len(self._lists))]
+            entries = np.concatenate(lists) if lists else np.zeros((0, 2), dtype=np.int64)
+            list_offsets = np.concatenate([[0], np.cumsum(self._list_sizes)]).astype(np.int64)
+
+            with atomic_open(path, 'wb') as f:
+                np.savez(
+                    f,
+                    centroids=self.centroids if self.centroids is not None else np.zeros((0, 0), dtype=np.float32),
+                    list_offsets=list_offsets,
+                    person_ids=remap[entries[:, 0]].astype(np.int32),
+                    positions=entries[:, 1].astype(np.int32),
+                    keys=np.array([self.keys[i] for i in live_ids], dtype=str),
+                    params=np.array([self.nlist or 0, self.nprobe, self.trained_size], dtype=np.int64)
+                )
+            logger.debug(f"Índice IVF guardado: {path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error al guardar índice IVF: {str(e)}")
+            return False
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['IVFIndex']:
+        """
+        Carga un índice guardado con `save`.
+
+        Returns:
+            Índice cargado o None si no existe, está corrupto o tiene el
+            formato anterior (con vectores), que se reconstruye
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if 'list_offsets' not in data.files:
+                    logger.info("Índice IVF con formato anterior; se reconstruirá")
+                    return None
+
+                nlist, nprobe, trained_size = (int(v) for v in data['params'])
+                index = cls(nprobe=nprobe)
+                index.nlist = nlist or None
+                centroids = data['centroids']
+                index.centroids = centroids if centroids.size else None
+                list_offsets = data['list_offsets']
+                entries = np.column_stack([data['person_ids'], data['positions']]).astype(np.int64)
+                index._lists = [entries[list_offsets[c]:list_offsets[c + 1]] for c in range(len(list_offsets) - 1)]
+                index._list_sizes = np.diff(list_offsets).astype(np.int64)
+                index.keys = [str(key) for key in data['keys']]
+                index._key_ids = {key: i for i, key in enumerate(index.keys)}
+                index.trained_size = trained_size
+            return index
+
+        except Exception as e:
+            logger.error(f"Error al cargar índice IVF: {str(e)}")
+            return None
@@ -0,0 +1,264 @@
+"""
+Módulo de micro-batching de embeddings.
+
+Cuando varias peticiones de reconocimiento llegan a la vez (ej: inicio de
+turno), cada una ejecutaría su propia pasada de Facenet512 con un solo
+rostro. `MicroBatcher` agrupa los rostros que llegan dentro de una ventana
+de MICRO_BATCH_WINDOW_MS (hasta MICRO_BATCH_MAX_SIZE), ejecuta una única
+llamada por lotes y devuelve a cada petición su embedding.
+
+Registra por rostro el tiempo de espera en cola y el tiempo de cómputo del
+lote, para ajustar ventana y tamaño de lote según el tráfico real. Cada
+petición los registra además como las etapas `batch_wait` y `batch_compute`
+del profiler (endpoint de tiempos y bloque `timings` del resultado, también
+desde los workers del pool).
+"""
+import threading
+import queue
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_SIZE
+from .utils import logger
+from .profiling import record_stage
+
+
+class _PendingFace:
+    """Rostro encolado esperando su embedding."""
+
+    __slots__ = ("face_img", "future", "enqueued_at", "wait_ms", "compute_ms")
+
+    def __init__(self, face_img: np.ndarray):
+        self.face_img = face_img
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+        # Los completa el hilo de lotes antes de resolver el Future
+        self.wait_ms: Optional[float] = None
+        self.compute_ms: Optional[float] = None
+
+
+class MicroBatcher:
+    """
+    Agrupa rostros concurrentes en lotes para una sola pasada del modelo.
+
+    Un hilo dedicado toma el primer rostro de la cola, espera hasta
+    `window_ms` por más rostros (o hasta llenar `max_batch_size`) y procesa
+    el lote completo. Las llamadas a `represent` bloquean solo al hilo que
+    las hace.
+    """
+
+    def __init__(
+        self,
+        represent_fn: Callable[[Sequence[np.ndarray]], List[Optional[np.ndarray]]] = None,
+        max_batch_size: int = None,
+        window_ms: float = None,
+        stats_size: int = 1000
+    ):
+        """
+        Args:
+            represent_fn: Función de lote (rostros -> embeddings o None);
+                por defecto `embedder.represent_faces`
+            max_batch_size: Máximo de rostros por lote
+            window_ms: Ventana de espera tras el primer rostro del lote
+            stats_size: Número de muestras recientes para las estadísticas
+        """
+        self.max_batch_size = max(1, max_batch_size or MICRO_BATCH_MAX_SIZE)
+        self.window_ms = MICRO_BATCH_WINDOW_MS if window_ms is None else window_ms
+        self._represent_fn = represent_fn
+        self._queue: "queue.Queue[Optional[_PendingFace]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wait_ms = deque(maxlen=stats_size)
+        self._compute_ms = deque(maxlen=stats_size)
+        self._batch_sizes = deque(maxlen=stats_size)
+        self._total_batches = 0
+        self._total_faces = 0
+
+    # ========================================================================
+    # API
+    # ========================================================================
+    def submit(self, face_img: np.ndarray) -> Future:
+        """
+        Encola un rostro y retorna un Future con su embedding.
+        """
+        return self._enqueue(face_img).future
+
+    def represent(self, face_img: np.ndarray, timeout: float = None) -> np.ndarray:
+        """
+        Extrae el embedding de un rostro esperando a que se procese su lote.
+        Registra la espera en cola y el cómputo del lote como etapas
+        `batch_wait` y `batch_compute` de la petición en curso.
+
+        Raises:
+            ValueError: Si el backend no pudo extraer el embedding
+        """
+        pending = self._enqueue(face_img)
+        try:
+            return pending.future.result(timeout=timeout)
+        finally:
+            if pending.compute_ms is not None:
+                record_stage("batch_wait", pending.wait_ms)
+                record_stage("batch_compute", pending.compute_ms)
+
+    def _enqueue(self, face_img: np.ndarray) -> _PendingFace:
+        self._ensure_thread()
+        pending = _PendingFace(face_img)
+        self._queue.put(pending)
+        return pending
+
+    def shutdown(self) -> None:
+        """Detiene el hilo del batcher (los rostros ya encolados se procesan)."""
+        with self._start_lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas recientes de espera en cola vs cómputo.
+
+        Returns:
+            Diccionario con totales, tamaño medio de lote y p50/p95 (ms) de
+            queue_wait (por rostro) y compute (por lote)
+        """
+        with self._stats_lock:
+            wait = np.asarray(self._wait_ms)
+            compute = np.asarray(self._compute_ms)
+            sizes = np.asarray(self._batch_sizes)
+            totals = (self._total_batches, self._total_faces)
+
+        def percentiles(samples: np.ndarray) -> Dict[str, float]:
+            if samples.size == 0:
+                return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            return {
+                "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)),
+                "max_ms": float(samples.max())
+            }
+
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "total_batches": totals[0],
+            "total_faces": totals[1],
+            "avg_batch_size": float(sizes.mean()) if sizes.size else 0.0,
+            "queue_wait": percentiles(wait),
+            "compute": percentiles(compute)
+        }
+
+    # ========================================================================
+    # HILO DE LOTES
+    # ========================================================================
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect_batch(self, first: _PendingFace) -> List[_PendingFace]:
+        """Reúne rostros hasta llenar el lote o agotar la ventana."""
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-encolar la señal de parada para salir tras este lote
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._process(self._collect_batch(first))
+
+    def _process(self, batch: List[_PendingFace]) -> None:
+        represent_fn = self._represent_fn
+        if represent_fn is None:
+            from .embedder import represent_faces
+
+            def represent_fn(faces):
+                return represent_faces(faces, batch_size=self.max_batch_size)
+
+        started = time.perf_counter()
+        try:
+            embeddings = represent_fn([item.face_img for item in batch])
+            error = None
+        except Exception as e:
+            error = e
+        finished = time.perf_counter()
+
+        for item in batch:
+            item.wait_ms = (started - item.enqueued_at) * 1000.0
+            item.compute_ms = (finished - started) * 1000.0
+
+        if error is not None:
+            logger.error(f"Error en lote de embeddings ({len(batch)} rostros): {str(error)}")
+            for item in batch:
+                item.future.set_exception(error)
+            return
+
+        for item, embedding in zip(batch, embeddings):
+            if embedding is None:
+                item.future.set_exception(ValueError("No se pudo extraer el embedding del rostro"))
+            else:
+                item.future.set_result(embedding)
+
+        compute_ms = (finished - started) * 1000.0
+        with self._stats_lock:
+            self._wait_ms.extend(item.wait_ms for item in batch)
+            self._compute_ms.append(compute_ms)
+            self._batch_sizes.append(len(batch))
+            self._total_batches += 1
+            self._total_faces += len(batch)
+
+        logger.debug(f"Micro-lote: {len(batch)} rostros, cómputo {compute_ms:.1f} ms")
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    """
+    Retorna el micro-batcher singleton del proceso (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de MicroBatcher
+    """
+    global _global_batcher
+
+    if _global_batcher is None:
+        with _batcher_lock:
+            if _global_batcher is None:
+                _global_batcher = MicroBatcher()
+    return _global_batcher
+
+
+def reset_batcher() -> None:
+    """Detiene y descarta el batcher singleton (útil para testing)."""
+    global _global_batcher
+
+    with _batcher_lock:
+        if _global_batcher is not None:
+            _global_batcher.shutdown()
+            _global_batcher = None
@@ -91,8 +91,38 @@ ALIGN_FACES = True
 # Preprocesamiento avanzado
 ENABLE_PREPROCESSING = True  # Ecualización + denoising + normalización
 ENABLE_AUGMENTATION = True   # Data augmentation en registro (flip, brightness, etc)
+AUGMENTATION_VARIANTS = 8    # Variaciones por rostro con augmentation (original + 7)
 ENABLE_QUALITY_FILTER = True # Filtrar imágenes de muy baja calidad
 
+# Perfil de preprocesamiento (latencia vs precisión), medir con
+# `python -m benchmarks.bench_preprocessing` antes de cambiarlo:
+#   quality:  CLAHE en LAB + NL-means + sharpening (más lento, el original)
+#   balanced: CLAHE en LAB + filtro bilateral + sharpening
+#   fast:     CLAHE en YCrCb (conversión entera) + sharpening, sin denoising
+# Todos aplican el mismo sharpening (misma ganancia) para que los embeddings
+# sigan siendo comparables con una galería registrada con otro perfil.
+PREPROCESSING_PROFILE = "quality"  # quality, balanced, fast
+PREPROCESSING_PROFILES = {
+    "quality": {
+        "interpolation": "cubic",
+        "color_space": "lab",
+        "denoise": "nlmeans",
+        "sharpen": True
+    },
+    "balanced": {
+        "interpolation": "linear",
+        "color_space": "lab",
+        "denoise": "bilateral",
+        "sharpen": True
+    },
+    "fast": {
+        "interpolation": "area",
+        "color_space": "ycrcb",
+        "denoise": None,
+        "sharpen": True
+    }
+}
+
 # Normalizar RGB
 NORMALIZATION = "base"  # Opciones: base, raw, Facenet, Facenet2018, VGGFace, ArcFace
 
@@ -102,14 +132,47 @@ NORMALIZATION = "base"  # Opciones: base, raw, Facenet, Facenet2018, VGGFace, Ar
 # Estrategia híbrida: combina múltiples enfoques para máxima precisión
 MATCHING_STRATEGY = "ensemble"  # ensemble, voting, min_distance, average, weighted
 
+# Motor de búsqueda 1:N: exhaustivo o índice aproximado (IVF) que propone
+# candidatos y luego el ensemble los re-ordena con distancias exactas
+SEARCH_ENGINE = "exhaustive"  # exhaustive, ivf
+ANN_MIN_PERSONS = 1000      # Por debajo de este tamaño se usa búsqueda exhaustiva
+ANN_CANDIDATES = 50         # Personas candidatas que se re-ordenan exactamente
+ANN_NLIST = None            # Listas IVF (None = ~sqrt(número de embeddings))
+ANN_NPROBE = 8              # Listas recorridas por búsqueda
+ANN_RETRAIN_FACTOR = 2.0    # Re-entrenar centroides cuando el índice crece este factor
+
+# Poda exacta en dos etapas (búsqueda exhaustiva): una cota por centroide y
+# radio de cada persona elige los candidatos y el ensemble completo se calcula
+# solo sobre ellos; si la cota no garantiza la misma decisión se amplía
+CENTROID_PRUNING = True
+PRUNING_MIN_PERSONS = 200   # Por debajo de este tamaño se calcula todo
+PRUNING_CANDIDATES = 32     # Candidatos iniciales (se multiplican x4 al ampliar)
+
 # Número de imágenes por persona para capturar variabilidad completa
 MIN_IMAGES_PER_PERSON = 8   # Mínimo para cubrir variaciones (pose, expresión, iluminación)
 RECOMMENDED_IMAGES_PER_PERSON = 12  # Óptimo para robustez
 MAX_IMAGES_PER_PERSON = 20  # Máximo útil (más allá reduce rendimiento sin mejora)
 
+# Prototipos por persona: los embeddings (imágenes x augmentations, casi
+# duplicados) se reducen a este número de representantes al registrar.
+# Validar con `python -m benchmarks.bench_prototypes` antes de activarlo;
+# la galería existente se compacta con `python -m src.recognize.prototypes`
+PROTOTYPES_PER_PERSON = None  # None = guardar todos (recomendado: 16)
+PROTOTYPE_METHOD = "farthest"  # farthest, kmedoids
+
 # K-vecinos para voting y análisis de distribución
 K_NEIGHBORS = 7  # Número impar para desempate en voting
 
+# Verificación 1:1 (asistencia con código): personas impostoras contra las que
+# se compara además de la persona reclamada, para el umbral adaptativo
+VERIFICATION_COHORT_SIZE = 20
+
+# Desglose por persona en los detalles del reconocimiento: "none" (solo el
+# mejor match), "top-k" (las DETAILS_TOP_K personas más cercanas) o "full"
+# (todas, crece con el número de registrados; solo para diagnóstico)
+DETAILS_LEVEL = "none"
+DETAILS_TOP_K = 5
+
 # Weights para estrategia ensemble (suma = 1.0)
 ENSEMBLE_WEIGHTS = {
     'min_distance': 0.40,    # Mayor peso: el mejor match es más confiable
@@ -133,6 +196,26 @@ MIN_DETECTION_CONFIDENCE = 0.65  # Balance óptimo
 # Tamaño mínimo de rostro en pixels
 MIN_FACE_SIZE = 50  # Detecta rostros lejanos pero mantiene calidad mínima
 
+# Memo de detecciones: has_face/detect_faces/extract_face sobre la misma imagen
+# reutilizan una sola pasada de RetinaFace (0 = deshabilitado)
+DETECTION_CACHE_SIZE = 8
+
+# Resolución de detección: imágenes con lado mayor a DETECTION_MAX_SIDE se
+# reducen por un factor entero (2, 3, 4...) antes del control de calidad y
+# de RetinaFace; las
+# cajas se mapean a la imagen original y el rostro se recorta del original
+# (None = detectar siempre a resolución completa)
+DETECTION_MAX_SIDE = 1280
+
+# Cascada de detección: un detector barato (backend de DeepFace: opencv =
+# Haar, ssd) revisa primero la imagen. Sin candidatos no se ejecuta
+# RetinaFace; con candidatos RetinaFace corre solo sobre la región (ROI)
+# que los contiene, ampliada CASCADE_ROI_PADDING veces el tamaño del rostro.
+DETECTION_CASCADE = False
+CASCADE_PREDETECTOR = "opencv"     # opencv, ssd
+CASCADE_ROI_PADDING = 0.5
+CASCADE_FALLBACK_ON_MISS = False   # True: sin candidatos, correr RetinaFace completo igual
+
 # Control de calidad multinivel
 CHECK_IMAGE_QUALITY = True
 QUALITY_STRICTNESS = "medium"  # strict, medium, lenient
@@ -162,12 +245,48 @@ QUALITY_THRESHOLDS = {
 # Usar threshold según strictness
 MAX_BLUR_THRESHOLD = QUALITY_THRESHOLDS[QUALITY_STRICTNESS]["blur"]
 
+# Ranking de calidad en el registro: los rostros de todas las imágenes se
+# puntúan (tamaño, nitidez, brillo, contraste, confianza) antes de la
+# augmentation; se descartan los que no pasan los pisos de QUALITY_THRESHOLDS
+# o ENROLLMENT_MIN_QUALITY_SCORE y solo los ENROLLMENT_BEST_IMAGES mejores se
+# aumentan y pasan por el modelo
+ENROLLMENT_QUALITY_RANKING = True
+ENROLLMENT_BEST_IMAGES = 8
+ENROLLMENT_MIN_QUALITY_SCORE = 0.35
+ENROLLMENT_TARGET_FACE_SIZE = 160   # Lado (px) desde el que el tamaño puntúa 1.0
+ENROLLMENT_QUALITY_WEIGHTS = {
+    "size": 1.0,
+    "blur": 1.5,
+    "brightness": 1.0,
+    "contrast": 1.0,
+    "confidence": 0.5
+}
+
+# Registro desde un video corto: los frames se decodifican en streaming; se
+# analiza 1 de cada VIDEO_FRAME_STEP y se descartan con métricas baratas
+# (nitidez y movimiento sobre el frame reducido a VIDEO_ANALYSIS_SIDE) antes
+# de detectar. Entre candidatos hay al menos VIDEO_MIN_FRAME_INTERVAL
+# segundos; se retienen los VIDEO_MAX_CANDIDATES rostros más nítidos
+# (memoria constante) y se guardan los VIDEO_ENROLLMENT_FRAMES más diversos
+# (distancia entre embeddings) como imágenes de registro
+VIDEO_MAX_SECONDS = 30              # Tope de duración decodificada
+VIDEO_FRAME_STEP = 2
+VIDEO_ANALYSIS_SIDE = 160
+VIDEO_MIN_SHARPNESS = 40.0          # Varianza del Laplaciano del frame reducido
+VIDEO_MAX_MOTION = 20.0             # Diferencia media (0-255) con el frame analizado anterior
+VIDEO_MIN_FRAME_INTERVAL = 0.25
+VIDEO_MAX_CANDIDATES = 30
+VIDEO_ENROLLMENT_FRAMES = 10
+
 # ============================================================================
 # ARCHIVOS DE BASE DE DATOS
 # ============================================================================
-EMBEDDINGS_FILE = DATABASE_DIR / "embeddings.pkl"
+EMBEDDINGS_FILE = DATABASE_DIR / "embeddings.pkl"  # Formato antiguo (se migra al almacén)
+EMBEDDINGS_STORE_DIR = DATABASE_DIR / "embeddings_store"
+EMBEDDINGS_INDEX_FILE = EMBEDDINGS_STORE_DIR / "index.json"
 METADATA_FILE = DATABASE_DIR / "metadata.json"
 FACE_DATABASE_FILE = DATABASE_DIR / "face_database.pkl"
+ANN_INDEX_FILE = DATABASE_DIR / "ann_index.npz"
 
 # ============================================================================
 # LOGGING
@@ -182,12 +301,70 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 # Usar GPU si está disponible (requiere CUDA)
 USE_GPU = False  # Cambiar a True si tienes GPU NVIDIA
 
-# Número de workers para procesamiento paralelo
+# Número de procesos de inferencia (cada uno carga detector + modelo una vez).
+# 0 = inferencia en un hilo del proceso del servidor
 NUM_WORKERS = 4
 
+# Máximo de reconocimientos pendientes (en ejecución + en espera); al superarlo
+# las peticiones se rechazan con 503 en lugar de acumular latencia
+INFERENCE_QUEUE_SIZE = 16
+
+# Los modelos se cargan en segundo plano al arrancar el servidor; mientras
+# tanto las rutas faciales responden 503 con este Retry-After (segundos)
+READINESS_RETRY_AFTER = 5
+
+# Registro facial en segundo plano: jobs que detectan imagen por imagen y
+# extraen embeddings por lotes (ENROLLMENT_FACES_PER_TASK rostros) en el pool
+# de inferencia (una tarea a la vez por job, para no acaparar la cola de las
+# marcaciones). Si la cola está llena se reintenta tras
+# ENROLLMENT_RETRY_DELAY segundos; se conservan los últimos
+# ENROLLMENT_JOB_HISTORY jobs para consultar su estado
+ENROLLMENT_CONCURRENCY = 1
+ENROLLMENT_RETRY_DELAY = 0.5
+ENROLLMENT_JOB_HISTORY = 200
+
+# Importación masiva (CSV + archivo de fotos): usuarios por transacción,
+# registros faciales en paralelo (dejar workers libres para las marcaciones)
+# e importaciones que se conservan para consultar su reporte
+BULK_IMPORT_BATCH_SIZE = 50
+BULK_IMPORT_CONCURRENCY = 3
+BULK_IMPORT_HISTORY = 20
+
+# Hilos de inferencia cuando NUM_WORKERS = 0 (comparten detector y modelo)
+INFERENCE_THREADS = 1
+
+# Micro-batching: agrupa rostros de peticiones concurrentes del mismo proceso
+# en una sola pasada del modelo. Solo funciona con NUM_WORKERS = 0 e
+# INFERENCE_THREADS > 1 (ej: NUM_WORKERS = 0, INFERENCE_THREADS = 8): cada
+# worker de un pool de procesos atiende una petición a la vez y nunca tiene
+# con quién agrupar, así que esa combinación se rechaza en validate_config;
+# con un solo hilo solo agrega espera
+MICRO_BATCHING = False
+MICRO_BATCH_WINDOW_MS = 5      # Espera máxima por más rostros tras el primero
+MICRO_BATCH_MAX_SIZE = 16      # Rostros máximos por lote
+
+# Tiempos por etapa del pipeline (calidad, detector, preprocesamiento,
+# embedding, matching) con percentiles sobre las últimas PROFILING_WINDOW
+# muestras de cada etapa (endpoint de administración y `return_timings`)
+PROFILING_ENABLED = True
+PROFILING_WINDOW = 2048
+
 # Batch size para procesamiento de múltiples imágenes
 BATCH_SIZE = 32
 
+# Rostros por tarea de embedding de un job de registro: sus variaciones
+# llenan un lote de BATCH_SIZE (4 rostros x 8 variaciones = 32)
+ENROLLMENT_FACES_PER_TASK = max(1, BATCH_SIZE // (AUGMENTATION_VARIANTS if ENABLE_AUGMENTATION else 1))
+
+# Hilos que preprocesan y aumentan en paralelo los rostros de un registro
+# antes del embedding por lotes (1 = secuencial). Cada proceso de inferencia
+# tiene su propio pool: NUM_WORKERS x PREPROCESSING_THREADS hilos en total
+PREPROCESSING_THREADS = 4
+# Hilos internos de cada llamada de OpenCV (cv2.setNumThreads), fijados una
+# vez por proceso al arrancar el servidor y cada worker de inferencia; 1 evita sobresuscribir los núcleos con los hilos del pool y de
+# TensorFlow. None = no cambiar el valor por defecto de OpenCV
+OPENCV_THREADS = 1
+
 # ============================================================================
 # VISUALIZACIÓN
 # ============================================================================
@@ -215,6 +392,20 @@ EXTRACT_LANDMARKS = True
 # Guardar embeddings en formato comprimido
 COMPRESS_EMBEDDINGS = True
 
+# Precisión de la copia de la galería que recorre el scan 1:N. Los archivos
+# float32 del almacén se conservan para re-puntuar las personas más cercanas
+# (float16: 1/2 de memoria, int8 con escala por fila: 1/4; int8 además es el
+# más rápido de decodificar, float16 depende del soporte de la CPU). Un almacén con
+# otra precisión se convierte al abrirlo, o con
+# `python -m src.recognize.embedding_store --precision int8`
+GALLERY_PRECISION = "float32"  # float32, float16, int8
+GALLERY_RESCORE_CANDIDATES = 32  # Personas re-puntuadas con float32 exacto
+
+# Compactación del almacén de embeddings: se reescriben los segmentos vivos
+# cuando las filas eliminadas superan esta fracción (y este mínimo de filas)
+STORE_COMPACTION_RATIO = 0.25
+STORE_COMPACTION_MIN_ROWS = 256
+
 # Cache de modelos en memoria
 CACHE_MODELS = True
 
@@ -266,6 +457,63 @@ def validate_config():
     if not 0 < RECOGNITION_THRESHOLD < 2:
         errors.append(f"Umbral {RECOGNITION_THRESHOLD} fuera de rango")
     
+    if SEARCH_ENGINE not in ["exhaustive", "ivf"]:
+        errors.append(f"Motor de búsqueda {SEARCH_ENGINE} no válido")
+    
+    if GALLERY_PRECISION not in ["float32", "float16", "int8"]:
+        errors.append(f"Precisión de galería {GALLERY_PRECISION} no válida")
+    
+    if DETAILS_LEVEL not in ["none", "top-k", "full"]:
+        errors.append(f"Nivel de detalles {DETAILS_LEVEL} no válido")
+    
+    if PRUNING_CANDIDATES < 2:
+        errors.append("PRUNING_CANDIDATES debe ser >= 2")
+    
+    if CASCADE_PREDETECTOR not in ["opencv", "ssd"]:
+        errors.append(f"Pre-detector {CASCADE_PREDETECTOR} no válido")
+    
+    if PROTOTYPE_METHOD not in ["farthest", "kmedoids"]:
+        errors.append(f"Método de prototipos {PROTOTYPE_METHOD} no válido")
+    
+    if PREPROCESSING_PROFILE not in PREPROCESSING_PROFILES:
+        errors.append(f"Perfil de preprocesamiento {PREPROCESSING_PROFILE} no válido")
+    
+    if AUGMENTATION_VARIANTS < 1:
+        errors.append("AUGMENTATION_VARIANTS debe ser >= 1")
+    
+    if ENROLLMENT_CONCURRENCY < 1:
+        errors.append("ENROLLMENT_CONCURRENCY debe ser >= 1")
+    
+    if ENROLLMENT_JOB_HISTORY < 1:
+        errors.append("ENROLLMENT_JOB_HISTORY debe ser >= 1")
+    
+    if BULK_IMPORT_BATCH_SIZE < 1 or BULK_IMPORT_CONCURRENCY < 1:
+        errors.append("BULK_IMPORT_BATCH_SIZE y BULK_IMPORT_CONCURRENCY deben ser >= 1")
+    
+    if VIDEO_FRAME_STEP < 1 or VIDEO_MAX_SECONDS <= 0:
+        errors.append("VIDEO_FRAME_STEP debe ser >= 1 y VIDEO_MAX_SECONDS > 0")
+    
+    if not 1 <= VIDEO_ENROLLMENT_FRAMES <= VIDEO_MAX_CANDIDATES:
+        errors.append("VIDEO_ENROLLMENT_FRAMES debe estar entre 1 y VIDEO_MAX_CANDIDATES")
+    
+    if PREPROCESSING_THREADS < 1:
+        errors.append("PREPROCESSING_THREADS debe ser >= 1")
+    
+    if OPENCV_THREADS is not None and OPENCV_THREADS < 0:
+        errors.append("OPENCV_THREADS debe ser >= 0 o None")
+    
+    if ENROLLMENT_BEST_IMAGES < 1:
+        errors.append("ENROLLMENT_BEST_IMAGES debe ser >= 1")
+    
+    if not 0 <= ENROLLMENT_MIN_QUALITY_SCORE < 1:
+        errors.append(f"ENROLLMENT_MIN_QUALITY_SCORE {ENROLLMENT_MIN_QUALITY_SCORE} fuera de rango")
+    
+    if PROFILING_WINDOW < 1:
+        errors.append("PROFILING_WINDOW debe ser >= 1")
+    
+    if MICRO_BATCHING and NUM_WORKERS > 0:
+        errors.append("MICRO_BATCHING requiere NUM_WORKERS = 0 (lotes entre hilos del mismo proceso)")
+    
     if MIN_IMAGES_PER_PERSON < 1:
         errors.append("MIN_IMAGES_PER_PERSON debe ser >= 1")
     
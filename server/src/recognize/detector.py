@@ -3,6 +3,9 @@ Módulo de detección facial.
 Detecta rostros en imágenes con alta precisión usando RetinaFace.
 """
 import numpy as np
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Tuple, Optional, Dict, Any
 from pathlib import Path
 import cv2
@@ -13,10 +16,17 @@ from .config import (
     MIN_FACE_SIZE,
     ENFORCE_DETECTION,
     TARGET_SIZE,
+    DETECTION_CACHE_SIZE,
+    DETECTION_MAX_SIDE,
+    DETECTION_CASCADE,
+    CASCADE_PREDETECTOR,
+    CASCADE_ROI_PADDING,
+    CASCADE_FALLBACK_ON_MISS,
     MSG_NO_FACE_DETECTED,
     MSG_MULTIPLE_FACES
 )
-from .utils import logger, check_image_quality, load_image
+from .utils import logger, check_image_quality, load_image, resize_max_side
+from .profiling import stage_timer, timed
 
 
 # =====================================================================
@@ -76,6 +86,174 @@ def reset_detector():
     logger.info("🔄 Detector singleton reseteado")
 
 
+class DetectionResult:
+    """
+    Resultado de UNA pasada de detección sobre una imagen.
+    
+    Se calcula una sola vez (RetinaFace + check_image_quality) y se reutiliza
+    para has_face / count / extract / bbox sin volver a ejecutar el backend.
+    """
+    
+    def __init__(
+        self,
+        faces: List[Dict[str, Any]],
+        quality_ok: bool = True,
+        quality_msg: str = "",
+        quality_metrics: Dict[str, float] = None,
+        error: Optional[str] = None
+    ):
+        """
+        Args:
+            faces: Rostros válidos (ya filtrados por tamaño y confianza)
+            quality_ok: Resultado de check_image_quality
+            quality_msg: Mensaje de calidad
+            quality_metrics: Métricas de calidad de la imagen completa
+            error: Error del backend si la detección falló (el resultado no se memoriza)
+        """
+        self.faces = faces
+        self.quality_ok = quality_ok
+        self.quality_msg = quality_msg
+        self.quality_metrics = quality_metrics or {}
+        self.error = error
+    
+    @property
+    def has_face(self) -> bool:
+        """True si hay al menos un rostro válido."""
+        return len(self.faces) > 0
+    
+    @property
+    def count(self) -> int:
+        """Número de rostros válidos detectados."""
+        return len(self.faces)
+    
+    def best(self) -> Optional[Dict[str, Any]]:
+        """Retorna el rostro más grande (por área) o None."""
+        if not self.faces:
+            return None
+        return max(self.faces, key=lambda f: f['bbox'][2] * f['bbox'][3])
+    
+    def bbox(self) -> Optional[Tuple[int, int, int, int]]:
+        """Bounding box (x, y, w, h) del rostro principal."""
+        best = self.best()
+        return best['bbox'] if best is not None else None
+    
+    def as_list(self, return_best: bool = True) -> List[Dict[str, Any]]:
+        """
+        Lista en el mismo formato que detect_faces().
+        
+        Args:
+            return_best: Si True, retorna solo el rostro más grande
+        """
+        if return_best and len(self.faces) > 1:
+            if ENFORCE_DETECTION:
+                logger.warning(MSG_MULTIPLE_FACES + " - Usando el más grande")
+            return [self.best()]
+        return list(self.faces)
+
+
+def _image_key(image: np.ndarray) -> Tuple:
+    """
+    Clave de memo para una imagen: hash del contenido + forma + dtype.
+    Dos arrays con el mismo contenido comparten resultado de detección.
+    """
+    data = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(data.data, digest_size=16).digest()
+    return (digest, data.shape, data.dtype.str)
+
+
+def _offset_facial_area(facial_area: Dict[str, Any], dx: int, dy: int) -> Dict[str, Any]:
+    """Traslada un área facial detectada en una ROI a coordenadas de la imagen completa."""
+    moved = dict(facial_area)
+    moved['x'] = facial_area['x'] + dx
+    moved['y'] = facial_area['y'] + dy
+    for eye in ('left_eye', 'right_eye'):
+        if facial_area.get(eye) is not None:
+            moved[eye] = (facial_area[eye][0] + dx, facial_area[eye][1] + dy)
+    return moved
+
+
+def _scale_facial_area(facial_area: Dict[str, Any], factor: float, shape: Tuple[int, ...]) -> Dict[str, Any]:
+    """
+    Mapea un área facial de la imagen reducida a la imagen original.
+    
+    Args:
+        facial_area: Área de DeepFace (x, y, w, h y opcionalmente ojos)
+        factor: original / reducida
+        shape: Shape de la imagen original (para recortar a sus bordes)
+    """
+    height, width = shape[:2]
+    x = min(width - 1, max(0, int(round(facial_area['x'] * factor))))
+    y = min(height - 1, max(0, int(round(facial_area['y'] * factor))))
+    scaled = dict(facial_area)
+    scaled.update({
+        'x': x,
+        'y': y,
+        'w': max(1, min(width - x, int(round(facial_area['w'] * factor)))),
+        'h': max(1, min(height - y, int(round(facial_area['h'] * factor))))
+    })
+    for eye in ('left_eye', 'right_eye'):
+        if facial_area.get(eye) is not None:
+            scaled[eye] = tuple(int(round(v * factor)) for v in facial_area[eye])
+    return scaled
+
+
+def _deepface_face(face_img: np.ndarray) -> np.ndarray:
+    """
+    Convierte el rostro que devuelve DeepFace (RGB, float en [0, 1]) a BGR uint8.
+    
+    Args:
+        face_img: Rostro de `face_obj['face']`
+        
+    Returns:
+        Rostro BGR uint8
+    """
+    # Convertir face_img a formato uint8 si está normalizado
+    if face_img.dtype == np.float32 or face_img.dtype == np.float64:
+        face_img = (face_img * 255).astype(np.uint8)
+    
+    # Convertir de RGB a BGR si es necesario (DeepFace retorna RGB)
+    if len(face_img.shape) == 3 and face_img.shape[2] == 3:
+        face_img = cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR)
+    return face_img
+
+
+def _crop_face(image: np.ndarray, facial_area: Dict[str, Any], align: bool = True) -> np.ndarray:
+    """
+    Recorta (y alinea por los ojos) un rostro de la imagen original.
+    
+    Sigue el mismo criterio que DeepFace: rotar para dejar los ojos en
+    horizontal y recortar la caja detectada. Solo se rota una ventana
+    alrededor del rostro, no la imagen completa.
+    
+    Args:
+        image: Imagen original BGR
+        facial_area: Área en coordenadas de la imagen original
+        align: Alinear por la posición de los ojos si está disponible
+        
+    Returns:
+        Rostro BGR uint8
+    """
+    x, y, w, h = facial_area['x'], facial_area['y'], facial_area['w'], facial_area['h']
+    left_eye, right_eye = facial_area.get('left_eye'), facial_area.get('right_eye')
+    
+    if not align or left_eye is None or right_eye is None:
+        return image[y:y + h, x:x + w].copy()
+    
+    # Ventana con margen para que la rotación no deje bordes vacíos
+    margin = max(w, h) // 2
+    height, width = image.shape[:2]
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = min(width, x + w + margin), min(height, y + h + margin)
+    window = image[y0:y1, x0:x1]
+    
+    angle = float(np.degrees(np.arctan2(left_eye[1] - right_eye[1], left_eye[0] - right_eye[0])))
+    center = (x + w / 2.0 - x0, y + h / 2.0 - y0)
+    rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+    rotated = cv2.warpAffine(window, rotation, (window.shape[1], window.shape[0]), flags=cv2.INTER_CUBIC)
+    
+    return rotated[y - y0:y - y0 + h, x - x0:x - x0 + w].copy()
+
+
 class FaceDetector:
     """
     Clase para detección de rostros en imágenes.
@@ -96,6 +274,22 @@ class FaceDetector:
         
         # Cargar modelo lazy (cuando se use por primera vez)
         self._model_loaded = False
+        
+        # Memo de detecciones recientes {clave_imagen: DetectionResult}
+        self._cache: "OrderedDict[Tuple, DetectionResult]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Contadores por etapa de la cascada (ver cascade_stats)
+        self._cascade_counts = {
+            'frames': 0,
+            'predetector_hits': 0,
+            'skipped': 0,
+            'roi_runs': 0,
+            'full_runs': 0,
+            'detector_hits': 0
+        }
+        self._roi_fraction_sum = 0.0
+        self._stats_lock = threading.Lock()
     
     def _load_model(self):
         """Carga el modelo de detección (lazy loading)."""
@@ -127,60 +321,111 @@ class FaceDetector:
             logger.error(f"Error al cargar modelo de detección: {str(e)}")
             raise
     
-    def detect_faces(
+    @timed("detection")
+    def detect(
         self,
         image_path: str = None,
-        image: np.ndarray = None,
-        return_best: bool = True
-    ) -> List[Dict[str, Any]]:
+        image: np.ndarray = None
+    ) -> DetectionResult:
         """
-        Detecta rostros en una imagen.
+        Ejecuta la detección UNA vez y memoriza el resultado.
+        
+        Llamadas repetidas con la misma imagen (mismo contenido) reutilizan el
+        resultado sin volver a invocar el backend ni el control de calidad.
+        Un fallo del backend (`error`) no se memoriza: la próxima llamada reintenta.
         
         Args:
             image_path: Ruta a la imagen (opcional)
             image: Imagen como array numpy (opcional)
-            return_best: Si True, retorna solo el rostro más grande
             
         Returns:
-            Lista de diccionarios con información de cada rostro detectado:
-            {
-                'bbox': (x, y, w, h),
-                'confidence': float,
-                'facial_area': dict,
-                'face_img': np.ndarray
-            }
+            DetectionResult con todos los rostros válidos
         """
-        self._load_model()
-        
         # Cargar imagen si se proporcionó path
         if image_path is not None:
             image = load_image(image_path)
             if image is None:
-                return []
+                return DetectionResult([])
         
         if image is None:
             logger.error("No se proporcionó imagen válida")
-            return []
+            return DetectionResult([])
+        
+        key = _image_key(image)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                logger.debug("✓ Reutilizando detección memorizada")
+                return cached
+        
+        result = self._run_detection(image)
+        
+        if DETECTION_CACHE_SIZE > 0 and result.error is None:
+            with self._cache_lock:
+                self._cache[key] = result
+                while len(self._cache) > DETECTION_CACHE_SIZE:
+                    self._cache.popitem(last=False)
         
-        # Verificar calidad de imagen
-        quality_ok, quality_msg, quality_metrics = check_image_quality(image)
+        return result
+    
+    def clear_cache(self):
+        """Vacía el memo de detecciones."""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def _run_detection(self, image: np.ndarray) -> DetectionResult:
+        """
+        Pasada real de detección (calidad + backend de DeepFace).
+        
+        Args:
+            image: Imagen BGR como array numpy
+            
+        Returns:
+            DetectionResult con los rostros filtrados
+        """
+        self._load_model()
+        
+        # Detección sobre una copia reducida si la imagen es grande
+        detection_image, scale = resize_max_side(image, DETECTION_MAX_SIDE)
+        if scale != 1.0:
+            logger.debug(
+                f"Detección a resolución reducida: {image.shape[1]}x{image.shape[0]} -> "
+                f"{detection_image.shape[1]}x{detection_image.shape[0]}"
+            )
+        
+        # Verificar calidad de imagen (sobre el original: los umbrales de
+        # nitidez y tamaño dependen de la resolución)
+        with stage_timer("quality"):
+            quality_ok, quality_msg, quality_metrics = check_image_quality(image)
         if not quality_ok:
             logger.warning(f"Calidad de imagen: {quality_msg}")
         
         try:
             from deepface import DeepFace
             
+            # Cascada: el pre-detector descarta la imagen o acota la región
+            roi = (0, 0, detection_image.shape[1], detection_image.shape[0])
+            if DETECTION_CASCADE:
+                with stage_timer("cascade"):
+                    roi = self._cascade_roi(detection_image)
+                if roi is None:
+                    logger.warning(MSG_NO_FACE_DETECTED)
+                    return DetectionResult([], quality_ok, quality_msg, quality_metrics)
+            x0, y0, x1, y1 = roi
+            
             # Detectar rostros usando DeepFace
-            face_objs = DeepFace.extract_faces(
-                img_path=image,
-                detector_backend=self.backend,
-                enforce_detection=False,  # No lanzar excepción si no detecta
-                align=True
-            )
+            with stage_timer("detector"):
+                face_objs = DeepFace.extract_faces(
+                    img_path=detection_image[y0:y1, x0:x1],
+                    detector_backend=self.backend,
+                    enforce_detection=False,  # No lanzar excepción si no detecta
+                    align=True
+                )
             
             if not face_objs:
                 logger.warning(MSG_NO_FACE_DETECTED)
-                return []
+                return DetectionResult([], quality_ok, quality_msg, quality_metrics)
             
             # Procesar cada rostro detectado
             detected_faces = []
@@ -189,6 +434,12 @@ class FaceDetector:
                 facial_area = face_obj['facial_area']
                 confidence = face_obj.get('confidence', 1.0)
                 
+                # Coordenadas en la imagen original
+                if x0 or y0:
+                    facial_area = _offset_facial_area(facial_area, x0, y0)
+                if scale != 1.0:
+                    facial_area = _scale_facial_area(facial_area, 1.0 / scale, image.shape)
+                
                 # Extraer coordenadas
                 x = facial_area['x']
                 y = facial_area['y']
@@ -205,16 +456,13 @@ class FaceDetector:
                     logger.debug(f"Rostro con baja confianza ignorado: {confidence:.2f}")
                     continue
                 
-                # Extraer imagen del rostro
-                face_img = face_obj['face']
-                
-                # Convertir face_img a formato uint8 si está normalizado
-                if face_img.dtype == np.float32 or face_img.dtype == np.float64:
-                    face_img = (face_img * 255).astype(np.uint8)
-                
-                # Convertir de RGB a BGR si es necesario (DeepFace retorna RGB)
-                if len(face_img.shape) == 3 and face_img.shape[2] == 3:
-                    face_img = cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR)
+                # Sin reducción se usa el recorte de DeepFace, igual que en las
+                # galerías ya registradas; con reducción se recorta del original
+                # para no perder resolución
+                if scale == 1.0:
+                    face_img = _deepface_face(face_obj['face'])
+                else:
+                    face_img = _crop_face(image, facial_area)
                 
                 detected_faces.append({
                     'bbox': (x, y, w, h),
@@ -224,27 +472,143 @@ class FaceDetector:
                     'quality_metrics': quality_metrics
                 })
             
+            if DETECTION_CASCADE and detected_faces:
+                with self._stats_lock:
+                    self._cascade_counts['detector_hits'] += 1
+            
             if not detected_faces:
                 logger.warning(MSG_NO_FACE_DETECTED)
-                return []
-            
-            # Log de detección
-            logger.info(f"Detectados {len(detected_faces)} rostro(s)")
+            else:
+                # Log de detección
+                logger.info(f"Detectados {len(detected_faces)} rostro(s)")
             
-            # Retornar solo el mejor (más grande) si se solicita
-            if return_best and len(detected_faces) > 1:
-                if ENFORCE_DETECTION:
-                    logger.warning(MSG_MULTIPLE_FACES + " - Usando el más grande")
-                
-                # Encontrar el rostro más grande (por área)
-                best_face = max(detected_faces, key=lambda f: f['bbox'][2] * f['bbox'][3])
-                return [best_face]
-            
-            return detected_faces
+            return DetectionResult(detected_faces, quality_ok, quality_msg, quality_metrics)
         
         except Exception as e:
             logger.error(f"Error en detección de rostros: {str(e)}")
-            return []
+            return DetectionResult([], quality_ok, quality_msg, quality_metrics, error=str(e))
+    
+    def _cascade_roi(self, image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Primera etapa de la cascada: detector barato sobre toda la imagen.
+        
+        Args:
+            image: Imagen BGR (ya reducida)
+            
+        Returns:
+            ROI (x0, y0, x1, y1) que contiene a todos los candidatos con
+            margen, la imagen completa si no hubo candidatos y
+            CASCADE_FALLBACK_ON_MISS está activo, o None para omitir RetinaFace
+        """
+        from deepface import DeepFace
+        
+        height, width = image.shape[:2]
+        try:
+            candidates = DeepFace.extract_faces(
+                img_path=image,
+                detector_backend=CASCADE_PREDETECTOR,
+                enforce_detection=False,
+                align=False
+            )
+        except Exception as e:
+            logger.debug(f"Error en pre-detector {CASCADE_PREDETECTOR}: {str(e)}")
+            candidates = None
+        
+        boxes = []
+        for candidate in candidates or []:
+            area = candidate['facial_area']
+            # Sin detección DeepFace retorna la imagen completa con confianza 0
+            if candidate.get('confidence', 1.0) <= 0 or (area['w'] >= width and area['h'] >= height):
+                continue
+            pad_x = int(area['w'] * CASCADE_ROI_PADDING)
+            pad_y = int(area['h'] * CASCADE_ROI_PADDING)
+            boxes.append((
+                max(0, area['x'] - pad_x), max(0, area['y'] - pad_y),
+                min(width, area['x'] + area['w'] + pad_x), min(height, area['y'] + area['h'] + pad_y)
+            ))
+        
+        if candidates is None:
+            # Pre-detector no disponible: no se puede descartar nada
+            roi = (0, 0, width, height)
+        elif boxes:
+            x0s, y0s, x1s, y1s = zip(*boxes)
+            roi = (min(x0s), min(y0s), max(x1s), max(y1s))
+        elif CASCADE_FALLBACK_ON_MISS:
+            roi = (0, 0, width, height)
+        else:
+            roi = None
+        
+        with self._stats_lock:
+            counts = self._cascade_counts
+            counts['frames'] += 1
+            if boxes:
+                counts['predetector_hits'] += 1
+            if roi is None:
+                counts['skipped'] += 1
+            elif roi == (0, 0, width, height):
+                counts['full_runs'] += 1
+            else:
+                counts['roi_runs'] += 1
+                self._roi_fraction_sum += (roi[2] - roi[0]) * (roi[3] - roi[1]) / float(width * height)
+        
+        return roi
+    
+    def cascade_stats(self) -> Dict[str, Any]:
+        """
+        Tasas por etapa de la cascada desde el arranque.
+        
+        Returns:
+            Diccionario con contadores y tasas: predetector_hit_rate (imágenes
+            con candidatos), skip_rate (RetinaFace omitido), roi_rate
+            (RetinaFace solo en ROI), detector_hit_rate (RetinaFace confirmó
+            un rostro, sobre las imágenes en que corrió) y avg_roi_fraction
+            (área media de la ROI respecto a la imagen)
+        """
+        with self._stats_lock:
+            counts = dict(self._cascade_counts)
+            roi_fraction_sum = self._roi_fraction_sum
+        
+        frames = counts['frames']
+        detector_runs = counts['roi_runs'] + counts['full_runs']
+        
+        def rate(value: int, total: int) -> float:
+            return value / total if total else 0.0
+        
+        return {
+            'enabled': DETECTION_CASCADE,
+            'predetector': CASCADE_PREDETECTOR,
+            **counts,
+            'predetector_hit_rate': rate(counts['predetector_hits'], frames),
+            'skip_rate': rate(counts['skipped'], frames),
+            'roi_rate': rate(counts['roi_runs'], frames),
+            'detector_hit_rate': rate(counts['detector_hits'], detector_runs),
+            'avg_roi_fraction': roi_fraction_sum / counts['roi_runs'] if counts['roi_runs'] else 0.0
+        }
+    
+    def detect_faces(
+        self,
+        image_path: str = None,
+        image: np.ndarray = None,
+        return_best: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Detecta rostros en una imagen.
+        
+        Args:
+            image_path: Ruta a la imagen (opcional)
+            image: Imagen como array numpy (opcional)
+            return_best: Si True, retorna solo el rostro más grande
+            
+        Returns:
+            Lista de diccionarios con información de cada rostro detectado:
+            {
+                'bbox': (x, y, w, h),
+                'confidence': float,
+                'facial_area': dict,
+                'face_img': np.ndarray
+            }
+        """
+        return self.detect(image_path=image_path, image=image).as_list(return_best)
     
     def extract_face(
         self,
@@ -263,12 +627,12 @@ class FaceDetector:
         Returns:
             Imagen del rostro o None si no se detecta
         """
-        faces = self.detect_faces(image_path=image_path, image=image, return_best=True)
+        best = self.detect(image_path=image_path, image=image).best()
         
-        if not faces:
+        if best is None:
             return None
         
-        face_img = faces[0]['face_img']
+        face_img = best['face_img']
         
         # Resize si se especifica tamaño objetivo
         if target_size is not None:
@@ -293,12 +657,7 @@ class FaceDetector:
         Returns:
             Tupla (x, y, w, h) o None si no se detecta
         """
-        faces = self.detect_faces(image_path=image_path, image=image, return_best=True)
-        
-        if not faces:
-            return None
-        
-        return faces[0]['bbox']
+        return self.detect(image_path=image_path, image=image).bbox()
     
     def has_face(
         self,
@@ -315,8 +674,7 @@ class FaceDetector:
         Returns:
             True si hay rostro, False si no
         """
-        faces = self.detect_faces(image_path=image_path, image=image, return_best=True)
-        return len(faces) > 0
+        return self.detect(image_path=image_path, image=image).has_face
     
     def count_faces(
         self,
@@ -333,8 +691,7 @@ class FaceDetector:
         Returns:
             Número de rostros detectados
         """
-        faces = self.detect_faces(image_path=image_path, image=image, return_best=False)
-        return len(faces)
+        return self.detect(image_path=image_path, image=image).count
     
     def get_detector_info(self) -> Dict[str, Any]:
         """
@@ -347,7 +704,9 @@ class FaceDetector:
             'backend': self.backend,
             'model_loaded': self._model_loaded,
             'min_confidence': MIN_DETECTION_CONFIDENCE,
-            'min_face_size': MIN_FACE_SIZE
+            'min_face_size': MIN_FACE_SIZE,
+            'cached_detections': len(self._cache),
+            'cascade': self.cascade_stats()
         }
 
 
@@ -0,0 +1,93 @@
+"""
+Módulo de extracción de embeddings.
+Centraliza las llamadas a `DeepFace.represent` sobre rostros ya recortados
+(detector_backend='skip'), tanto de a uno como por lotes de BATCH_SIZE.
+"""
+import numpy as np
+from typing import List, Optional, Sequence
+
+from .config import RECOGNITION_MODEL, BATCH_SIZE
+from .utils import logger
+
+
+def _parse_embedding(embedding_obj) -> np.ndarray:
+    """Extrae el vector de la respuesta de DeepFace.represent para una imagen."""
+    if isinstance(embedding_obj, list):
+        embedding_obj = embedding_obj[0]
+    return np.asarray(embedding_obj['embedding'], dtype=np.float64).reshape(-1)
+
+
+def represent_face(face_img: np.ndarray) -> np.ndarray:
+    """
+    Extrae el embedding de un rostro ya recortado.
+
+    Args:
+        face_img: Rostro recortado (BGR)
+
+    Returns:
+        Embedding como vector float64
+    """
+    from deepface import DeepFace
+
+    embedding_obj = DeepFace.represent(
+        img_path=face_img,
+        model_name=RECOGNITION_MODEL,
+        detector_backend='skip',  # Ya tenemos el rostro
+        enforce_detection=False,
+        align=True
+    )
+    return _parse_embedding(embedding_obj)
+
+
+def represent_faces(
+    face_imgs: Sequence[np.ndarray],
+    batch_size: Optional[int] = None
+) -> List[Optional[np.ndarray]]:
+    """
+    Extrae embeddings de varios rostros en lotes.
+
+    Cada lote de `batch_size` rostros se envía en una sola llamada a
+    `DeepFace.represent`, que redimensiona y normaliza cada rostro igual que
+    en el camino individual y ejecuta una única pasada del modelo sobre el
+    tensor apilado. Si un lote falla (ej: una imagen inválida o una versión de
+    DeepFace sin soporte de listas), ese lote se procesa de a uno.
+
+    Args:
+        face_imgs: Rostros recortados (BGR)
+        batch_size: Tamaño de lote (None = BATCH_SIZE de config)
+
+    Returns:
+        Lista alineada con `face_imgs`; None donde no se pudo extraer
+    """
+    from deepface import DeepFace
+
+    batch_size = max(1, batch_size or BATCH_SIZE)
+    embeddings: List[Optional[np.ndarray]] = []
+
+    for start in range(0, len(face_imgs), batch_size):
+        chunk = list(face_imgs[start:start + batch_size])
+
+        if len(chunk) > 1:
+            try:
+                results = DeepFace.represent(
+                    img_path=chunk,
+                    model_name=RECOGNITION_MODEL,
+                    detector_backend='skip',
+                    enforce_detection=False,
+                    align=True
+                )
+                if len(results) == len(chunk):
+                    embeddings.extend(_parse_embedding(result) for result in results)
+                    continue
+                logger.debug(f"Lote con {len(results)} respuestas para {len(chunk)} rostros, procesando de a uno")
+            except Exception as e:
+                logger.debug(f"Error en lote de embeddings, procesando de a uno: {str(e)}")
+
+        for face_img in chunk:
+            try:
+                embeddings.append(represent_face(face_img))
+            except Exception as e:
+                logger.debug(f"  ⚠ Error extrayendo embedding: {str(e)}")
+                embeddings.append(None)
+
+    return embeddings
@@ -0,0 +1,611 @@
+"""
+Módulo de almacenamiento de embeddings en disco.
+
+Reemplaza `embeddings.pkl` por un almacén binario append-only:
+
+- `vectors-<gen>.f32`: matriz float32 (N, D) de embeddings normalizados,
+  abierta con `np.memmap` (carga instantánea, sin copia)
+- `norms-<gen>.f32`: norma original de cada fila (para métricas euclidianas)
+- `codes-<gen>.f16` / `codes-<gen>.i8` + `scales-<gen>.f32`: copia compacta
+  de la matriz para el scan 1:N según GALLERY_PRECISION (ver gallery.py)
+- `index.json`: índice compacto de segmentos {clave, fila inicial, cantidad}
+  con tombstones para las personas eliminadas o sobrescritas
+
+Registrar agrega filas al final; eliminar solo marca un tombstone. Cuando las
+filas muertas superan STORE_COMPACTION_RATIO, un hilo en segundo plano
+reescribe los segmentos vivos en una nueva generación de archivos.
+
+El índice se escribe con archivo temporal + rename: un corte a mitad de una
+escritura deja como máximo filas huérfanas al final, que se descartan. Cada
+escritura incrementa su campo `version` (el primero del archivo), que los
+workers leen con `read_index_version` para saber si deben recargar.
+
+Solo el proceso del servidor escribe (registro, migración, conversión y
+compactación); los workers de inferencia abren el almacén en solo lectura y
+releen el índice cuando cambia. Para que un lector
+que leyó el índice anterior todavía pueda mapear sus archivos, la
+compactación y `convert` conservan los archivos reemplazados hasta el
+siguiente cambio de generación o de precisión.
+"""
+import json
+import os
+import pickle
+import re
+import threading
+from pathlib import Path
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .config import (
+    EMBEDDINGS_STORE_DIR,
+    EMBEDDINGS_FILE,
+    STORE_COMPACTION_RATIO,
+    STORE_COMPACTION_MIN_ROWS,
+    GALLERY_PRECISION
+)
+from .gallery import EmbeddingGallery, PRECISIONS, quantize_rows
+from .utils import logger, atomic_open
+
+
+INDEX_NAME = "index.json"
+_ROW_DTYPE = np.float32
+_CODE_SUFFIXES = {"float16": "f16", "int8": "i8"}
+_CONVERT_BLOCK_ROWS = 65536
+_DATA_PATTERNS = ("vectors-*.f32", "norms-*.f32", "codes-*", "scales-*.f32")
+# Intentos de mapear la generación del índice si otro proceso la reemplaza a mitad de la lectura
+_LOAD_ATTEMPTS = 3
+# `version` es la primera clave de index.json: basta leer el comienzo del archivo
+_VERSION_PREFIX = re.compile(rb'^\{"version":\s*(\d+)')
+_VERSION_PREFIX_BYTES = 64
+
+
+def read_index_version(index_path: Path) -> int:
+    """
+    Versión de un index.json sin leer los segmentos.
+
+    Args:
+        index_path: Ruta del index.json del almacén
+
+    Returns:
+        Contador de escrituras del índice (0 si no existe o es de un
+        formato anterior sin versión)
+    """
+    try:
+        with open(index_path, 'rb') as f:
+            match = _VERSION_PREFIX.match(f.read(_VERSION_PREFIX_BYTES))
+    except FileNotFoundError:
+        return 0
+    return int(match.group(1)) if match else 0
+
+
+class EmbeddingStore(Mapping):
+    """
+    Almacén de embeddings por persona respaldado por archivos memmap.
+
+    Se comporta como un `Mapping` de solo lectura {clave: matriz (n, D)} para
+    el código que recorría el antiguo diccionario; las escrituras se hacen
+    con `put`, `remove` y `rename`.
+    """
+
+    def __init__(self, directory: Path = None, precision: str = None, read_only: bool = False):
+        """
+        Abre (o crea vacío) el almacén de un directorio.
+
+        Args:
+            directory: Directorio del almacén (por defecto EMBEDDINGS_STORE_DIR)
+            precision: Precisión de la copia compacta de un almacén nuevo (por
+                defecto GALLERY_PRECISION); uno existente conserva la suya
+                hasta `convert`
+            read_only: Solo lectura (workers de inferencia): las escrituras
+                lanzan PermissionError
+        """
+        self.directory = Path(directory or EMBEDDINGS_STORE_DIR)
+        self.read_only = read_only
+        if not read_only:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+        self.generation = 0
+        self.version = 0
+        self.dim = 0
+        self.rows = 0
+        self.precision = precision or GALLERY_PRECISION
+        self.segments: List[Dict] = []
+        self._live: Dict[str, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=_ROW_DTYPE)
+        self._norms = np.zeros(0, dtype=_ROW_DTYPE)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+        self._load_index()
+
+    # ========================================================================
+    # ARCHIVOS
+    # ========================================================================
+    @property
+    def index_path(self) -> Path:
+        return self.directory / INDEX_NAME
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.directory / f"vectors-{generation}.f32"
+
+    def _norms_path(self, generation: int) -> Path:
+        return self.directory / f"norms-{generation}.f32"
+
+    def _generation_files(self, generation: int, precision: str) -> List[Path]:
+        """Todos los archivos de datos de una generación con una precisión."""
+        return [self._vectors_path(generation), self._norms_path(generation)] + [
+            path for path, _, _ in self._compact_files(generation, precision)
+        ]
+
+    def _compact_files(self, generation: int, precision: str) -> List[tuple]:
+        """Archivos (ruta, dtype, ancho) de la copia compacta de una generación."""
+        if precision == "float32":
+            return []
+        files = [(self.directory / f"codes-{generation}.{_CODE_SUFFIXES[precision]}", np.dtype(precision), self.dim)]
+        if precision == "int8":
+            files.append((self.directory / f"scales-{generation}.f32", np.dtype(_ROW_DTYPE), 1))
+        return files
+
+    def _load_index(self) -> None:
+        """
+        Lee index.json y mapea los archivos de la generación actual.
+
+        Si otro proceso cambia de generación entre la lectura del índice y
+        el mapeo (FileNotFoundError), se relee el índice y se reintenta.
+        """
+        for attempt in range(_LOAD_ATTEMPTS):
+            if not self.index_path.exists():
+                return
+
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+
+            self.version = int(index.get('version', 0))
+            self.generation = int(index['generation'])
+            self.dim = int(index['dim'])
+            self.rows = int(index['rows'])
+            self.precision = index.get('precision', "float32")
+            self.segments = index['segments']
+            self._live = {
+                segment['key']: i for i, segment in enumerate(self.segments) if not segment.get('deleted')
+            }
+            try:
+                self._map_files()
+                return
+            except FileNotFoundError:
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+                logger.warning(f"Generación {self.generation} del almacén reemplazada durante la carga; releyendo índice")
+
+    def _map_files(self) -> None:
+        """Abre la matriz y las normas como memmap de solo lectura (sin copiar)."""
+        self._codes = self._scales = None
+        if self.rows == 0 or self.dim == 0:
+            self._vectors = np.zeros((0, self.dim), dtype=_ROW_DTYPE)
+            self._norms = np.zeros(0, dtype=_ROW_DTYPE)
+            return
+
+        self._vectors = np.memmap(
+            self._vectors_path(self.generation), dtype=_ROW_DTYPE, mode='r', shape=(self.rows, self.dim)
+        )
+        self._norms = np.memmap(
+            self._norms_path(self.generation), dtype=_ROW_DTYPE, mode='r', shape=(self.rows,)
+        )
+
+        compact = [
+            np.memmap(path, dtype=dtype, mode='r', shape=(self.rows, width) if width > 1 else (self.rows,))
+            for path, dtype, width in self._compact_files(self.generation, self.precision)
+        ]
+        if compact:
+            self._codes = compact[0]
+            self._scales = compact[1] if len(compact) > 1 else None
+
+    def _write_index(self) -> None:
+        """
+        Escribe index.json de forma atómica (archivo temporal + rename) con
+        la versión incrementada.
+        """
+        self.version += 1
+        index = {
+            'version': self.version,
+            'generation': self.generation,
+            'dim': self.dim,
+            'rows': self.rows,
+            'precision': self.precision,
+            'segments': self.segments
+        }
+        with atomic_open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError(f"Almacén de embeddings abierto en solo lectura: {self.directory}")
+
+    def _append_rows(self, vectors: np.ndarray, norms: np.ndarray) -> None:
+        """
+        Agrega filas al final de los archivos de la generación actual.
+        Descarta antes cualquier fila huérfana de una escritura interrumpida.
+        """
+        files = [
+            (self._vectors_path(self.generation), np.dtype(_ROW_DTYPE), self.dim),
+            (self._norms_path(self.generation), np.dtype(_ROW_DTYPE), 1)
+        ] + self._compact_files(self.generation, self.precision)
+        codes, scales = quantize_rows(vectors, self.precision)
+        data = [vectors, norms, codes, scales]
+
+        for (path, dtype, width), rows in zip(files, data):
+            mode = 'r+b' if path.exists() else 'wb'
+            with open(path, mode) as f:
+                f.seek(self.rows * width * dtype.itemsize)
+                f.truncate()
+                f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ========================================================================
+    # MAPPING (lectura)
+    # ========================================================================
+    def __getitem__(self, key: str) -> np.ndarray:
+        """Embeddings originales (desnormalizados) de una persona."""
+        with self._lock:
+            segment = self.segments[self._live[key]]
+            start, end = segment['start'], segment['start'] + segment['count']
+            return np.asarray(self._vectors[start:end]) * np.asarray(self._norms[start:end])[:, None]
+
+    def __contains__(self, key) -> bool:
+        return key in self._live
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._live))
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def count(self, key: str) -> int:
+        """Número de embeddings de una persona (sin leer la matriz)."""
+        return int(self.segments[self._live[key]]['count'])
+
+    @property
+    def live_rows(self) -> int:
+        """Filas de personas vigentes."""
+        return sum(self.segments[i]['count'] for i in self._live.values())
+
+    @property
+    def dead_rows(self) -> int:
+        """Filas ocupadas por tombstones."""
+        return self.rows - self.live_rows
+
+    def gallery(self) -> EmbeddingGallery:
+        """
+        Construye la galería vectorizada sobre la matriz memmap.
+
+        Si no hay tombstones y los segmentos están en orden, la galería usa
+        la matriz mapeada directamente (sin copia); si no, copia solo las
+        filas vivas. Con precisión compacta, el scan recorre la copia
+        compacta y la matriz float32 solo se lee al re-puntuar.
+        """
+        with self._lock:
+            live = sorted(self._live.items(), key=lambda item: self.segments[item[1]]['start'])
+            keys = [key for key, _ in live]
+            starts = np.array([self.segments[i]['start'] for _, i in live], dtype=np.int64)
+            counts = np.array([self.segments[i]['count'] for _, i in live], dtype=np.int64)
+            vectors, norms, codes, scales = self._vectors, self._norms, self._codes, self._scales
+
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+
+        if offsets[-1] == len(vectors) and np.array_equal(starts, offsets[:-1]):
+            return EmbeddingGallery(keys, vectors, norms, offsets, codes, scales)
+
+        rows = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+        if codes is None:
+            return EmbeddingGallery(keys, np.ascontiguousarray(vectors[rows]), np.asarray(norms[rows]), offsets)
+
+        # Las filas float32 se quedan en el memmap; la galería las indexa al re-puntuar
+        return EmbeddingGallery(
+            keys,
+            vectors,
+            np.asarray(norms[rows]),
+            offsets,
+            np.ascontiguousarray(codes[rows]),
+            None if scales is None else np.asarray(scales[rows]),
+            exact_rows=rows
+        )
+
+    # ========================================================================
+    # ESCRITURA
+    # ========================================================================
+    def put(self, key: str, embeddings: Sequence[np.ndarray]) -> bool:
+        """
+        Agrega (o reemplaza) los embeddings de una persona.
+
+        Los vectores se agregan al final; un registro previo de la misma
+        clave queda como tombstone.
+
+        Returns:
+            True si se guardó correctamente
+        """
+        return self.put_many({key: embeddings})
+
+    def put_many(self, items: Mapping) -> bool:
+        """
+        Agrega (o reemplaza) varias personas con una sola escritura de índice.
+
+        Args:
+            items: {clave: [embeddings]}; se ignoran las listas vacías
+
+        Returns:
+            True si se guardó correctamente
+
+        Raises:
+            PermissionError: Si el almacén es de solo lectura
+        """
+        self._check_writable()
+        batch = []
+        for key, embeddings in items.items():
+            raw = np.asarray(embeddings, dtype=np.float64).reshape(len(embeddings), -1)
+            if len(raw) > 0:
+                batch.append((key, raw))
+        if not batch:
+            return False
+
+        try:
+            with self._lock:
+                dims = {raw.shape[1] for _, raw in batch}
+                dim = self.dim or next(iter(dims))
+                if dims != {dim}:
+                    raise ValueError(f"Dimensiones {sorted(dims)} distintas a la del almacén ({dim})")
+                self.dim = dim
+
+                raw = np.vstack([raw for _, raw in batch])
+                norms = np.linalg.norm(raw, axis=1)
+                self._append_rows(raw / np.where(norms > 0, norms, 1.0)[:, None], norms)
+
+                for key, person_raw in batch:
+                    if key in self._live:
+                        self.segments[self._live[key]]['deleted'] = True
+                    self.segments.append({'key': key, 'start': self.rows, 'count': len(person_raw)})
+                    self._live[key] = len(self.segments) - 1
+                    self.rows += len(person_raw)
+
+                self._write_index()
+                self._map_files()
+
+            self._maybe_compact()
+            return True
+
+        except Exception as e:
+            logger.error(f"Error al guardar embeddings: {str(e)}")
+            self._reload()
+            return False
+
+    def remove(self, key: str) -> bool:
+        """Marca a una persona como eliminada (tombstone). Retorna False si no existe."""
+        self._check_writable()
+        with self._lock:
+            if key not in self._live:
+                return False
+            self.segments[self._live.pop(key)]['deleted'] = True
+            self._write_index()
+
+        self._maybe_compact()
+        return True
+
+    def rename(self, old_key: str, new_key: str) -> bool:
+        """Cambia la clave de una persona sin mover sus filas."""
+        self._check_writable()
+        with self._lock:
+            if old_key not in self._live or new_key in self._live:
+                return False
+            position = self._live.pop(old_key)
+            self.segments[position]['key'] = new_key
+            self._live[new_key] = position
+            self._write_index()
+        return True
+
+    def _reload(self) -> None:
+        """Vuelve al estado en disco tras un error de escritura."""
+        with self._lock:
+            self.generation, self.dim, self.rows, self.segments, self._live = 0, 0, 0, [], {}
+            self._load_index()
+
+    # ========================================================================
+    # COMPACTACIÓN
+    # ========================================================================
+    def needs_compaction(self) -> bool:
+        dead = self.dead_rows
+        return dead >= STORE_COMPACTION_MIN_ROWS and dead > STORE_COMPACTION_RATIO * max(self.rows, 1)
+
+    def _maybe_compact(self) -> None:
+        """Lanza la compactación en segundo plano si hay demasiadas filas muertas."""
+        if not self.needs_compaction():
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, name="store-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self) -> bool:
+        """
+        Reescribe los segmentos vivos en una nueva generación de archivos.
+
+        Las escrituras esperan a que termine; las lecturas siguen usando la
+        galería ya construida. Los archivos de la generación anterior se
+        conservan hasta la próxima compactación, para los procesos que aún
+        no releyeron el índice.
+
+        Returns:
+            True si se compactó
+        """
+        self._check_writable()
+        with self._lock:
+            live = sorted(self._live.items(), key=lambda item: self.segments[item[1]]['start'])
+            new_generation = self.generation + 1
+            new_segments = []
+            position = 0
+
+            sources = [self._vectors, self._norms, self._codes, self._scales]
+            files = [self._vectors_path(new_generation), self._norms_path(new_generation)] + [
+                path for path, _, _ in self._compact_files(new_generation, self.precision)
+            ]
+
+            try:
+                handles = [open(path, 'wb') for path in files]
+                try:
+                    for key, i in live:
+                        segment = self.segments[i]
+                        start, end = segment['start'], segment['start'] + segment['count']
+                        for f, source in zip(handles, sources):
+                            f.write(np.ascontiguousarray(source[start:end]).tobytes())
+                        new_segments.append({'key': key, 'start': position, 'count': segment['count']})
+                        position += segment['count']
+                    for f in handles:
+                        f.flush()
+                        os.fsync(f.fileno())
+                finally:
+                    for f in handles:
+                        f.close()
+            except Exception as e:
+                logger.error(f"Error al compactar almacén de embeddings: {str(e)}")
+                return False
+
+            old_generation = self.generation
+            removed_rows = self.rows - position
+            self.generation = new_generation
+            self.rows = position
+            self.segments = new_segments
+            self._live = {segment['key']: i for i, segment in enumerate(new_segments)}
+            self._write_index()
+            self._map_files()
+            self._remove_stale_files(self._generation_files(old_generation, self.precision))
+
+        logger.info(f"Almacén de embeddings compactado: {removed_rows} filas eliminadas")
+        return True
+
+    def _remove_stale_files(self, previous: Sequence[Path]) -> None:
+        """
+        Elimina los archivos de datos que no son de la generación actual ni
+        `previous` (los que acaba de reemplazar, que aún puede mapear un lector).
+        """
+        keep = set(self._generation_files(self.generation, self.precision)) | set(previous)
+        self._remove_files([
+            path for pattern in _DATA_PATTERNS for path in sorted(self.directory.glob(pattern)) if path not in keep
+        ])
+
+    @staticmethod
+    def _remove_files(paths: Sequence[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                # En Windows un memmap abierto impide borrar; se limpia en la próxima compactación
+                pass
+
+    def convert(self, precision: str) -> bool:
+        """
+        Cambia la precisión de la copia compacta de la generación actual.
+
+        Las filas float32 no se tocan: la copia compacta se genera desde
+        ellas por bloques y se publica con la escritura del índice. La copia
+        anterior se conserva hasta el próximo cambio, como en `compact`.
+
+        Args:
+            precision: "float32" (sin copia compacta), "float16" o "int8"
+
+        Returns:
+            True si se convirtió (False si ya tenía esa precisión)
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Precisión de galería no soportada: {precision}")
+        self._check_writable()
+
+        with self._lock:
+            if precision == self.precision:
+                return False
+
+            old_files = self._compact_files(self.generation, self.precision)
+            new_files = self._compact_files(self.generation, precision)
+            handles = [open(path, 'wb') for path, _, _ in new_files]
+            try:
+                for start in range(0, self.rows, _CONVERT_BLOCK_ROWS):
+                    block = quantize_rows(self._vectors[start:start + _CONVERT_BLOCK_ROWS], precision)
+                    for f, rows in zip(handles, block):
+                        f.write(np.ascontiguousarray(rows).tobytes())
+                for f in handles:
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                for f in handles:
+                    f.close()
+
+            old_precision, self.precision = self.precision, precision
+            self._write_index()
+            self._map_files()
+            self._remove_stale_files([path for path, _, _ in old_files])
+
+        logger.info(f"Almacén de embeddings convertido: {old_precision} -> {precision} ({self.rows} filas)")
+        return True
+
+    def wait_for_compaction(self, timeout: float = None) -> None:
+        """Espera a que termine una compactación en curso (útil en tests y al apagar)."""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join(timeout)
+
+
+# ============================================================================
+# MIGRACIÓN DESDE embeddings.pkl
+# ============================================================================
+def migrate_pickle(pickle_path: Path = None, store: EmbeddingStore = None, keep_backup: bool = True) -> int:
+    """
+    Migra el antiguo `embeddings.pkl` ({persona: [np.ndarray]}) al almacén.
+
+    Args:
+        pickle_path: Ruta del pickle (por defecto EMBEDDINGS_FILE)
+        store: Almacén destino (por defecto el de EMBEDDINGS_STORE_DIR)
+        keep_backup: Si True renombra el pickle a .pkl.bak en lugar de borrarlo
+
+    Returns:
+        Número de personas migradas
+    """
+    pickle_path = Path(pickle_path or EMBEDDINGS_FILE)
+    store = store if store is not None else EmbeddingStore()
+
+    if not pickle_path.exists():
+        return 0
+
+    with open(pickle_path, 'rb') as f:
+        database = pickle.load(f)
+
+    persons = {key: embeddings for key, embeddings in database.items() if len(embeddings) > 0}
+    if persons and not store.put_many(persons):
+        raise RuntimeError(f"No se pudo migrar {pickle_path}")
+    migrated = len(persons)
+
+    if keep_backup:
+        pickle_path.replace(pickle_path.with_suffix('.pkl.bak'))
+    else:
+        pickle_path.unlink()
+
+    logger.info(f"Migradas {migrated} personas de {pickle_path.name} al almacén de embeddings")
+    return migrated
+
+
+if __name__ == "__main__":
+    # Migración manual: python -m src.recognize.embedding_store [--precision int8]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migra embeddings.pkl y convierte la precisión del almacén")
+    parser.add_argument("--precision", choices=PRECISIONS, default=None, help="Precisión de la copia compacta")
+    args = parser.parse_args()
+
+    count = migrate_pickle()
+    print(f"✅ {count} personas migradas a {EMBEDDINGS_STORE_DIR}")
+
+    if args.precision:
+        store = EmbeddingStore()
+        store.convert(args.precision)
+        print(f"✅ Almacén en {store.precision}: {store.rows} filas")
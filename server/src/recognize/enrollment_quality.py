@@ -0,0 +1,144 @@
+"""
+Módulo de ranking de calidad de las imágenes de registro.
+
+Antes de preprocesar, aumentar y extraer embeddings, se puntúan todos los
+rostros detectados en las imágenes subidas en una sola pasada vectorizada:
+- tamaño del rostro (lado menor de la caja detectada)
+- nitidez (varianza del Laplaciano)
+- brillo (media de gris) y contraste (desviación estándar)
+- confianza de la detección
+
+Los rostros bajo los pisos de QUALITY_THRESHOLDS (o con puntaje combinado
+menor a ENROLLMENT_MIN_QUALITY_SCORE) se descartan con su motivo, y solo
+los ENROLLMENT_BEST_IMAGES mejores pasan a augmentation y embedding: menos
+inferencia por registro y menos ruido en la galería.
+
+Las métricas se calculan sobre el rostro reducido a QUALITY_FACE_SIZE para
+que todos los rostros se comparen a la misma escala.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from .config import (
+    QUALITY_THRESHOLDS,
+    QUALITY_STRICTNESS,
+    MIN_FACE_SIZE,
+    MIN_DETECTION_CONFIDENCE,
+    ENROLLMENT_BEST_IMAGES,
+    ENROLLMENT_MIN_QUALITY_SCORE,
+    ENROLLMENT_QUALITY_WEIGHTS,
+    ENROLLMENT_TARGET_FACE_SIZE
+)
+
+# Lado del rostro reducido sobre el que se miden nitidez, brillo y contraste
+QUALITY_FACE_SIZE = 112
+
+# Coeficientes BGR -> gris (ITU-R BT.601, los mismos que cv2.COLOR_BGR2GRAY)
+_GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def face_quality_metrics(faces: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Nitidez, brillo y contraste de varios rostros en una sola pasada.
+
+    Los rostros se reducen a QUALITY_FACE_SIZE y se apilan en un arreglo
+    (N, S, S); el Laplaciano de 4 vecinos y las estadísticas se calculan
+    sobre la pila completa.
+
+    Args:
+        faces: Rostros BGR (o gris) de cualquier tamaño
+
+    Returns:
+        Diccionario con arreglos de N valores: blur, brightness, contrast
+    """
+    size = QUALITY_FACE_SIZE
+    stack = np.empty((len(faces), size, size), dtype=np.float32)
+    for i, face in enumerate(faces):
+        face = cv2.resize(face, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+        stack[i] = face @ _GRAY_WEIGHTS if face.ndim == 3 else face
+
+    laplacian = (
+        stack[:, :-2, 1:-1] + stack[:, 2:, 1:-1] + stack[:, 1:-1, :-2] + stack[:, 1:-1, 2:]
+        - 4.0 * stack[:, 1:-1, 1:-1]
+    )
+    return {
+        "blur": laplacian.reshape(len(faces), -1).var(axis=1),
+        "brightness": stack.reshape(len(faces), -1).mean(axis=1),
+        "contrast": stack.reshape(len(faces), -1).std(axis=1)
+    }
+
+
+def rank_enrollment_faces(
+    candidates: List[Dict[str, Any]],
+    best_n: int = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Puntúa los candidatos, descarta los que no pasan los pisos y elige los mejores.
+
+    Args:
+        candidates: Un dict por imagen con `image` (ruta), `face_img`,
+            `confidence` y `face_size` (lado menor de la caja, px)
+        best_n: Máximo de imágenes seleccionadas (None = ENROLLMENT_BEST_IMAGES)
+
+    Returns:
+        Tupla (seleccionados, rechazados). Los seleccionados son los dicts de
+        entrada (con `quality_score`) ordenados de mayor a menor puntaje; cada
+        rechazo es {image, score, reasons}
+    """
+    if not candidates:
+        return [], []
+
+    best_n = best_n or ENROLLMENT_BEST_IMAGES
+    thresholds = QUALITY_THRESHOLDS[QUALITY_STRICTNESS]
+
+    metrics = face_quality_metrics([candidate["face_img"] for candidate in candidates])
+    blur, brightness, contrast = metrics["blur"], metrics["brightness"], metrics["contrast"]
+    face_size = np.array([candidate["face_size"] for candidate in candidates], dtype=np.float32)
+    confidence = np.array([candidate["confidence"] for candidate in candidates], dtype=np.float32)
+
+    # Puntajes parciales en [0, 1]
+    brightness_mid = (thresholds["brightness_min"] + thresholds["brightness_max"]) / 2.0
+    brightness_span = (thresholds["brightness_max"] - thresholds["brightness_min"]) / 2.0
+    partial = {
+        "size": np.clip(face_size / ENROLLMENT_TARGET_FACE_SIZE, 0.0, 1.0),
+        "blur": np.clip(blur / (2.0 * thresholds["blur"]), 0.0, 1.0),
+        "brightness": np.clip(1.0 - np.abs(brightness - brightness_mid) / brightness_span, 0.0, 1.0),
+        "contrast": np.clip(contrast / (2.0 * thresholds["contrast_min"]), 0.0, 1.0),
+        "confidence": np.clip(
+            (confidence - MIN_DETECTION_CONFIDENCE) / (1.0 - MIN_DETECTION_CONFIDENCE), 0.0, 1.0
+        )
+    }
+    total_weight = sum(ENROLLMENT_QUALITY_WEIGHTS.values())
+    scores = sum(ENROLLMENT_QUALITY_WEIGHTS[name] * values for name, values in partial.items()) / total_weight
+
+    # Pisos por métrica (mismo criterio que check_image_quality)
+    floors = [
+        (face_size < MIN_FACE_SIZE, "Rostro muy pequeño"),
+        (blur < thresholds["blur"], "Imagen borrosa"),
+        (brightness < thresholds["brightness_min"], "Imagen muy oscura"),
+        (brightness > thresholds["brightness_max"], "Imagen muy brillante"),
+        (contrast < thresholds["contrast_min"], "Bajo contraste"),
+        (confidence < MIN_DETECTION_CONFIDENCE, "Baja confianza de detección"),
+        (scores < ENROLLMENT_MIN_QUALITY_SCORE, "Puntaje de calidad insuficiente")
+    ]
+    failed = np.stack([mask for mask, _ in floors])
+
+    selected, rejected = [], []
+    for i in np.argsort(-scores, kind="stable"):
+        reasons = [reason for (_, reason), hit in zip(floors, failed[:, i]) if hit]
+        if not reasons and len(selected) >= best_n:
+            reasons = [f"Fuera de las {best_n} mejores imágenes"]
+        if reasons:
+            rejected.append({
+                "image": Path(str(candidates[i]["image"])).name,
+                "score": round(float(scores[i]), 3),
+                "reasons": reasons
+            })
+        else:
+            candidates[i]["quality_score"] = float(scores[i])
+            selected.append(candidates[i])
+
+    return selected, rejected
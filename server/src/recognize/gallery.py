@@ -0,0 +1,548 @@
+"""
+Módulo de galería vectorizada de embeddings.
+Mantiene todos los embeddings en una matriz contigua float32 pre-normalizada
+con un índice fila -> persona, y calcula el matching ensemble con un único
+producto matricial y reducciones por segmento (sin bucles Python por embedding).
+
+Opcionalmente la galería lleva una copia compacta de la matriz (float16, o
+int8 con una escala por fila) que es la única que recorre el scan 1:N; las
+personas más cercanas se re-puntúan con las filas float32 exactas.
+"""
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Tuple
+
+from .config import DISTANCE_METRIC, K_NEIGHBORS, GALLERY_RESCORE_CANDIDATES
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Filas por bloque al decodificar la copia compacta: el bloque float32
+# temporal (256 x 512 x 4 bytes = 512 KB) queda en cache L2 durante el producto
+_SCAN_BLOCK_ROWS = 256
+
+# Filas por bloque al calcular centroides y radios: el pico de memoria es un
+# bloque (4096 x 512 x 8 bytes = 16 MB) y no copias float64 de la galería
+_CENTROID_BLOCK_ROWS = 4096
+
+# Margen (en coseno) de las cotas inferiores: las distancias exactas salen del
+# producto float32, así la poda nunca descarta por error de redondeo
+_BOUND_SLACK = 1e-4
+
+
+def quantize_rows(unit_rows: np.ndarray, precision: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Codifica filas normalizadas en el formato compacto.
+
+    Args:
+        unit_rows: Matriz (N, D) de embeddings normalizados
+        precision: "float32" (sin copia compacta), "float16" o "int8"
+
+    Returns:
+        Tupla (codes, scales): float16 sin escalas, o int8 con una escala
+        float32 por fila (fila ~= codes * scale); (None, None) para float32
+    """
+    rows = np.asarray(unit_rows, dtype=np.float32)
+
+    if precision == "float32":
+        return None, None
+
+    if precision == "float16":
+        return rows.astype(np.float16), None
+
+    if precision == "int8":
+        peaks = np.abs(rows).max(axis=1) if rows.size else np.zeros(len(rows), dtype=np.float32)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    raise ValueError(f"Precisión de galería no soportada: {precision}")
+
+
+class EmbeddingGallery:
+    """
+    Galería de embeddings en formato matricial.
+
+    Las filas de cada persona son contiguas: la persona `i` ocupa las filas
+    `offsets[i]:offsets[i + 1]` de `matrix`. La matriz guarda los vectores
+    normalizados (norma L2 = 1) y `norms` la norma original de cada fila, lo
+    que permite obtener coseno, euclidiana y euclidiana L2 del mismo producto.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        matrix: np.ndarray,
+        norms: np.ndarray,
+        offsets: np.ndarray,
+        codes: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        exact_rows: Optional[np.ndarray] = None
+    ):
+        """
+        Inicializa la galería a partir de arrays ya construidos.
+
+        Args:
+            keys: Identificador de cada persona (en el orden de los segmentos)
+            matrix: Matriz (N, D) float32 de embeddings normalizados
+            norms: Vector (N,) con la norma original de cada embedding
+            offsets: Vector (P + 1,) con el inicio de cada segmento de persona
+            codes: Copia compacta (N, D) float16 o int8 para el scan (opcional)
+            scales: Escala (N,) de cada fila int8
+            exact_rows: Con copia compacta, filas de `matrix` que corresponden
+                a la galería (None = todas y en orden); evita copiar la matriz
+                float32 cuando el almacén tiene tombstones
+        """
+        self.keys: List[str] = list(keys)
+        self.matrix = matrix
+        self.norms = norms
+        self.codes = codes
+        self.scales = scales
+        self._exact_rows = exact_rows
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.counts = np.diff(self.offsets)
+        self.labels = np.repeat(np.arange(len(self.keys)), self.counts)
+        self._columns = np.arange(len(self.labels)) - np.repeat(self.offsets[:-1], self.counts)
+        self._key_index = {key: i for i, key in enumerate(self.keys)}
+        self._cohort: Optional[np.ndarray] = None
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def from_database(cls, database: Dict[str, List[np.ndarray]]) -> 'EmbeddingGallery':
+        """
+        Construye la galería desde el diccionario {persona: [embeddings]}.
+
+        Args:
+            database: Base de datos de embeddings por persona
+
+        Returns:
+            Galería con los embeddings apilados y pre-normalizados
+        """
+        keys = [key for key, embeddings in database.items() if len(embeddings) > 0]
+        counts = [len(database[key]) for key in keys]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+
+        if not keys:
+            return cls([], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.float32), offsets)
+
+        raw = np.vstack([np.asarray(database[key], dtype=np.float64).reshape(len(database[key]), -1) for key in keys])
+        norms = np.linalg.norm(raw, axis=1)
+        safe_norms = np.where(norms > 0, norms, 1.0)
+        matrix = np.ascontiguousarray((raw / safe_norms[:, None]).astype(np.float32))
+
+        return cls(keys, matrix, norms.astype(np.float32), offsets)
+
+    def __len__(self) -> int:
+        """Número de personas en la galería."""
+        return len(self.keys)
+
+    @property
+    def precision(self) -> str:
+        """Formato que recorre el scan: float32, float16 o int8."""
+        return "float32" if self.codes is None else self.codes.dtype.name
+
+    @property
+    def scan_nbytes(self) -> int:
+        """Bytes de la matriz que recorre el scan (más normas y escalas)."""
+        matrix = self.matrix if self.codes is None else self.codes
+        scales = 0 if self.scales is None else self.scales.nbytes
+        return int(matrix.nbytes + self.norms.nbytes + scales)
+
+    def quantize(self, precision: str) -> 'EmbeddingGallery':
+        """
+        Galería con la misma matriz exacta y una copia compacta para el scan.
+
+        Args:
+            precision: "float32", "float16" o "int8"
+
+        Returns:
+            Nueva galería (comparte matrix, norms y offsets)
+        """
+        codes, scales = quantize_rows(self.exact(), precision)
+        return EmbeddingGallery(self.keys, self.exact(), self.norms, self.offsets, codes, scales)
+
+    def exact(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Filas float32 exactas (normalizadas) de la galería.
+
+        Args:
+            rows: Índices de fila (None = todas)
+
+        Returns:
+            Matriz (len(rows), D) float32
+        """
+        if self._exact_rows is not None:
+            rows = self._exact_rows if rows is None else self._exact_rows[rows]
+        return self.matrix if rows is None else np.asarray(self.matrix[rows])
+
+    @property
+    def num_embeddings(self) -> int:
+        """Número total de embeddings (filas) en la galería."""
+        return int(self.offsets[-1])
+
+    def index_of(self, key: str) -> Optional[int]:
+        """Retorna el índice del segmento de una persona o None si no existe."""
+        return self._key_index.get(key)
+
+    def subset(self, indices: Sequence[int]) -> 'EmbeddingGallery':
+        """
+        Construye una galería con solo algunas personas (en el orden dado).
+
+        Args:
+            indices: Índices de persona a conservar
+
+        Returns:
+            Nueva galería con las filas de esas personas (float32 exactas:
+            los subconjuntos son candidatos y se puntúan sin aproximación)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = self.counts[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        rows = np.arange(offsets[-1]) + np.repeat(self.offsets[indices] - offsets[:-1], counts)
+        keys = [self.keys[i] for i in indices]
+        return EmbeddingGallery(keys, self.exact(rows), self.norms[rows], offsets)
+
+    def cohort_indices(self, size: int, exclude: Optional[int] = None) -> np.ndarray:
+        """
+        Cohorte fija de impostores para verificación 1:1.
+
+        La muestra es determinista (misma galería -> misma cohorte) para que
+        el umbral adaptativo sea reproducible entre peticiones.
+
+        Args:
+            size: Número de personas de la cohorte
+            exclude: Índice de persona a excluir (la persona reclamada)
+
+        Returns:
+            Índices de persona de la cohorte
+        """
+        if self._cohort is None:
+            self._cohort = np.random.default_rng(0).permutation(len(self.keys))
+        cohort = self._cohort[:size + 1]
+        if exclude is not None:
+            cohort = cohort[cohort != exclude]
+        return cohort[:size]
+
+    # ========================================================================
+    # DISTANCIAS
+    # ========================================================================
+    def distances(self, query: np.ndarray, metric: str = None) -> np.ndarray:
+        """
+        Calcula la distancia del query contra todas las filas con un solo producto.
+
+        Args:
+            query: Embedding a comparar
+            metric: Métrica a usar (cosine, euclidean, euclidean_l2)
+
+        Returns:
+            Vector (N,) float64 de distancias, en el orden de las filas
+        """
+        metric = metric or DISTANCE_METRIC
+        query = np.asarray(query, dtype=np.float64).ravel()
+        query_norm = float(np.linalg.norm(query))
+        unit_query = (query / (query_norm if query_norm > 0 else 1.0)).astype(np.float32)
+
+        if self.codes is None:
+            cosine = (self.matrix @ unit_query).astype(np.float64)
+        else:
+            cosine = self._compact_cosine(unit_query)
+
+        return self._from_cosine(cosine, self.norms, query_norm, metric)
+
+    def _compact_cosine(self, unit_query: np.ndarray) -> np.ndarray:
+        """Coseno aproximado contra la copia compacta, decodificada por bloques."""
+        cosine = np.empty(len(self.codes), dtype=np.float64)
+        block = np.empty((_SCAN_BLOCK_ROWS, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.codes), _SCAN_BLOCK_ROWS):
+            codes = self.codes[start:start + _SCAN_BLOCK_ROWS]
+            np.copyto(block[:len(codes)], codes, casting='unsafe')
+            cosine[start:start + len(codes)] = block[:len(codes)] @ unit_query
+        if self.scales is not None:
+            cosine *= self.scales
+        return cosine
+
+    @staticmethod
+    def _from_cosine(cosine: np.ndarray, norms: np.ndarray, query_norm: float, metric: str) -> np.ndarray:
+        """Convierte el coseno por fila en la métrica pedida."""
+        if metric == "cosine":
+            return 1.0 - cosine
+
+        if metric == "euclidean":
+            norms = norms.astype(np.float64)
+            squared = norms * norms + query_norm * query_norm - 2.0 * norms * query_norm * cosine
+            return np.sqrt(np.maximum(squared, 0.0))
+
+        if metric == "euclidean_l2":
+            return np.sqrt(np.maximum(2.0 - 2.0 * cosine, 0.0))
+
+        raise ValueError(f"Métrica no soportada: {metric}")
+
+    def rescore(self, distances: np.ndarray, query: np.ndarray, metric: str = None, candidates: int = None) -> np.ndarray:
+        """
+        Recalcula con las filas float32 exactas las distancias de las personas
+        más cercanas según el scan compacto.
+
+        Args:
+            distances: Distancias aproximadas (N,) del scan compacto
+            query: Embedding a comparar
+            metric: Métrica de distancia
+            candidates: Personas a re-puntuar (None = GALLERY_RESCORE_CANDIDATES)
+
+        Returns:
+            Vector (N,) con distancias exactas para esas personas
+        """
+        metric = metric or DISTANCE_METRIC
+        candidates = min(candidates or GALLERY_RESCORE_CANDIDATES, len(self.keys))
+        closest = self.segment_min(distances)
+        persons = np.argpartition(closest, candidates - 1)[:candidates] if candidates < len(self.keys) \
+            else np.arange(len(self.keys))
+
+        counts = self.counts[persons]
+        local = np.zeros(len(persons) + 1, dtype=np.int64)
+        local[1:] = np.cumsum(counts)
+        rows = np.arange(local[-1]) + np.repeat(self.offsets[persons] - local[:-1], counts)
+
+        query = np.asarray(query, dtype=np.float64).ravel()
+        query_norm = float(np.linalg.norm(query))
+        unit_query = (query / (query_norm if query_norm > 0 else 1.0)).astype(np.float32)
+        cosine = (self.exact(rows) @ unit_query).astype(np.float64)
+
+        rescored = distances.copy()
+        rescored[rows] = self._from_cosine(cosine, self.norms[rows], query_norm, metric)
+        return rescored
+
+    # ========================================================================
+    # REDUCCIONES POR SEGMENTO
+    # ========================================================================
+    def segment_min(self, distances: np.ndarray) -> np.ndarray:
+        """Distancia mínima por persona."""
+        return np.minimum.reduceat(distances, self.offsets[:-1])
+
+    def segment_mean(self, distances: np.ndarray) -> np.ndarray:
+        """Distancia promedio por persona."""
+        return np.add.reduceat(distances, self.offsets[:-1]) / self.counts
+
+    def segment_median(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Mediana por persona (misma definición que np.median).
+
+        Si los segmentos tienen tamaños parecidos se rellena una matriz
+        (P, max_count) con +inf y se ordena por filas; si no, se ordena todo
+        el vector por (persona, distancia).
+        """
+        starts = self.offsets[:-1]
+        counts = self.counts
+        low = (counts - 1) // 2
+        high = counts // 2
+
+        max_count = int(counts.max())
+        if max_count * len(counts) <= 2 * len(distances):
+            padded = np.full((len(counts), max_count), np.inf)
+            padded[self.labels, self._columns] = distances
+            padded.sort(axis=1)
+            rows = np.arange(len(counts))
+            return (padded[rows, low] + padded[rows, high]) / 2.0
+
+        order = np.lexsort((distances, self.labels))
+        ordered = distances[order]
+        return (ordered[starts + low] + ordered[starts + high]) / 2.0
+
+    def segment_voting(self, distances: np.ndarray, k: int = None) -> np.ndarray:
+        """
+        Voting por k-vecinos: promedio de las distancias de cada persona dentro
+        de los K vecinos más cercanos globales (inf si no tiene votos).
+        """
+        k = min(k or K_NEIGHBORS, len(distances))
+        num_persons = len(self.keys)
+
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        # Orden estable por (distancia, fila) igual que el sort de la lista plana
+        nearest = nearest[np.lexsort((nearest, distances[nearest]))]
+
+        voters = self.labels[nearest]
+        votes = np.bincount(voters, minlength=num_persons)
+        sums = np.bincount(voters, weights=distances[nearest], minlength=num_persons)
+
+        voting = np.full(num_persons, np.inf)
+        has_votes = votes > 0
+        voting[has_votes] = sums[has_votes] / votes[has_votes]
+        return voting
+
+    def score(self, query: np.ndarray, metric: str = None, k: int = None) -> Dict[str, np.ndarray]:
+        """
+        Calcula las cuatro puntuaciones base del ensemble para todas las personas.
+        Con copia compacta, las personas más cercanas se re-puntúan en float32.
+
+        Args:
+            query: Embedding a comparar
+            metric: Métrica de distancia
+            k: Número de vecinos para voting
+
+        Returns:
+            Diccionario con 'distances' (N,) y 'min_distance', 'average',
+            'median', 'voting' (P,) alineados con `keys`
+        """
+        distances = self.distances(query, metric)
+        if self.codes is not None:
+            distances = self.rescore(distances, query, metric)
+        return {
+            'distances': distances,
+            'min_distance': self.segment_min(distances),
+            'average': self.segment_mean(distances),
+            'median': self.segment_median(distances),
+            'voting': self.segment_voting(distances, k)
+        }
+
+    def person_distances(self, distances: np.ndarray, index: int) -> np.ndarray:
+        """Retorna las distancias (vista) que corresponden a una persona."""
+        return distances[self.offsets[index]:self.offsets[index + 1]]
+
+    # ========================================================================
+    # CENTROIDES (poda en dos etapas)
+    # ========================================================================
+    def centroids(self) -> Dict[str, np.ndarray]:
+        """
+        Centroide y radio de cada persona (calculados una vez por galería).
+
+        - 'directions' (P, D) / 'angles' (P,): dirección media de los vectores
+          normalizados y ángulo máximo de un embedding a esa dirección
+          (cotas para coseno y euclidiana L2)
+        - 'centers' (P, D) / 'radii' (P,) / 'max_norms' (P,): centro, radio y
+          norma máxima en el espacio original (cotas para euclidiana)
+        """
+        if self._centroids is None:
+            num_persons = len(self.keys)
+            dim = self.matrix.shape[1]
+            norms = self.norms.astype(np.float32)
+
+            # Primera pasada: sumas por persona (acumuladas en float64)
+            directions = np.zeros((num_persons, dim))
+            centers = np.zeros((num_persons, dim))
+            for start, block, persons, starts in self._centroid_blocks():
+                directions[persons] += np.add.reduceat(block, starts, axis=0)
+                raw = block * norms[start:start + len(block), None]
+                centers[persons] += np.add.reduceat(raw, starts, axis=0)
+
+            lengths = np.linalg.norm(directions, axis=1)
+            directions /= np.where(lengths > 0, lengths, 1.0)[:, None]
+            centers /= self.counts[:, None]
+
+            # Segunda pasada: ángulo y radio máximos respecto del centroide. El
+            # bloque se sube a float64: cerca de coseno 1 el arccos amplifica
+            # el redondeo float32 más allá del margen de las cotas
+            angles = np.zeros(num_persons)
+            radii = np.zeros(num_persons)
+            for start, block, persons, starts in self._centroid_blocks():
+                stop = start + len(block)
+                labels = self.labels[start:stop]
+                block = block.astype(np.float64)
+                cosines = np.einsum('ij,ij->i', block, directions[labels])
+                block_angles = np.maximum.reduceat(np.arccos(np.clip(cosines, -1.0, 1.0)), starts)
+                angles[persons] = np.maximum(angles[persons], block_angles)
+
+                raw = block * self.norms[start:stop, None]
+                distances = np.linalg.norm(raw - centers[labels], axis=1)
+                radii[persons] = np.maximum(radii[persons], np.maximum.reduceat(distances, starts))
+            angles[lengths <= 0] = np.pi  # Dirección indefinida: sin cota
+
+            max_norms = np.maximum.reduceat(self.norms.astype(np.float64), self.offsets[:-1])
+
+            self._centroids = {
+                'directions': directions,
+                'angles': angles,
+                'centers': centers,
+                'radii': radii,
+                'max_norms': max_norms
+            }
+        return self._centroids
+
+    def _centroid_blocks(self):
+        """
+        Recorre la galería exacta en bloques float32 de filas contiguas.
+
+        Yields:
+            (start, block, persons, starts): fila inicial, bloque (B, D)
+            float32, personas presentes en el bloque y el inicio local de
+            cada una (para `reduceat`)
+        """
+        total = self.num_embeddings
+        for start in range(0, total, _CENTROID_BLOCK_ROWS):
+            stop = min(start + _CENTROID_BLOCK_ROWS, total)
+            if self._exact_rows is None:
+                block = np.asarray(self.matrix[start:stop], dtype=np.float32)
+            else:
+                block = np.asarray(self.matrix[self._exact_rows[start:stop]], dtype=np.float32)
+            labels = self.labels[start:stop]
+            starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+            yield start, block, labels[starts], starts
+
+    def lower_bounds(self, query: np.ndarray, metric: str = None) -> np.ndarray:
+        """
+        Cota inferior de la distancia mínima del query a cada persona.
+
+        Por desigualdad triangular contra el centroide: ningún embedding de la
+        persona está más cerca que (distancia al centroide - radio). Como
+        promedio, mediana y voting nunca son menores que el mínimo, la cota
+        vale también para el score del ensemble. Un solo producto (P, D).
+
+        Args:
+            query: Embedding a comparar
+            metric: Métrica de distancia
+
+        Returns:
+            Vector (P,) float64 alineado con `keys`
+        """
+        metric = metric or DISTANCE_METRIC
+        bounds = self.centroids()
+        query = np.asarray(query, dtype=np.float64).ravel()
+        query_norm = float(np.linalg.norm(query))
+
+        if metric == "euclidean":
+            # En el espacio de distancias al cuadrado, como el cálculo exacto
+            gaps = np.maximum(np.linalg.norm(bounds['centers'] - query, axis=1) - bounds['radii'], 0.0)
+            squared = gaps * gaps - 2.0 * query_norm * bounds['max_norms'] * _BOUND_SLACK
+            return np.sqrt(np.maximum(squared, 0.0))
+
+        unit_query = query / (query_norm if query_norm > 0 else 1.0)
+        angles = np.arccos(np.clip(bounds['directions'] @ unit_query, -1.0, 1.0))
+        cosine = np.cos(np.maximum(angles - bounds['angles'], 0.0)) + _BOUND_SLACK
+
+        if metric == "cosine":
+            return 1.0 - cosine
+
+        if metric == "euclidean_l2":
+            return np.sqrt(np.maximum(2.0 - 2.0 * cosine, 0.0))
+
+        raise ValueError(f"Métrica no soportada: {metric}")
+
+
+class GallerySnapshot:
+    """
+    Versión inmutable de la galería (y su índice IVF) publicada por
+    `FaceRegistration`.
+
+    Los lectores toman una referencia al snapshot actual y trabajan sobre ella
+    sin locks; un registro construye un snapshot nuevo y lo publica con una
+    sola asignación (read-copy-update). Un snapshot nunca se modifica después
+    de publicado, así un reconocimiento en curso ve siempre una galería
+    consistente aunque haya escrituras en paralelo.
+    """
+
+    __slots__ = ("version", "gallery", "ann_index")
+
+    def __init__(self, gallery: EmbeddingGallery, ann_index=None, version: int = 0):
+        """
+        Args:
+            gallery: Galería vectorizada (no se modifica después)
+            ann_index: Índice IVF correspondiente (None con el motor exhaustivo)
+            version: Número de versión (crece con cada publicación)
+        """
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "gallery", gallery)
+        object.__setattr__(self, "ann_index", ann_index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GallerySnapshot es inmutable")
+
+    def __len__(self) -> int:
+        return len(self.gallery)
@@ -0,0 +1,268 @@
+"""
+Módulo de ejecución de inferencia fuera del event loop.
+
+El reconocimiento (RetinaFace + Facenet512) tarda ~1 s por imagen y es
+síncrono; ejecutarlo dentro de una ruta `async` bloquea el event loop de
+uvicorn y con él todas las demás peticiones HTTP y el tráfico de Socket.IO.
+
+`InferencePool` ejecuta los métodos de `FaceRecognizer` en un pool de
+procesos (NUM_WORKERS) donde cada worker carga detector y reconocedor una
+sola vez. Las rutas hacen `await` del resultado sin bloquear el loop, y la
+cola de peticiones pendientes está acotada (INFERENCE_QUEUE_SIZE).
+
+Con NUM_WORKERS = 0 se usan INFERENCE_THREADS hilos en el mismo proceso
+(mismos singletons que el resto del servidor); con MICRO_BATCHING sus
+embeddings se agrupan en lotes. Los tiempos por etapa medidos en los
+workers se agregan al profiler del proceso del servidor; los de las tareas
+de registro con prefijo "enrollment." (ver `stage_namespace`).
+"""
+import asyncio
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import NUM_WORKERS, INFERENCE_THREADS, INFERENCE_QUEUE_SIZE, EMBEDDINGS_INDEX_FILE
+from .embedding_store import read_index_version
+from .utils import logger
+from .profiling import collect_timings, get_profiler, stage_namespace
+
+
+class InferenceQueueFull(Exception):
+    """La cola de inferencia está llena; el cliente debe reintentar."""
+
+
+def gallery_version() -> int:
+    """
+    Versión de la galería en disco (contador de escrituras del índice del
+    almacén, no su mtime: dos escrituras en el mismo tick del reloj del
+    sistema de archivos tendrían el mismo mtime).
+    Los workers la comparan para recargar la base tras un registro/eliminación.
+    """
+    return read_index_version(EMBEDDINGS_INDEX_FILE)
+
+
+# ============================================================================
+# LADO DEL WORKER (se ejecuta en cada proceso del pool)
+# ============================================================================
+_worker_recognizer = None
+_worker_version: Optional[int] = None
+
+
+def _init_worker() -> None:
+    """
+    Inicializador del proceso: carga detector, reconocedor y base una sola vez.
+    La base se abre en solo lectura (el servidor la migra y la escribe).
+    Un error aquí no debe romper el pool: se registra y se reintenta en la
+    primera tarea (que fallará con la excepción real).
+    """
+    global _worker_recognizer, _worker_version
+    from .reconocimiento import initialize_recognizer
+    from .preprocessing_pool import configure_opencv_threads
+    from .registro import use_read_only_store
+
+    use_read_only_store()
+    try:
+        configure_opencv_threads()
+        _worker_version = gallery_version()
+        _worker_recognizer = initialize_recognizer()
+        logger.info(f"Worker de inferencia listo (pid={multiprocessing.current_process().pid})")
+    except Exception as e:
+        logger.error(f"Error al inicializar worker de inferencia: {str(e)}")
+
+
+def _worker_ping() -> int:
+    """Tarea vacía para forzar el arranque de los workers."""
+    return multiprocessing.current_process().pid
+
+
+def _run_in_worker(version: int, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """
+    Ejecuta un método del reconocedor del worker.
+    Si la galería en disco cambió desde la última carga, la recarga primero.
+    """
+    global _worker_recognizer, _worker_version
+
+    if _worker_recognizer is None:
+        from .reconocimiento import initialize_recognizer
+
+        _worker_version = gallery_version()
+        _worker_recognizer = initialize_recognizer()
+
+    if version != _worker_version:
+        from .registro import reset_registration, get_registration
+
+        reset_registration()
+        registration = get_registration()
+        _worker_recognizer.registration = registration
+        _worker_recognizer.database = registration.database
+        _worker_version = version
+        logger.info(f"Worker de inferencia: galería recargada ({len(registration.database)} personas)")
+
+    return getattr(_worker_recognizer, method)(*args, **kwargs)
+
+
+def _task_namespace(method: str):
+    """
+    Tareas de registro (`enrollment_*`): sus etapas se registran como
+    "enrollment.<etapa>" para no sesgar los percentiles de las marcaciones.
+    """
+    return stage_namespace("enrollment") if method.startswith("enrollment_") else nullcontext()
+
+
+def _run_profiled(version: int, method: str, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Any, Dict[str, float]]:
+    """
+    `_run_in_worker` recolectando los tiempos por etapa de la tarea, para que
+    el proceso del servidor los agregue a su profiler.
+    """
+    with _task_namespace(method), collect_timings() as timings:
+        result = _run_in_worker(version, method, args, kwargs)
+    return result, timings
+
+
+def _run_local(method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Ejecuta un método del reconocedor singleton del proceso actual."""
+    from .reconocimiento import get_recognizer
+
+    with _task_namespace(method):
+        return getattr(get_recognizer(), method)(*args, **kwargs)
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+class InferencePool:
+    """
+    Pool de inferencia con cola acotada y API async.
+    """
+
+    def __init__(self, num_workers: int = None, queue_size: int = None, num_threads: int = None):
+        """
+        Args:
+            num_workers: Procesos del pool (0 = hilos en el proceso actual)
+            queue_size: Máximo de peticiones pendientes (en ejecución + en espera)
+            num_threads: Hilos cuando num_workers = 0
+        """
+        self.num_workers = NUM_WORKERS if num_workers is None else num_workers
+        self.num_threads = max(1, num_threads or INFERENCE_THREADS)
+        self.queue_size = queue_size or INFERENCE_QUEUE_SIZE
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._startup: List[Future] = []
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.num_workers > 0
+
+    @property
+    def pending(self) -> int:
+        """Peticiones en ejecución o esperando un worker."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.uses_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                logger.info(f"Pool de inferencia iniciado: {self.num_workers} procesos")
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="inference")
+                logger.info(f"Pool de inferencia iniciado en el proceso actual ({self.num_threads} hilos)")
+        return self._executor
+
+    def start(self) -> None:
+        """
+        Arranca los workers sin esperar a que terminen de cargar los modelos.
+        """
+        executor = self._get_executor()
+        if self.uses_processes:
+            self._startup = [executor.submit(_worker_ping) for _ in range(self.num_workers)]
+    
+    async def wait_ready(self) -> None:
+        """
+        Espera a que los workers arrancados por `start` terminen de cargar
+        los modelos (el ping corre después del inicializador del proceso).
+        """
+        if self._startup:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in self._startup))
+            self._startup = []
+
+    def shutdown(self) -> None:
+        """Detiene el pool (cancela lo que no empezó)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Pool de inferencia detenido")
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """
+        Ejecuta `FaceRecognizer.<method>(*args, **kwargs)` fuera del event loop.
+
+        Raises:
+            InferenceQueueFull: Si ya hay `queue_size` peticiones pendientes
+        """
+        if self._pending >= self.queue_size:
+            raise InferenceQueueFull(
+                f"Cola de inferencia llena ({self._pending}/{self.queue_size})"
+            )
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            if self.uses_processes:
+                result, timings = await loop.run_in_executor(
+                    self._get_executor(), _run_profiled, gallery_version(), method, args, kwargs
+                )
+                get_profiler().record_many(timings)
+                return result
+            return await loop.run_in_executor(self._get_executor(), _run_local, method, args, kwargs)
+
+        except BrokenProcessPool:
+            # Un worker murió (ej: OOM); el próximo submit crea un pool nuevo
+            logger.error("Pool de inferencia roto, se reiniciará en la próxima petición")
+            self.shutdown()
+            raise
+
+        finally:
+            self._pending -= 1
+
+    async def verify(self, user_key: str, image_path: str = None, **kwargs) -> Dict[str, Any]:
+        """Versión async de `FaceRecognizer.verify`."""
+        return await self.run("verify", user_key, image_path=image_path, **kwargs)
+
+    async def recognize(self, image_path: str = None, **kwargs) -> Dict[str, Any]:
+        """Versión async de `FaceRecognizer.recognize`."""
+        return await self.run("recognize", image_path=image_path, **kwargs)
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_pool: Optional[InferencePool] = None
+
+
+def get_inference_pool() -> InferencePool:
+    """
+    Retorna el pool de inferencia singleton (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de InferencePool
+    """
+    global _global_pool
+
+    if _global_pool is None:
+        _global_pool = InferencePool()
+    return _global_pool
+
+
+def shutdown_inference_pool() -> None:
+    """Detiene y descarta el pool singleton."""
+    global _global_pool
+
+    if _global_pool is not None:
+        _global_pool.shutdown()
+        _global_pool = None
@@ -0,0 +1,123 @@
+"""
+Módulo del pool de hilos de preprocesamiento.
+
+En el registro, `preprocess_face` (CLAHE, denoising, sharpening) y
+`augment_face_image` se ejecutaban rostro por rostro antes de la pasada por
+lotes del modelo. Las funciones de OpenCV liberan el GIL, así que un pool
+de PREPROCESSING_THREADS hilos procesa los rostros de una persona en
+paralelo y deja el embedding por lotes igual.
+
+`configure_opencv_threads` fija `cv2.setNumThreads(OPENCV_THREADS)` una vez
+por proceso (al arrancar el servidor y en cada worker de inferencia): el
+paralelismo lo dan los hilos del pool, y si cada llamada de OpenCV abriera
+además su propio pool de hilos competiría con los hilos de TensorFlow por
+los núcleos.
+
+El pool es compartido por el proceso (cada worker de inferencia tiene el
+suyo): en total hay NUM_WORKERS x PREPROCESSING_THREADS hilos.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+import cv2
+
+from .config import PREPROCESSING_THREADS, OPENCV_THREADS
+from .utils import logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_opencv_configured = False
+
+
+def configure_opencv_threads() -> None:
+    """
+    Limita los hilos internos de OpenCV a OPENCV_THREADS en este proceso.
+    Idempotente: solo la primera llamada del proceso tiene efecto.
+    """
+    global _opencv_configured
+
+    if _opencv_configured:
+        return
+    _opencv_configured = True
+    if OPENCV_THREADS is not None:
+        cv2.setNumThreads(OPENCV_THREADS)
+        logger.info(f"OpenCV limitado a {cv2.getNumThreads()} hilos por llamada")
+
+
+class PreprocessingPool:
+    """
+    Pool de hilos para preprocesar y aumentar rostros en paralelo.
+    """
+
+    def __init__(self, num_threads: int = None):
+        """
+        Args:
+            num_threads: Hilos del pool (None = PREPROCESSING_THREADS;
+                1 = secuencial, sin crear hilos)
+        """
+        self.num_threads = max(1, PREPROCESSING_THREADS if num_threads is None else num_threads)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.num_threads, thread_name_prefix="preprocessing"
+                    )
+                    logger.info(f"Pool de preprocesamiento iniciado: {self.num_threads} hilos")
+        return self._executor
+
+    def map(self, fn: Callable[[T], R], items: Sequence[T]) -> List[R]:
+        """
+        Aplica `fn` a cada elemento y retorna los resultados en el mismo orden.
+
+        Con un solo hilo (o un solo elemento) se ejecuta en el hilo actual.
+        Una excepción de `fn` se propaga como en la versión secuencial.
+        """
+        if self.num_threads == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._get_executor().map(fn, items))
+
+    def shutdown(self) -> None:
+        """Detiene los hilos del pool."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_pool: Optional[PreprocessingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_preprocessing_pool() -> PreprocessingPool:
+    """
+    Retorna el pool de preprocesamiento singleton del proceso (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de PreprocessingPool
+    """
+    global _global_pool
+
+    if _global_pool is None:
+        with _pool_lock:
+            if _global_pool is None:
+                _global_pool = PreprocessingPool()
+    return _global_pool
+
+
+def reset_preprocessing_pool() -> None:
+    """Detiene y descarta el pool singleton (apagado o testing)."""
+    global _global_pool
+
+    with _pool_lock:
+        if _global_pool is not None:
+            _global_pool.shutdown()
+            _global_pool = None
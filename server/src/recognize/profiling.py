@@ -0,0 +1,204 @@
+"""
+Módulo de tiempos por etapa del pipeline de reconocimiento.
+
+Cada marcación pasa por calidad de imagen, detector (RetinaFace),
+preprocesamiento, embedding (Facenet512) y matching. `stage_timer` (o el
+decorador `timed`) mide una etapa con `time.perf_counter` y registra la
+muestra en:
+- el `StageProfiler` del proceso, que guarda las últimas PROFILING_WINDOW
+  muestras por etapa y calcula p50/p95/p99 (endpoint de administración)
+- los tiempos de la petición en curso, si se abrió `collect_timings`
+  (bloque `timings` del resultado de `recognize`/`verify`)
+
+Las etapas medidas dentro de `stage_namespace` (ej: tareas de registro en el
+pool de inferencia) se registran con prefijo ("enrollment.detector"), así no
+se mezclan con las distribuciones de las marcaciones.
+
+Solo importa `config`: `utils` y `detector` lo usan sin ciclos.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+import numpy as np
+
+from .config import PROFILING_ENABLED, PROFILING_WINDOW
+
+
+# Tiempos (ms) de la petición en curso; None fuera de `collect_timings`
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+# Prefijo de las etapas del código en curso ("" fuera de `stage_namespace`)
+_stage_prefix: ContextVar[str] = ContextVar("stage_prefix", default="")
+
+
+class StageProfiler:
+    """
+    Histogramas deslizantes de duración por etapa.
+    """
+
+    def __init__(self, window: int = None):
+        """
+        Args:
+            window: Muestras recientes que se conservan por etapa
+        """
+        self.window = window or PROFILING_WINDOW
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        """Agrega una muestra (ms) a la etapa."""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = 0
+            samples.append(elapsed_ms)
+            self._counts[stage] += 1
+
+    def record_many(self, timings: Dict[str, float]) -> None:
+        """Agrega los tiempos de una petición (ej: medidos en un worker)."""
+        for stage, elapsed_ms in timings.items():
+            self.record(stage, elapsed_ms)
+
+    def reset(self) -> None:
+        """Descarta todas las muestras."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Percentiles recientes por etapa.
+
+        Returns:
+            Diccionario con la ventana y, por etapa, total de muestras y
+            mean/p50/p95/p99/max (ms) de las últimas `window`
+        """
+        with self._lock:
+            samples = {stage: np.asarray(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        stages = {}
+        for stage, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[stage] = {
+                "count": counts[stage],
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(values.max())
+            }
+
+        return {"window": self.window, "stages": stages}
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Mide el bloque como la etapa `stage`.
+
+    Con PROFILING_ENABLED = False solo se mide si hay una petición que
+    recolecta sus tiempos. Una etapa repetida en la misma petición (ej: varios
+    rostros) acumula su duración.
+    """
+    if not PROFILING_ENABLED and _request_timings.get() is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, (time.perf_counter() - started) * 1000.0)
+
+
+def record_stage(stage: str, elapsed_ms: float) -> None:
+    """
+    Registra una duración ya medida (ej: en otro hilo) como la etapa `stage`,
+    en el profiler y en los tiempos de la petición en curso, como `stage_timer`.
+    """
+    stage = _stage_prefix.get() + stage
+    timings = _request_timings.get()
+    if PROFILING_ENABLED:
+        get_profiler().record(stage, elapsed_ms)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + elapsed_ms
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorador: mide cada llamada a la función como la etapa `stage`."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage_namespace(name: str) -> Iterator[None]:
+    """Registra las etapas del bloque como "<name>.<etapa>"."""
+    token = _stage_prefix.set(f"{_stage_prefix.get()}{name}.")
+    try:
+        yield
+    finally:
+        _stage_prefix.reset(token)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """
+    Recolecta los tiempos por etapa (ms) de la petición en curso.
+
+    Anidado dentro de otra recolección (ej: `recognize` dentro de un worker
+    del pool) comparte el diccionario de la petición externa.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        yield timings
+        return
+
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_profiler: Optional[StageProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> StageProfiler:
+    """
+    Retorna el profiler singleton del proceso (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de StageProfiler
+    """
+    global _global_profiler
+
+    if _global_profiler is None:
+        with _profiler_lock:
+            if _global_profiler is None:
+                _global_profiler = StageProfiler()
+    return _global_profiler
+
+
+def reset_profiler() -> None:
+    """Descarta el profiler singleton (útil para testing)."""
+    global _global_profiler
+
+    with _profiler_lock:
+        _global_profiler = None
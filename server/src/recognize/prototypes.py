@@ -0,0 +1,158 @@
+"""
+Módulo de compactación de embeddings en prototipos por persona.
+
+Con augmentation cada imagen de registro genera hasta 8 variantes casi
+idénticas, así una persona con 10 imágenes guarda ~80 embeddings. Aquí se
+reduce cada persona a PROTOTYPES_PER_PERSON embeddings representativos:
+
+- "farthest": selección greedy del punto más lejano (empezando por el
+  medoide), cubre los extremos de pose/iluminación.
+- "kmedoids": k-medoids (asignar / actualizar medoide) inicializado con la
+  selección anterior; prototipos más centrados en cada grupo.
+
+Los prototipos son embeddings reales de la persona (no promedios), así las
+distancias del ensemble siguen teniendo el mismo significado.
+
+Uso offline (compacta la galería existente):
+    python -m src.recognize.prototypes --k 16
+"""
+import numpy as np
+from typing import Dict, Mapping, Optional, Sequence
+
+from .config import PROTOTYPES_PER_PERSON, PROTOTYPE_METHOD
+from .utils import logger
+
+
+def _cosine_distances(vectors: np.ndarray) -> np.ndarray:
+    """Matriz (N, N) de distancias coseno entre filas."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms > 0, norms, 1.0)
+    return 1.0 - unit @ unit.T
+
+
+def farthest_point_indices(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Selección greedy del punto más lejano.
+
+    Args:
+        distances: Matriz (N, N) de distancias
+        k: Número de prototipos
+
+    Returns:
+        Índices de los k puntos elegidos (el primero es el medoide)
+    """
+    selected = [int(np.argmin(distances.sum(axis=1)))]
+    min_distance = distances[selected[0]].copy()
+
+    while len(selected) < k:
+        candidate = int(np.argmax(min_distance))
+        if min_distance[candidate] <= 0:
+            break  # Solo quedan duplicados exactos
+        selected.append(candidate)
+        min_distance = np.minimum(min_distance, distances[candidate])
+
+    return np.array(selected, dtype=np.int64)
+
+
+def kmedoids_indices(distances: np.ndarray, k: int, iterations: int = 10) -> np.ndarray:
+    """
+    k-medoids (alternando asignación y actualización de medoides).
+
+    Args:
+        distances: Matriz (N, N) de distancias
+        k: Número de prototipos
+        iterations: Máximo de iteraciones
+
+    Returns:
+        Índices de los medoides
+    """
+    medoids = farthest_point_indices(distances, k)
+
+    for _ in range(iterations):
+        assign = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(len(medoids)):
+            members = np.flatnonzero(assign == cluster)
+            if len(members) > 0:
+                within = distances[np.ix_(members, members)].sum(axis=1)
+                updated[cluster] = members[np.argmin(within)]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+
+    return medoids
+
+
+def select_prototypes(
+    embeddings: Sequence[np.ndarray],
+    k: Optional[int] = None,
+    method: Optional[str] = None
+) -> np.ndarray:
+    """
+    Reduce los embeddings de una persona a `k` prototipos.
+
+    Args:
+        embeddings: Embeddings de la persona
+        k: Número de prototipos (None = PROTOTYPES_PER_PERSON; None/0 = sin compactar)
+        method: "farthest" o "kmedoids" (None = PROTOTYPE_METHOD)
+
+    Returns:
+        Matriz (min(k, N), D) con los prototipos (filas originales, en su orden)
+    """
+    vectors = np.asarray(embeddings, dtype=np.float64).reshape(len(embeddings), -1)
+    k = PROTOTYPES_PER_PERSON if k is None else k
+    method = method or PROTOTYPE_METHOD
+
+    if not k or len(vectors) <= k:
+        return vectors
+
+    distances = _cosine_distances(vectors)
+    if method == "kmedoids":
+        indices = kmedoids_indices(distances, k)
+    elif method == "farthest":
+        indices = farthest_point_indices(distances, k)
+    else:
+        raise ValueError(f"Método de prototipos no válido: {method}")
+
+    return vectors[np.sort(indices)]
+
+
+def compact_database(
+    database: Mapping,
+    k: Optional[int] = None,
+    method: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Calcula los prototipos de todas las personas de una base.
+
+    Args:
+        database: {persona: embeddings} (dict o EmbeddingStore)
+        k: Prototipos por persona (None = PROTOTYPES_PER_PERSON)
+        method: Método de selección (None = PROTOTYPE_METHOD)
+
+    Returns:
+        {persona: prototipos} solo de las personas que se redujeron
+    """
+    compacted = {}
+    for key in list(database):
+        embeddings = database[key]
+        prototypes = select_prototypes(embeddings, k=k, method=method)
+        if len(prototypes) < len(embeddings):
+            compacted[key] = prototypes
+    return compacted
+
+
+if __name__ == "__main__":
+    import argparse
+    from .registro import get_registration
+
+    parser = argparse.ArgumentParser(description="Compacta la galería en prototipos por persona")
+    parser.add_argument("--k", type=int, default=PROTOTYPES_PER_PERSON or 16, help="Prototipos por persona")
+    parser.add_argument("--method", choices=["farthest", "kmedoids"], default=PROTOTYPE_METHOD)
+    args = parser.parse_args()
+
+    report = get_registration().compact_gallery(k=args.k, method=args.method)
+    logger.info(
+        f"✅ Galería compactada: {report['persons_compacted']}/{report['persons']} personas, "
+        f"{report['embeddings_before']} -> {report['embeddings_after']} embeddings"
+    )
@@ -0,0 +1,150 @@
+"""
+Módulo de carga en segundo plano del sistema de reconocimiento.
+
+Cargar TensorFlow, RetinaFace y Facenet512 tarda decenas de segundos. En
+lugar de hacerlo en el arranque del servidor (que no atiende peticiones
+hasta terminar), `RecognitionReadiness.start` lanza la carga como tarea
+de fondo: las rutas no faciales responden de inmediato y las faciales
+consultan `ready` (503 con Retry-After mientras tanto).
+
+Etapas que se reportan:
+- models: detector y reconocedor cargados, con inferencia de calentamiento
+- gallery: base de embeddings cargada
+- workers: procesos del pool de inferencia con sus modelos cargados
+
+Con NUM_WORKERS > 0 la inferencia corre en los workers (cada uno carga sus
+modelos en el inicializador): el proceso del servidor solo carga la
+galería, sin duplicar TensorFlow y los modelos en memoria. La galería se
+carga antes de arrancar los workers: es el único proceso que migra o
+convierte el almacén.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .utils import logger
+
+
+class RecognitionReadiness:
+    """
+    Estado de carga del sistema de reconocimiento (pending, loading, ready, failed).
+    """
+
+    def __init__(self):
+        self.state = "pending"
+        self.models_ready = False
+        self.gallery_ready = False
+        self.workers_ready = False
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        """Estado para /health/ready."""
+        return {
+            "state": self.state,
+            "models": self.models_ready,
+            "gallery": self.gallery_ready,
+            "workers": self.workers_ready,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
+
+    def start(self) -> asyncio.Task:
+        """
+        Lanza la carga en el event loop actual sin esperarla.
+
+        Returns:
+            Tarea de la carga (se reutiliza si ya se lanzó)
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.load())
+        return self._task
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Bloquea el hilo actual hasta que la carga termine (lista o fallida).
+
+        Returns:
+            True si terminó antes del timeout
+        """
+        return self._done.wait(timeout)
+
+    async def load(self) -> None:
+        """Carga modelos, galería y workers (el trabajo pesado corre en hilos)."""
+        from .reconocimiento import initialize_recognizer
+        from .registro import get_registration
+        from .inference_pool import get_inference_pool
+        from .profiling import get_profiler
+
+        self.state = "loading"
+        started = time.perf_counter()
+        try:
+            # La galería (con la migración/conversión del almacén) se carga
+            # antes de arrancar los workers, que la abren en solo lectura
+            await asyncio.to_thread(get_registration)
+            self.gallery_ready = True
+
+            pool = get_inference_pool()
+            pool.start()
+            if not pool.uses_processes:
+                await asyncio.to_thread(initialize_recognizer)
+                self.models_ready = True
+
+            await pool.wait_ready()
+            self.models_ready = True
+            self.workers_ready = True
+
+            # Las muestras del calentamiento no representan marcaciones reales
+            get_profiler().reset()
+            self.state = "ready"
+            logger.info(f"✅ Sistema de reconocimiento listo ({time.perf_counter() - started:.1f} s)")
+
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Error al cargar el sistema de reconocimiento: {str(e)}")
+
+        finally:
+            self.load_seconds = time.perf_counter() - started
+            self._done.set()
+
+    def cancel(self) -> None:
+        """Cancela la carga si sigue en curso (apagado del servidor)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_readiness: Optional[RecognitionReadiness] = None
+
+
+def get_readiness() -> RecognitionReadiness:
+    """
+    Retorna el estado de carga singleton (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de RecognitionReadiness
+    """
+    global _global_readiness
+
+    if _global_readiness is None:
+        _global_readiness = RecognitionReadiness()
+    return _global_readiness
+
+
+def reset_readiness() -> None:
+    """Cancela la carga en curso y descarta el estado (apagado o testing)."""
+    global _global_readiness
+
+    if _global_readiness is not None:
+        _global_readiness.cancel()
+        _global_readiness = None
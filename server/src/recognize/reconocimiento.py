@@ -2,9 +2,11 @@
 Módulo de reconocimiento facial.
 Identifica personas en imágenes comparando con la base de datos de embeddings.
 """
+import functools
 import numpy as np
 import cv2
-from typing import List, Dict, Any, Optional, Tuple
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
 
 from .config import (
@@ -12,6 +14,12 @@ from .config import (
     DISTANCE_METRIC,
     RECOGNITION_THRESHOLD,
     MATCHING_STRATEGY,
+    SEARCH_ENGINE,
+    ANN_MIN_PERSONS,
+    ANN_CANDIDATES,
+    CENTROID_PRUNING,
+    PRUNING_MIN_PERSONS,
+    PRUNING_CANDIDATES,
     K_NEIGHBORS,
     MSG_UNKNOWN_PERSON,
     MSG_SUCCESS_RECOGNITION,
@@ -21,7 +29,11 @@ from .config import (
     BASE_VARIATION_TOLERANCE,
     ILLUMINATION_TOLERANCE,
     OCCLUSION_TOLERANCE,
-    ENABLE_PREPROCESSING
+    ENABLE_PREPROCESSING,
+    VERIFICATION_COHORT_SIZE,
+    DETAILS_LEVEL,
+    DETAILS_TOP_K,
+    MICRO_BATCHING
 )
 
 # Importar VARIATION_TOLERANCE si existe
@@ -31,7 +43,6 @@ except ImportError:
     VARIATION_TOLERANCE = BASE_VARIATION_TOLERANCE  # Usar base si no está definida
 from .utils import (
     logger,
-    calculate_distance,
     load_image,
     draw_face_box,
     format_confidence,
@@ -42,6 +53,64 @@ from .utils import (
 )
 from .detector import get_detector, initialize_detector, FaceDetector  # Usar get_detector singleton
 from .registro import get_registration  # Usar singleton del registro de embeddings
+from .gallery import EmbeddingGallery, GallerySnapshot
+from .embedder import represent_face
+from .batcher import get_batcher
+from .profiling import collect_timings, stage_timer, timed
+
+
+def _with_timings(stage: str):
+    """
+    Decorador de `recognize`/`verify`: recolecta los tiempos por etapa de la
+    petición (y su duración total como `stage`). Con el argumento
+    `return_timings=True` los agrega al resultado en 'timings' (ms por etapa).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, return_timings: bool = False, **kwargs):
+            with collect_timings() as timings:
+                with stage_timer(stage):
+                    result = method(self, *args, **kwargs)
+            if return_timings:
+                result['timings'] = dict(timings)
+            return result
+        return wrapper
+    return decorator
+
+
+class PersonBreakdown(Mapping):
+    """
+    Desglose de una persona en los detalles del reconocimiento.
+
+    Guarda una copia de las distancias de la persona y convierte a lista o
+    calcula las estadísticas solo cuando se leen (al serializar la respuesta),
+    no en cada reconocimiento.
+    """
+
+    _KEYS = ('final_score', 'distances', 'statistics')
+
+    def __init__(self, final_score: float, distances: np.ndarray):
+        self._final_score = float(final_score)
+        self._distances = np.array(distances, dtype=np.float64)
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        if key not in self._values:
+            if key == 'final_score':
+                self._values[key] = self._final_score
+            elif key == 'distances':
+                self._values[key] = self._distances.tolist()
+            else:
+                self._values[key] = calculate_statistics(self['distances'])
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
 
 
 class FaceRecognizer:
@@ -63,6 +132,28 @@ class FaceRecognizer:
         else:
             logger.info(f"Reconocedor inicializado con {len(self.database)} personas")
     
+    def warm_up(self) -> None:
+        """
+        Inferencia de calentamiento sobre un rostro sintético.
+        
+        La primera pasada de Facenet512 construye el grafo de TensorFlow y
+        tarda varios segundos; hacerla al arrancar evita que la pague la
+        primera marcación. También calcula los centroides de la galería.
+        """
+        rng = np.random.default_rng(0)
+        face_img = rng.integers(40, 216, size=(160, 160, 3), dtype=np.uint8)
+        
+        try:
+            if ENABLE_PREPROCESSING:
+                face_img = preprocess_face(face_img)
+            embedding = represent_face(face_img)
+            if len(self.registration.snapshot.gallery) > 0:
+                self._compare_with_database(embedding)
+            logger.info("✓ Inferencia de calentamiento completada")
+        except Exception as e:
+            logger.warning(f"Inferencia de calentamiento fallida: {str(e)}")
+    
+    @timed("extract")
     def _extract_embedding(
         self,
         image_path: str = None,
@@ -80,28 +171,17 @@ class FaceRecognizer:
             context_hints contiene información sobre calidad de imagen que ayuda
             al matching adaptativo
         """
-        from deepface import DeepFace
-        
         context_hints = {}
         
         try:
-            # Verificar que hay rostro
-            if not self.detector.has_face(image_path=image_path, image=image):
+            # Una sola pasada de detección (reutilizada para verificar y extraer)
+            detection = self.detector.detect(image_path=image_path, image=image)
+            if not detection.has_face:
                 logger.warning(MSG_NO_FACE_DETECTED)
                 return None, context_hints
             
-            # Detectar rostro y obtener info
-            face_data = self.detector.detect_faces(
-                image_path=image_path,
-                image=image,
-                return_best=True
-            )
-            
-            if not face_data:
-                return None, context_hints
-            
-            face_img = face_data[0]['face_img']
-            quality_metrics = face_data[0].get('quality_metrics', {})
+            face_img = detection.best()['face_img']
+            quality_metrics = detection.quality_metrics
             
             # Analizar contexto de la imagen
             if quality_metrics:
@@ -126,25 +206,13 @@ class FaceRecognizer:
                 logger.debug("Aplicando preprocesamiento avanzado...")
                 face_img = preprocess_face(face_img)
             
-            # Extraer embedding
-            if image_path is not None and not ENABLE_PREPROCESSING:
-                img_source = image_path
-            else:
-                img_source = face_img
-            
-            embedding_obj = DeepFace.represent(
-                img_path=img_source,
-                model_name=RECOGNITION_MODEL,
-                detector_backend='skip' if ENABLE_PREPROCESSING else self.detector.backend,
-                enforce_detection=not ENABLE_PREPROCESSING,
-                align=True
-            )
-            
-            # Extraer array del embedding
-            if isinstance(embedding_obj, list):
-                embedding = np.array(embedding_obj[0]['embedding'])
-            else:
-                embedding = np.array(embedding_obj['embedding'])
+            # Extraer embedding del rostro ya detectado (sin segunda detección),
+            # agrupado con peticiones concurrentes si hay micro-batching
+            with stage_timer("embedding"):
+                if MICRO_BATCHING:
+                    embedding = get_batcher().represent(face_img)
+                else:
+                    embedding = represent_face(face_img)
             
             return embedding, context_hints
         
@@ -152,10 +220,12 @@ class FaceRecognizer:
             logger.error(f"Error al extraer embedding: {str(e)}")
             return None, context_hints
     
+    @timed("matching")
     def _compare_with_database(
         self,
         query_embedding: np.ndarray,
-        context_hints: Dict[str, Any] = None
+        context_hints: Dict[str, Any] = None,
+        details_level: str = None
     ) -> Tuple[Optional[str], float, Dict[str, Any]]:
         """
         Sistema de matching ULTRA-AVANZADO con estrategia ensemble.
@@ -168,79 +238,165 @@ class FaceRecognizer:
         5. Weighted ensemble: Combinación ponderada
         6. Adaptive threshold: Ajusta según distribución y contexto
         
+        Con SEARCH_ENGINE = "ivf" y galerías grandes, el índice IVF propone
+        ANN_CANDIDATES personas y el ensemble se calcula solo sobre ellas.
+        Con la búsqueda exhaustiva y CENTROID_PRUNING, una cota por centroide
+        descarta las personas que no pueden cambiar la decisión.
+        
         Args:
             query_embedding: Embedding a comparar
             context_hints: Hints de contexto (illumination_quality, has_occlusions, etc.)
+            details_level: Desglose por persona en los detalles: "none",
+                "top-k" o "full" (None = DETAILS_LEVEL)
             
         Returns:
             Tupla (nombre_persona, confianza, detalles)
         """
-        if not self.database:
+        # Un solo snapshot por consulta: galería e índice de la misma versión
+        snapshot = self.registration.snapshot
+        gallery = snapshot.gallery
+        if len(gallery) == 0:
             logger.warning("Base de datos vacía")
             return None, 0.0, {}
         
-        context_hints = context_hints or {}
-        all_distances = {}
+        if SEARCH_ENGINE == "ivf" and snapshot.ann_index is not None and len(gallery) >= ANN_MIN_PERSONS:
+            gallery = self._ann_candidates(snapshot, query_embedding)
+            if len(gallery) == 0:
+                return None, 0.0, {}
+        elif CENTROID_PRUNING and len(gallery) >= PRUNING_MIN_PERSONS:
+            return self._match_pruned(gallery, query_embedding, context_hints, details_level)
+        
+        return self._match_gallery(gallery, query_embedding, context_hints, details_level=details_level)
+    
+    def _ann_candidates(self, snapshot: GallerySnapshot, query_embedding: np.ndarray) -> EmbeddingGallery:
+        """
+        Reduce la galería a las personas candidatas del índice IVF.
+        
+        Args:
+            snapshot: Snapshot con la galería completa y su índice IVF
+            query_embedding: Embedding a buscar
+            
+        Returns:
+            Sub-galería con los candidatos (re-ordenados luego con distancias exactas)
+        """
+        gallery = snapshot.gallery
+        candidates = snapshot.ann_index.search(query_embedding, ANN_CANDIDATES, gallery)
+        indices = [gallery.index_of(key) for key in candidates]
+        indices = [i for i in indices if i is not None]
+        logger.debug(f"IVF: {len(indices)} candidatos de {len(gallery)} personas")
+        return gallery.subset(indices)
+    
+    def _match_pruned(
+        self,
+        gallery: EmbeddingGallery,
+        query_embedding: np.ndarray,
+        context_hints: Dict[str, Any] = None,
+        details_level: str = None
+    ) -> Tuple[Optional[str], float, Dict[str, Any]]:
+        """
+        Matching en dos etapas con la misma decisión que la galería completa.
+        
+        1. Cota inferior por persona (centroide y radio, un producto (P, D))
+        2. Ensemble exacto solo para las M personas con menor cota
+        
+        Los candidatos bastan si toda persona descartada tiene cota mayor que
+        el mejor score, que los K vecinos del voting y que el segundo mejor
+        (o que 1.5x el mejor, lo único que miran el umbral adaptativo y la zona
+        gris). Si no, M se multiplica por 4; si ya no hay ahorro se calcula
+        la galería completa.
         
-        # Calcular distancias con todas las personas
-        for person_name, person_embeddings in self.database.items():
-            distances = []
+        Args:
+            gallery: Galería completa
+            query_embedding: Embedding a comparar
+            context_hints: Hints de contexto de la imagen
+            details_level: Nivel de desglose por persona (ver _match_gallery)
             
-            for person_embedding in person_embeddings:
-                distance = calculate_distance(
-                    query_embedding,
-                    person_embedding,
-                    metric=DISTANCE_METRIC
+        Returns:
+            Tupla (clave_persona o None, confianza, detalles); el desglose por
+            persona de los detalles incluye solo a los candidatos
+        """
+        bounds = gallery.lower_bounds(query_embedding, metric=DISTANCE_METRIC)
+        order = np.argsort(bounds, kind="stable")
+        size = PRUNING_CANDIDATES
+        
+        # Con más de 1/4 de la galería la poda ya no compensa las copias
+        while size <= len(gallery) // 4:
+            candidates = gallery.subset(np.sort(order[:size]))
+            base_scores = candidates.score(query_embedding, metric=DISTANCE_METRIC, k=K_NEIGHBORS)
+            
+            if self._pruning_is_exact(base_scores, cutoff=float(bounds[order[size]])):
+                logger.debug(f"Poda por centroides: {size} candidatos de {len(gallery)} personas")
+                person, confidence, details = self._match_gallery(
+                    candidates, query_embedding, context_hints, details_level, base_scores=base_scores
                 )
-                distances.append(distance)
+                details['pruning'] = {'persons': len(gallery), 'candidates': size}
+                return person, confidence, details
             
-            all_distances[person_name] = distances
+            size *= 4
+        
+        return self._match_gallery(gallery, query_embedding, context_hints, details_level)
+    
+    def _pruning_is_exact(self, base_scores: Dict[str, np.ndarray], cutoff: float) -> bool:
+        """
+        Verifica que las personas descartadas (todas con cota >= cutoff) no
+        pueden cambiar el resultado calculado sobre los candidatos.
+        
+        Args:
+            base_scores: Scores base de los candidatos
+            cutoff: Menor cota inferior entre las personas descartadas
+            
+        Returns:
+            True si la decisión es la misma que con la galería completa
+        """
+        distances = base_scores['distances']
+        if len(distances) < K_NEIGHBORS:
+            return False
         
+        # Los K vecinos globales del voting son todos de candidatos
+        if np.partition(distances, K_NEIGHBORS - 1)[K_NEIGHBORS - 1] >= cutoff:
+            return False
+        
+        person_scores, _ = self._ensemble_scores(base_scores)
+        best, second = np.partition(person_scores, 1)[:2]
+        if best >= cutoff:
+            return False
+        
+        # El segundo mejor solo se compara contra 1.5x / 1.3x el mejor
+        return second < cutoff or min(second, cutoff) / (best + 1e-10) > 1.5
+    
+    def _ensemble_scores(self, base_scores: Dict[str, np.ndarray]) -> Tuple[np.ndarray, str]:
+        """
+        Combina las puntuaciones base según MATCHING_STRATEGY.
+        
+        Args:
+            base_scores: Resultado de `EmbeddingGallery.score`
+            
+        Returns:
+            Tupla (score final por persona, estrategia usada)
+        """
         # ===================================================================
         # ESTRATEGIA ENSEMBLE: Combinar múltiples enfoques
         # ===================================================================
-        person_scores_ensemble = {}
-        
         # 1. MIN DISTANCE (mejor match individual)
-        scores_min = {name: np.min(dists) for name, dists in all_distances.items()}
+        scores_min = base_scores['min_distance']
         
         # 2. AVERAGE (tendencia general)
-        scores_avg = {name: np.mean(dists) for name, dists in all_distances.items()}
+        scores_avg = base_scores['average']
         
         # 3. MEDIAN (robusto a outliers)
-        scores_median = {name: np.median(dists) for name, dists in all_distances.items()}
+        scores_median = base_scores['median']
         
         # 4. VOTING (k-vecinos)
-        all_dists_flat = []
-        for name, dists in all_distances.items():
-            for dist in dists:
-                all_dists_flat.append((name, dist))
-        all_dists_flat.sort(key=lambda x: x[1])
-        
-        votes = {}
-        for name, dist in all_dists_flat[:K_NEIGHBORS]:
-            votes[name] = votes.get(name, 0) + 1
-        
-        scores_voting = {}
-        for name in all_distances.keys():
-            if name in votes:
-                name_dists = [d for n, d in all_dists_flat[:K_NEIGHBORS] if n == name]
-                scores_voting[name] = np.mean(name_dists)
-            else:
-                scores_voting[name] = float('inf')
+        scores_voting = base_scores['voting']
         
         # 5. ENSEMBLE COMBINADO (ponderado)
         if MATCHING_STRATEGY == "ensemble":
-            for name in all_distances.keys():
-                ensemble_score = (
-                    ENSEMBLE_WEIGHTS['min_distance'] * scores_min[name] +
-                    ENSEMBLE_WEIGHTS['average'] * scores_avg[name] +
-                    ENSEMBLE_WEIGHTS['median'] * scores_median[name] +
-                    ENSEMBLE_WEIGHTS['voting'] * scores_voting[name]
-                )
-                person_scores_ensemble[name] = ensemble_score
-            
-            person_scores = person_scores_ensemble
+            person_scores = (
+                ENSEMBLE_WEIGHTS['min_distance'] * scores_min +
+                ENSEMBLE_WEIGHTS['average'] * scores_avg +
+                ENSEMBLE_WEIGHTS['median'] * scores_median +
+                ENSEMBLE_WEIGHTS['voting'] * scores_voting
+            )
             strategy_used = "ensemble"
         
         elif MATCHING_STRATEGY == "voting":
@@ -257,8 +413,7 @@ class FaceRecognizer:
         
         elif MATCHING_STRATEGY == "weighted":
             # Weighted: más peso a min, menos a avg
-            for name in all_distances.keys():
-                person_scores[name] = 0.6 * scores_min[name] + 0.4 * scores_avg[name]
+            person_scores = 0.6 * scores_min + 0.4 * scores_avg
             strategy_used = "weighted"
         
         else:
@@ -266,9 +421,45 @@ class FaceRecognizer:
             person_scores = scores_avg
             strategy_used = "average (fallback)"
         
+        return person_scores, strategy_used
+    
+    def _match_gallery(
+        self,
+        gallery: EmbeddingGallery,
+        query_embedding: np.ndarray,
+        context_hints: Dict[str, Any] = None,
+        details_level: str = None,
+        base_scores: Dict[str, np.ndarray] = None
+    ) -> Tuple[Optional[str], float, Dict[str, Any]]:
+        """
+        Aplica el ensemble y el umbral adaptativo sobre una galería concreta
+        (completa para 1:N, o persona reclamada + cohorte para 1:1).
+        
+        Args:
+            gallery: Galería contra la que se compara
+            query_embedding: Embedding a comparar
+            context_hints: Hints de contexto de la imagen
+            details_level: Desglose por persona ('all_scores' y 'all_distances'):
+                "none" (solo el resumen), "top-k" (las DETAILS_TOP_K mejores)
+                o "full" (todas); None = DETAILS_LEVEL
+            base_scores: Scores base ya calculados sobre `gallery` (opcional)
+            
+        Returns:
+            Tupla (clave_persona o None, confianza, detalles)
+        """
+        context_hints = context_hints or {}
+        
+        # Calcular distancias con todas las personas (un solo producto matricial)
+        if base_scores is None:
+            base_scores = gallery.score(query_embedding, metric=DISTANCE_METRIC, k=K_NEIGHBORS)
+        
+        person_scores, strategy_used = self._ensemble_scores(base_scores)
+        
         # Encontrar mejor match
-        best_name = min(person_scores.keys(), key=lambda k: person_scores[k])
-        best_distance = person_scores[best_name]
+        best_index = int(np.argmin(person_scores))
+        best_name = gallery.keys[best_index]
+        best_distance = float(person_scores[best_index])
+        second_best_score = float(np.partition(person_scores, 1)[1]) if len(gallery) >= 2 else None
         
         # ===================================================================
         # ADAPTIVE THRESHOLD: Ajustar según contexto y distribución
@@ -284,13 +475,10 @@ class FaceRecognizer:
             tolerance_factor = max(tolerance_factor, OCCLUSION_TOLERANCE)
         
         # Adaptive threshold basado en distribución de distancias en DB
-        if USE_ADAPTIVE_THRESHOLD and len(all_distances) > 1:
+        if USE_ADAPTIVE_THRESHOLD and len(gallery) > 1:
             # Calcular separación entre mejor y segundo mejor
-            sorted_scores = sorted(person_scores.values())
-            if len(sorted_scores) >= 2:
-                best_score = sorted_scores[0]
-                second_best_score = sorted_scores[1]
-                separation_ratio = second_best_score / (best_score + 1e-10)
+            if second_best_score is not None:
+                separation_ratio = second_best_score / (best_distance + 1e-10)
                 
                 # Si hay buena separación, ser menos estricto
                 if separation_ratio > 1.5:  # Mejor es 50% menor que segundo
@@ -320,10 +508,8 @@ class FaceRecognizer:
         margin = 0.05 * adjusted_threshold
         if not recognized and best_distance < (adjusted_threshold + margin):
             # Verificar separación: si el mejor es significativamente mejor que el resto
-            sorted_scores = sorted(person_scores.values())
-            if len(sorted_scores) >= 2:
-                second_best = sorted_scores[1]
-                if second_best > best_distance * 1.3:  # 30% peor
+            if second_best_score is not None:
+                if second_best_score > best_distance * 1.3:  # 30% peor
                     recognized = True
                     confidence *= 0.9  # Penalizar ligeramente
         
@@ -331,6 +517,7 @@ class FaceRecognizer:
         # DETALLES PARA ANÁLISIS
         # ===================================================================
         details = {
+            'best_match': best_name,
             'distance': float(best_distance),
             'threshold': base_threshold,
             'adjusted_threshold': float(adjusted_threshold),
@@ -339,33 +526,66 @@ class FaceRecognizer:
             'confidence_raw': float(confidence),
             'strategy': strategy_used,
             'metric': DISTANCE_METRIC,
-            'context_hints': context_hints,
-            'all_scores': {
-                'min_distance': {name: float(s) for name, s in scores_min.items()},
-                'average': {name: float(s) for name, s in scores_avg.items()},
-                'median': {name: float(s) for name, s in scores_median.items()},
-                'voting': {name: float(s) for name, s in scores_voting.items()}
-            },
-            'all_distances': {
-                name: {
-                    'final_score': float(person_scores[name]),
-                    'distances': [float(d) for d in all_distances[name]],
-                    'statistics': calculate_statistics(all_distances[name])
-                }
-                for name in all_distances.keys()
-            }
+            'context_hints': context_hints
         }
+        details.update(self._breakdown(gallery, base_scores, person_scores, details_level or DETAILS_LEVEL))
         
         if not recognized:
             return None, confidence, details
         
         return best_name, confidence, details
     
+    def _breakdown(
+        self,
+        gallery: EmbeddingGallery,
+        base_scores: Dict[str, np.ndarray],
+        person_scores: np.ndarray,
+        details_level: str
+    ) -> Dict[str, Any]:
+        """
+        Desglose por persona de los detalles, acotado según el nivel.
+        
+        Con "top-k" solo se seleccionan (argpartition) y copian las
+        DETAILS_TOP_K personas de menor score; las listas de distancias y las
+        estadísticas de cada una se generan al leerlas (PersonBreakdown).
+        
+        Args:
+            gallery: Galería comparada
+            base_scores: Scores base de `gallery.score`
+            person_scores: Score final por persona
+            details_level: "none", "top-k" o "full"
+            
+        Returns:
+            {'all_scores': ..., 'all_distances': ...} o {} con "none"
+        """
+        if details_level == "none":
+            return {}
+        
+        if details_level == "top-k" and len(person_scores) > DETAILS_TOP_K:
+            selected = np.argpartition(person_scores, DETAILS_TOP_K - 1)[:DETAILS_TOP_K]
+            selected = selected[np.argsort(person_scores[selected], kind="stable")]
+        else:
+            selected = np.arange(len(person_scores))
+        
+        keys = [gallery.keys[i] for i in selected]
+        return {
+            'all_scores': {
+                name: dict(zip(keys, base_scores[name][selected].tolist()))
+                for name in ('min_distance', 'average', 'median', 'voting')
+            },
+            'all_distances': {
+                key: PersonBreakdown(person_scores[i], gallery.person_distances(base_scores['distances'], i))
+                for key, i in zip(keys, selected)
+            }
+        }
+    
+    @_with_timings("recognize")
     def recognize(
         self,
         image_path: str = None,
         image: np.ndarray = None,
-        return_details: bool = False
+        return_details: bool = False,
+        details_level: str = None
     ) -> Dict[str, Any]:
         """
         Reconoce una persona en una imagen.
@@ -373,7 +593,10 @@ class FaceRecognizer:
         Args:
             image_path: Ruta a la imagen
             image: Imagen como array numpy
-            return_details: Si True, incluye detalles de todas las comparaciones
+            return_details: Si True, incluye los detalles de la comparación
+            details_level: Desglose por persona de los detalles ("none",
+                "top-k" o "full"; None = "top-k" si return_details)
+            return_timings: Si True, incluye los tiempos por etapa (ms)
             
         Returns:
             Diccionario con resultado del reconocimiento:
@@ -383,7 +606,8 @@ class FaceRecognizer:
                 'confidence': float,
                 'distance': float,
                 'timestamp': str,
-                'details': dict (opcional)
+                'details': dict (opcional),
+                'timings': dict (opcional)
             }
         """
         logger.info(f"\n{'='*60}")
@@ -413,7 +637,9 @@ class FaceRecognizer:
         
         # Comparar con base de datos (con context hints)
         logger.info(f"Comparando con {len(self.database)} personas en la base de datos...")
-        person_name, confidence, details = self._compare_with_database(query_embedding, context_hints)
+        if details_level is None:
+            details_level = "top-k" if return_details else "none"
+        person_name, confidence, details = self._compare_with_database(query_embedding, context_hints, details_level)
         
         # Actualizar resultado
         if person_name is not None:
@@ -428,7 +654,7 @@ class FaceRecognizer:
             logger.info(f"Distancia: {details['distance']:.4f}")
         else:
             logger.info(f"\n{MSG_UNKNOWN_PERSON}")
-            logger.info(f"Mejor match: {list(self.database.keys())[0]} (distancia: {details['distance']:.4f})")
+            logger.info(f"Mejor match: {details.get('best_match')} (distancia: {details.get('distance', float('inf')):.4f})")
             logger.info(f"Umbral requerido: {RECOGNITION_THRESHOLD:.4f}")
         
         if return_details:
@@ -437,6 +663,129 @@ class FaceRecognizer:
         logger.info(f"{'='*60}\n")
         
         return result
+    
+    def enrollment_candidate(self, image_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Primera etapa de un registro: detecta el rostro de una imagen.
+        Los jobs de registro lo ejecutan en el pool de inferencia, puntúan
+        todos los candidatos con `FaceRegistration.select_candidates` y
+        solo envían los mejores a `enrollment_embeddings`.
+        """
+        return self.registration.detect_candidate(image_path)
+
+    def enrollment_video_frames(self, video_path: str, output_dir: str) -> Dict[str, Any]:
+        """
+        Etapa previa de un registro desde video: guarda los mejores frames
+        del clip como imágenes en `output_dir` (ver video_enrollment.py).
+        """
+        return self.registration.extract_video_frames(video_path, output_dir)
+
+    def enrollment_embeddings(self, face_imgs: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Embeddings de registro (preprocesamiento, augmentation y modelo) de
+        rostros ya seleccionados, sin escribir en la galería. El job los
+        guarda en el proceso del servidor con `FaceRegistration.register_embeddings`.
+        """
+        return self.registration.embed_faces(face_imgs)
+
+    def is_enrolled(self, user_key: str) -> bool:
+        """Indica si una clave (codigo_user) tiene embeddings registrados."""
+        return self.registration.gallery.index_of(user_key) is not None
+    
+    @_with_timings("verify")
+    def verify(
+        self,
+        user_key: str,
+        image_path: str = None,
+        image: np.ndarray = None,
+        return_details: bool = False,
+        details_level: str = None
+    ) -> Dict[str, Any]:
+        """
+        Verificación 1:1: ¿la imagen corresponde a la persona reclamada?
+        
+        Compara el probe solo contra los embeddings de `user_key` y una pequeña
+        cohorte de impostores (VERIFICATION_COHORT_SIZE personas) que alimenta
+        el umbral adaptativo. El costo depende del tamaño de la cohorte, no del
+        total de personas registradas.
+        
+        Args:
+            user_key: Clave de la persona reclamada (codigo_user)
+            image_path: Ruta a la imagen
+            image: Imagen como array numpy
+            return_details: Si True, incluye detalles de la comparación
+            details_level: Desglose por persona de los detalles (None = "full"
+                si return_details: la cohorte es chica)
+            return_timings: Si True, incluye los tiempos por etapa (ms)
+            
+        Returns:
+            Diccionario con resultado de la verificación:
+            {
+                'verified': bool,
+                'recognized': bool,
+                'person': str o None,
+                'claimed': str,
+                'confidence': float,
+                'distance': float,
+                'cohort_size': int,
+                'timestamp': str,
+                'details': dict (opcional),
+                'timings': dict (opcional)
+            }
+        """
+        logger.info(f"Iniciando verificación facial 1:1 para: {user_key}")
+        
+        result = {
+            'verified': False,
+            'recognized': False,
+            'person': None,
+            'claimed': user_key,
+            'confidence': 0.0,
+            'distance': float('inf'),
+            'cohort_size': 0,
+            'timestamp': get_timestamp()
+        }
+        
+        gallery = self.registration.gallery
+        claimed_index = gallery.index_of(user_key)
+        if claimed_index is None:
+            logger.warning(f"La persona '{user_key}' no está registrada")
+            result['error'] = "Persona no registrada en el sistema de reconocimiento"
+            return result
+        
+        query_embedding, context_hints = self._extract_embedding(image_path=image_path, image=image)
+        if query_embedding is None:
+            logger.error("No se pudo extraer embedding de la imagen")
+            result['error'] = "No se detectó rostro o error al procesar"
+            return result
+        
+        # Persona reclamada + cohorte de impostores
+        cohort = gallery.cohort_indices(VERIFICATION_COHORT_SIZE, exclude=claimed_index)
+        candidates = gallery.subset(np.concatenate(([claimed_index], cohort)))
+        result['cohort_size'] = len(cohort)
+        
+        if details_level is None:
+            details_level = "full" if return_details else "none"
+        with stage_timer("matching"):
+            person_key, confidence, details = self._match_gallery(candidates, query_embedding, context_hints, details_level)
+        
+        result['confidence'] = confidence
+        result['distance'] = details['distance']
+        if person_key == user_key:
+            result['verified'] = True
+            result['recognized'] = True
+            result['person'] = person_key
+            logger.info(f"✓ Verificación exitosa: {user_key} ({format_confidence(confidence)})")
+        else:
+            logger.info(
+                f"✗ Verificación fallida para {user_key} "
+                f"(mejor match: {details.get('best_match')}, distancia: {details['distance']:.4f})"
+            )
+        
+        if return_details:
+            result['details'] = details
+        
+        return result
 
 
 # ============================================================================
@@ -477,7 +826,7 @@ def initialize_recognizer() -> FaceRecognizer:
     
     Esto pre-carga:
     - Modelo de detección facial (RetinaFace/MTCNN/etc.)
-    - Modelo de reconocimiento (Facenet512)
+    - Modelo de reconocimiento (Facenet512), con una inferencia de calentamiento
     - Base de datos de embeddings
     
     Ejemplo:
@@ -498,6 +847,7 @@ def initialize_recognizer() -> FaceRecognizer:
     # Pre-cargar reconocedor (que usa el detector singleton)
     logger.info("🧠 Pre-cargando reconocedor facial...")
     recognizer = get_recognizer()
+    recognizer.warm_up()
     
     logger.info("✅ Sistema completamente inicializado y listo")
     return recognizer
@@ -3,24 +3,30 @@ Módulo de registro de personas.
 Permite registrar nuevas personas en el sistema con sus imágenes de referencia.
 Extrae y almacena los embeddings faciales.
 """
+import threading
 import numpy as np
-import pickle
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
 from .config import (
     DATA_DIR,
     EMBEDDINGS_FILE,
+    EMBEDDINGS_STORE_DIR,
     METADATA_FILE,
+    ANN_INDEX_FILE,
+    SEARCH_ENGINE,
+    GALLERY_PRECISION,
+    PROTOTYPES_PER_PERSON,
     RECOGNITION_MODEL,
     DISTANCE_METRIC,
     MIN_IMAGES_PER_PERSON,
     MAX_IMAGES_PER_PERSON,
-    COMPRESS_EMBEDDINGS,
     MSG_SUCCESS_REGISTRATION,
     ENABLE_PREPROCESSING,
-    ENABLE_AUGMENTATION
+    ENABLE_AUGMENTATION,
+    ENROLLMENT_QUALITY_RANKING,
+    BATCH_SIZE
 )
 from .utils import (
     logger,
@@ -35,12 +41,22 @@ from .utils import (
     load_image
 )
 from .detector import get_detector, FaceDetector  # Usar detector singleton
+from .gallery import EmbeddingGallery, GallerySnapshot
+from .ann_index import IVFIndex
+from .embedder import represent_faces
+from .embedding_store import EmbeddingStore, migrate_pickle
+from .prototypes import select_prototypes, compact_database
+from .enrollment_quality import rank_enrollment_faces
+from .preprocessing_pool import get_preprocessing_pool
+from .video_enrollment import extract_enrollment_frames
 
 
 # =====================================================================
 # SINGLETON PATTERN para FaceRegistration
 # =====================================================================
 _global_registration: Optional['FaceRegistration'] = None
+# Los workers de inferencia abren el almacén en solo lectura (ver use_read_only_store)
+_read_only_store = False
 
 
 def get_registration() -> 'FaceRegistration':
@@ -62,6 +78,18 @@ def get_registration() -> 'FaceRegistration':
     return _global_registration
 
 
+def use_read_only_store() -> None:
+    """
+    Marca el proceso como lector del almacén de embeddings (workers de inferencia).
+
+    Migración del pickle, conversión de precisión, índice IVF en disco y
+    registros quedan a cargo del proceso del servidor: varios procesos
+    escribiendo el mismo directorio duplicarían personas o corromperían el índice.
+    """
+    global _read_only_store
+    _read_only_store = True
+
+
 def reset_registration():
     """
     Resetea el singleton del registro (útil para testing o recargar BD).
@@ -76,60 +104,144 @@ class FaceRegistration:
     Clase para registrar personas en el sistema de reconocimiento facial.
     """
     
-    def __init__(self):
-        """Inicializa el sistema de registro."""
+    def __init__(self, read_only: bool = None):
+        """
+        Inicializa el sistema de registro.
+        
+        Args:
+            read_only: Abrir el almacén en solo lectura (None = según use_read_only_store)
+        """
+        self.read_only = _read_only_store if read_only is None else read_only
         # Usar detector singleton en lugar de crear nueva instancia
         self.detector = get_detector()
         self.database = self._load_database()
         self.metadata = self._load_metadata()
+        # Snapshot publicado de la galería (read-copy-update): los lectores
+        # lo toman sin locks; las escrituras se serializan con _write_lock
+        self._write_lock = threading.Lock()
+        self._snapshot: Optional[GallerySnapshot] = None
+        self._version = 0
+        # Índice IVF para búsqueda 1:N aproximada (solo con SEARCH_ENGINE = "ivf")
+        self._ann_index: Optional[IVFIndex] = None
         
         logger.info("Sistema de registro inicializado")
     
-    def _load_database(self) -> Dict[str, List[np.ndarray]]:
+    @property
+    def snapshot(self) -> GallerySnapshot:
         """
-        Carga la base de datos de embeddings desde disco.
+        Snapshot actual de la galería (inmutable).
+        Se construye la primera vez que se usa y se reemplaza en cada escritura.
         
         Returns:
-            Diccionario {nombre_persona: [embeddings]}
+            GallerySnapshot con la galería y el índice IVF de una misma versión
         """
-        if not EMBEDDINGS_FILE.exists():
-            logger.info("No existe base de datos previa, creando nueva")
-            return {}
-        
-        try:
-            with open(EMBEDDINGS_FILE, 'rb') as f:
-                database = pickle.load(f)
-            
-            logger.info(f"Base de datos cargada: {len(database)} personas")
-            return database
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._write_lock:
+                if self._snapshot is None:
+                    self._publish()
+                snapshot = self._snapshot
+        return snapshot
+    
+    @property
+    def gallery(self) -> EmbeddingGallery:
+        """
+        Galería matricial del snapshot actual.
         
-        except Exception as e:
-            logger.error(f"Error al cargar base de datos: {str(e)}")
-            return {}
+        Returns:
+            EmbeddingGallery con todos los embeddings pre-normalizados
+        """
+        return self.snapshot.gallery
     
-    def _save_database(self) -> bool:
+    def _publish(self) -> None:
+        """
+        Construye un snapshot nuevo desde el almacén y lo publica con una
+        sola asignación. Debe llamarse con _write_lock tomado.
         """
-        Guarda la base de datos de embeddings en disco.
+        gallery = self.database.gallery()
+        ann_index = self.ann_index if SEARCH_ENGINE == "ivf" else None
+        self._version += 1
+        self._snapshot = GallerySnapshot(gallery, ann_index, self._version)
+        logger.debug(
+            f"Galería publicada (v{self._version}): {len(gallery)} personas, "
+            f"{gallery.num_embeddings} embeddings"
+        )
+    
+    @property
+    def ann_index(self) -> IVFIndex:
+        """
+        Índice IVF de la base de datos.
+        Se carga desde ANN_INDEX_FILE y se reconstruye si no corresponde con
+        la base de datos (ej: almacén modificado con el motor exhaustivo).
         
         Returns:
-            True si se guardó correctamente
+            IVFIndex sincronizado con la base de datos
         """
-        try:
-            # Crear directorio si no existe
-            EMBEDDINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Guardar con compresión si está habilitado
-            protocol = pickle.HIGHEST_PROTOCOL if COMPRESS_EMBEDDINGS else pickle.DEFAULT_PROTOCOL
+        if self._ann_index is None:
+            index = IVFIndex.load(ANN_INDEX_FILE)
+            expected = {key: self.database.count(key) for key in self.database}
             
-            with open(EMBEDDINGS_FILE, 'wb') as f:
-                pickle.dump(self.database, f, protocol=protocol)
+            if index is None or index.person_counts() != expected:
+                logger.info("Construyendo índice IVF desde la base de datos...")
+                index = IVFIndex.from_database(self.database)
+                if not self.read_only:
+                    index.save(ANN_INDEX_FILE)
             
-            logger.info(f"Base de datos guardada: {EMBEDDINGS_FILE}")
-            return True
+            self._ann_index = index
+        return self._ann_index
+    
+    def _update_ann_index(self, update) -> None:
+        """
+        Aplica un cambio incremental a una copia del índice IVF, la persiste
+        y la deja como índice actual (el snapshot publicado sigue usando el
+        anterior hasta la próxima publicación). Si el índice creció más de
+        ANN_RETRAIN_FACTOR veces, se re-entrena desde el almacén.
+        No hace nada si el motor de búsqueda es exhaustivo.
+        """
+        if SEARCH_ENGINE != "ivf":
+            return
+        index = self.ann_index.copy()
+        update(index)
+        if index.needs_training:
+            index.train(self.database)
+        index.save(ANN_INDEX_FILE)
+        self._ann_index = index
+    
+    def _load_database(self) -> EmbeddingStore:
+        """
+        Abre el almacén de embeddings (memmap, sin deserializar la matriz).
+        Si solo existe el antiguo embeddings.pkl, lo migra una vez y lo
+        convierte a GALLERY_PRECISION (solo el proceso del servidor; en solo
+        lectura se abre tal cual).
         
-        except Exception as e:
-            logger.error(f"Error al guardar base de datos: {str(e)}")
-            return False
+        Returns:
+            EmbeddingStore con {clave_persona: embeddings}
+        """
+        store = EmbeddingStore(EMBEDDINGS_STORE_DIR, read_only=self.read_only)
+        
+        if self.read_only:
+            logger.info(f"Base de datos abierta en solo lectura: {len(store)} personas ({store.rows} embeddings)")
+            return store
+        
+        if len(store) == 0 and EMBEDDINGS_FILE.exists():
+            logger.info(f"Migrando {EMBEDDINGS_FILE.name} al almacén de embeddings...")
+            try:
+                migrate_pickle(EMBEDDINGS_FILE, store)
+            except Exception as e:
+                logger.error(f"Error al migrar base de datos: {str(e)}")
+        
+        if store.precision != GALLERY_PRECISION:
+            logger.info(f"Convirtiendo almacén de embeddings a {GALLERY_PRECISION}...")
+            try:
+                store.convert(GALLERY_PRECISION)
+            except Exception as e:
+                logger.error(f"Error al convertir almacén de embeddings: {str(e)}")
+        
+        if len(store) == 0:
+            logger.info("No existe base de datos previa, creando nueva")
+        else:
+            logger.info(f"Base de datos cargada: {len(store)} personas ({store.rows} embeddings)")
+        return store
     
     def _load_metadata(self) -> Dict[str, Any]:
         """
@@ -161,111 +273,238 @@ class FaceRegistration:
         self.metadata['last_updated'] = get_timestamp()
         return save_json(self.metadata, METADATA_FILE)
     
-    def _extract_embeddings(self, image_paths: List[str], use_augmentation: bool = True) -> List[np.ndarray]:
+    def detect_candidate(
+        self,
+        image_path: str,
+        image: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Carga la imagen y detecta su mejor rostro (primera etapa del registro).
+        
+        Args:
+            image_path: Ruta a la imagen (o nombre del frame si se da `image`)
+            image: Imagen ya decodificada (ej: frame de video)
+        
+        Returns:
+            Tupla (candidato, motivo de rechazo). El candidato tiene `image`,
+            `face_img`, `confidence` y `face_size` (lado menor de la caja)
+        """
+        img = load_image(image_path) if image is None else image
+        if img is None:
+            logger.warning(f"  ✗ No se pudo cargar: {image_path}")
+            return None, "No se pudo cargar la imagen"
+        
+        # Una sola pasada de detección (verificar + extraer rostro)
+        detection = self.detector.detect(image=img)
+        if not detection.has_face:
+            logger.warning(f"  ✗ No se detectó rostro en: {image_path}")
+            return None, "No se detectó rostro"
+        
+        face = detection.best()
+        return {
+            'image': str(image_path),
+            'face_img': face['face_img'],
+            'confidence': float(face['confidence']),
+            'face_size': int(min(face['bbox'][2], face['bbox'][3]))
+        }, None
+    
+    def _face_variants(self, face_img: np.ndarray, use_augmentation: bool = True) -> List[np.ndarray]:
+        """Preprocesa un rostro y genera sus variaciones augmentadas."""
+        # Preprocesamiento avanzado
+        if ENABLE_PREPROCESSING:
+            logger.debug("  → Aplicando preprocesamiento avanzado...")
+            face_img = preprocess_face(face_img)
+        
+        # Lista de imágenes a procesar (original + augmentaciones)
+        images_to_process = [face_img]
+        
+        # Data augmentation para mayor robustez
+        if use_augmentation and ENABLE_AUGMENTATION:
+            logger.debug("  → Generando variaciones augmentadas...")
+            augmented_imgs = augment_face_image(face_img)
+            images_to_process.extend(augmented_imgs[1:])  # Excluir original (ya está)
+        
+        return images_to_process
+    
+    def select_candidates(
+        self,
+        candidates: List[Dict[str, Any]],
+        rejected: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ranking de calidad de los rostros detectados (ENROLLMENT_QUALITY_RANKING).
+        
+        Args:
+            candidates: Candidatos de `detect_candidate`
+            rejected: Lista donde se agregan los rechazos {image, score, reasons}
+            
+        Returns:
+            Candidatos seleccionados para augmentation y embedding
+        """
+        if not ENROLLMENT_QUALITY_RANKING:
+            return candidates
+        
+        selected, quality_rejected = rank_enrollment_faces(candidates)
+        for rejection in quality_rejected:
+            logger.info(f"  ✗ Descartada {rejection['image']}: {', '.join(rejection['reasons'])}")
+        if rejected is not None:
+            rejected.extend(quality_rejected)
+        return selected
+    
+    def _extract_embeddings(
+        self,
+        image_paths: List[str],
+        use_augmentation: bool = True,
+        batch_size: Optional[int] = None,
+        rejected: Optional[List[Dict[str, Any]]] = None
+    ) -> List[np.ndarray]:
         """
         Extrae embeddings de imágenes con preprocesamiento y augmentation opcionales.
         
         Estrategia multi-embedding:
-        1. Preprocesa cada imagen (CLAHE, denoising, sharpening)
-        2. Si augmentation activo: genera variaciones (flip, brightness, contrast, rotation)
-        3. Extrae embeddings de todas las variaciones
-        4. Resultado: embeddings más robustos que capturan variabilidad
+        1. Detecta el rostro de cada imagen
+        2. Ranking de calidad: descarta rostros pobres y conserva los mejores
+        3. Preprocesa cada rostro seleccionado (CLAHE, denoising, sharpening)
+        4. Si augmentation activo: genera variaciones (flip, brightness, contrast, rotation)
+        5. Extrae embeddings de todas las variaciones en lotes de BATCH_SIZE
         
         Args:
             image_paths: Lista de rutas a imágenes
             use_augmentation: Si True, genera variaciones augmentadas
+            batch_size: Tamaño de lote del modelo (None = BATCH_SIZE)
+            rejected: Lista donde se agregan las imágenes descartadas y el motivo
             
         Returns:
             Lista de embeddings extraídos (puede ser > len(image_paths) si hay augmentation)
         """
-        from deepface import DeepFace
-        
-        embeddings = []
-        total_processed = 0
+        rejected = [] if rejected is None else rejected
+        candidates = []
         
         for i, image_path in enumerate(image_paths, 1):
             logger.info(f"Procesando imagen {i}/{len(image_paths)}: {Path(image_path).name}")
             
             try:
-                # Cargar y verificar imagen
-                img = load_image(image_path)
-                if img is None:
-                    logger.warning(f"  ✗ No se pudo cargar: {image_path}")
-                    continue
-                
-                # Verificar que hay rostro
-                if not self.detector.has_face(image=img):
-                    logger.warning(f"  ✗ No se detectó rostro en: {image_path}")
-                    continue
-                
-                # Extraer rostro detectado
-                face_data = self.detector.detect_faces(image=img, return_best=True)
-                if not face_data:
-                    continue
-                
-                face_img = face_data[0]['face_img']
-                
-                # Preprocesamiento avanzado
-                if ENABLE_PREPROCESSING:
-                    logger.debug("  → Aplicando preprocesamiento avanzado...")
-                    face_img = preprocess_face(face_img)
-                
-                # Lista de imágenes a procesar (original + augmentaciones)
-                images_to_process = [face_img]
-                
-                # Data augmentation para mayor robustez
-                if use_augmentation and ENABLE_AUGMENTATION:
-                    logger.debug("  → Generando variaciones augmentadas...")
-                    augmented_imgs = augment_face_image(face_img)
-                    images_to_process.extend(augmented_imgs[1:])  # Excluir original (ya está)
-                    logger.info(f"  → Generadas {len(images_to_process)} variaciones")
-                
-                # Extraer embeddings de todas las variaciones
-                for idx, img_variant in enumerate(images_to_process):
-                    try:
-                        embedding_obj = DeepFace.represent(
-                            img_path=img_variant,
-                            model_name=RECOGNITION_MODEL,
-                            detector_backend='skip',  # Ya tenemos el rostro
-                            enforce_detection=False,
-                            align=True
-                        )
-                        
-                        if isinstance(embedding_obj, list):
-                            embedding = np.array(embedding_obj[0]['embedding'])
-                        else:
-                            embedding = np.array(embedding_obj['embedding'])
-                        
-                        embeddings.append(embedding)
-                        total_processed += 1
-                        
-                        if idx == 0:
-                            logger.info(f"  ✓ Embedding original: dimensión {embedding.shape}")
-                        
-                    except Exception as e:
-                        logger.debug(f"  ⚠ Error en variación {idx}: {str(e)}")
-                        continue
-            
+                candidate, reason = self.detect_candidate(image_path)
             except Exception as e:
                 logger.error(f"  ✗ Error al procesar {image_path}: {str(e)}")
-                continue
+                candidate, reason = None, f"Error al procesar: {str(e)}"
+            
+            if candidate is None:
+                rejected.append({'image': Path(image_path).name, 'score': None, 'reasons': [reason]})
+            else:
+                candidates.append(candidate)
+        
+        selected = self.select_candidates(candidates, rejected)
+        embeddings = self.embed_faces([candidate['face_img'] for candidate in selected], use_augmentation, batch_size)
         
         logger.info(f"✓ Total embeddings extraídos: {len(embeddings)} (de {len(image_paths)} imágenes)")
         return embeddings
     
+    def embed_faces(
+        self,
+        face_imgs: List[np.ndarray],
+        use_augmentation: bool = True,
+        batch_size: Optional[int] = None
+    ) -> List[np.ndarray]:
+        """
+        Preprocesa y aumenta los rostros seleccionados en paralelo (pool de
+        preprocesamiento) y extrae los embeddings de todas las variaciones por lotes.
+        """
+        def variants(face_img: np.ndarray) -> List[np.ndarray]:
+            try:
+                return self._face_variants(face_img, use_augmentation)
+            except Exception as e:
+                logger.error(f"  ✗ Error al preprocesar rostro: {str(e)}")
+                return []
+        
+        faces_to_process = [
+            variant
+            for face_variants in get_preprocessing_pool().map(variants, face_imgs)
+            for variant in face_variants
+        ]
+        
+        # Extraer embeddings de todas las variaciones por lotes
+        logger.info(f"Extrayendo {len(faces_to_process)} embeddings en lotes de {batch_size or BATCH_SIZE}")
+        embeddings = [
+            embedding for embedding in represent_faces(faces_to_process, batch_size=batch_size)
+            if embedding is not None
+        ]
+        
+        if embeddings:
+            logger.info(f"  ✓ Embeddings: dimensión {embeddings[0].shape}")
+        return embeddings
+    
+    def extract_video_frames(self, video_path: str, output_dir: str) -> Dict[str, Any]:
+        """
+        Elige los mejores frames de un video de registro y los guarda como imágenes.
+        
+        Args:
+            video_path: Ruta al video
+            output_dir: Carpeta de las imágenes de la persona
+            
+        Returns:
+            Reporte de `extract_enrollment_frames` (incluye `image_paths`)
+        """
+        return extract_enrollment_frames(
+            video_path,
+            output_dir,
+            detect=lambda name, frame: self.detect_candidate(name, image=frame),
+            embed=represent_faces
+        )
+    
+    def register_from_video(
+        self,
+        person_name: str,
+        video_path: str,
+        overwrite: bool = False,
+        display_name: str = None
+    ) -> bool:
+        """
+        Registra una persona a partir de un video corto en lugar de fotos.
+        
+        Los frames elegidos se guardan en data/<clave>/ y se registran con
+        `register_person`.
+        
+        Args:
+            person_name: Clave de la persona en la galería (codigo_user)
+            video_path: Ruta al video
+            overwrite: Si True, sobrescribe registro existente
+            display_name: Nombre visible de la persona (solo metadata)
+            
+        Returns:
+            True si el registro fue exitoso
+        """
+        if person_name in self.database and not overwrite:
+            logger.warning(f"La persona '{person_name}' ya está registrada")
+            return False
+        
+        try:
+            report = self.extract_video_frames(video_path, str(DATA_DIR / person_name))
+        except ValueError as e:
+            logger.error(str(e))
+            return False
+        
+        if not report['image_paths']:
+            logger.error(f"No se encontraron frames con rostro en: {video_path}")
+            return False
+        
+        return self.register_person(person_name, report['image_paths'], overwrite, display_name)
+    
     def register_person(
         self,
         person_name: str,
         image_paths: List[str] = None,
-        overwrite: bool = False
+        overwrite: bool = False,
+        display_name: str = None
     ) -> bool:
         """
         Registra una persona en el sistema.
         
         Args:
-            person_name: Nombre de la persona
+            person_name: Clave de la persona en la galería (codigo_user)
             image_paths: Lista de rutas a imágenes (opcional, se buscan en data/)
             overwrite: Si True, sobrescribe registro existente
+            display_name: Nombre visible de la persona (solo metadata)
             
         Returns:
             True si el registro fue exitoso
@@ -310,30 +549,58 @@ class FaceRegistration:
         logger.info(f"\nExtrayendo embeddings con modelo: {RECOGNITION_MODEL}")
         embeddings = self._extract_embeddings(image_paths)
         
+        return self.register_embeddings(person_name, embeddings, image_paths, display_name=display_name)
+    
+    def register_embeddings(
+        self,
+        person_name: str,
+        embeddings: List[np.ndarray],
+        image_paths: List[str],
+        display_name: str = None
+    ) -> bool:
+        """
+        Guarda en la galería embeddings ya extraídos (ej: en el pool de inferencia).
+        
+        Args:
+            person_name: Clave de la persona en la galería (codigo_user)
+            embeddings: Embeddings de las imágenes y sus variaciones
+            image_paths: Imágenes de origen (solo metadata)
+            display_name: Nombre visible de la persona (solo metadata)
+            
+        Returns:
+            True si el registro fue exitoso
+        """
         if not embeddings:
             logger.error("No se pudo extraer ningún embedding válido")
             return False
         
         logger.info(f"\n✓ Embeddings extraídos: {len(embeddings)}/{len(image_paths)}")
         
-        # Guardar en base de datos
-        self.database[person_name] = embeddings
-        
-        # Actualizar metadata
-        self.metadata['persons'][person_name] = {
-            'num_embeddings': len(embeddings),
-            'registered_at': get_timestamp(),
-            'image_paths': [str(p) for p in image_paths[:len(embeddings)]],
-            'embedding_dim': embeddings[0].shape[0]
-        }
-        
-        # Persistir cambios
-        if not self._save_database():
-            logger.error("Error al guardar base de datos")
-            return False
-        
-        if not self._save_metadata():
-            logger.warning("Error al guardar metadata")
+        # Reducir variantes casi duplicadas a prototipos
+        if PROTOTYPES_PER_PERSON and len(embeddings) > PROTOTYPES_PER_PERSON:
+            embeddings = list(select_prototypes(embeddings, k=PROTOTYPES_PER_PERSON))
+            logger.info(f"✓ Compactado a {len(embeddings)} prototipos")
+        
+        with self._write_lock:
+            # Guardar en el almacén (append; el registro previo queda como tombstone)
+            if not self.database.put(person_name, embeddings):
+                logger.error("Error al guardar base de datos")
+                return False
+            self._update_ann_index(lambda index: index.add(person_name, embeddings))
+            self._publish()
+            
+            # Actualizar metadata
+            self.metadata['persons'][person_name] = {
+                'display_name': display_name or person_name,
+                'num_embeddings': len(embeddings),
+                'registered_at': get_timestamp(),
+                'image_paths': [str(p) for p in image_paths[:len(embeddings)]],
+                'embedding_dim': embeddings[0].shape[0]
+            }
+            
+            # Persistir metadata
+            if not self._save_metadata():
+                logger.warning("Error al guardar metadata")
         
         logger.info(f"\n{MSG_SUCCESS_REGISTRATION}: {person_name}")
         logger.info(f"Total de personas en el sistema: {len(self.database)}\n")
@@ -350,43 +617,125 @@ class FaceRegistration:
         Returns:
             True si se eliminó correctamente
         """
-        if person_name not in self.database:
-            logger.warning(f"La persona '{person_name}' no está registrada")
-            return False
-        
-        # Eliminar de base de datos
-        del self.database[person_name]
+        with self._write_lock:
+            if person_name not in self.database:
+                logger.warning(f"La persona '{person_name}' no está registrada")
+                return False
+            
+            # Eliminar del almacén (tombstone; la compactación libera el espacio)
+            self.database.remove(person_name)
+            self._update_ann_index(lambda index: index.remove(person_name))
+            self._publish()
+            
+            # Eliminar de metadata
+            if person_name in self.metadata['persons']:
+                del self.metadata['persons'][person_name]
+            
+            self._save_metadata()
         
-        # Eliminar de metadata
-        if person_name in self.metadata['persons']:
-            del self.metadata['persons'][person_name]
+        logger.info(f"Persona eliminada: {person_name}")
+        return True
+    
+    def rename_person(self, old_key: str, new_key: str) -> bool:
+        """
+        Cambia la clave de una persona en la galería (ej: migrar de nombre a
+        codigo_user, o cuando se edita el código del usuario).
         
-        # Persistir cambios
-        self._save_database()
-        self._save_metadata()
+        Args:
+            old_key: Clave actual
+            new_key: Nueva clave
+            
+        Returns:
+            True si se renombró correctamente
+        """
+        with self._write_lock:
+            if old_key not in self.database:
+                logger.warning(f"La persona '{old_key}' no está registrada")
+                return False
+            
+            if new_key in self.database:
+                logger.warning(f"La clave '{new_key}' ya está en uso")
+                return False
+            
+            self.database.rename(old_key, new_key)
+            self._update_ann_index(lambda index: index.rename(old_key, new_key))
+            self._publish()
+            
+            if old_key in self.metadata['persons']:
+                person_meta = self.metadata['persons'].pop(old_key)
+                person_meta.setdefault('display_name', old_key)
+                self.metadata['persons'][new_key] = person_meta
+            
+            self._save_metadata()
         
-        logger.info(f"Persona eliminada: {person_name}")
+        logger.info(f"Persona renombrada: {old_key} -> {new_key}")
         return True
 
+    
+    def compact_gallery(self, k: int = None, method: str = None) -> Dict[str, int]:
+        """
+        Compacta la galería existente en prototipos por persona (pasada offline).
+        
+        Args:
+            k: Prototipos por persona (None = PROTOTYPES_PER_PERSON)
+            method: "farthest" o "kmedoids" (None = PROTOTYPE_METHOD)
+            
+        Returns:
+            Reporte con personas y embeddings antes/después
+        """
+        with self._write_lock:
+            before = self.database.live_rows
+            compacted = compact_database(self.database, k=k, method=method)
+            
+            if compacted:
+                if not self.database.put_many(compacted):
+                    raise RuntimeError("Error al guardar la galería compactada")
+                
+                def replace_all(index: IVFIndex) -> None:
+                    for key, prototypes in compacted.items():
+                        index.add(key, prototypes)
+                
+                self._update_ann_index(replace_all)
+                self._publish()
+                
+                for key, prototypes in compacted.items():
+                    if key in self.metadata['persons']:
+                        self.metadata['persons'][key]['num_embeddings'] = len(prototypes)
+                self._save_metadata()
+            
+            report = {
+                'persons': len(self.database),
+                'persons_compacted': len(compacted),
+                'embeddings_before': before,
+                'embeddings_after': self.database.live_rows
+            }
+        
+        logger.info(
+            f"Galería compactada: {report['persons_compacted']} personas, "
+            f"{report['embeddings_before']} -> {report['embeddings_after']} embeddings"
+        )
+        return report
+
 
 # ============================================================================
 # FUNCIONES DE UTILIDAD
 # ============================================================================
-def quick_register(person_name: str, overwrite: bool = False) -> bool:
+def quick_register(person_name: str, overwrite: bool = False, display_name: str = None) -> bool:
     """
     Función rápida para registrar una persona.
     
     ⚡ USA SINGLETON: Reutiliza la instancia de FaceRegistration en memoria.
     
     Args:
-        person_name: Nombre de la persona
+        person_name: Clave de la persona (codigo_user); las imágenes se buscan en data/<clave>/
         overwrite: Si True, sobrescribe registro existente
+        display_name: Nombre visible de la persona
         
     Returns:
         True si el registro fue exitoso
     """
     registration = get_registration()  # ← Usa instancia global (rápido!)
-    return registration.register_person(person_name, overwrite=overwrite)
+    return registration.register_person(person_name, overwrite=overwrite, display_name=display_name)
 
 
 def quick_remove(person_name: str) -> bool:
@@ -396,7 +745,7 @@ def quick_remove(person_name: str) -> bool:
     ⚡ USA SINGLETON: Reutiliza la instancia de FaceRegistration en memoria.
     
     Args:
-        person_name: Nombre de la persona a eliminar
+        person_name: Clave de la persona a eliminar (codigo_user)
         
     Returns:
         True si la eliminación fue exitosa
@@ -405,6 +754,21 @@ def quick_remove(person_name: str) -> bool:
     return registration.remove_person(person_name)
 
 
+def quick_rename(old_key: str, new_key: str) -> bool:
+    """
+    Función rápida para cambiar la clave de una persona en la galería.
+    
+    Args:
+        old_key: Clave actual (ej: nombre legado)
+        new_key: Nueva clave (ej: codigo_user)
+        
+    Returns:
+        True si se renombró correctamente
+    """
+    registration = get_registration()
+    return registration.rename_person(old_key, new_key)
+
+
 if __name__ == "__main__":
     # Test del sistema de registro
     print_banner("TEST DEL SISTEMA DE REGISTRO")
@@ -3,6 +3,7 @@ Módulo de utilidades para el sistema de reconocimiento facial.
 Incluye funciones de logging, validación, preprocesamiento y visualización.
 """
 import os
+import threading
 import cv2
 import numpy as np
 import logging
@@ -10,12 +11,15 @@ from pathlib import Path
 from typing import Tuple, Optional, List, Dict, Any
 from datetime import datetime
 import json
+from contextlib import contextmanager
 
 from .config import (
     LOG_FILE, LOG_FORMAT, LOG_LEVEL,
     MIN_FACE_SIZE, MAX_BLUR_THRESHOLD, CHECK_IMAGE_QUALITY,
+    PREPROCESSING_PROFILE, PREPROCESSING_PROFILES,
     COLOR_RECOGNIZED, COLOR_UNKNOWN, BOX_THICKNESS, TEXT_THICKNESS, FONT_SCALE
 )
+from .profiling import timed
 
 
 # ============================================================================
@@ -120,6 +124,32 @@ def load_image(image_path: str) -> Optional[np.ndarray]:
         return None
 
 
+def resize_max_side(image: np.ndarray, max_side: Optional[int]) -> Tuple[np.ndarray, float]:
+    """
+    Reduce una imagen por un factor entero para que su lado mayor no supere
+    `max_side` (como IMREAD_REDUCED_COLOR_2/4/8, pero sobre una imagen ya
+    decodificada). Con factor entero INTER_AREA usa su camino rápido; las
+    últimas filas/columnas que no completan un bloque se descartan.
+    
+    Args:
+        image: Imagen como array numpy
+        max_side: Lado máximo en pixels (None o 0 = sin límite)
+        
+    Returns:
+        Tupla (imagen, escala) con escala = 1 / factor; si no hace falta
+        reducir retorna la misma imagen y escala 1.0
+    """
+    longest = max(image.shape[:2])
+    if not max_side or longest <= max_side:
+        return image, 1.0
+    
+    factor = -(-longest // max_side)  # ceil
+    h, w = image.shape[:2]
+    h, w = (h // factor) * factor, (w // factor) * factor
+    reduced = cv2.resize(image[:h, :w], (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+    return reduced, 1.0 / factor
+
+
 def check_image_quality(image: np.ndarray) -> Tuple[bool, str, Dict[str, float]]:
     """
     Verifica la calidad de una imagen (blur, brillo, contraste).
@@ -187,47 +217,85 @@ def check_image_quality(image: np.ndarray) -> Tuple[bool, str, Dict[str, float]]
 # ============================================================================
 # PROCESAMIENTO DE IMÁGENES
 # ============================================================================
-def preprocess_face(face_img: np.ndarray, target_size: Tuple[int, int] = (224, 224)) -> np.ndarray:
+_INTERPOLATIONS = {
+    "cubic": cv2.INTER_CUBIC,
+    "linear": cv2.INTER_LINEAR,
+    "area": cv2.INTER_AREA
+}
+
+# Sharpening suave para mejorar detalles
+_SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]]) / 9
+
+# Un CLAHE por hilo: crear el objeto en cada llamada es costoso y una misma
+# instancia no debe compartirse entre hilos
+_clahe_local = threading.local()
+
+
+def get_clahe() -> "cv2.CLAHE":
+    """Retorna la instancia CLAHE reutilizable del hilo actual."""
+    clahe = getattr(_clahe_local, "clahe", None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        _clahe_local.clahe = clahe
+    return clahe
+
+
+def _equalize_luminance(face_img: np.ndarray, color_space: str) -> np.ndarray:
+    """CLAHE sobre el canal de luminancia (L de LAB o Y de YCrCb)."""
+    if face_img.ndim == 2:
+        return get_clahe().apply(face_img)
+    
+    if color_space == "ycrcb":
+        # Conversión entera, bastante más barata que LAB
+        to_space, from_space = cv2.COLOR_BGR2YCrCb, cv2.COLOR_YCrCb2BGR
+    else:
+        to_space, from_space = cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR
+    
+    converted = cv2.cvtColor(face_img, to_space)
+    # Ecualizar el canal 0 in-place, sin split/merge
+    converted[:, :, 0] = get_clahe().apply(np.ascontiguousarray(converted[:, :, 0]))
+    return cv2.cvtColor(converted, from_space)
+
+
+@timed("preprocess")
+def preprocess_face(
+    face_img: np.ndarray,
+    target_size: Tuple[int, int] = (224, 224),
+    profile: str = None
+) -> np.ndarray:
     """
     Preprocesa una imagen de rostro para mejorar la calidad.
-    Aplica ecualización adaptativa, reducción de ruido y normalización.
+    Aplica ecualización adaptativa, reducción de ruido y normalización según
+    el perfil (PREPROCESSING_PROFILES).
     
     Args:
         face_img: Imagen del rostro
         target_size: Tamaño objetivo
+        profile: Perfil de preprocesamiento (None = PREPROCESSING_PROFILE)
         
     Returns:
         Imagen preprocesada
     """
+    settings = PREPROCESSING_PROFILES[profile or PREPROCESSING_PROFILE]
+    
     try:
         # Resize si es necesario
         if face_img.shape[:2] != target_size:
-            face_img = cv2.resize(face_img, target_size, interpolation=cv2.INTER_CUBIC)
+            face_img = cv2.resize(
+                face_img, target_size, interpolation=_INTERPOLATIONS[settings["interpolation"]]
+            )
         
         # Ecualización adaptativa (CLAHE) para iluminación no uniforme
-        if len(face_img.shape) == 3:
-            # Convertir a LAB color space para mejor ecualización
-            lab = cv2.cvtColor(face_img, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            
-            # CLAHE en canal L (luminancia)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            l = clahe.apply(l)
-            
-            # Merge y convertir de vuelta
-            lab = cv2.merge([l, a, b])
-            face_img = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-        else:
-            # Para escala de grises
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            face_img = clahe.apply(face_img)
+        face_img = _equalize_luminance(face_img, settings["color_space"])
         
-        # Reducción de ruido adaptativa
-        face_img = cv2.fastNlMeansDenoisingColored(face_img, None, 10, 10, 7, 21)
+        # Reducción de ruido
+        if face_img.ndim == 3 and settings["denoise"] == "nlmeans":
+            face_img = cv2.fastNlMeansDenoisingColored(face_img, None, 10, 10, 7, 21)
+        elif settings["denoise"] == "bilateral":
+            face_img = cv2.bilateralFilter(face_img, 5, 40, 40)
         
-        # Sharpening suave para mejorar detalles
-        kernel = np.array([[-1,-1,-1], [-1, 9,-1], [-1,-1,-1]]) / 9
-        face_img = cv2.filter2D(face_img, -1, kernel)
+        if settings["sharpen"]:
+            face_img = cv2.filter2D(face_img, -1, _SHARPEN_KERNEL)
         
         return face_img
     
@@ -485,9 +553,39 @@ def calculate_distance(embedding1: np.ndarray, embedding2: np.ndarray, metric: s
 # ============================================================================
 # PERSISTENCIA
 # ============================================================================
+@contextmanager
+def atomic_open(filepath: Path, mode: str = 'w', encoding: Optional[str] = None):
+    """
+    Abre un archivo temporal junto a `filepath` y lo renombra sobre el destino
+    al cerrar sin errores (os.replace es atómico). Un corte a mitad de la
+    escritura deja intacto el archivo anterior.
+    
+    Args:
+        filepath: Ruta final del archivo
+        mode: 'w' o 'wb'
+        encoding: Encoding para modo texto
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+    
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
 def save_json(data: Dict[str, Any], filepath: Path) -> bool:
     """
-    Guarda datos en formato JSON.
+    Guarda datos en formato JSON (escritura atómica).
     
     Args:
         data: Datos a guardar
@@ -497,7 +595,7 @@ def save_json(data: Dict[str, Any], filepath: Path) -> bool:
         True si se guardó correctamente
     """
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with atomic_open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         return True
     except Exception as e:
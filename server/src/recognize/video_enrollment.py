@@ -0,0 +1,258 @@
+"""
+Módulo de registro facial desde un video corto.
+
+En lugar de 10 fotos, el colaborador graba unos segundos girando la cabeza.
+Los frames se procesan como generadores, así la memoria no depende de la
+duración del clip:
+
+1. `iter_video_frames`: decodifica en streaming (grab/retrieve de OpenCV;
+   solo se convierte 1 de cada VIDEO_FRAME_STEP frames)
+2. `iter_candidate_frames`: descarta frames con métricas baratas sobre el
+   frame reducido (nitidez por varianza del Laplaciano, movimiento por
+   diferencia con el frame anterior) y espacia los candidatos en el tiempo
+3. Solo los candidatos pasan por el detector; se retienen los
+   VIDEO_MAX_CANDIDATES rostros más nítidos (JPEG en memoria)
+4. Ranking de calidad (enrollment_quality) y selección de los
+   VIDEO_ENROLLMENT_FRAMES más diversos por distancia entre embeddings
+   (punto más lejano, como los prototipos), que se guardan como imágenes
+   para `FaceRegistration.register_person` o el job de registro
+"""
+import heapq
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import (
+    VIDEO_MAX_SECONDS,
+    VIDEO_FRAME_STEP,
+    VIDEO_ANALYSIS_SIDE,
+    VIDEO_MIN_SHARPNESS,
+    VIDEO_MAX_MOTION,
+    VIDEO_MIN_FRAME_INTERVAL,
+    VIDEO_MAX_CANDIDATES,
+    VIDEO_ENROLLMENT_FRAMES
+)
+from .utils import logger, resize_max_side
+from .enrollment_quality import rank_enrollment_faces
+from .prototypes import farthest_point_indices, _cosine_distances
+
+# FPS supuesto cuando el contenedor no lo informa
+_DEFAULT_FPS = 30.0
+
+
+def video_fps(video_path: str) -> float:
+    """FPS declarado del video (_DEFAULT_FPS si el contenedor no lo informa)."""
+    capture = cv2.VideoCapture(str(video_path))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) if capture.isOpened() else 0.0
+    finally:
+        capture.release()
+    return fps if fps and fps > 0 else _DEFAULT_FPS
+
+
+def iter_video_frames(
+    video_path: str,
+    step: int = 1,
+    max_frames: Optional[int] = None
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decodifica el video en streaming.
+
+    Todos los frames se avanzan con `grab()`, pero solo 1 de cada `step` se
+    convierte con `retrieve()`; el generador nunca retiene frames anteriores.
+
+    Args:
+        video_path: Ruta al video
+        step: Entregar 1 de cada `step` frames
+        max_frames: Tope de frames decodificados (None = hasta el final)
+
+    Yields:
+        Tuplas (índice del frame, frame BGR)
+
+    Raises:
+        ValueError: Si el video no se puede abrir
+    """
+    capture = cv2.VideoCapture(str(video_path))
+    if not capture.isOpened():
+        capture.release()
+        raise ValueError(f"No se pudo abrir el video: {Path(video_path).name}")
+
+    try:
+        index = 0
+        while max_frames is None or index < max_frames:
+            if not capture.grab():
+                break
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok and frame is not None:
+                    yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_candidate_frames(
+    frames: Iterable[Tuple[int, np.ndarray]],
+    min_sharpness: float = None,
+    max_motion: float = None,
+    min_gap: int = 1,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[int, np.ndarray, float]]:
+    """
+    Filtra frames con métricas baratas antes de la detección.
+
+    Sobre el frame reducido a VIDEO_ANALYSIS_SIDE en gris se mide la nitidez
+    (varianza del Laplaciano) y el movimiento (diferencia media absoluta con
+    el frame analizado anterior; mucho movimiento = blur de movimiento).
+    Entre dos candidatos hay al menos `min_gap` frames.
+
+    Args:
+        frames: Iterable de (índice, frame), ej: `iter_video_frames`
+        min_sharpness: Nitidez mínima (None = VIDEO_MIN_SHARPNESS)
+        max_motion: Movimiento máximo (None = VIDEO_MAX_MOTION)
+        min_gap: Frames mínimos entre candidatos
+        stats: Diccionario donde se cuentan `frames_analyzed` y `candidate_frames`
+
+    Yields:
+        Tuplas (índice, frame, nitidez) de los frames candidatos
+    """
+    min_sharpness = VIDEO_MIN_SHARPNESS if min_sharpness is None else min_sharpness
+    max_motion = VIDEO_MAX_MOTION if max_motion is None else max_motion
+    stats = {} if stats is None else stats
+    stats.setdefault("frames_analyzed", 0)
+    stats.setdefault("candidate_frames", 0)
+
+    previous = None
+    last_candidate = None
+    for index, frame in frames:
+        stats["frames_analyzed"] += 1
+        small, _ = resize_max_side(frame, VIDEO_ANALYSIS_SIDE)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        motion = 0.0
+        if previous is not None and previous.shape == gray.shape:
+            motion = float(cv2.absdiff(gray, previous).mean())
+        previous = gray
+
+        if last_candidate is not None and index - last_candidate < min_gap:
+            continue
+        if motion > max_motion:
+            continue
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        if sharpness < min_sharpness:
+            continue
+
+        last_candidate = index
+        stats["candidate_frames"] += 1
+        yield index, frame, sharpness
+
+
+def select_diverse_faces(
+    candidates: List[Dict[str, Any]],
+    num_frames: int,
+    embed: Optional[Callable[[List[np.ndarray]], List[Optional[np.ndarray]]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Elige los rostros más diversos entre los que pasan el ranking de calidad.
+
+    Con `embed` se usa la selección del punto más lejano sobre las
+    distancias coseno entre embeddings (cubre poses e iluminación
+    distintas); sin él, frames equiespaciados en el tiempo.
+
+    Args:
+        candidates: Candidatos con `image`, `face_img`, `confidence`, `face_size` y `frame`
+        num_frames: Rostros a elegir
+        embed: Embeddings por lotes de los rostros (ej: `represent_faces`)
+
+    Returns:
+        Candidatos elegidos en orden de aparición en el video
+    """
+    selected, rejected = rank_enrollment_faces(candidates, best_n=len(candidates))
+    for rejection in rejected:
+        logger.debug(f"  ✗ Frame descartado {rejection['image']}: {', '.join(rejection['reasons'])}")
+
+    selected.sort(key=lambda candidate: candidate["frame"])
+    if len(selected) <= num_frames:
+        return selected
+
+    if embed is not None:
+        embeddings = embed([candidate["face_img"] for candidate in selected])
+        valid = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        if len(valid) >= num_frames:
+            vectors = np.asarray([embeddings[i] for i in valid], dtype=np.float64)
+            chosen = farthest_point_indices(_cosine_distances(vectors), num_frames)
+            return [selected[valid[i]] for i in sorted(chosen)]
+
+    positions = np.linspace(0, len(selected) - 1, num_frames).round().astype(int)
+    return [selected[i] for i in sorted(set(positions))]
+
+
+def extract_enrollment_frames(
+    video_path: str,
+    output_dir: str,
+    detect: Callable[[str, np.ndarray], Tuple[Optional[Dict[str, Any]], Optional[str]]],
+    embed: Optional[Callable[[List[np.ndarray]], List[Optional[np.ndarray]]]] = None,
+    num_frames: int = None
+) -> Dict[str, Any]:
+    """
+    Selecciona los mejores frames de un video y los guarda como imágenes de registro.
+
+    Args:
+        video_path: Ruta al video
+        output_dir: Carpeta donde se guardan los frames (`video_frame_<n>.jpg`)
+        detect: Detector de un frame `(nombre, imagen) -> (candidato, motivo)`,
+            ej: `FaceRegistration.detect_candidate`
+        embed: Embeddings por lotes para la selección por diversidad (opcional)
+        num_frames: Frames a guardar (None = VIDEO_ENROLLMENT_FRAMES)
+
+    Returns:
+        Reporte con `image_paths` (frames guardados) y los contadores
+        frames_read, frames_analyzed, candidate_frames y faces
+    """
+    num_frames = num_frames or VIDEO_ENROLLMENT_FRAMES
+    fps = video_fps(video_path)
+    stats: Dict[str, int] = {"frames_read": 0, "faces": 0}
+
+    def frames() -> Iterator[Tuple[int, np.ndarray]]:
+        for index, frame in iter_video_frames(video_path, VIDEO_FRAME_STEP, int(fps * VIDEO_MAX_SECONDS)):
+            stats["frames_read"] = index + 1
+            yield index, frame
+
+    # Montículo de mínimos por nitidez: conserva los VIDEO_MAX_CANDIDATES mejores
+    retained: List[Tuple[float, int, Dict[str, Any]]] = []
+    min_gap = max(1, int(round(fps * VIDEO_MIN_FRAME_INTERVAL)))
+    for index, frame, sharpness in iter_candidate_frames(frames(), min_gap=min_gap, stats=stats):
+        candidate, _ = detect(f"frame_{index:05d}", frame)
+        if candidate is None:
+            continue
+
+        stats["faces"] += 1
+        ok, encoded = cv2.imencode(".jpg", frame)
+        if not ok:
+            continue
+        candidate.update({"frame": index, "jpeg": encoded})
+
+        entry = (sharpness, index, candidate)
+        if len(retained) < VIDEO_MAX_CANDIDATES:
+            heapq.heappush(retained, entry)
+        elif sharpness > retained[0][0]:
+            heapq.heapreplace(retained, entry)
+
+    chosen = select_diverse_faces([candidate for _, _, candidate in retained], num_frames, embed)
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    image_paths = []
+    for candidate in chosen:
+        path = output / f"video_frame_{candidate['frame']:05d}.jpg"
+        path.write_bytes(candidate["jpeg"].tobytes())
+        image_paths.append(str(path))
+
+    logger.info(
+        f"Video {Path(video_path).name}: {stats['frames_read']} frames, "
+        f"{stats['frames_analyzed']} analizados, {stats['candidate_frames']} candidatos, "
+        f"{stats['faces']} con rostro, {len(image_paths)} seleccionados"
+    )
+    return {"image_paths": image_paths, **stats}
@@ -1,6 +1,7 @@
 from src.socketsio.socketio_app import sio
 from src.config.database import SessionLocal
 from src.users.service import user_service
+from src.users.enrollment import get_enrollment_jobs
 from src.asistencias.service import asistencia_service
 from fastapi import HTTPException
 import json
@@ -683,6 +684,30 @@ async def sensor_response(sid, data):
         db.close()
 
 
+@sio.on("enrollment_subscribe")
+async def enrollment_subscribe(sid, data):
+    """
+    Suscribe al cliente al avance de un registro facial en segundo plano.
+    Se une a la room `enrollment:{job_id}` y recibe de inmediato el estado
+    actual (por si el job avanzó antes de suscribirse).
+
+    data expected: {job_id: str}
+    """
+    try:
+        job_id = data.get("job_id") if isinstance(data, dict) else None
+        job = get_enrollment_jobs().get(job_id) if job_id else None
+        if job is None:
+            await sio.emit("enrollment-error", {"job_id": job_id, "message": "Job de registro no encontrado"}, to=sid)
+            return
+
+        await sio.enter_room(sid, job.room)
+        event = "enrollment-complete" if job.finished else "enrollment-progress"
+        await sio.emit(event, job.to_dict(), to=sid)
+
+    except Exception as e:
+        print(f"Error en enrollment_subscribe: {e}")
+
+
 
 
 # ============================================================
@@ -741,4 +766,9 @@ async def sensor_response(sid, data):
 #    sensor-ack        (confirmación de recepción de sensor-huella)
 #    sensor-cancel-ack (confirmación de cancelación)
 #         ↓
-#    client-response    (servidor al cliente con resultado o progreso)
\ No newline at end of file
+#    client-response    (servidor al cliente con resultado o progreso)
+# ============================================================
+# 🧑 REGISTRO FACIAL EN SEGUNDO PLANO:
+#    enrollment_subscribe  (cliente → servidor, {job_id})
+#    enrollment-progress   (servidor → room enrollment:{job_id})
+#    enrollment-complete   (estado final: completed/failed)
\ No newline at end of file
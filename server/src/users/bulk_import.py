@@ -0,0 +1,438 @@
+"""
+Importación masiva de usuarios (CSV + archivo de fotos).
+
+Para dar de alta una sucursal completa en una sola operación:
+
+    POST /users/import  (users_csv, photos)
+
+- `users_csv`: columnas name, email, codigo_user, password y opcionales
+  role_id (default: COLABORADOR) y huella
+- `photos`: zip o tar(.gz) con una carpeta por codigo_user
+  (`EMP001/foto1.jpg`, `sucursal/EMP001/foto1.jpg`, ...)
+
+Etapas:
+1. Valida las filas (schema, duplicados en el CSV y en la BD con una
+   consulta por campo, rol existente)
+2. Extrae el archivo miembro por miembro (`r|*` para tar, sin cargarlo en
+   memoria) solo para las filas válidas
+3. Crea los usuarios pendientes en transacciones por lote
+4. Registra los rostros con el pipeline de jobs de registro
+   (BULK_IMPORT_CONCURRENCY a la vez sobre el pool de inferencia)
+
+El reporte por fila (created → enrolled | failed, con el motivo) se consulta
+con `GET /users/import/{import_id}`.
+"""
+import asyncio
+import csv
+import io
+import logging
+import tarfile
+import uuid
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from src.config.settings import get_settings
+from src.recognize.config import (
+    MIN_IMAGES_PER_PERSON,
+    MAX_IMAGES_PER_PERSON,
+    BULK_IMPORT_BATCH_SIZE,
+    BULK_IMPORT_CONCURRENCY,
+    BULK_IMPORT_HISTORY
+)
+from src.roles.service import role_service
+from src.utils.file_handler import save_user_image_stream, delete_user_folder
+from .schemas import UserCreate
+from .service import user_service
+from .enrollment import EnrollmentJob, EnrollmentJobManager
+
+# Logger
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+REQUIRED_COLUMNS = ("name", "email", "codigo_user", "password")
+
+
+class ImportRow:
+    """
+    Resultado de una fila del CSV (pending, created, enrolled, failed).
+    """
+
+    def __init__(self, line: int, record: Dict[str, Any]):
+        self.line = line
+        self.codigo_user = (record.get("codigo_user") or "").strip()
+        self.name = (record.get("name") or "").strip()
+        self.email = (record.get("email") or "").strip()
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.user_id: Optional[int] = None
+        self.user_data: Optional[UserCreate] = None
+        self.image_paths: List[str] = []
+        self.rejected_images: List[Dict[str, Any]] = []
+
+    def fail(self, error: str) -> None:
+        self.status = "failed"
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "line": self.line,
+            "codigo_user": self.codigo_user,
+            "email": self.email,
+            "status": self.status,
+            "user_id": self.user_id,
+            "images": len(self.image_paths),
+            "rejected_images": self.rejected_images,
+            "error": self.error
+        }
+
+
+class BulkImport:
+    """
+    Importación en curso (processing) o terminada (completed) con su reporte.
+    """
+
+    def __init__(self, rows: List[ImportRow]):
+        self.import_id = uuid.uuid4().hex
+        self.rows = rows
+        self.status = "processing"
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def summary(self) -> Dict[str, int]:
+        counts = {"total": len(self.rows), "pending": 0, "created": 0, "enrolled": 0, "failed": 0}
+        for row in self.rows:
+            counts[row.status] += 1
+        return counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "import_id": self.import_id,
+            "status": self.status,
+            "summary": self.summary(),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "rows": [row.to_dict() for row in self.rows]
+        }
+
+
+# ============================================================================
+# CSV
+# ============================================================================
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def parse_users_csv(stream: BinaryIO, default_role_id: Optional[int]) -> List[ImportRow]:
+    """
+    Lee el CSV fila por fila y valida cada una con `UserCreate`.
+
+    Returns:
+        Filas del CSV (las inválidas ya marcadas como failed)
+
+    Raises:
+        HTTPException: Si el CSV no tiene las columnas requeridas
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Faltan columnas en el CSV: {', '.join(missing)}"
+            )
+
+        rows = []
+        for line, record in enumerate(reader, start=2):
+            row = ImportRow(line, record)
+            try:
+                role_id = int(record["role_id"]) if (record.get("role_id") or "").strip() else default_role_id
+                row.user_data = UserCreate(
+                    name=row.name,
+                    email=row.email,
+                    codigo_user=row.codigo_user,
+                    password=record.get("password") or "",
+                    confirm_password=record.get("password") or "",
+                    role_id=role_id,
+                    huella=(record.get("huella") or "").strip() or None
+                )
+            except (ValueError, ValidationError) as e:
+                row.fail(_error_message(e))
+            rows.append(row)
+        return rows
+
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El CSV debe estar codificado en UTF-8"
+        )
+    finally:
+        text.detach()  # No cerrar el archivo subido
+
+
+def validate_rows(db: Session, rows: List[ImportRow]) -> None:
+    """
+    Marca como failed las filas con código inválido, duplicadas en el CSV,
+    ya registradas en la BD o con un rol inexistente.
+    """
+    valid = [row for row in rows if row.status == "pending"]
+
+    existing_emails = user_service.existing_values(db, "email", [row.user_data.email for row in valid])
+    existing_codes = user_service.existing_values(db, "codigo_user", [row.codigo_user for row in valid])
+    roles: Dict[int, bool] = {}
+    seen_emails: Set[str] = set()
+    seen_codes: Set[str] = set()
+
+    for row in valid:
+        role_id = row.user_data.role_id
+        if role_id not in roles:
+            try:
+                roles[role_id] = role_service.obtener_rol(db, role_id) is not None
+            except HTTPException:
+                roles[role_id] = False
+
+        # El código se usa como nombre de carpeta
+        if PurePosixPath(row.codigo_user).name != row.codigo_user or "\\" in row.codigo_user or row.codigo_user in (".", ".."):
+            row.fail("El código de usuario no es válido")
+        elif row.user_data.email in seen_emails or row.codigo_user in seen_codes:
+            row.fail("Email o código duplicado en el CSV")
+        elif row.user_data.email in existing_emails:
+            row.fail("El email ya está registrado")
+        elif row.codigo_user in existing_codes:
+            row.fail("El código de usuario ya está registrado")
+        elif not roles[role_id]:
+            row.fail("El rol especificado no existe")
+
+        seen_emails.add(row.user_data.email)
+        seen_codes.add(row.codigo_user)
+
+
+# ============================================================================
+# ARCHIVO DE FOTOS
+# ============================================================================
+def _member_target(member_name: str, wanted: Set[str]) -> Optional[str]:
+    """codigo_user de un miembro `.../<codigo_user>/<imagen>` o None si se ignora."""
+    parts = PurePosixPath(member_name.replace("\\", "/")).parts
+    if len(parts) < 2 or parts[-2] not in wanted:
+        return None
+    if Path(parts[-1]).suffix.lower() not in settings.ALLOWED_IMAGE_EXTENSIONS:
+        return None
+    return parts[-2]
+
+
+def extract_photo_archive(fileobj: BinaryIO, filename: str, wanted: Set[str]) -> Dict[str, List[str]]:
+    """
+    Extrae las fotos de los códigos `wanted` a sus carpetas, miembro por miembro.
+
+    Los zip se leen por su directorio central (requiere un archivo con seek,
+    como el spool de la subida); los tar se leen como stream (`r|*`). Se
+    guardan hasta MAX_IMAGES_PER_PERSON imágenes por código, cada una de
+    hasta MAX_FILE_SIZE bytes.
+
+    Returns:
+        Rutas guardadas por codigo_user
+
+    Raises:
+        HTTPException: Si el archivo no es un zip ni un tar válido
+    """
+    saved: Dict[str, List[str]] = {}
+
+    def save(member_name: str, open_stream: Callable[[], BinaryIO]) -> None:
+        codigo = _member_target(member_name, wanted)
+        if codigo is None:
+            return
+        if codigo not in saved:
+            delete_user_folder(codigo)  # Restos de una importación anterior
+            saved[codigo] = []
+        images = saved[codigo]
+        if len(images) >= MAX_IMAGES_PER_PERSON:
+            return
+        try:
+            with open_stream() as stream:
+                images.append(save_user_image_stream(
+                    codigo, len(images) + 1, member_name, stream, settings.MAX_FILE_SIZE
+                ))
+        except ValueError as e:
+            logger.warning(f"Imagen omitida en la importación: {str(e)}")
+
+    try:
+        fileobj.seek(0)
+        if filename.lower().endswith(".zip") or zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        save(info.filename, lambda info=info: archive.open(info))
+        else:
+            fileobj.seek(0)
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for member in archive:
+                    if member.isfile():
+                        save(member.name, lambda member=member: archive.extractfile(member))
+
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        for codigo in saved:
+            delete_user_folder(codigo)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El archivo de fotos no es un zip o tar válido: {str(e)}"
+        )
+
+    return saved
+
+
+# ============================================================================
+# IMPORTACIÓN
+# ============================================================================
+def prepare_bulk_import(
+    db: Session,
+    users_csv: BinaryIO,
+    photos: BinaryIO,
+    photos_filename: str,
+    batch_size: int = None
+) -> BulkImport:
+    """
+    Etapas síncronas de la importación: CSV, fotos y alta de usuarios por lotes.
+    Se ejecuta fuera del event loop (threadpool); el registro facial queda
+    para `BulkImporter.start`.
+
+    Returns:
+        Importación con las filas creadas (status created) o fallidas
+    """
+    default_role = role_service.obtener_rol_default(db)
+    rows = parse_users_csv(users_csv, default_role.id if default_role else None)
+    validate_rows(db, rows)
+
+    valid = [row for row in rows if row.status == "pending"]
+    saved = extract_photo_archive(photos, photos_filename or "", {row.codigo_user for row in valid})
+
+    to_create = []
+    for row in valid:
+        row.image_paths = saved.get(row.codigo_user, [])
+        if len(row.image_paths) < MIN_IMAGES_PER_PERSON:
+            row.fail(
+                f"Se requieren al menos {MIN_IMAGES_PER_PERSON} imágenes en la carpeta "
+                f"{row.codigo_user}/ (encontradas: {len(row.image_paths)})"
+            )
+            delete_user_folder(row.codigo_user)
+        else:
+            to_create.append(row)
+
+    results = user_service.create_users_batch(
+        db, [row.user_data for row in to_create],
+        batch_size=batch_size or BULK_IMPORT_BATCH_SIZE,
+        hash_workers=BULK_IMPORT_CONCURRENCY
+    )
+    for row, result in zip(to_create, results):
+        if isinstance(result, str):
+            row.fail(result)
+            delete_user_folder(row.codigo_user)
+        else:
+            row.status = "created"
+            row.user_id = result.id
+
+    bulk = BulkImport(rows)
+    logger.info(f"Importación {bulk.import_id}: {bulk.summary()}")
+    return bulk
+
+
+class BulkImporter:
+    """
+    Registro facial de las importaciones y su historial de reportes.
+    """
+
+    def __init__(self, concurrency: int = None, history: int = None, session_factory: Callable = None):
+        """
+        Args:
+            concurrency: Registros faciales en paralelo por importación
+            history: Importaciones que se conservan para consultar su reporte
+            session_factory: Fábrica de sesiones de BD (None = SessionLocal)
+        """
+        self.concurrency = concurrency or BULK_IMPORT_CONCURRENCY
+        self.history = history or BULK_IMPORT_HISTORY
+        self._session_factory = session_factory
+        self._imports: "OrderedDict[str, BulkImport]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get(self, import_id: str) -> Optional[BulkImport]:
+        return self._imports.get(import_id)
+
+    def start(self, bulk: BulkImport) -> asyncio.Task:
+        """Lanza el registro facial de los usuarios creados sin esperarlo."""
+        self._imports[bulk.import_id] = bulk
+        for import_id in list(self._imports):
+            if len(self._imports) <= self.history:
+                break
+            if self._imports[import_id].status == "completed":
+                del self._imports[import_id]
+
+        task = asyncio.get_running_loop().create_task(self.enroll(bulk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def enroll(self, bulk: BulkImport) -> BulkImport:
+        """
+        Registra los rostros de las filas creadas con `concurrency` jobs a la
+        vez; cada job extrae sus imágenes en el pool de inferencia.
+        """
+        jobs = EnrollmentJobManager(concurrency=self.concurrency, session_factory=self._session_factory)
+
+        async def enroll_row(row: ImportRow) -> None:
+            job = await jobs.run(EnrollmentJob(row.user_id, row.codigo_user, row.name, row.image_paths))
+            row.rejected_images = job.rejected
+            if job.status == "completed":
+                row.status = "enrolled"
+            else:
+                row.fail(job.error)
+
+        await asyncio.gather(*(enroll_row(row) for row in bulk.rows if row.status == "created"))
+
+        bulk.status = "completed"
+        bulk.finished_at = datetime.now()
+        logger.info(f"Importación {bulk.import_id} completada: {bulk.summary()}")
+        return bulk
+
+    def cancel(self) -> None:
+        """Cancela las importaciones en curso (apagado del servidor)."""
+        for task in list(self._tasks):
+            task.cancel()
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_importer: Optional[BulkImporter] = None
+
+
+def get_bulk_importer() -> BulkImporter:
+    """
+    Retorna el importador singleton (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de BulkImporter
+    """
+    global _global_importer
+
+    if _global_importer is None:
+        _global_importer = BulkImporter()
+    return _global_importer
+
+
+def reset_bulk_importer() -> None:
+    """Cancela las importaciones en curso y descarta el historial (apagado o testing)."""
+    global _global_importer
+
+    if _global_importer is not None:
+        _global_importer.cancel()
+        _global_importer = None
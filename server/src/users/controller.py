@@ -8,7 +8,9 @@ Define los endpoints REST para:
 - Actualización y eliminación
 
 RUTAS PÚBLICAS (sin autenticación):
-- POST /users/register - Registro de usuario
+- POST /users/register - Registro de usuario (registro facial en segundo plano)
+- POST /users/register/video - Registro de usuario desde un video corto
+- GET /users/enrollment/{job_id} - Estado del registro facial
 - POST /users/login/credentials - Login
 
 RUTAS PROTEGIDAS (requieren autenticación):
@@ -20,9 +22,11 @@ RUTAS PROTEGIDAS (requieren autenticación):
 
 PERMISOS ESPECIALES:
 - Solo ADMIN: GET /users/, PUT /users/{user_id}, DELETE /users/{user_id}
+- Solo ADMIN: POST /users/import, GET /users/import/{import_id} - Importación masiva
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form, File, UploadFile, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import ValidationError
 import json
 from sqlalchemy.orm import Session
@@ -30,11 +34,14 @@ from typing import List, Optional, TYPE_CHECKING
 
 from src.config.database import get_db
 from .service import user_service
+from .enrollment import get_enrollment_jobs
+from .bulk_import import prepare_bulk_import, get_bulk_importer
 from .schemas import UserCreate, UserUpdate, UserResponse, LoginRequest, LoginResponse
 from src.roles.service import role_service
 from src.common_schemas import create_single_response, create_paginated_response, create_error_response
 from src.utils.security import create_tokens
 from src.auth import get_current_user, require_admin, require_can_manage_users
+from src.utils.readiness import require_recognition_ready
 
 if TYPE_CHECKING:
     from src.users.model import User
@@ -48,7 +55,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 # ============================================================================
 
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post("/register", status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_recognition_ready)])
 async def register_user(
     name: str = Form(...),
     email: str = Form(...),
@@ -64,6 +71,10 @@ async def register_user(
     
     🔓 RUTA PÚBLICA (sin autenticación requerida)
     
+    El usuario se crea pendiente (`facial_recognize = false`) y el registro
+    facial se procesa en segundo plano: el avance llega por Socket.IO
+    (room `enrollment:<job_id>`) y se consulta en /users/enrollment/{job_id}.
+    
     Requiere:
     - **name**: Nombre completo del usuario
     - **email**: Correo electrónico único
@@ -76,9 +87,69 @@ async def register_user(
     Returns:
         {
             "data": UserResponse,
+            "enrollment": {"job_id": string, "status": "queued", ...},
+            "message": string
+        }
+    """
+    return await _register_pending_user(
+        db, name, email, codigo_user, password, confirm_password, role_id,
+        user_service.create_user, images
+    )
+
+
+@router.post("/register/video", status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_recognition_ready)])
+async def register_user_video(
+    name: str = Form(...),
+    email: str = Form(...),
+    codigo_user: str = Form(...),
+    password: str = Form(...),
+    confirm_password: str = Form(...),
+    role_id: Optional[int] = Form(None),
+    video: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Registra un nuevo usuario a partir de un video corto del rostro.
+    
+    🔓 RUTA PÚBLICA (sin autenticación requerida)
+    
+    Igual que /users/register, pero en lugar de 10 imágenes recibe un video
+    de unos segundos (el colaborador gira lentamente la cabeza). El job de
+    registro elige los frames nítidos y con poses distintas y continúa como
+    un registro con imágenes.
+    
+    Requiere los mismos campos que /users/register y:
+    - **video**: Video del rostro (mp4, mov, webm, avi o mkv; máx. MAX_VIDEO_SIZE)
+    
+    Returns:
+        {
+            "data": UserResponse,
+            "enrollment": {"job_id": string, "status": "queued", ...},
             "message": string
         }
     """
+    return await _register_pending_user(
+        db, name, email, codigo_user, password, confirm_password, role_id,
+        user_service.create_user_from_video, video, from_video=True
+    )
+
+
+async def _register_pending_user(
+    db: Session,
+    name: str,
+    email: str,
+    codigo_user: str,
+    password: str,
+    confirm_password: str,
+    role_id: Optional[int],
+    create_user,
+    uploads,
+    from_video: bool = False
+):
+    """
+    Valida los datos, crea al usuario pendiente con `create_user` y encola
+    su registro facial (rutas /register y /register/video).
+    """
     try:
         # Si no se proporciona role_id, usar el rol por defecto (COLABORADOR)
         if not role_id:
@@ -102,13 +173,23 @@ async def register_user(
             role_id=role_id_to_use
         )
         
-        # Crear usuario con imágenes
-        user = user_service.create_user(db, user_data, images)
+        # Crear usuario pendiente con imágenes o video (hash y escritura fuera del event loop)
+        if from_video:
+            user, video_path = await run_in_threadpool(create_user, db, user_data, uploads)
+        else:
+            user, video_path = await run_in_threadpool(create_user, db, user_data, uploads), None
         
-        return create_single_response(
+        # Registro facial en segundo plano
+        job = get_enrollment_jobs().submit(
+            user.id, user.codigo_user, display_name=user.name, video_path=video_path
+        )
+        
+        response = create_single_response(
             data=UserResponse.model_validate(user),
-            message="Usuario registrado exitosamente"
+            message="Usuario registrado; el registro facial se está procesando"
         )
+        response["enrollment"] = job.to_dict()
+        return response
     except HTTPException as e:
         raise e
     except ValidationError as e:
@@ -132,6 +213,32 @@ async def register_user(
         )
 
 
+@router.get("/enrollment/{job_id}")
+def get_enrollment_status(job_id: str):
+    """
+    Estado de un registro facial en segundo plano.
+    
+    🔓 RUTA PÚBLICA (el job_id solo lo conoce quien registró al usuario)
+    
+    Returns:
+        {
+            "data": {"job_id", "status", "processed", "total", "error", ...},
+            "message": string
+        }
+    """
+    job = get_enrollment_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de registro no encontrado"
+        )
+    
+    return create_single_response(
+        data=job.to_dict(),
+        message="Estado del registro facial"
+    )
+
+
 @router.post("/login/credentials", response_model=LoginResponse, status_code=status.HTTP_200_OK)
 async def login(
     credentials: LoginRequest,
@@ -202,6 +309,78 @@ async def login(
 # ============================================================================
 # RUTAS PROTEGIDAS (requieren autenticación)
 # ============================================================================
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_recognition_ready)])
+async def import_users(
+    users_csv: UploadFile = File(...),
+    photos: UploadFile = File(...),
+    current_user: "User" = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    🔐 SOLO ADMIN - Importación masiva de usuarios con registro facial.
+    
+    Requiere:
+    - **users_csv**: CSV con columnas name, email, codigo_user, password
+      (opcionales: role_id, huella)
+    - **photos**: zip o tar(.gz) con una carpeta por codigo_user
+    
+    Los usuarios se crean pendientes y sus rostros se registran en segundo
+    plano; el reporte por fila se consulta en /users/import/{import_id}.
+    
+    Returns:
+        {
+            "data": {"import_id", "status", "summary", "rows": [...]},
+            "message": string
+        }
+    """
+    try:
+        bulk = await run_in_threadpool(prepare_bulk_import, db, users_csv.file, photos.file, photos.filename)
+        get_bulk_importer().start(bulk)
+        
+        return create_single_response(
+            data=bulk.to_dict(),
+            message="Importación recibida; el registro facial se está procesando"
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=create_error_response(
+                message="Error al importar usuarios",
+                error=str(e),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        )
+
+
+@router.get("/import/{import_id}")
+def get_import_report(
+    import_id: str,
+    current_user: "User" = Depends(require_admin)
+):
+    """
+    🔐 SOLO ADMIN - Reporte por fila de una importación masiva.
+    
+    Returns:
+        {
+            "data": {"import_id", "status", "summary", "rows": [...]},
+            "message": string
+        }
+    """
+    bulk = get_bulk_importer().get(import_id)
+    if bulk is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Importación no encontrada"
+        )
+    
+    return create_single_response(
+        data=bulk.to_dict(),
+        message="Reporte de importación"
+    )
+
+
 @router.put("/{user_id}")
 def update_user(
     user_id: int,
@@ -540,7 +719,7 @@ def delete_user(
             )
         )
 
-@router.delete("/face/{user_id}")
+@router.delete("/face/{user_id}", dependencies=[Depends(require_recognition_ready)])
 def delete_user_face_data(
     user_id: int,
     current_user: "User" = Depends(get_current_user),
@@ -0,0 +1,419 @@
+"""
+Jobs de registro facial en segundo plano.
+
+`POST /users/register` crea al usuario pendiente (`facial_recognize = False`)
+y encola un job: la ruta responde de inmediato con el id del job en lugar de
+esperar la detección y los ~80 embeddings de las 10 imágenes.
+
+Cada job:
+0. Si el registro es desde video, elige los mejores frames del clip en el
+   pool de inferencia (etapa `video`) y los guarda como imágenes
+1. Detecta el rostro de cada imagen en el pool de inferencia (etapa
+   `analyzing`; una tarea a la vez, para que las marcaciones no esperen
+   detrás del registro)
+2. Puntúa todos los rostros en una pasada y descarta los de baja calidad
+   (ver recognize/enrollment_quality.py); los rechazos quedan en `rejected`
+3. Extrae los embeddings solo de los mejores rostros (etapa `embedding`),
+   ENROLLMENT_FACES_PER_TASK rostros por tarea para llenar un lote del
+   modelo y repartir su preprocesamiento en el pool de hilos
+4. Los guarda en la galería del proceso del servidor (único escritor)
+5. Marca al usuario como registrado, o lo descarta si no hubo rostros
+
+El avance se emite por Socket.IO a la room `enrollment:<job_id>` (el cliente
+se suscribe con el evento `enrollment_subscribe`):
+- enrollment-progress: {job_id, status, stage, processed, total, embedded, ...}
+- enrollment-complete: estado final (completed o failed, con `error`)
+
+El estado también se consulta con `GET /users/enrollment/{job_id}`.
+
+Los jobs solo viven en memoria: al arrancar, cuando el sistema de
+reconocimiento está listo, `start_recovery` retoma los registros que un
+reinicio dejó a medias (ver `recover_pending`).
+"""
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.config.database import get_session_local
+from src.config.settings import get_settings
+from src.recognize.config import (
+    DATA_DIR,
+    MAX_IMAGES_PER_PERSON,
+    ENROLLMENT_CONCURRENCY,
+    ENROLLMENT_RETRY_DELAY,
+    ENROLLMENT_JOB_HISTORY,
+    ENROLLMENT_FACES_PER_TASK
+)
+from src.recognize.inference_pool import InferenceQueueFull, get_inference_pool
+from src.recognize.registro import get_registration
+from src.recognize.utils import get_person_images
+from src.socketsio.socketio_app import sio
+from .service import user_service
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class EnrollmentError(Exception):
+    """El registro facial no se pudo completar (ej: sin rostros válidos)."""
+
+
+class EnrollmentJob:
+    """
+    Estado de un registro facial (queued, processing, completed, failed).
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        codigo_user: str,
+        display_name: str,
+        image_paths: Optional[List[str]] = None,
+        video_path: Optional[str] = None
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.codigo_user = codigo_user
+        self.display_name = display_name
+        self.image_paths = image_paths
+        self.video_path = video_path
+        self.video: Optional[Dict[str, int]] = None
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.processed = 0
+        self.total = len(image_paths) if image_paths else 0
+        self.selected = 0
+        self.embedded = 0
+        self.num_embeddings = 0
+        self.rejected: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def room(self) -> str:
+        """Room de Socket.IO con el avance del job."""
+        return f"enrollment:{self.job_id}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "codigo_user": self.codigo_user,
+            "status": self.status,
+            "stage": self.stage,
+            "processed": self.processed,
+            "total": self.total,
+            "selected": self.selected,
+            "embedded": self.embedded,
+            "num_embeddings": self.num_embeddings,
+            "rejected": self.rejected,
+            "video": self.video,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class EnrollmentJobManager:
+    """
+    Cola de jobs de registro facial del proceso del servidor.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        history: int = None,
+        session_factory: Callable = None
+    ):
+        """
+        Args:
+            concurrency: Jobs que extraen embeddings a la vez
+            history: Jobs que se conservan para consultar su estado
+            session_factory: Fábrica de sesiones de BD (None = SessionLocal)
+        """
+        self.concurrency = concurrency or ENROLLMENT_CONCURRENCY
+        self.history = history or ENROLLMENT_JOB_HISTORY
+        self._session_factory = session_factory
+        self._jobs: "OrderedDict[str, EnrollmentJob]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def get(self, job_id: str) -> Optional[EnrollmentJob]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        user_id: int,
+        codigo_user: str,
+        display_name: str = None,
+        image_paths: Optional[List[str]] = None,
+        video_path: Optional[str] = None
+    ) -> EnrollmentJob:
+        """
+        Encola el registro facial de un usuario pendiente (no espera el resultado).
+
+        Args:
+            user_id: ID del usuario pendiente
+            codigo_user: Clave en la galería (las imágenes se buscan en data/<clave>/)
+            display_name: Nombre visible
+            image_paths: Imágenes del registro (None = carpeta del usuario)
+            video_path: Video del registro (sus mejores frames reemplazan a las imágenes)
+
+        Returns:
+            Job encolado
+        """
+        job = EnrollmentJob(user_id, codigo_user, display_name or codigo_user, image_paths, video_path)
+        self._jobs[job.job_id] = job
+        self._evict()
+
+        self._track(asyncio.get_running_loop().create_task(self.run(job)))
+        return job
+
+    def _track(self, task: asyncio.Task) -> asyncio.Task:
+        """Conserva la tarea hasta que termine (wait_all y cancel la incluyen)."""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def wait_all(self) -> None:
+        """Espera los jobs en curso (testing y apagado ordenado)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def start_recovery(self, readiness) -> asyncio.Task:
+        """
+        Lanza `recover_pending` en segundo plano cuando termine la carga del
+        reconocimiento (si la carga falla, los pendientes esperan al próximo arranque).
+
+        Args:
+            readiness: Estado de carga (`get_readiness()`)
+
+        Returns:
+            Tarea de la recuperación
+        """
+        async def recover() -> None:
+            await readiness.start()
+            if not readiness.ready:
+                logger.warning("Reconocimiento no disponible: los registros pendientes se retoman en el próximo arranque")
+                return
+            try:
+                await self.recover_pending()
+            except Exception as e:
+                logger.error(f"Error al retomar los registros faciales pendientes: {str(e)}")
+
+        return self._track(asyncio.get_running_loop().create_task(recover()))
+
+    async def recover_pending(self) -> Dict[str, int]:
+        """
+        Retoma los registros faciales interrumpidos por un reinicio del servidor.
+
+        Solo considera usuarios creados por el registro en segundo plano cuyo
+        job no terminó (`face_enrollment_pending`):
+        - si sus embeddings ya están en la galería, se marca como registrado
+        - si conserva su video o sus imágenes en data/, se encola un job nuevo
+        - si no, se descarta con `discard_pending_user`
+        Antes marca `facial_recognize` en los usuarios anteriores a este flujo
+        que ya están en la galería (`backfill_facial_recognize`).
+
+        Returns:
+            Contadores backfilled, requeued, completed y discarded
+        """
+        registration = await asyncio.to_thread(get_registration)
+        backfilled = await asyncio.to_thread(self._with_session, user_service.backfill_facial_recognize)
+        pending = await asyncio.to_thread(self._with_session, user_service.get_pending_face_enrollments)
+        allowed_videos = set(get_settings().ALLOWED_VIDEO_EXTENSIONS)
+
+        counts = {"backfilled": backfilled, "requeued": 0, "completed": 0, "discarded": 0}
+        for user in pending:
+            if user_service.get_face_key(user) in registration.database:
+                await asyncio.to_thread(self._with_session, user_service.complete_face_enrollment, user.id)
+                counts["completed"] += 1
+                continue
+
+            folder = DATA_DIR / user.codigo_user
+            videos = [path for path in sorted(folder.glob("enrollment.*")) if path.suffix.lower() in allowed_videos]
+            if videos:
+                self.submit(user.id, user.codigo_user, user.name, video_path=str(videos[0]))
+            elif get_person_images(DATA_DIR, user.codigo_user):
+                self.submit(user.id, user.codigo_user, user.name)
+            else:
+                await asyncio.to_thread(self._with_session, user_service.discard_pending_user, user.id, user.codigo_user)
+                counts["discarded"] += 1
+                continue
+            counts["requeued"] += 1
+
+        if any(counts.values()):
+            logger.info(
+                f"Registros faciales pendientes: {counts['requeued']} reencolados, "
+                f"{counts['completed']} completados, {counts['discarded']} descartados; "
+                f"{counts['backfilled']} usuarios anteriores marcados como registrados"
+            )
+        return counts
+
+    def cancel(self) -> None:
+        """Cancela los jobs en curso (apagado del servidor)."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _evict(self) -> None:
+        """Descarta los jobs terminados más antiguos por encima de `history`."""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+
+    async def run(self, job: EnrollmentJob) -> EnrollmentJob:
+        """Procesa el job y emite su avance; nunca lanza."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            try:
+                job.status = "processing"
+                await self._emit("enrollment-progress", job)
+                await self._process(job)
+                job.status = "completed"
+
+            except Exception as e:
+                job.status = "failed"
+                job.error = user_service.face_enrollment_error_detail(str(e))
+                logger.error(f"Error en registro facial para usuario {job.codigo_user}: {str(e)}")
+                try:
+                    await asyncio.to_thread(self._with_session, user_service.discard_pending_user, job.user_id, job.codigo_user)
+                except Exception as cleanup_error:
+                    logger.error(f"Error al descartar usuario pendiente {job.codigo_user}: {str(cleanup_error)}")
+
+            job.finished_at = datetime.now()
+            await self._emit("enrollment-complete", job)
+            return job
+
+    async def _process(self, job: EnrollmentJob) -> None:
+        registration = await asyncio.to_thread(get_registration)
+        if job.codigo_user in registration.database:
+            raise EnrollmentError(f"La persona '{job.codigo_user}' ya está registrada")
+
+        if job.video_path is not None:
+            await self._extract_video_frames(job)
+
+        if job.image_paths is None:
+            job.image_paths = get_person_images(DATA_DIR, job.codigo_user)
+        job.image_paths = job.image_paths[:MAX_IMAGES_PER_PERSON]
+        job.total = len(job.image_paths)
+        if not job.image_paths:
+            raise EnrollmentError(f"No se encontraron imágenes para: {job.codigo_user}")
+
+        # 1. Detección: un candidato por imagen (o su motivo de rechazo)
+        job.stage = "analyzing"
+        candidates = []
+        for image_path in job.image_paths:
+            candidate, reason = await self._run_in_pool("enrollment_candidate", image_path)
+            if candidate is None:
+                job.rejected.append({"image": Path(image_path).name, "score": None, "reasons": [reason]})
+            else:
+                candidates.append(candidate)
+            job.processed += 1
+            await self._emit("enrollment-progress", job)
+
+        # 2. Ranking de calidad en una sola pasada (antes de cualquier embedding)
+        selected = registration.select_candidates(candidates, job.rejected)
+        job.selected = len(selected)
+
+        # 3. Embeddings (con augmentation) solo de los rostros seleccionados,
+        #    por tareas que llenan un lote del modelo
+        job.stage = "embedding"
+        embeddings = []
+        for start in range(0, len(selected), ENROLLMENT_FACES_PER_TASK):
+            chunk = [candidate["face_img"] for candidate in selected[start:start + ENROLLMENT_FACES_PER_TASK]]
+            embeddings.extend(await self._run_in_pool("enrollment_embeddings", chunk))
+            job.embedded += len(chunk)
+            job.num_embeddings = len(embeddings)
+            await self._emit("enrollment-progress", job)
+
+        if not embeddings:
+            raise EnrollmentError("No se detectó rostro en ninguna imagen")
+
+        registered = await asyncio.to_thread(
+            registration.register_embeddings, job.codigo_user, embeddings, job.image_paths, job.display_name
+        )
+        if not registered:
+            raise EnrollmentError("No se pudo registrar en el sistema de reconocimiento facial")
+
+        await asyncio.to_thread(self._with_session, user_service.complete_face_enrollment, job.user_id)
+
+    async def _extract_video_frames(self, job: EnrollmentJob) -> None:
+        """Reemplaza el video del job por sus mejores frames (guardados junto al video)."""
+        job.stage = "video"
+        await self._emit("enrollment-progress", job)
+
+        # Si el job falla, discard_pending_user elimina la carpeta con el video;
+        # si se cancela (apagado), el video queda para recover_pending
+        video_path = Path(job.video_path)
+        report = await self._run_in_pool("enrollment_video_frames", str(video_path), str(video_path.parent))
+        video_path.unlink(missing_ok=True)
+
+        job.image_paths = report.pop("image_paths")
+        job.video = report
+        if not job.image_paths:
+            raise EnrollmentError("No se detectó rostro en el video")
+
+    async def _run_in_pool(self, method: str, *args) -> Any:
+        """Ejecuta una etapa del registro en el pool; espera si la cola está llena."""
+        pool = get_inference_pool()
+        while True:
+            try:
+                return await pool.run(method, *args)
+            except InferenceQueueFull:
+                await asyncio.sleep(ENROLLMENT_RETRY_DELAY)
+
+    def _with_session(self, fn: Callable, *args) -> Any:
+        factory = self._session_factory or get_session_local()
+        db = factory()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    async def _emit(self, event: str, job: EnrollmentJob) -> None:
+        try:
+            await sio.emit(event, job.to_dict(), room=job.room)
+        except Exception as e:
+            logger.warning(f"No se pudo emitir {event} del job {job.job_id}: {str(e)}")
+
+
+# =====================================================================
+# SINGLETON
+# =====================================================================
+_global_jobs: Optional[EnrollmentJobManager] = None
+
+
+def get_enrollment_jobs() -> EnrollmentJobManager:
+    """
+    Retorna la cola de jobs de registro singleton (se crea la primera vez).
+
+    Returns:
+        Instancia compartida de EnrollmentJobManager
+    """
+    global _global_jobs
+
+    if _global_jobs is None:
+        _global_jobs = EnrollmentJobManager()
+    return _global_jobs
+
+
+def reset_enrollment_jobs() -> None:
+    """Cancela los jobs en curso y descarta la cola (apagado o testing)."""
+    global _global_jobs
+
+    if _global_jobs is not None:
+        _global_jobs.cancel()
+        _global_jobs = None
@@ -23,6 +23,9 @@ class User(BaseModel):
         role_id: ID del rol asignado
         is_active: Estado del usuario (activo/inactivo)
         huella: Huella digital del usuario (opcional, se registra posteriormente)
+        facial_recognize: Tiene embeddings en la galería de reconocimiento facial
+        face_enrollment_pending: Creado por el registro facial en segundo plano
+            y a la espera de su job (ver users/enrollment.py)
         
     Relaciones:
         role: Rol asignado al usuario
@@ -47,6 +50,7 @@ class User(BaseModel):
     is_active = Column(Boolean, default=True, nullable=False)
     huella = Column(Text, nullable=True)  # Huella encriptada en base64 con formato: "<slot>|<datos_encriptados>"
     facial_recognize = Column(Boolean, default=False, nullable=False)
+    face_enrollment_pending = Column(Boolean, default=False, nullable=False)
     
     # Relaciones
     # Use la referencia por nombre de clase simple para evitar errores de
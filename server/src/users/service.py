@@ -9,9 +9,10 @@ Contiene toda la lógica de negocio para:
 - Integración con sistema de reconocimiento facial
 
 Gestión de archivos:
-- Imágenes se guardan temporalmente en /uploads/username/
+- Imágenes se guardan temporalmente en /uploads/codigo_user/
 - Después del registro exitoso, la carpeta se ELIMINA (no son necesarias)
-- Solo los embeddings se guardan permanentemente en database/embeddings.pkl
+- Solo los embeddings se guardan permanentemente en database/embeddings_store/
+- La galería facial se indexa por codigo_user (galerías antiguas: por nombre)
 
 Hereda de BaseService para CRUD genérico:
 - get_by_id() - Obtener usuario por ID
@@ -24,7 +25,8 @@ Hereda de BaseService para CRUD genérico:
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, asc, desc
 from fastapi import HTTPException, status, UploadFile
-from typing import Optional, List
+from typing import Optional, List, Set, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import os
 import logging
 
@@ -32,8 +34,8 @@ from .model import User
 from .schemas import UserCreate, UserUpdate, UserResponse
 from src.roles.service import role_service
 from src.utils.security import hash_password
-from src.utils.file_handler import save_user_images, delete_user_folder
-from src.recognize.registro import quick_register, quick_remove
+from src.utils.file_handler import save_user_images, save_user_video, delete_user_folder
+from src.recognize.registro import get_registration, quick_remove, quick_rename
 from src.utils.base_service import BaseService
 
 # Logger
@@ -52,7 +54,9 @@ class UserService(BaseService):
     - save_with_transaction() - Guardar seguro
     
     Métodos adicionales específicos de usuario:
-    - create_user() - Crear con validaciones y registro facial
+    - create_user() - Crear con validaciones (pendiente de registro facial)
+    - create_users_batch() - Alta de usuarios por lotes (importación masiva)
+    - complete_face_enrollment() / discard_pending_user() - Cierre del job de registro
     - actualizar_huella() - Actualizar huella digital
     """
     
@@ -83,7 +87,20 @@ class UserService(BaseService):
         return self.field_exists(db, "codigo_user", codigo, exclude_id)
     
     # ================= ELIMINAR DE LA LISTA DE RECONOCIMIENTO ================
-    def remove_from_recognition(self, user_id: int) -> bool:
+    def get_face_key(self, user: User) -> str:
+        """
+        Clave del usuario en la galería de reconocimiento facial.
+        
+        La galería se indexa por codigo_user; los registros antiguos se
+        indexaban por nombre, así que se usa el nombre solo si el código no
+        está registrado y el nombre sí.
+        """
+        database = get_registration().database
+        if user.codigo_user not in database and user.name in database:
+            return user.name
+        return user.codigo_user
+    
+    def remove_from_recognition(self, db: Session, user_id: int) -> dict:
         """
         Elimina un usuario del sistema de reconocimiento facial.
         
@@ -91,19 +108,23 @@ class UserService(BaseService):
             user_id: ID del usuario
             
         Returns:
-            True si se eliminó exitosamente
+            Dict con mensaje de confirmación
             
         Raises:
-            Exception: Si falla la eliminación
+            HTTPException: Si el usuario no existe o no tiene datos faciales
         """
-        try:
-            user = self.get_by_id(None, user_id)  # No se necesita DB aquí
-            if not user:
-                raise Exception("Usuario no encontrado")
-            return quick_remove(user.name)
-        except Exception as e:
-            logger.error(f"Error al eliminar {user.name} del sistema de reconocimiento: {str(e)}")
-            raise
+        user = self.get_user(db, user_id)
+        
+        if not quick_remove(self.get_face_key(user)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"El usuario {user.codigo_user} no tiene datos de reconocimiento facial"
+            )
+        
+        return {
+            "success": True,
+            "message": f"Datos faciales de '{user.name}' eliminados exitosamente"
+        }
     
     # ========== CRUD ESPECÍFICO DE USUARIO ==========
     
@@ -114,7 +135,12 @@ class UserService(BaseService):
         images: List[UploadFile]
     ) -> User:
         """
-        Crea un nuevo usuario con registro facial.
+        Crea un nuevo usuario pendiente de registro facial.
+        
+        Guarda las imágenes y el usuario con `facial_recognize = False`; la
+        extracción de embeddings la hace después un job de registro
+        (`src.users.enrollment`), que marca al usuario con
+        `complete_face_enrollment` o lo descarta con `discard_pending_user`.
         
         Validaciones:
         - Exactamente 10 imágenes
@@ -127,11 +153,11 @@ class UserService(BaseService):
             images: Lista de 10 imágenes
             
         Returns:
-            Usuario creado
+            Usuario creado (pendiente de registro facial)
             
         Raises:
             HTTPException: Si faltan imágenes, email/código duplicado, rol no existe,
-                          o falla el registro facial
+                          o falla el guardado de imágenes/usuario
         """
         # Validar que se proporcionen exactamente 10 imágenes
         if len(images) != 10:
@@ -140,21 +166,11 @@ class UserService(BaseService):
                 detail="Se requieren exactamente 10 imágenes para el registro facial"
             )
         
-        # Validar unicidad usando BaseService
-        self.assert_field_unique(db, "email", user_data.email, "El email ya está registrado")
-        self.assert_field_unique(db, "codigo_user", user_data.codigo_user, "El código de usuario ya está registrado")
-        
-        # Validar que el rol existe
-        role = role_service.obtener_rol(db, user_data.role_id)
-        if not role:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="El rol especificado no existe"
-            )
+        self._validate_new_user(db, user_data)
         
         # Guardar imágenes en el sistema de archivos
         try:
-            images_saved = save_user_images(user_data.name, images)
+            images_saved = save_user_images(user_data.codigo_user, images)
             if not images_saved:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -166,78 +182,221 @@ class UserService(BaseService):
                 detail=f"Error al procesar las imágenes: {str(e)}"
             )
         
+        return self._save_pending_user(db, user_data)
+    
+    def create_user_from_video(
+        self,
+        db: Session,
+        user_data: UserCreate,
+        video: UploadFile
+    ) -> Tuple[User, str]:
+        """
+        Crea un nuevo usuario pendiente de registro facial a partir de un video.
+        
+        Guarda el video en la carpeta del usuario; el job de registro elige
+        los mejores frames (`FaceRecognizer.enrollment_video_frames`) y sigue
+        como un registro con imágenes.
+        
+        Args:
+            user_data: Datos del usuario
+            video: Video corto del rostro
+            
+        Returns:
+            Tupla (usuario creado pendiente de registro facial, ruta del video)
+            
+        Raises:
+            HTTPException: Si el video no es válido, email/código duplicado,
+                          rol no existe, o falla el guardado del usuario
+        """
+        self._validate_new_user(db, user_data)
+        video_path = save_user_video(user_data.codigo_user, video)
+        return self._save_pending_user(db, user_data), video_path
+    
+    def _validate_new_user(self, db: Session, user_data: UserCreate) -> None:
+        """Valida email y código únicos y que el rol exista."""
+        # Validar unicidad usando BaseService
+        self.assert_field_unique(db, "email", user_data.email, "El email ya está registrado")
+        self.assert_field_unique(db, "codigo_user", user_data.codigo_user, "El código de usuario ya está registrado")
+        
+        # Validar que el rol existe
+        role = role_service.obtener_rol(db, user_data.role_id)
+        if not role:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="El rol especificado no existe"
+            )
+    
+    def _save_pending_user(self, db: Session, user_data: UserCreate) -> User:
+        """
+        Guarda el usuario pendiente de registro facial; si falla, elimina los
+        archivos ya guardados en su carpeta.
+        """
         # Encriptar contraseña
         hashed_password = hash_password(user_data.password)
         
-        # Crear usuario
-        user = User(
+        # Crear usuario (pendiente hasta que termine el job de registro facial)
+        user = self._new_user(user_data, hashed_password)
+        
+        try:
+            # Guardar en BD usando transacción segura
+            return self.save_with_transaction(db, user, "Error al crear el usuario")
+        except Exception:
+            # Limpiar imágenes guardadas en caso de error
+            delete_user_folder(user_data.codigo_user)
+            raise
+    
+    def existing_values(self, db: Session, field_name: str, values: List[str]) -> Set[str]:
+        """
+        Valores de `field_name` que ya están registrados, con una sola consulta
+        (validación de unicidad de un lote de importación).
+        """
+        if not values:
+            return set()
+        field = getattr(User, field_name)
+        return {row[0] for row in db.query(field).filter(field.in_(values)).all()}
+    
+    def create_users_batch(
+        self,
+        db: Session,
+        users_data: List[UserCreate],
+        batch_size: int = 50,
+        hash_workers: int = 4
+    ) -> List[Union[User, str]]:
+        """
+        Crea usuarios pendientes de registro facial en transacciones por lote.
+        
+        Las contraseñas se encriptan en paralelo (bcrypt libera el GIL) y cada
+        lote se guarda con un solo commit. Si un lote falla (ej: un duplicado
+        que apareció mientras tanto), se reintenta fila por fila para aislar
+        el error sin perder el resto del lote.
+        
+        Args:
+            users_data: Usuarios ya validados (unicidad, rol)
+            batch_size: Usuarios por transacción
+            hash_workers: Hilos para encriptar contraseñas
+            
+        Returns:
+            Por cada usuario de entrada: el User creado o el mensaje de error
+        """
+        with ThreadPoolExecutor(max_workers=max(1, hash_workers)) as executor:
+            hashed_passwords = list(executor.map(hash_password, [data.password for data in users_data]))
+        
+        results: List[Union[User, str]] = []
+        for start in range(0, len(users_data), batch_size):
+            chunk = list(zip(users_data[start:start + batch_size], hashed_passwords[start:start + batch_size]))
+            users = [self._new_user(data, hashed) for data, hashed in chunk]
+            try:
+                db.add_all(users)
+                db.commit()
+                results.extend(users)
+                continue
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Lote de usuarios rechazado, reintentando fila por fila: {str(e)}")
+            
+            for data, hashed in chunk:
+                try:
+                    results.append(self.save_with_transaction(db, self._new_user(data, hashed), "Error al crear el usuario"))
+                except HTTPException as e:
+                    results.append(str(e.detail))
+        
+        return results
+    
+    @staticmethod
+    def _new_user(user_data: UserCreate, hashed_password: str) -> User:
+        """Usuario nuevo pendiente de registro facial."""
+        return User(
             name=user_data.name,
             email=user_data.email,
             codigo_user=user_data.codigo_user,
             password=hashed_password,
             role_id=user_data.role_id,
             is_active=True,
+            facial_recognize=False,
+            face_enrollment_pending=True,
             huella=user_data.huella  # Asignar huella si se proporciona (opcional)
         )
+    
+    def complete_face_enrollment(self, db: Session, user_id: int) -> Optional[User]:
+        """
+        Marca el registro facial de un usuario pendiente como completado.
+        
+        Los embeddings ya están guardados en database/embeddings_store/, así
+        que la carpeta de imágenes temporales se elimina.
+        
+        Returns:
+            Usuario actualizado (None si se eliminó mientras se procesaba)
+        """
+        user = self.get_by_field(db, "id", user_id)
+        if user is None:
+            return None
+        
+        user.facial_recognize = True
+        user.face_enrollment_pending = False
+        user = self.update_with_transaction(db, user, "Error al completar el registro facial")
+        delete_user_folder(user.codigo_user)
+        return user
+    
+    def discard_pending_user(self, db: Session, user_id: int, codigo_user: str) -> None:
+        """
+        Rollback de un registro facial fallido: elimina el usuario pendiente
+        y su carpeta de imágenes. Solo toca usuarios creados por el registro
+        en segundo plano que siguen pendientes (`face_enrollment_pending`).
+        """
+        user = self.get_by_field(db, "id", user_id)
+        if user is not None:
+            if not user.face_enrollment_pending or user.facial_recognize:
+                return
+            self.delete_with_transaction(db, user, "Error al eliminar el usuario pendiente")
         
+        delete_user_folder(codigo_user)
+    
+    def get_pending_face_enrollments(self, db: Session) -> List[User]:
+        """
+        Usuarios creados por el registro facial en segundo plano cuyo job no
+        terminó (`face_enrollment_pending`), ej: por un reinicio del servidor.
+        """
+        return db.query(User).filter(User.face_enrollment_pending.is_(True)).all()
+    
+    def backfill_facial_recognize(self, db: Session) -> int:
+        """
+        Marca `facial_recognize` en los usuarios anteriores al registro en
+        segundo plano que ya tienen embeddings en la galería (indexados por
+        codigo_user o, los más antiguos, por nombre).
+        
+        Returns:
+            Usuarios actualizados
+        """
+        database = get_registration().database
+        users = db.query(User).filter(
+            User.facial_recognize.is_(False), User.face_enrollment_pending.is_(False)
+        ).all()
+        enrolled = [user for user in users if self.get_face_key(user) in database]
+        if not enrolled:
+            return 0
+        
+        for user in enrolled:
+            user.facial_recognize = True
         try:
-            # Guardar en BD usando transacción segura
-            user = self.save_with_transaction(db, user, "Error al crear el usuario")
-            
-            # Registrar en el sistema de reconocimiento facial
-            try:
-                registration_success = quick_register(user.name)
-                
-                # Verificar si el registro fue exitoso
-                if not registration_success:
-                    raise Exception("No se pudo registrar en el sistema de reconocimiento facial")
-                    
-            except Exception as e:
-                # Si falla el registro facial, hacer rollback completo
-                logger.error(f"Error en registro facial para usuario {user.name}: {str(e)}")
-                
-                # Eliminar usuario de la base de datos
-                db.delete(user)
-                db.commit()
-                
-                # Eliminar carpeta de imágenes
-                delete_user_folder(user.name)
-                
-                # Determinar mensaje de error apropiado
-                error_msg = str(e)
-                if "No se detectó rostro" in error_msg or "No se pudo extraer" in error_msg:
-                    detail_msg = (
-                        "No se detectaron rostros válidos en las imágenes. "
-                        "Por favor, asegúrate de que:\n"
-                        "- Las fotos muestren claramente tu rostro\n"
-                        "- Haya buena iluminación\n"
-                        "- La cámara esté enfocada\n"
-                        "- No uses accesorios que cubran el rostro"
-                    )
-                else:
-                    detail_msg = f"Error al registrar en el sistema de reconocimiento: {error_msg}"
-                
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=detail_msg
-                )
-            
-            # ✅ REGISTRO EXITOSO - Eliminar carpeta de imágenes temporales
-            # Los embeddings ya están guardados en database/embeddings.pkl
-            # Las imágenes originales ya no son necesarias
-            delete_user_folder(user.name)
-            
-            return user
-            
-        except HTTPException:
+            db.commit()
+        except Exception:
+            db.rollback()
             raise
-        except Exception as e:
-            # Limpiar imágenes guardadas en caso de error
-            delete_user_folder(user_data.name)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al crear el usuario: {str(e)}"
+        return len(enrolled)
+    
+    @staticmethod
+    def face_enrollment_error_detail(error_msg: str) -> str:
+        """Mensaje para el cliente cuando falla el registro facial."""
+        if "No se detectó rostro" in error_msg or "No se pudo extraer" in error_msg:
+            return (
+                "No se detectaron rostros válidos en las imágenes. "
+                "Por favor, asegúrate de que:\n"
+                "- Las fotos muestren claramente tu rostro\n"
+                "- Haya buena iluminación\n"
+                "- La cámara esté enfocada\n"
+                "- No uses accesorios que cubran el rostro"
             )
+        return f"Error al registrar en el sistema de reconocimiento: {error_msg}"
     
     def get_user(self, db: Session, user_id: int) -> User:
         """
@@ -315,9 +474,11 @@ class UserService(BaseService):
                                     "El email ya está registrado", exclude_id=user_id)
         
         # Validar unicidad de código si se está actualizando
+        old_face_key = None
         if user_data.codigo_user and user_data.codigo_user != user.codigo_user:
             self.assert_field_unique(db, "codigo_user", user_data.codigo_user,
                                     "El código de usuario ya está registrado", exclude_id=user_id)
+            old_face_key = self.get_face_key(user)
         
         # Actualizar campos
         update_dict = user_data.model_dump(exclude_unset=True)
@@ -330,19 +491,25 @@ class UserService(BaseService):
             setattr(user, key, value)
         
         # Usar transacción segura del BaseService
-        return self.update_with_transaction(db, user, "Error al actualizar el usuario")
+        user = self.update_with_transaction(db, user, "Error al actualizar el usuario")
+        
+        # La galería facial se indexa por código: mover los embeddings a la nueva clave
+        if old_face_key is not None and old_face_key in get_registration().database:
+            quick_rename(old_face_key, user.codigo_user)
+        
+        return user
     
     def delete_user(self, db: Session, user_id: int) -> dict:
         """
         Elimina un usuario y sus datos asociados del sistema.
         
         Elimina:
-        1. Embeddings faciales del sistema de reconocimiento (database/embeddings.pkl)
+        1. Embeddings faciales del sistema de reconocimiento (database/embeddings_store/)
         2. Usuario de la base de datos
         
-        NOTA: La carpeta de imágenes (/uploads/username/) ya fue eliminada
-        después del registro exitoso en create_user(), por lo que NO se vuelve
-        a eliminar aquí.
+        NOTA: La carpeta de imágenes (/uploads/codigo_user/) ya fue eliminada
+        al completar el registro facial (complete_face_enrollment()), por lo
+        que NO se vuelve a eliminar aquí.
         
         Args:
             db: Sesión de base de datos
@@ -360,9 +527,9 @@ class UserService(BaseService):
         
         try:
             # 1️⃣ Eliminar embeddings del sistema de reconocimiento facial
-            # Los embeddings se guardan en database/embeddings.pkl
+            # Los embeddings se guardan en database/embeddings_store/
             try:
-                quick_remove(user_name)
+                quick_remove(self.get_face_key(user))
             except Exception as e:
                 # Registrar advertencia pero continuar con la eliminación
                 import logging
@@ -372,7 +539,7 @@ class UserService(BaseService):
             # 2️⃣ Eliminar usuario de la base de datos usando transacción segura
             self.delete_with_transaction(db, user, "Error al eliminar usuario")
             
-            # ✅ La carpeta /uploads/username/ ya fue eliminada en create_user()
+            # ✅ La carpeta /uploads/username/ ya fue eliminada en complete_face_enrollment()
             # No es necesario intentar eliminarla aquí
             
             return {
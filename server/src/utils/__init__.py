@@ -1,11 +1,16 @@
 """Utilities module"""
 from .security import hash_password, verify_password
-from .file_handler import validate_image, save_user_images, delete_user_folder
+from .file_handler import validate_image, save_user_images, save_user_image_stream, save_user_video, delete_user_folder, decode_upload_image
+from .readiness import require_recognition_ready
 
 __all__ = [
     "hash_password",
     "verify_password",
     "validate_image",
     "save_user_images",
-    "delete_user_folder"
+    "save_user_image_stream",
+    "save_user_video",
+    "delete_user_folder",
+    "decode_upload_image",
+    "require_recognition_ready"
 ]
@@ -1,9 +1,13 @@
 """
 File handling utilities for image upload and management
 """
+import io
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List
 import shutil
+
+import cv2
+import numpy as np
 from fastapi import UploadFile, HTTPException, status
 
 from src.config.settings import get_settings
@@ -99,6 +103,98 @@ def save_user_images(username: str, images: List[UploadFile]) -> List[str]:
         raise e
 
 
+def _copy_stream(stream: BinaryIO, file_path: Path, max_bytes: int) -> bool:
+    """
+    Copy a stream to file_path in 64KB chunks.
+
+    Returns:
+        False (and removes the partial file) if the stream exceeds max_bytes
+    """
+    written = 0
+    with open(file_path, 'wb') as out_file:
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                break
+            out_file.write(chunk)
+
+    if written > max_bytes:
+        file_path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def save_user_image_stream(username: str, index: int, filename: str, stream: BinaryIO, max_bytes: int) -> str:
+    """
+    Save one user image from a file-like stream, copying it in chunks.
+
+    Used by the bulk import to write archive members without loading the
+    archive (or the image) fully into memory.
+
+    Args:
+        username: Username for folder creation
+        index: Image number (file is saved as image_<index><ext>)
+        filename: Original filename (only its extension is used)
+        stream: Readable binary stream with the image content
+        max_bytes: Maximum image size; larger images are rejected
+
+    Returns:
+        Saved file path
+
+    Raises:
+        ValueError: If the image is larger than max_bytes
+    """
+    user_folder = Path(settings.UPLOAD_DIR) / username
+    user_folder.mkdir(parents=True, exist_ok=True)
+    file_path = user_folder / f"image_{index}{Path(filename).suffix.lower()}"
+
+    if not _copy_stream(stream, file_path, max_bytes):
+        raise ValueError(f"Image {filename} exceeds {max_bytes} bytes")
+
+    return str(file_path)
+
+
+def save_user_video(username: str, video: UploadFile) -> str:
+    """
+    Validate and save an enrollment video to the user's folder.
+
+    The upload is copied in chunks, so the video is never fully loaded
+    into memory.
+
+    Args:
+        username: Username for folder creation
+        video: Uploaded video file
+
+    Returns:
+        Saved file path
+
+    Raises:
+        HTTPException: If the file type is not allowed or it exceeds MAX_VIDEO_SIZE
+    """
+    file_ext = Path(video.filename or "").suffix.lower()
+    if file_ext not in settings.ALLOWED_VIDEO_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid video type. Allowed types: {', '.join(sorted(settings.ALLOWED_VIDEO_EXTENSIONS))}"
+        )
+
+    user_folder = Path(settings.UPLOAD_DIR) / username
+    user_folder.mkdir(parents=True, exist_ok=True)
+    file_path = user_folder / f"enrollment{file_ext}"
+
+    video.file.seek(0)
+    if not _copy_stream(video.file, file_path, settings.MAX_VIDEO_SIZE):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Video size exceeds maximum allowed size of {settings.MAX_VIDEO_SIZE / 1024 / 1024}MB"
+        )
+
+    return str(file_path)
+
+
 def delete_user_folder(username: str) -> None:
     """
     Delete user's data folder.
@@ -110,3 +206,41 @@ def delete_user_folder(username: str) -> None:
     
     if user_folder.exists():
         shutil.rmtree(user_folder)
+
+
+def decode_upload_image(image: UploadFile) -> np.ndarray:
+    """
+    Decode an uploaded image in memory, without writing it to disk.
+    
+    The upload spool is read through a memoryview (zero-copy while it is
+    still in memory) and decoded with `cv2.imdecode`.
+    
+    Args:
+        image: Uploaded image file
+        
+    Returns:
+        Decoded BGR image
+        
+    Raises:
+        HTTPException: If the file is empty or is not a valid image
+    """
+    spool = image.file
+    raw = getattr(spool, "_file", spool)  # SpooledTemporaryFile -> BytesIO while in memory
+    
+    if isinstance(raw, io.BytesIO):
+        buffer = raw.getbuffer()
+    else:
+        spool.seek(0)
+        buffer = memoryview(spool.read())
+    
+    with buffer:
+        decoded = None
+        if buffer.nbytes > 0:
+            decoded = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+    
+    if decoded is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or empty image file"
+        )
+    return decoded
@@ -0,0 +1,29 @@
+"""
+Readiness dependency for routes that need the facial recognition system
+"""
+from fastapi import HTTPException, status
+
+
+async def require_recognition_ready() -> None:
+    """
+    Reject facial routes while the models load in the background.
+    
+    Raises:
+        HTTPException 503: With Retry-After until the recognition system is ready
+    """
+    from src.recognize.config import READINESS_RETRY_AFTER
+    from src.recognize.readiness import get_readiness
+    
+    readiness = get_readiness()
+    if readiness.ready:
+        return
+    
+    if readiness.state == "failed":
+        detail = "Sistema de reconocimiento facial no disponible"
+    else:
+        detail = "Sistema de reconocimiento facial iniciando, intente nuevamente"
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(READINESS_RETRY_AFTER)}
+    )
@@ -31,6 +31,13 @@ def _patch_heavy_initializers(monkeypatch):
     except Exception:
         pass
 
+    # Pool de inferencia en hilo (sin procesos que carguen modelos)
+    try:
+        import src.recognize.inference_pool as inference_pool_mod
+        monkeypatch.setattr(inference_pool_mod, 'NUM_WORKERS', 0)
+    except Exception:
+        pass
+
     # Parchear scheduler para que no arranque jobs
     try:
         import src.jobs.scheduler as scheduler_mod
@@ -139,6 +146,12 @@ def _patch_heavy_initializers_no_monkeypatch():
     except Exception:
         pass
 
+    try:
+        import src.recognize.inference_pool as inference_pool_mod
+        inference_pool_mod.NUM_WORKERS = 0
+    except Exception:
+        pass
+
     try:
         import src.jobs.scheduler as scheduler_mod
         scheduler_mod.start_scheduler = lambda *a, **k: None
@@ -206,7 +219,11 @@ def prepare_app(monkeypatch, _prepare_app_session, test_session_factory):
 @pytest.fixture()
 def client(prepare_app):
     """Proporciona TestClient para la app con DB en memoria"""
+    from src.recognize.readiness import get_readiness
+    
     with TestClient(prepare_app) as c:
+        # Carga del reconocimiento en segundo plano (no-op con los parches)
+        get_readiness().wait(timeout=10)
         yield c
 
 
@@ -324,3 +324,26 @@ def test_asistencia_invalid_time_format(client):
         HTTPStatus.INTERNAL_SERVER_ERROR,
         HTTPStatus.METHOD_NOT_ALLOWED
     ]
+
+
+def test_tiempos_reconocimiento_admin(client, admin_user_and_token):
+    """Prueba que el admin obtiene los tiempos por etapa del reconocimiento."""
+    from src.recognize.profiling import get_profiler
+    
+    admin_user, admin_token = admin_user_and_token
+    admin_headers = get_auth_headers(admin_token)
+    get_profiler().record("matching", 3.5)
+    
+    resp = client.get("/api/asistencia/admin/reconocimiento/tiempos", headers=admin_headers)
+    assert resp.status_code == HTTPStatus.OK
+    data = resp.json()["data"]
+    assert data["stages"]["matching"]["count"] >= 1
+    assert "p99_ms" in data["stages"]["matching"]
+
+
+def test_tiempos_reconocimiento_empleado(client, employee_user_and_token):
+    """Prueba que un empleado no puede ver los tiempos del reconocimiento."""
+    employee_user, employee_token = employee_user_and_token
+    
+    resp = client.get("/api/asistencia/admin/reconocimiento/tiempos", headers=get_auth_headers(employee_token))
+    assert resp.status_code == HTTPStatus.FORBIDDEN
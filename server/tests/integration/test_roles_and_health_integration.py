@@ -17,6 +17,44 @@ def test_health_endpoint(client):
     assert "scheduler" in data
 
 
+def test_health_live(client):
+    """Test: /health/live responde sin depender de los modelos."""
+    resp = client.get("/health/live")
+    assert resp.status_code == HTTPStatus.OK
+    assert resp.json()["status"] == "alive"
+
+
+def test_health_ready(client):
+    """Test: /health/ready reporta modelos, galería y base de datos listos."""
+    resp = client.get("/health/ready")
+    assert resp.status_code == HTTPStatus.OK
+    data = resp.json()
+    assert data["status"] == "ready"
+    assert data["database"] is True
+    assert data["recognition"]["models"] and data["recognition"]["gallery"]
+
+
+def test_health_ready_mientras_carga(client, monkeypatch):
+    """Test: mientras cargan los modelos, /health/ready y las rutas faciales responden 503."""
+    from src.recognize.readiness import get_readiness
+    
+    monkeypatch.setattr(get_readiness(), "state", "loading")
+    
+    resp = client.get("/health/ready")
+    assert resp.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert resp.json()["recognition"]["state"] == "loading"
+    
+    resp = client.post(
+        "/api/asistencia/registro-facial?codigo=EMP001",
+        files={"image": ("face.jpg", b"fake", "image/jpeg")}
+    )
+    assert resp.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert "Retry-After" in resp.headers
+    
+    # Las rutas no faciales siguen respondiendo
+    assert client.get("/api/roles/?page=1&pageSize=10").status_code == HTTPStatus.OK
+
+
 def test_roles_public_list(client):
     """Test: Listar roles es PÚBLICO (sin autenticación)."""
     resp = client.get("/api/roles/?page=1&pageSize=10")
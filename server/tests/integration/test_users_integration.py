@@ -2,7 +2,7 @@
 Pruebas de integración para usuarios.
 
 Cubre:
-- Registro de usuario
+- Registro de usuario (imágenes y video)
 - Listado de usuarios
 - Obtención de usuario por ID
 - Actualización de usuario
@@ -146,6 +146,29 @@ def test_create_user_duplicate_email(client):
         assert resp2.status_code in [HTTPStatus.BAD_REQUEST, HTTPStatus.CONFLICT, HTTPStatus.UNPROCESSABLE_ENTITY]
 
 
+def test_register_video_rejects_invalid_type(client):
+    """Prueba que el registro desde video rechaza archivos que no son video."""
+    payload = {
+        "name": "Video User",
+        "email": "videouser@example.com",
+        "codigo_user": "VID001",
+        "password": "password123",
+        "confirm_password": "password123",
+        "role_id": 1
+    }
+    files = {"video": ("rostro.txt", BytesIO(b"no es un video"), "text/plain")}
+    
+    resp = client.post("/api/users/register/video", data=payload, files=files)
+    assert resp.status_code == HTTPStatus.BAD_REQUEST, resp.text
+    assert "video" in resp.json()["detail"].lower()
+
+
+def test_enrollment_status_not_found(client):
+    """Prueba que un job de registro facial desconocido responde 404."""
+    resp = client.get("/api/users/enrollment/desconocido")
+    assert resp.status_code == HTTPStatus.NOT_FOUND
+
+
 def test_get_user_by_codigo(client, admin_user_and_token):
     """Prueba obtención de usuario por código."""
     admin_user, admin_token = admin_user_and_token
@@ -255,3 +278,79 @@ def test_get_all_users_minimal(client, admin_user_and_token):
     resp = client.get("/api/users?page=1&pageSize=100", headers=admin_headers)
     # Puede retornar OK si el endpoint existe, o error de servidor
     assert resp.status_code in [HTTPStatus.OK, HTTPStatus.NOT_FOUND, HTTPStatus.UNPROCESSABLE_ENTITY, HTTPStatus.INTERNAL_SERVER_ERROR]
+
+
+def test_bulk_import_users(client, admin_user_and_token, test_session_factory, monkeypatch):
+    """Prueba la importación masiva: CSV + zip con una carpeta por código."""
+    import zipfile
+    from src.users.bulk_import import BulkImporter
+    from src.users.model import User
+
+    async def enroll(self, bulk):
+        return bulk
+
+    # El registro facial en segundo plano se prueba en los tests unitarios
+    monkeypatch.setattr(BulkImporter, "enroll", enroll)
+
+    admin_user, token = admin_user_and_token
+    headers = get_auth_headers(token)
+    role_id = admin_user.role_id
+
+    users_csv = (
+        "name,email,codigo_user,password,role_id\n"
+        f"Bulk Uno,bulk1@example.com,BLK001,password123,{role_id}\n"
+        f"Bulk Dos,bulk2@example.com,BLK002,password123,{role_id}\n"
+        f"Bulk Tres,bulk1@example.com,BLK003,password123,{role_id}\n"
+        f"Bulk Cuatro,bulk4@example.com,BLK004,corta,{role_id}\n"
+    )
+    photos = BytesIO()
+    with zipfile.ZipFile(photos, "w") as archive:
+        for i in range(8):
+            archive.writestr(f"sucursal/BLK001/foto{i}.jpg", create_test_image().getvalue())
+        archive.writestr("sucursal/BLK002/foto0.jpg", create_test_image().getvalue())
+    photos.seek(0)
+
+    resp = client.post(
+        "/api/users/import",
+        headers=headers,
+        files={
+            "users_csv": ("usuarios.csv", users_csv.encode(), "text/csv"),
+            "photos": ("fotos.zip", photos.getvalue(), "application/zip"),
+        },
+    )
+    assert resp.status_code == HTTPStatus.ACCEPTED
+    data = resp.json()["data"]
+    rows = {row["codigo_user"]: row for row in data["rows"]}
+
+    assert rows["BLK001"]["status"] == "created" and rows["BLK001"]["images"] == 8
+    assert rows["BLK002"]["status"] == "failed" and "imágenes" in rows["BLK002"]["error"]
+    assert "duplicado" in rows["BLK003"]["error"]
+    assert rows["BLK004"]["status"] == "failed"
+    assert data["summary"]["created"] == 1 and data["summary"]["failed"] == 3
+
+    db = test_session_factory()
+    try:
+        user = db.query(User).filter_by(codigo_user="BLK001").first()
+        assert user is not None and user.facial_recognize is False
+        assert db.query(User).filter_by(codigo_user="BLK002").first() is None
+    finally:
+        db.close()
+
+    report = client.get(f"/api/users/import/{data['import_id']}", headers=headers)
+    assert report.status_code == HTTPStatus.OK
+    assert report.json()["data"]["import_id"] == data["import_id"]
+
+    from src.utils.file_handler import delete_user_folder
+    delete_user_folder("BLK001")
+
+
+def test_bulk_import_requires_admin(client):
+    """Prueba que la importación masiva requiere autenticación."""
+    resp = client.post(
+        "/api/users/import",
+        files={
+            "users_csv": ("usuarios.csv", b"name,email,codigo_user,password\n", "text/csv"),
+            "photos": ("fotos.zip", b"", "application/zip"),
+        },
+    )
+    assert_unauthorized(resp)
@@ -0,0 +1,77 @@
+"""
+Helpers para tests del sistema de reconocimiento facial.
+
+Proveen un módulo `deepface` falso (sin TensorFlow) que cuenta las invocaciones
+del backend, para poder probar el pipeline sin descargar modelos.
+"""
+import sys
+import types
+
+import numpy as np
+
+
+EMBEDDING_DIM = 32
+
+
+def fake_embedding(face: np.ndarray) -> np.ndarray:
+    """Embedding determinista a partir del contenido de la imagen."""
+    face = np.asarray(face, dtype=np.float64)
+    flat = face.reshape(-1)
+    chunks = np.array_split(flat, EMBEDDING_DIM)
+    return np.array([chunk.mean() for chunk in chunks]) + 1.0
+
+
+class FakeDeepFace:
+    """Sustituto de `deepface.DeepFace` que registra cada llamada."""
+
+    def __init__(self, faces_per_image: int = 1, face_size: int = 120, supports_batches: bool = True):
+        self.faces_per_image = faces_per_image
+        self.face_size = face_size
+        self.supports_batches = supports_batches
+        self.extract_calls = 0
+        self.represent_calls = 0
+        self.represented_faces = 0
+
+    def extract_faces(self, img_path, detector_backend=None, enforce_detection=False, align=True):
+        self.extract_calls += 1
+        image = np.asarray(img_path)
+        if image.ndim != 3 or image.max() == 0:
+            return []
+
+        faces = []
+        size = self.face_size
+        for i in range(self.faces_per_image):
+            x = 5 + i * (size + 5)
+            crop = image[5:5 + size, x:x + size]
+            faces.append({
+                'face': crop[:, :, ::-1].astype(np.float64) / 255.0,
+                'facial_area': {'x': x, 'y': 5, 'w': crop.shape[1], 'h': crop.shape[0]},
+                'confidence': 0.99
+            })
+        return faces
+
+    def represent(self, img_path, model_name=None, detector_backend=None, enforce_detection=True, align=True):
+        self.represent_calls += 1
+        if isinstance(img_path, list):
+            if not self.supports_batches:
+                raise ValueError("Input img must be 3 dimensional")
+            self.represented_faces += len(img_path)
+            results = [[{'embedding': fake_embedding(img).tolist()}] for img in img_path]
+            return results[0] if len(img_path) == 1 else results
+        self.represented_faces += 1
+        return [{'embedding': fake_embedding(img_path).tolist()}]
+
+
+def install_fake_deepface(monkeypatch, **kwargs) -> FakeDeepFace:
+    """Instala un paquete `deepface` falso en sys.modules y retorna el backend."""
+    fake = FakeDeepFace(**kwargs)
+    module = types.ModuleType("deepface")
+    module.DeepFace = fake
+    monkeypatch.setitem(sys.modules, "deepface", module)
+    return fake
+
+
+def face_image(seed: int = 0, size: int = 260) -> np.ndarray:
+    """Imagen BGR sintética con textura suficiente para pasar el control de calidad."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(20, 235, size=(size, size, 3), dtype=np.uint8)
@@ -45,3 +45,61 @@ class TestAsistenciaService:
             mock.return_value = [Mock(id=1, user_id=1)]
             resultado = asistencia_service.get_asistencias_usuario(mock_db, 1)
             assert mock.called
+
+
+class TestRegistroFacialEnMemoria:
+    """Tests de la ingesta de imágenes en memoria para registro facial."""
+
+    @pytest.fixture
+    def upload(self):
+        import tempfile
+        from pathlib import Path
+        from fastapi import UploadFile
+
+        image_path = Path(__file__).parent.parent / "powershell" / "test_images" / "image1.jpg"
+        spool = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        spool.write(image_path.read_bytes())
+        spool.seek(0)
+        return UploadFile(spool, filename="image1.jpg")
+
+    def test_decodifica_sin_disco(self, upload):
+        """Test: la imagen se decodifica desde el spool en memoria."""
+        from src.utils.file_handler import decode_upload_image
+
+        image = decode_upload_image(upload)
+
+        assert image.shape == (720, 1280, 3)
+        assert not upload.file._rolled
+
+    def test_imagen_invalida(self):
+        """Test: bytes que no son imagen -> 400."""
+        import io
+        from fastapi import UploadFile
+        from src.utils.file_handler import decode_upload_image
+
+        with pytest.raises(HTTPException) as exc:
+            decode_upload_image(UploadFile(io.BytesIO(b"no es una imagen"), filename="x.jpg"))
+        assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio
+    async def test_verifica_con_array(self, upload):
+        """Test: el pool recibe el array decodificado, no una ruta."""
+        import numpy as np
+        from unittest.mock import AsyncMock
+        from src.asistencias import service as service_module
+        from src.asistencias.service import AsistenciaService
+
+        asistencia_service = AsistenciaService()
+        pool = Mock(verify=AsyncMock(return_value={'error': 'sin rostro'}))
+
+        with patch.object(asistencia_service, '_validar_y_obtener_usuario', return_value=Mock(codigo_user="U1")), \
+                patch.object(asistencia_service.user_service, 'get_face_key', return_value="U1"), \
+                patch.object(service_module, 'get_inference_pool', return_value=pool):
+            with pytest.raises(HTTPException) as exc:
+                await asistencia_service.registrar_asistencia_facial(MagicMock(), "U1", upload)
+
+        assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
+        args, kwargs = pool.verify.call_args
+        assert args == ("U1",)
+        assert isinstance(kwargs['image'], np.ndarray)
+        assert 'image_path' not in kwargs
@@ -0,0 +1,181 @@
+"""Unit Tests - Índice IVF para búsqueda 1:N aproximada"""
+import threading
+
+import pytest
+import numpy as np
+from types import SimpleNamespace
+
+from tests.unit.test_recognize_gallery import _random_database
+
+
+@pytest.fixture
+def database():
+    return _random_database(200, 5, seed=4)
+
+
+def _gallery(database):
+    from src.recognize.gallery import EmbeddingGallery
+
+    return EmbeddingGallery.from_database(database)
+
+
+class TestIVFIndex:
+    """Tests del índice IVF (búsqueda, actualización y persistencia)."""
+
+    def test_recall_de_candidatos(self, database):
+        """Test: la persona correcta está entre los candidatos para casi todos los probes."""
+        from src.recognize.ann_index import IVFIndex
+
+        index = IVFIndex.from_database(database, nprobe=4)
+        gallery = _gallery(database)
+        rng = np.random.default_rng(0)
+        hits = 0
+        for p in range(0, 200, 5):
+            query = database[f"persona_{p}"][0] + rng.normal(size=64) * 0.3
+            hits += f"persona_{p}" in index.search(query, num_candidates=10, gallery=gallery)
+
+        assert hits / 40 >= 0.95
+
+    def test_add_y_remove_incremental(self, database):
+        """Test: add/remove/rename actualizan el índice sin reconstruirlo."""
+        from src.recognize.ann_index import IVFIndex
+
+        index = IVFIndex.from_database(database)
+        centroids = index.centroids
+        new_embeddings = [np.full(64, 5.0) + i for i in range(3)]
+
+        index.add("nueva", new_embeddings)
+        gallery = _gallery({**database, "nueva": new_embeddings})
+        assert index.centroids is centroids
+        assert index.search(new_embeddings[0], num_candidates=1, gallery=gallery) == ["nueva"]
+
+        assert index.rename("nueva", "renombrada")
+        gallery = _gallery({**database, "renombrada": new_embeddings})
+        assert index.search(new_embeddings[0], num_candidates=1, gallery=gallery) == ["renombrada"]
+
+        assert index.remove("renombrada")
+        assert "renombrada" not in index.search(new_embeddings[0], num_candidates=5, gallery=gallery)
+        assert index.num_vectors == 200 * 5
+        assert not index.remove("renombrada")
+
+    def test_copia_no_ve_filas_nuevas(self, database):
+        """Test: agregar a una copia no cambia las listas del índice original."""
+        from src.recognize.ann_index import IVFIndex
+
+        index = IVFIndex.from_database(database)
+        first = index.copy()
+        first.add("a", [np.full(64, 5.0)])
+        second = first.copy()
+        second.add("b", [np.full(64, 5.0) + 1])
+
+        assert index.num_vectors == 1000 and "a" not in index.person_counts()
+        assert first.num_vectors == 1001 and "b" not in first.person_counts()
+        assert second.person_counts()["a"] == second.person_counts()["b"] == 1
+
+    def test_reentrena_al_crecer(self):
+        """Test: el índice pide re-entrenarse cuando crece más de ANN_RETRAIN_FACTOR."""
+        from src.recognize.ann_index import IVFIndex
+
+        database = _random_database(5, 4)
+        index = IVFIndex.from_database(database)
+        assert index.trained_size == 20
+        database["extra"] = list(np.random.default_rng(1).normal(size=(30, 64)))
+        index.add("extra", database["extra"])
+        assert index.needs_training
+
+        index.train(database)
+        assert index.trained_size == 50 and not index.needs_training
+        assert index.person_counts()["extra"] == 30
+
+    def test_persistencia(self, database, tmp_path):
+        """Test: save/load conserva resultados y compacta personas eliminadas."""
+        from src.recognize.ann_index import IVFIndex
+
+        index = IVFIndex.from_database(database)
+        index.remove("persona_3")
+        path = tmp_path / "ann_index.npz"
+        assert index.save(path)
+
+        loaded = IVFIndex.load(path)
+        gallery = _gallery(database)
+        query = database["persona_8"][1]
+        assert loaded.search(query, 10, gallery) == index.search(query, 10, gallery)
+        assert loaded.person_counts() == index.person_counts()
+        assert IVFIndex.load(tmp_path / "no_existe.npz") is None
+
+    def test_no_guarda_vectores(self, database, tmp_path):
+        """Test: el archivo solo tiene centroides y asignaciones; el formato anterior se descarta."""
+        from src.recognize.ann_index import IVFIndex
+
+        path = tmp_path / "ann_index.npz"
+        assert IVFIndex.from_database(database).save(path)
+        with np.load(path) as data:
+            assert 'vectors' not in data.files
+            assert data['person_ids'].dtype == np.int32
+
+        np.savez(path, vectors=np.zeros((1, 64)), params=np.zeros(3, dtype=np.int64))
+        assert IVFIndex.load(path) is None
+
+
+class TestIVFMatching:
+    """Tests del matching con SEARCH_ENGINE = 'ivf'."""
+
+    def test_misma_decision_que_exhaustivo(self, database, monkeypatch):
+        """Test: re-ordenar candidatos da la misma persona que la búsqueda exhaustiva."""
+        from src.recognize import reconocimiento
+        from src.recognize.ann_index import IVFIndex
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.registration = SimpleNamespace(
+            database=database,
+            snapshot=GallerySnapshot(
+                EmbeddingGallery.from_database(database), IVFIndex.from_database(database)
+            )
+        )
+        recognizer.database = database
+
+        query = database["persona_42"][2] + 0.05
+        exhaustive = recognizer._compare_with_database(query)
+
+        monkeypatch.setattr(reconocimiento, "SEARCH_ENGINE", "ivf")
+        monkeypatch.setattr(reconocimiento, "ANN_MIN_PERSONS", 10)
+        approximate = recognizer._compare_with_database(query, details_level="full")
+
+        assert approximate[0] == exhaustive[0] == "persona_42"
+        assert approximate[2]['distance'] == pytest.approx(exhaustive[2]['distance'])
+        assert len(approximate[2]['all_distances']) < len(database)
+
+
+class TestRegistrationSync:
+    """Tests de sincronización del índice con register/remove."""
+
+    def test_remove_actualiza_y_persiste(self, database, monkeypatch, tmp_path):
+        """Test: remove_person elimina a la persona del índice guardado."""
+        from src.recognize import registro
+        from src.recognize.ann_index import IVFIndex
+        from src.recognize.embedding_store import EmbeddingStore
+        from src.recognize.registro import FaceRegistration
+
+        path = tmp_path / "ann_index.npz"
+        monkeypatch.setattr(registro, "SEARCH_ENGINE", "ivf")
+        monkeypatch.setattr(registro, "ANN_INDEX_FILE", path)
+
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.database = EmbeddingStore(tmp_path / "store")
+        registration.database.put_many(database)
+        registration.metadata = {'persons': {}}
+        registration._write_lock = threading.Lock()
+        registration._snapshot = None
+        registration._version = 0
+        registration._ann_index = None
+        registration.read_only = False
+        registration._save_metadata = lambda: True
+
+        assert len(registration.ann_index) == 200
+        assert registration.remove_person("persona_0")
+
+        loaded = IVFIndex.load(path)
+        assert "persona_0" not in loaded.person_counts()
+        assert len(loaded) == 199
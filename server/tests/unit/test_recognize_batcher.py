@@ -0,0 +1,157 @@
+"""Unit Tests - Micro-batching de embeddings"""
+import threading
+import time
+import pytest
+import numpy as np
+
+
+class StubBackend:
+    """Backend de lotes que registra el tamaño de cada llamada."""
+
+    def __init__(self, delay=0.02, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.batch_sizes = []
+
+    def __call__(self, faces):
+        self.batch_sizes.append(len(faces))
+        time.sleep(self.delay)
+        return [None if self.fail_on is not None and f[0] == self.fail_on else f * 2.0 for f in faces]
+
+
+def _submit_concurrently(batcher, count):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = batcher.represent(np.full(4, float(i)), timeout=5)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestMicroBatcher:
+    """Tests del agrupamiento y del reparto de resultados."""
+
+    def test_agrupa_peticiones_concurrentes(self):
+        """Test: rostros concurrentes se procesan en menos llamadas y cada uno recibe el suyo."""
+        from src.recognize.batcher import MicroBatcher
+
+        backend = StubBackend()
+        batcher = MicroBatcher(represent_fn=backend, max_batch_size=16, window_ms=50)
+        results = _submit_concurrently(batcher, 8)
+        batcher.shutdown()
+
+        for i, embedding in enumerate(results):
+            assert np.array_equal(embedding, np.full(4, 2.0 * i))
+        assert sum(backend.batch_sizes) == 8
+        assert len(backend.batch_sizes) < 8
+
+    def test_respeta_tamano_maximo(self):
+        """Test: ningún lote supera max_batch_size."""
+        from src.recognize.batcher import MicroBatcher
+
+        backend = StubBackend()
+        batcher = MicroBatcher(represent_fn=backend, max_batch_size=3, window_ms=50)
+        _submit_concurrently(batcher, 10)
+        batcher.shutdown()
+
+        assert max(backend.batch_sizes) <= 3
+        assert sum(backend.batch_sizes) == 10
+
+    def test_error_por_rostro(self):
+        """Test: un rostro sin embedding falla solo para su petición."""
+        from src.recognize.batcher import MicroBatcher
+
+        batcher = MicroBatcher(represent_fn=StubBackend(fail_on=2.0), window_ms=20)
+        results = _submit_concurrently(batcher, 4)
+        batcher.shutdown()
+
+        assert isinstance(results[2], ValueError)
+        assert all(isinstance(r, np.ndarray) for i, r in enumerate(results) if i != 2)
+
+    def test_estadisticas_espera_y_computo(self):
+        """Test: stats() separa espera en cola y cómputo."""
+        from src.recognize.batcher import MicroBatcher
+
+        batcher = MicroBatcher(represent_fn=StubBackend(delay=0.03), window_ms=10)
+        _submit_concurrently(batcher, 6)
+        stats = batcher.stats()
+        batcher.shutdown()
+
+        assert stats['total_faces'] == 6
+        assert stats['total_batches'] >= 1
+        assert stats['compute']['p50_ms'] >= 25
+        assert stats['avg_batch_size'] == pytest.approx(6 / stats['total_batches'])
+        assert set(stats['queue_wait']) == {'p50_ms', 'p95_ms', 'max_ms'}
+
+    def test_espera_y_computo_en_el_profiler(self, monkeypatch):
+        """Test: cada petición registra batch_wait y batch_compute en el profiler y en sus tiempos."""
+        from src.recognize import profiling
+        from src.recognize.batcher import MicroBatcher
+        from src.recognize.profiling import collect_timings, get_profiler, reset_profiler
+
+        monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+        reset_profiler()
+        batcher = MicroBatcher(represent_fn=StubBackend(delay=0.03), window_ms=10)
+        try:
+            _submit_concurrently(batcher, 4)
+            with collect_timings() as timings:
+                batcher.represent(np.ones(4), timeout=5)
+        finally:
+            batcher.shutdown()
+
+        stages = get_profiler().snapshot()["stages"]
+        assert stages["batch_wait"]["count"] == 5
+        assert stages["batch_compute"]["count"] == 5
+        assert stages["batch_compute"]["p50_ms"] >= 25
+        assert timings["batch_compute"] >= 25 and "batch_wait" in timings
+        reset_profiler()
+
+
+class TestRecognizerIntegration:
+    """Tests del uso del batcher desde FaceRecognizer."""
+
+    def test_reconocimiento_usa_batcher(self, monkeypatch):
+        """Test: con MICRO_BATCHING el embedding del probe pasa por el batcher."""
+        from tests.unit.recognize_helpers import install_fake_deepface, face_image
+        from src.recognize import reconocimiento, batcher as batcher_mod
+        from src.recognize.detector import FaceDetector
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        fake = install_fake_deepface(monkeypatch)
+        detector = FaceDetector("retinaface")
+        detector._model_loaded = True
+
+        batcher = batcher_mod.MicroBatcher(window_ms=0)
+        monkeypatch.setattr(reconocimiento, "MICRO_BATCHING", True)
+        monkeypatch.setattr(reconocimiento, "get_batcher", lambda: batcher)
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.detector = detector
+        embedding, _ = recognizer._extract_embedding(image=face_image(seed=3))
+        batcher.shutdown()
+
+        assert embedding is not None
+        assert batcher.stats()['total_faces'] == 1
+        assert fake.represent_calls == 1
+
+    def test_rechaza_pool_de_procesos(self, monkeypatch):
+        """Test: MICRO_BATCHING con NUM_WORKERS > 0 es un error de configuración."""
+        from src.recognize import config
+
+        monkeypatch.setattr(config, "MICRO_BATCHING", True)
+        monkeypatch.setattr(config, "NUM_WORKERS", 2)
+        with pytest.raises(ValueError, match="MICRO_BATCHING"):
+            config.validate_config()
+
+        monkeypatch.setattr(config, "NUM_WORKERS", 0)
+        assert config.validate_config()
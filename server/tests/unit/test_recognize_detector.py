@@ -0,0 +1,305 @@
+"""Unit Tests - Detección facial de una sola pasada"""
+import pytest
+import numpy as np
+import cv2
+from types import SimpleNamespace
+
+from tests.unit.recognize_helpers import install_fake_deepface, face_image
+
+
+@pytest.fixture
+def fake_deepface(monkeypatch):
+    return install_fake_deepface(monkeypatch)
+
+
+@pytest.fixture
+def detector(fake_deepface):
+    from src.recognize.detector import FaceDetector
+    detector = FaceDetector("retinaface")
+    detector._model_loaded = True  # Evitar la pasada de pre-carga
+    return detector
+
+
+class TestDetectionResult:
+    """Tests del memo de detección."""
+
+    def test_una_sola_invocacion_para_todos_los_helpers(self, detector, fake_deepface):
+        """Test: has_face/detect_faces/count/bbox/extract reutilizan una pasada."""
+        image = face_image()
+
+        assert detector.has_face(image=image)
+        faces = detector.detect_faces(image=image, return_best=True)
+        assert detector.count_faces(image=image) == 1
+        assert detector.get_face_bbox(image=image) == faces[0]['bbox']
+        assert detector.extract_face(image=image) is not None
+
+        assert fake_deepface.extract_calls == 1
+
+    def test_mismo_contenido_otro_buffer(self, detector, fake_deepface):
+        """Test: una copia con el mismo contenido reutiliza la detección."""
+        image = face_image()
+        detector.detect(image=image)
+        detector.detect(image=image.copy())
+        assert fake_deepface.extract_calls == 1
+
+    def test_imagen_distinta_vuelve_a_detectar(self, detector, fake_deepface):
+        """Test: otra imagen dispara una nueva pasada del backend."""
+        detector.detect(image=face_image(seed=1))
+        detector.detect(image=face_image(seed=2))
+        assert fake_deepface.extract_calls == 2
+
+    def test_error_del_backend_no_se_memoriza(self, detector, fake_deepface, monkeypatch):
+        """Test: si el backend falla, la misma imagen se vuelve a detectar en la próxima llamada."""
+        original_extract = fake_deepface.extract_faces
+        failures = [RuntimeError("GPU sin memoria")]
+
+        def extract_faces(img_path, **kwargs):
+            if failures:
+                raise failures.pop()
+            return original_extract(img_path, **kwargs)
+
+        monkeypatch.setattr(fake_deepface, "extract_faces", extract_faces)
+        image = face_image()
+
+        failed = detector.detect(image=image)
+        assert not failed.has_face and "GPU sin memoria" in failed.error
+
+        retried = detector.detect(image=image)
+        assert retried.has_face and retried.error is None
+        assert detector.detect(image=image) is retried
+
+    def test_best_es_el_rostro_mas_grande(self, monkeypatch):
+        """Test: best() retorna el rostro de mayor área."""
+        from src.recognize.detector import DetectionResult
+        small = {'bbox': (0, 0, 60, 60)}
+        large = {'bbox': (0, 0, 90, 80)}
+        result = DetectionResult([small, large])
+
+        assert result.count == 2
+        assert result.best() is large
+        assert result.as_list(return_best=True) == [large]
+        assert result.as_list(return_best=False) == [small, large]
+
+    def test_sin_rostro(self, detector):
+        """Test: imagen negra no tiene rostros."""
+        result = detector.detect(image=np.zeros((100, 100, 3), dtype=np.uint8))
+        assert not result.has_face
+        assert result.bbox() is None
+
+
+class TestSinglePassPipelines:
+    """Tests de una sola invocación del backend por reconocimiento/registro."""
+
+    def test_reconocimiento_invoca_backend_una_vez(self, detector, fake_deepface):
+        """Test: recognize() ejecuta una sola detección por imagen."""
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        database = {"persona": [np.ones(32)]}
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.detector = detector
+        recognizer.registration = SimpleNamespace(
+            database=database, snapshot=GallerySnapshot(EmbeddingGallery.from_database(database))
+        )
+        recognizer.database = database
+
+        result = recognizer.recognize(image=face_image(seed=4))
+
+        assert 'error' not in result
+        assert fake_deepface.extract_calls == 1
+        assert fake_deepface.represent_calls == 1
+
+    def test_registro_invoca_backend_una_vez_por_imagen(self, detector, fake_deepface, tmp_path):
+        """Test: _extract_embeddings detecta cada imagen una sola vez."""
+        from src.recognize.registro import FaceRegistration
+
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"image_{i}.jpg"
+            cv2.imwrite(str(path), face_image(seed=10 + i))
+            paths.append(str(path))
+
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.detector = detector
+        embeddings = registration._extract_embeddings(paths, use_augmentation=False)
+
+        assert len(embeddings) == 3
+        assert fake_deepface.extract_calls == 3
+
+
+class TestDetectionResolution:
+    """Tests de detección a resolución reducida."""
+
+    def test_imagen_grande_se_reduce(self, detector, fake_deepface, monkeypatch):
+        """Test: el backend recibe la imagen reducida y las cajas vuelven al original."""
+        from src.recognize import detector as detector_module
+
+        shapes = []
+        original_extract = fake_deepface.extract_faces
+
+        def extract_faces(img_path, **kwargs):
+            shapes.append(np.asarray(img_path).shape)
+            return original_extract(img_path, **kwargs)
+
+        monkeypatch.setattr(fake_deepface, "extract_faces", extract_faces)
+        monkeypatch.setattr(detector_module, "DETECTION_MAX_SIDE", 260)
+        image = face_image(size=1040)
+
+        best = detector.detect(image=image).best()
+
+        assert shapes == [(260, 260, 3)]
+        assert best['bbox'] == (20, 20, 480, 480)
+        # Recorte del original (no de la copia reducida)
+        assert np.array_equal(best['face_img'], image[20:500, 20:500])
+
+    def test_imagen_chica_sin_cambios(self, detector, monkeypatch):
+        """Test: imágenes menores al límite se detectan tal cual."""
+        from src.recognize import detector as detector_module
+
+        monkeypatch.setattr(detector_module, "DETECTION_MAX_SIDE", 1280)
+        image = face_image()
+
+        best = detector.detect(image=image).best()
+
+        assert best['bbox'] == (5, 5, 120, 120)
+        assert np.array_equal(best['face_img'], image[5:125, 5:125])
+
+    def test_sin_reduccion_usa_recorte_de_deepface(self, detector, fake_deepface, monkeypatch):
+        """Test: sin reducción el rostro es el recorte de DeepFace (como en las galerías registradas)."""
+        from src.recognize import detector as detector_module
+        from src.recognize.detector import _crop_face, _deepface_face
+
+        faces = []
+        original_extract = fake_deepface.extract_faces
+
+        def extract_faces(img_path, **kwargs):
+            result = original_extract(img_path, **kwargs)
+            for face in result:
+                face['facial_area'].update({'left_eye': (95, 45), 'right_eye': (35, 60)})
+            faces.extend(result)
+            return result
+
+        monkeypatch.setattr(fake_deepface, "extract_faces", extract_faces)
+        monkeypatch.setattr(detector_module, "DETECTION_MAX_SIDE", 1280)
+        image = face_image()
+
+        best = detector.detect(image=image).best()
+
+        assert np.array_equal(best['face_img'], _deepface_face(faces[0]['face']))
+        assert not np.array_equal(best['face_img'], _crop_face(image, best['facial_area']))
+
+    def test_con_reduccion_recorta_del_original(self, detector, fake_deepface, monkeypatch):
+        """Test: con la imagen reducida el rostro alineado se recorta del original."""
+        from src.recognize import detector as detector_module
+        from src.recognize.detector import _crop_face
+
+        original_extract = fake_deepface.extract_faces
+
+        def extract_faces(img_path, **kwargs):
+            faces = original_extract(img_path, **kwargs)
+            for face in faces:
+                face['facial_area'].update({'left_eye': (95, 45), 'right_eye': (35, 60)})
+            return faces
+
+        monkeypatch.setattr(fake_deepface, "extract_faces", extract_faces)
+        monkeypatch.setattr(detector_module, "DETECTION_MAX_SIDE", 260)
+        large = face_image(size=1040)
+
+        best = detector.detect(image=large).best()
+
+        assert np.array_equal(best['face_img'], _crop_face(large, best['facial_area']))
+
+    def test_calidad_sobre_la_imagen_original(self, detector, monkeypatch):
+        """Test: el control de calidad usa la imagen original aunque la detección se reduzca."""
+        from src.recognize import detector as detector_module
+
+        shapes = []
+        original_check = detector_module.check_image_quality
+
+        def check_image_quality(image):
+            shapes.append(image.shape)
+            return original_check(image)
+
+        monkeypatch.setattr(detector_module, "check_image_quality", check_image_quality)
+        monkeypatch.setattr(detector_module, "DETECTION_MAX_SIDE", 260)
+
+        detector.detect(image=face_image(size=1040))
+
+        assert shapes == [(1040, 1040, 3)]
+
+    def test_recorte_alineado_por_ojos(self):
+        """Test: con los ojos a la misma altura el recorte alineado es el recorte simple."""
+        from src.recognize.detector import _crop_face
+
+        image = face_image(size=400)
+        area = {'x': 100, 'y': 120, 'w': 150, 'h': 150, 'left_eye': (210, 170), 'right_eye': (140, 170)}
+
+        assert np.array_equal(_crop_face(image, area), image[120:270, 100:250])
+        tilted = dict(area, left_eye=(210, 190))
+        assert _crop_face(image, tilted).shape == (150, 150, 3)
+
+
+class TestDetectionCascade:
+    """Tests de la cascada pre-detector -> RetinaFace."""
+
+    @pytest.fixture
+    def calls(self, fake_deepface, monkeypatch):
+        """Simula el pre-detector y registra qué recibe cada etapa."""
+        from src.recognize import detector as detector_module
+
+        monkeypatch.setattr(detector_module, "DETECTION_CASCADE", True)
+        calls = {'predetector': [], 'detector': [], 'candidates': []}
+        original_extract = fake_deepface.extract_faces
+
+        def extract_faces(img_path, detector_backend=None, **kwargs):
+            image = np.asarray(img_path)
+            if detector_backend == "opencv":
+                calls['predetector'].append(image.shape)
+                if not calls['candidates']:
+                    h, w = image.shape[:2]
+                    return [{'face': image, 'facial_area': {'x': 0, 'y': 0, 'w': w, 'h': h}, 'confidence': 0}]
+                return [{'face': None, 'facial_area': area, 'confidence': 1.0} for area in calls['candidates']]
+            calls['detector'].append(image.shape)
+            return original_extract(img_path, detector_backend=detector_backend, **kwargs)
+
+        monkeypatch.setattr(fake_deepface, "extract_faces", extract_faces)
+        return calls
+
+    def test_sin_candidatos_omite_retinaface(self, detector, calls):
+        """Test: si el pre-detector no encuentra rostros, RetinaFace no corre."""
+        result = detector.detect(image=face_image(size=400))
+
+        assert not result.has_face
+        assert len(calls['predetector']) == 1
+        assert calls['detector'] == []
+        stats = detector.cascade_stats()
+        assert stats['skipped'] == 1
+        assert stats['skip_rate'] == 1.0
+
+    def test_retinaface_solo_en_roi(self, detector, calls):
+        """Test: RetinaFace recibe la ROI ampliada y las cajas vuelven a la imagen completa."""
+        calls['candidates'].append({'x': 200, 'y': 150, 'w': 100, 'h': 100})
+        image = face_image(size=400)
+
+        best = detector.detect(image=image).best()
+
+        # ROI con padding de 0.5: (150, 100) a (350, 300)
+        assert calls['detector'] == [(200, 200, 3)]
+        assert best['bbox'] == (155, 105, 120, 120)
+        assert np.array_equal(best['face_img'], image[105:225, 155:275])
+
+        stats = detector.cascade_stats()
+        assert stats['roi_runs'] == 1
+        assert stats['predetector_hit_rate'] == 1.0
+        assert stats['detector_hit_rate'] == 1.0
+        assert stats['avg_roi_fraction'] == pytest.approx(0.25)
+
+    def test_fallback_sin_candidatos(self, detector, calls, monkeypatch):
+        """Test: con CASCADE_FALLBACK_ON_MISS se corre RetinaFace sobre la imagen completa."""
+        from src.recognize import detector as detector_module
+
+        monkeypatch.setattr(detector_module, "CASCADE_FALLBACK_ON_MISS", True)
+
+        assert detector.detect(image=face_image(size=400)).has_face
+        assert calls['detector'] == [(400, 400, 3)]
+        assert detector.cascade_stats()['full_runs'] == 1
@@ -0,0 +1,78 @@
+"""Unit Tests - Extracción de embeddings por lotes"""
+import numpy as np
+import cv2
+
+from tests.unit.recognize_helpers import install_fake_deepface, face_image
+
+
+def _faces(count):
+    return [face_image(seed=i, size=120) for i in range(count)]
+
+
+class TestRepresentFaces:
+    """Tests de paridad entre el camino por lotes y el individual."""
+
+    def test_paridad_con_camino_individual(self, monkeypatch):
+        """Test: los embeddings por lotes son iguales a los de a uno y en el mismo orden."""
+        from src.recognize.embedder import represent_face, represent_faces
+
+        install_fake_deepface(monkeypatch)
+        faces = _faces(7)
+
+        batched = represent_faces(faces, batch_size=3)
+        single = [represent_face(face) for face in faces]
+
+        assert len(batched) == 7
+        for b, s in zip(batched, single):
+            assert np.allclose(b, s, rtol=1e-5, atol=1e-6)
+
+    def test_llamadas_por_lote(self, monkeypatch):
+        """Test: se hace una llamada al modelo por cada BATCH_SIZE rostros."""
+        from src.recognize.embedder import represent_faces
+
+        fake = install_fake_deepface(monkeypatch)
+        represent_faces(_faces(8), batch_size=3)
+
+        assert fake.represent_calls == 3
+        assert fake.represented_faces == 8
+
+    def test_fallback_individual(self, monkeypatch):
+        """Test: si el backend no acepta listas se procesa de a uno."""
+        from src.recognize.embedder import represent_faces
+
+        fake = install_fake_deepface(monkeypatch, supports_batches=False)
+        embeddings = represent_faces(_faces(4), batch_size=4)
+
+        assert all(e is not None for e in embeddings)
+        assert fake.represented_faces == 4
+
+
+class TestBatchedEnrollment:
+    """Tests del registro con extracción por lotes."""
+
+    def test_registro_por_lotes_igual_a_individual(self, monkeypatch, tmp_path):
+        """Test: _extract_embeddings por lotes produce los mismos embeddings que lotes de 1."""
+        from src.recognize.detector import FaceDetector
+        from src.recognize.registro import FaceRegistration
+
+        fake = install_fake_deepface(monkeypatch)
+        detector = FaceDetector("retinaface")
+        detector._model_loaded = True
+
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"image_{i}.jpg"
+            cv2.imwrite(str(path), face_image(seed=20 + i))
+            paths.append(str(path))
+
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.detector = detector
+
+        batched = registration._extract_embeddings(paths, batch_size=32)
+        batched_calls = fake.represent_calls
+        single = registration._extract_embeddings(paths, batch_size=1)
+
+        assert len(batched) == len(single) > len(paths)
+        assert batched_calls == 1
+        for b, s in zip(batched, single):
+            assert np.allclose(b, s, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,141 @@
+"""Unit Tests - Ranking de calidad de las imágenes de registro"""
+import cv2
+import numpy as np
+import pytest
+
+from tests.unit.recognize_helpers import install_fake_deepface, face_image
+
+
+def _face(seed):
+    """Recorte de rostro del tamaño que entrega el detector falso."""
+    return face_image(seed=seed, size=120)
+
+
+def _candidate(name, face_img, confidence=0.99, face_size=160):
+    return {"image": f"/data/U1/{name}", "face_img": face_img, "confidence": confidence, "face_size": face_size}
+
+
+class TestFaceQualityMetrics:
+    """Tests de las métricas vectorizadas."""
+
+    def test_coinciden_con_opencv(self):
+        """Test: nitidez, brillo y contraste equivalen a cv2.Laplacian/mean/std por rostro."""
+        from src.recognize.enrollment_quality import QUALITY_FACE_SIZE, face_quality_metrics
+
+        faces = [face_image(seed=i, size=140 + 20 * i) for i in range(3)]
+        metrics = face_quality_metrics(faces)
+
+        for i, face in enumerate(faces):
+            resized = cv2.resize(face, (QUALITY_FACE_SIZE, QUALITY_FACE_SIZE), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY).astype(np.float64)
+            laplacian = cv2.Laplacian(gray, cv2.CV_64F)[1:-1, 1:-1]
+            assert metrics["blur"][i] == pytest.approx(laplacian.var(), rel=0.02)
+            assert metrics["brightness"][i] == pytest.approx(gray.mean(), abs=1.0)
+            assert metrics["contrast"][i] == pytest.approx(gray.std(), abs=1.0)
+
+
+class TestRankEnrollmentFaces:
+    """Tests de los pisos y la selección de los mejores rostros."""
+
+    def test_rechaza_con_motivo(self):
+        """Test: borrosa, oscura, pequeña y de baja confianza se descartan con su motivo."""
+        from src.recognize.enrollment_quality import rank_enrollment_faces
+
+        blurred = cv2.GaussianBlur(_face(1), (0, 0), 6)
+        dark = (_face(2) // 12).astype(np.uint8)
+        candidates = [
+            _candidate("buena.jpg", _face(0)),
+            _candidate("borrosa.jpg", blurred),
+            _candidate("oscura.jpg", dark),
+            _candidate("chica.jpg", _face(3), face_size=20),
+            _candidate("dudosa.jpg", _face(4), confidence=0.2),
+        ]
+
+        selected, rejected = rank_enrollment_faces(candidates)
+
+        assert [c["image"] for c in selected] == ["/data/U1/buena.jpg"]
+        assert 0.0 < selected[0]["quality_score"] <= 1.0
+        reasons = {item["image"]: item["reasons"] for item in rejected}
+        assert "Imagen borrosa" in reasons["borrosa.jpg"]
+        assert "Imagen muy oscura" in reasons["oscura.jpg"]
+        assert "Rostro muy pequeño" in reasons["chica.jpg"]
+        assert "Baja confianza de detección" in reasons["dudosa.jpg"]
+
+    def test_conserva_los_mejores(self):
+        """Test: solo pasan los `best_n` rostros de mayor puntaje, ordenados."""
+        from src.recognize.enrollment_quality import rank_enrollment_faces
+
+        candidates = [
+            _candidate(f"img_{size}.jpg", _face(size), face_size=size)
+            for size in (80, 160, 100, 140)
+        ]
+
+        selected, rejected = rank_enrollment_faces(candidates, best_n=2)
+
+        assert [c["face_size"] for c in selected] == [160, 140]
+        assert sorted(item["image"] for item in rejected) == ["img_100.jpg", "img_80.jpg"]
+        assert all(item["reasons"] == ["Fuera de las 2 mejores imágenes"] for item in rejected)
+
+    def test_sin_candidatos(self):
+        """Test: sin rostros no hay selección ni rechazos."""
+        from src.recognize.enrollment_quality import rank_enrollment_faces
+
+        assert rank_enrollment_faces([]) == ([], [])
+
+
+class TestRegistrationRanking:
+    """Tests del ranking dentro de FaceRegistration._extract_embeddings."""
+
+    @pytest.fixture
+    def registration(self, monkeypatch):
+        from src.recognize.detector import FaceDetector
+        from src.recognize.registro import FaceRegistration
+
+        fake = install_fake_deepface(monkeypatch)
+        detector = FaceDetector("retinaface")
+        detector._model_loaded = True
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.detector = detector
+        return registration, fake
+
+    def test_solo_embebe_los_seleccionados(self, registration, tmp_path, monkeypatch):
+        """Test: los rostros descartados no se aumentan ni pasan por el modelo, y se reportan."""
+        from src.recognize import registro
+
+        registration, fake = registration
+        monkeypatch.setattr(registro, "ENABLE_PREPROCESSING", False)
+
+        images = {
+            "nitida.jpg": face_image(seed=0),
+            "borrosa.jpg": cv2.GaussianBlur(face_image(seed=1), (0, 0), 6),
+            "vacia.jpg": np.zeros((260, 260, 3), dtype=np.uint8),
+        }
+        paths = []
+        for name, image in images.items():
+            path = tmp_path / name
+            cv2.imwrite(str(path), image)
+            paths.append(str(path))
+
+        rejected = []
+        embeddings = registration._extract_embeddings(paths, rejected=rejected)
+
+        variants = len(registration._face_variants(face_image(seed=0)))
+        assert len(embeddings) == variants
+        assert fake.represented_faces == variants
+        reasons = {item["image"]: item["reasons"] for item in rejected}
+        assert reasons["vacia.jpg"] == ["No se detectó rostro"]
+        assert "Imagen borrosa" in reasons["borrosa.jpg"]
+
+    def test_ranking_desactivado(self, registration, tmp_path, monkeypatch):
+        """Test: con ENROLLMENT_QUALITY_RANKING=False se embeben todos los rostros detectados."""
+        from src.recognize import registro
+
+        registration, fake = registration
+        monkeypatch.setattr(registro, "ENROLLMENT_QUALITY_RANKING", False)
+
+        path = tmp_path / "borrosa.jpg"
+        cv2.imwrite(str(path), cv2.GaussianBlur(face_image(seed=1), (0, 0), 6))
+
+        embeddings = registration._extract_embeddings([str(path)], use_augmentation=False)
+
+        assert len(embeddings) == 1
@@ -0,0 +1,277 @@
+"""Unit Tests - Galería vectorizada de reconocimiento facial"""
+import pytest
+import numpy as np
+from types import SimpleNamespace
+
+
+def _random_database(num_persons, embeddings_per_person, dim=64, seed=0, variable=False):
+    """Genera una base {persona: [embeddings float64]} con clusters por persona."""
+    rng = np.random.default_rng(seed)
+    database = {}
+    for p in range(num_persons):
+        center = rng.normal(size=dim) * 3
+        count = int(rng.integers(1, embeddings_per_person + 1)) if variable else embeddings_per_person
+        database[f"persona_{p}"] = [center + rng.normal(size=dim) for _ in range(count)]
+    return database
+
+
+def _reference_scores(database, query, metric, k):
+    """Implementación original (bucles por embedding) usada como referencia."""
+    from src.recognize.utils import calculate_distance
+
+    all_distances = {
+        name: [calculate_distance(query, emb, metric=metric) for emb in embs]
+        for name, embs in database.items()
+    }
+    scores_min = {name: np.min(d) for name, d in all_distances.items()}
+    scores_avg = {name: np.mean(d) for name, d in all_distances.items()}
+    scores_median = {name: np.median(d) for name, d in all_distances.items()}
+
+    flat = sorted(
+        [(name, dist) for name, dists in all_distances.items() for dist in dists],
+        key=lambda x: x[1]
+    )
+    scores_voting = {}
+    for name in all_distances:
+        name_dists = [d for n, d in flat[:k] if n == name]
+        scores_voting[name] = np.mean(name_dists) if name_dists else float('inf')
+
+    return scores_min, scores_avg, scores_median, scores_voting
+
+
+class TestEmbeddingGallery:
+    """Tests de paridad entre la galería matricial y los bucles originales."""
+
+    @pytest.mark.parametrize("metric", ["cosine", "euclidean", "euclidean_l2"])
+    @pytest.mark.parametrize("variable", [False, True])
+    def test_scores_iguales_a_referencia(self, metric, variable):
+        """Test: min/mean/median/voting coinciden con la implementación original."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(12, 9, variable=variable, seed=3)
+        gallery = EmbeddingGallery.from_database(database)
+        rng = np.random.default_rng(11)
+
+        for _ in range(5):
+            query = database["persona_4"][0] + rng.normal(size=64) * 0.5
+            scores = gallery.score(query, metric=metric, k=7)
+            reference = _reference_scores(database, query, metric, 7)
+
+            for name_key, ref in zip(["min_distance", "average", "median", "voting"], reference):
+                for i, name in enumerate(gallery.keys):
+                    assert scores[name_key][i] == pytest.approx(ref[name], rel=1e-5, abs=1e-5)
+
+    def test_offsets_y_etiquetas(self):
+        """Test: cada persona ocupa un segmento contiguo de filas."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = {"a": [np.ones(4)] * 2, "b": [np.ones(4)] * 3, "vacia": []}
+        gallery = EmbeddingGallery.from_database(database)
+
+        assert gallery.keys == ["a", "b"]
+        assert gallery.offsets.tolist() == [0, 2, 5]
+        assert gallery.labels.tolist() == [0, 0, 1, 1, 1]
+        assert gallery.matrix.dtype == np.float32
+        assert np.allclose(np.linalg.norm(gallery.matrix, axis=1), 1.0)
+
+    def test_galeria_vacia(self):
+        """Test: una base vacía produce una galería sin personas."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        gallery = EmbeddingGallery.from_database({})
+        assert len(gallery) == 0
+        assert gallery.num_embeddings == 0
+
+    @pytest.mark.parametrize("precision", ["float16", "int8"])
+    def test_galeria_compacta_re_puntua(self, precision):
+        """Test: la copia compacta ocupa menos y las personas cercanas se puntúan exacto."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(60, 8, seed=9)
+        gallery = EmbeddingGallery.from_database(database)
+        compact = gallery.quantize(precision)
+        query = database["persona_12"][3] + 0.3
+
+        exact, approx = gallery.score(query, metric="cosine"), compact.score(query, metric="cosine")
+        nearest = np.argsort(exact['min_distance'])[:10]
+
+        assert compact.scan_nbytes <= gallery.scan_nbytes * (0.55 if precision == "float16" else 0.3)
+        for name in ("min_distance", "average", "median", "voting"):
+            assert np.allclose(approx[name][nearest], exact[name][nearest], atol=1e-6)
+        assert compact.subset([3, 1]).precision == "float32"
+
+
+class TestCompareWithDatabase:
+    """Tests de la decisión del ensemble usando la galería."""
+
+    def _recognizer(self, database):
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        gallery = EmbeddingGallery.from_database(database)
+        recognizer.registration = SimpleNamespace(
+            database=database,
+            gallery=gallery,
+            snapshot=GallerySnapshot(gallery)
+        )
+        recognizer.database = database
+        return recognizer
+
+    def test_reconoce_persona_correcta(self):
+        """Test: el probe de una persona registrada se reconoce como ella."""
+        database = _random_database(20, 8, seed=5)
+        recognizer = self._recognizer(database)
+
+        query = database["persona_7"][2] + 0.05
+        person, confidence, details = recognizer._compare_with_database(query, details_level="full")
+
+        assert person == "persona_7"
+        assert details['recognized'] is True
+        assert set(details['all_distances']) == set(database)
+        assert len(details['all_distances']['persona_7']['distances']) == 8
+
+    def test_ensemble_igual_a_referencia(self):
+        """Test: el score final y el mejor match coinciden con la referencia."""
+        from src.recognize.config import ENSEMBLE_WEIGHTS, DISTANCE_METRIC, K_NEIGHBORS
+
+        database = _random_database(15, 6, variable=True, seed=8)
+        recognizer = self._recognizer(database)
+        query = np.random.default_rng(2).normal(size=64) * 3
+
+        _, _, details = recognizer._compare_with_database(query, details_level="full")
+        s_min, s_avg, s_med, s_vot = _reference_scores(database, query, DISTANCE_METRIC, K_NEIGHBORS)
+        reference = {
+            name: (
+                ENSEMBLE_WEIGHTS['min_distance'] * s_min[name] +
+                ENSEMBLE_WEIGHTS['average'] * s_avg[name] +
+                ENSEMBLE_WEIGHTS['median'] * s_med[name] +
+                ENSEMBLE_WEIGHTS['voting'] * s_vot[name]
+            )
+            for name in database
+        }
+
+        assert details['distance'] == pytest.approx(min(reference.values()), rel=1e-5)
+        for name, info in details['all_distances'].items():
+            assert info['final_score'] == pytest.approx(reference[name], rel=1e-5)
+
+    def test_detalles_acotados(self):
+        """Test: por defecto no hay desglose y top-k devuelve solo las mejores personas."""
+        from src.recognize.reconocimiento import DETAILS_TOP_K
+
+        database = _random_database(40, 6, seed=5)
+        recognizer = self._recognizer(database)
+        query = database["persona_11"][0] + 0.05
+
+        person, _, summary = recognizer._compare_with_database(query)
+        _, _, top = recognizer._compare_with_database(query, details_level="top-k")
+        _, _, full = recognizer._compare_with_database(query, details_level="full")
+
+        assert person == "persona_11"
+        assert 'all_distances' not in summary and 'all_scores' not in summary
+        assert summary['distance'] == top['distance'] == full['distance']
+
+        best_scores = sorted(info['final_score'] for info in full['all_distances'].values())[:DETAILS_TOP_K]
+        assert [info['final_score'] for info in top['all_distances'].values()] == best_scores
+        assert list(top['all_distances'])[0] == "persona_11"
+        assert set(top['all_scores']['median']) == set(top['all_distances'])
+
+    def test_estadisticas_perezosas(self):
+        """Test: el desglose calcula listas y estadísticas al leerse y se serializa como dict."""
+        from fastapi.encoders import jsonable_encoder
+        from src.recognize.utils import calculate_statistics
+
+        database = _random_database(10, 4, seed=5)
+        recognizer = self._recognizer(database)
+        _, _, details = recognizer._compare_with_database(database["persona_2"][1], details_level="top-k")
+
+        breakdown = details['all_distances']['persona_2']
+        assert breakdown._values == {}
+        assert breakdown['statistics'] == calculate_statistics(breakdown['distances'])
+        assert len(breakdown['distances']) == 4
+
+        encoded = jsonable_encoder(details)
+        assert set(encoded['all_distances']['persona_2']) == {'final_score', 'distances', 'statistics'}
+
+    def test_base_vacia(self):
+        """Test: sin personas registradas no hay match."""
+        recognizer = self._recognizer({})
+        person, confidence, details = recognizer._compare_with_database(np.ones(64))
+        assert person is None
+        assert confidence == 0.0
+
+
+class TestVerify:
+    """Tests de la verificación 1:1 contra persona reclamada + cohorte."""
+
+    def _recognizer(self, database, query):
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        gallery = EmbeddingGallery.from_database(database)
+        recognizer.registration = SimpleNamespace(
+            database=database,
+            gallery=gallery,
+            snapshot=GallerySnapshot(gallery)
+        )
+        recognizer.database = database
+        recognizer._extract_embedding = lambda image_path=None, image=None: (query, {})
+        return recognizer
+
+    def test_subset_conserva_filas(self):
+        """Test: subset() toma exactamente las filas de las personas pedidas."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(6, 4, variable=True, seed=1)
+        gallery = EmbeddingGallery.from_database(database)
+        sub = gallery.subset([4, 1])
+
+        assert sub.keys == ["persona_4", "persona_1"]
+        for i, key in enumerate(sub.keys):
+            original = gallery.index_of(key)
+            assert np.array_equal(
+                sub.matrix[sub.offsets[i]:sub.offsets[i + 1]],
+                gallery.matrix[gallery.offsets[original]:gallery.offsets[original + 1]]
+            )
+
+    def test_cohorte_excluye_reclamado(self):
+        """Test: la cohorte es determinista y no incluye a la persona reclamada."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        gallery = EmbeddingGallery.from_database(_random_database(30, 2, seed=2))
+        for claimed in range(30):
+            cohort = gallery.cohort_indices(5, exclude=claimed)
+            assert len(cohort) == 5
+            assert claimed not in cohort
+        assert np.array_equal(gallery.cohort_indices(5), gallery.cohort_indices(5))
+
+    def test_verifica_persona_correcta(self):
+        """Test: el probe de la persona reclamada se verifica."""
+        database = _random_database(40, 6, seed=9)
+        query = database["persona_12"][1] + 0.05
+        recognizer = self._recognizer(database, query)
+
+        result = recognizer.verify("persona_12", image=np.zeros((1, 1, 3)))
+
+        assert result['verified'] is True
+        assert result['person'] == "persona_12"
+        assert result['cohort_size'] > 0
+
+    def test_rechaza_impostor(self):
+        """Test: el probe de otra persona no verifica al reclamado."""
+        database = _random_database(40, 6, seed=9)
+        query = database["persona_3"][0] + 0.05
+        recognizer = self._recognizer(database, query)
+
+        result = recognizer.verify("persona_12", image=np.zeros((1, 1, 3)))
+        assert result['verified'] is False
+
+    def test_persona_no_registrada(self):
+        """Test: verificar una clave inexistente retorna error."""
+        database = _random_database(3, 2)
+        recognizer = self._recognizer(database, np.ones(64))
+
+        result = recognizer.verify("no-existe", image=np.zeros((1, 1, 3)))
+        assert result['verified'] is False
+        assert 'error' in result
@@ -0,0 +1,97 @@
+"""Unit Tests - Pool de inferencia fuera del event loop"""
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+
+
+class SlowRecognizer:
+    """Reconocedor falso que bloquea como lo haría el modelo real."""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.calls = []
+
+    def verify(self, user_key, image_path=None):
+        time.sleep(self.delay)
+        self.calls.append(user_key)
+        return {'verified': True, 'person': user_key}
+
+
+@pytest.fixture
+def slow_recognizer(monkeypatch):
+    from src.recognize import reconocimiento
+    recognizer = SlowRecognizer()
+    monkeypatch.setattr(reconocimiento, "get_recognizer", lambda: recognizer)
+    return recognizer
+
+
+class TestInferencePool:
+    """Tests del pool en modo hilo (NUM_WORKERS = 0)."""
+
+    @pytest.mark.asyncio
+    async def test_no_bloquea_event_loop(self, slow_recognizer):
+        """Test: el loop sigue atendiendo otras tareas mientras corre la inferencia."""
+        from src.recognize.inference_pool import InferencePool
+
+        pool = InferencePool(num_workers=0, queue_size=4)
+        task = asyncio.create_task(pool.verify("U1", image_path="x.jpg"))
+
+        worst_tick = 0.0
+        while not task.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst_tick = max(worst_tick, time.perf_counter() - start)
+
+        assert task.result()['verified'] is True
+        assert worst_tick < 0.1
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cola_acotada(self, slow_recognizer):
+        """Test: al superar queue_size se rechaza con InferenceQueueFull."""
+        from src.recognize.inference_pool import InferencePool, InferenceQueueFull
+
+        pool = InferencePool(num_workers=0, queue_size=2)
+        tasks = [asyncio.create_task(pool.verify(f"U{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+
+        assert pool.pending == 2
+        with pytest.raises(InferenceQueueFull):
+            await pool.verify("U3")
+
+        await asyncio.gather(*tasks)
+        assert pool.pending == 0
+        assert slow_recognizer.calls == ["U0", "U1"]
+        pool.shutdown()
+
+
+class TestWorker:
+    """Tests de la recarga de galería en los workers."""
+
+    def test_recarga_galeria_si_cambia_version(self, monkeypatch):
+        """Test: el worker recarga el registro solo cuando cambia la versión en disco."""
+        from src.recognize import inference_pool, registro
+
+        recognizer = SimpleNamespace(
+            registration=None, database=None,
+            verify=lambda key, image_path=None: {'person': key}
+        )
+        loads = []
+
+        def fake_get_registration():
+            loads.append(1)
+            return SimpleNamespace(database={"U1": []})
+
+        monkeypatch.setattr(inference_pool, "_worker_recognizer", recognizer)
+        monkeypatch.setattr(inference_pool, "_worker_version", 1)
+        monkeypatch.setattr(registro, "get_registration", fake_get_registration)
+        monkeypatch.setattr(registro, "reset_registration", lambda: None)
+
+        inference_pool._run_in_worker(1, "verify", ("U1",), {})
+        assert loads == []
+
+        result = inference_pool._run_in_worker(2, "verify", ("U1",), {})
+        assert loads == [1]
+        assert recognizer.database == {"U1": []}
+        assert result == {'person': "U1"}
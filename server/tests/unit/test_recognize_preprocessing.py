@@ -0,0 +1,78 @@
+"""Unit Tests - Perfiles de preprocesamiento de rostros"""
+import threading
+from pathlib import Path
+
+import cv2
+import pytest
+import numpy as np
+
+FIXTURES_DIR = Path(__file__).parent.parent / "powershell" / "test_images"
+
+
+@pytest.fixture(scope="module")
+def faces():
+    """Recortes centrados de las imágenes de prueba (rostro de webcam al centro)."""
+    faces = []
+    for i in (1, 4, 7):
+        image = cv2.imread(str(FIXTURES_DIR / f"image{i}.jpg"))
+        h, w = image.shape[:2]
+        faces.append(image[int(h * 0.2):int(h * 0.75), int(w * 0.38):int(w * 0.66)].copy())
+    return faces
+
+
+class TestPreprocessingProfiles:
+    """Tests de los perfiles quality/balanced/fast."""
+
+    @pytest.mark.parametrize("profile", ["quality", "balanced", "fast"])
+    def test_salida_normalizada(self, faces, profile):
+        """Test: todos los perfiles entregan el tamaño objetivo en uint8 BGR."""
+        from src.recognize.utils import preprocess_face
+
+        output = preprocess_face(faces[0], profile=profile)
+
+        assert output.shape == (224, 224, 3)
+        assert output.dtype == np.uint8
+
+    @pytest.mark.parametrize("profile", ["balanced", "fast"])
+    def test_cercano_a_quality(self, faces, profile):
+        """Test: los perfiles rápidos no se alejan del perfil de referencia."""
+        from src.recognize.utils import preprocess_face
+
+        for face in faces:
+            reference = preprocess_face(face, profile="quality").astype(np.float64)
+            output = preprocess_face(face, profile=profile).astype(np.float64)
+            mse = np.mean((reference - output) ** 2)
+            assert 10 * np.log10(255.0 ** 2 / mse) > 30
+
+    def test_escala_de_grises(self, faces):
+        """Test: imágenes de un canal se ecualizan sin error."""
+        from src.recognize.utils import preprocess_face
+
+        gray = cv2.cvtColor(faces[0], cv2.COLOR_BGR2GRAY)
+        output = preprocess_face(gray, profile="fast")
+
+        assert output.shape == (224, 224)
+
+    def test_perfil_por_defecto_de_config(self, faces, monkeypatch):
+        """Test: sin argumento se usa PREPROCESSING_PROFILE."""
+        from src.recognize import utils
+
+        monkeypatch.setattr(utils, "PREPROCESSING_PROFILE", "fast")
+
+        assert np.array_equal(utils.preprocess_face(faces[1]), utils.preprocess_face(faces[1], profile="fast"))
+
+
+class TestClahe:
+    """Tests de reutilización de CLAHE."""
+
+    def test_instancia_por_hilo(self):
+        """Test: el CLAHE se reutiliza dentro de un hilo y no se comparte entre hilos."""
+        from src.recognize.utils import get_clahe
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_clahe()))
+        thread.start()
+        thread.join()
+
+        assert get_clahe() is get_clahe()
+        assert other[0] is not get_clahe()
@@ -0,0 +1,117 @@
+"""Unit Tests - Pool de hilos de preprocesamiento"""
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from tests.unit.recognize_helpers import face_image
+
+
+class TestPreprocessingPool:
+    """Tests del map paralelo."""
+
+    def test_ejecuta_en_paralelo_y_conserva_orden(self):
+        """Test: con N hilos los elementos se procesan a la vez y el resultado mantiene el orden."""
+        from src.recognize.preprocessing_pool import PreprocessingPool
+
+        pool = PreprocessingPool(num_threads=3)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def work(item):
+            barrier.wait()  # Solo avanza si los 3 elementos corren a la vez
+            return item * 10
+
+        try:
+            assert pool.map(work, [1, 2, 3]) == [10, 20, 30]
+        finally:
+            pool.shutdown()
+
+    def test_un_hilo_es_secuencial(self):
+        """Test: con un solo hilo se ejecuta en el hilo actual sin crear el executor."""
+        from src.recognize.preprocessing_pool import PreprocessingPool
+
+        pool = PreprocessingPool(num_threads=1)
+        threads = pool.map(lambda _: threading.current_thread(), [1, 2])
+
+        assert threads == [threading.current_thread()] * 2
+        assert pool._executor is None
+
+    def test_fija_hilos_de_opencv_una_vez(self, monkeypatch):
+        """Test: configure_opencv_threads limita OpenCV una sola vez por proceso, aunque el pool sea secuencial."""
+        from src.recognize import preprocessing_pool
+
+        calls = []
+        monkeypatch.setattr(preprocessing_pool, "OPENCV_THREADS", 1)
+        monkeypatch.setattr(preprocessing_pool, "_opencv_configured", False)
+        monkeypatch.setattr(preprocessing_pool.cv2, "setNumThreads", calls.append)
+
+        preprocessing_pool.configure_opencv_threads()
+        preprocessing_pool.configure_opencv_threads()
+
+        assert calls == [1]
+
+    def test_worker_de_inferencia_fija_hilos_de_opencv(self, monkeypatch):
+        """Test: el inicializador de cada worker de inferencia configura OpenCV."""
+        from src.recognize import inference_pool, preprocessing_pool, reconocimiento, registro
+
+        calls = []
+        monkeypatch.setattr(registro, "_read_only_store", False)  # Lo marca el inicializador
+        monkeypatch.setattr(preprocessing_pool, "configure_opencv_threads", lambda: calls.append("opencv"))
+        monkeypatch.setattr(reconocimiento, "initialize_recognizer", lambda: calls.append("recognizer"))
+        monkeypatch.setattr(inference_pool, "_worker_recognizer", None)
+        monkeypatch.setattr(inference_pool, "_worker_version", None)
+
+        inference_pool._init_worker()
+
+        assert calls == ["opencv", "recognizer"]
+
+    def test_propaga_excepciones(self):
+        """Test: un error en un elemento se propaga como en la versión secuencial."""
+        from src.recognize.preprocessing_pool import PreprocessingPool
+
+        def work(item):
+            if item == 2:
+                raise ValueError("falla")
+            return item
+
+        pool = PreprocessingPool(num_threads=2)
+        try:
+            with pytest.raises(ValueError):
+                pool.map(work, [1, 2, 3])
+        finally:
+            pool.shutdown()
+
+
+class TestRegistrationUsesPool:
+    """Tests del preprocesamiento paralelo en el registro."""
+
+    def test_mismo_resultado_que_secuencial(self, monkeypatch):
+        """Test: embed_faces con hilos produce las mismas variaciones, en el mismo orden."""
+        from src.recognize import registro
+        from src.recognize.preprocessing_pool import PreprocessingPool
+        from src.recognize.registro import FaceRegistration
+
+        represented = []
+
+        def represent_faces(faces, batch_size=None):
+            represented.append([face.copy() for face in faces])
+            return [np.full(4, float(face.mean())) for face in faces]
+
+        monkeypatch.setattr(registro, "represent_faces", represent_faces)
+        registration = FaceRegistration.__new__(FaceRegistration)
+        faces = [cv2.resize(face_image(seed=i), (120, 120)) for i in range(4)]
+
+        results = []
+        for num_threads in (1, 4):
+            pool = PreprocessingPool(num_threads)
+            monkeypatch.setattr(registro, "get_preprocessing_pool", lambda: pool)
+            try:
+                results.append(registration.embed_faces(faces))
+            finally:
+                pool.shutdown()
+
+        sequential, parallel = represented
+        assert len(parallel) == len(sequential) == len(faces) * len(registration._face_variants(faces[0]))
+        assert all(np.array_equal(a, b) for a, b in zip(sequential, parallel))
+        assert all(np.array_equal(a, b) for a, b in zip(*results))
@@ -0,0 +1,191 @@
+"""Unit Tests - Tiempos por etapa del pipeline de reconocimiento"""
+import asyncio
+import threading
+
+import pytest
+import numpy as np
+from types import SimpleNamespace
+
+from tests.unit.recognize_helpers import install_fake_deepface, face_image
+
+
+@pytest.fixture
+def profiler():
+    from src.recognize.profiling import get_profiler, reset_profiler
+
+    reset_profiler()
+    yield get_profiler()
+    reset_profiler()
+
+
+class TestStageProfiler:
+    """Tests de los histogramas deslizantes."""
+
+    def test_percentiles_por_etapa(self):
+        """Test: snapshot() calcula count y percentiles sobre la ventana."""
+        from src.recognize.profiling import StageProfiler
+
+        profiler = StageProfiler(window=100)
+        for value in range(1, 201):
+            profiler.record("detector", float(value))
+        profiler.record("matching", 2.0)
+
+        stages = profiler.snapshot()["stages"]
+        assert stages["detector"]["count"] == 200
+        assert stages["detector"]["p50_ms"] == pytest.approx(150.5)
+        assert stages["detector"]["p99_ms"] == pytest.approx(np.percentile(np.arange(101, 201), 99))
+        assert stages["detector"]["max_ms"] == 200.0
+        assert stages["matching"]["mean_ms"] == 2.0
+
+    def test_registro_concurrente(self):
+        """Test: muestras desde varios hilos no se pierden."""
+        from src.recognize.profiling import StageProfiler
+
+        profiler = StageProfiler(window=10000)
+        threads = [
+            threading.Thread(target=lambda: [profiler.record("embedding", 1.0) for _ in range(500)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert profiler.snapshot()["stages"]["embedding"]["count"] == 2000
+
+
+class TestStageTimer:
+    """Tests de la medición por petición."""
+
+    def test_recolecta_y_acumula(self, profiler):
+        """Test: una etapa repetida suma su duración en la petición."""
+        from src.recognize.profiling import collect_timings, stage_timer
+
+        with collect_timings() as timings:
+            for _ in range(3):
+                with stage_timer("preprocess"):
+                    pass
+            with collect_timings() as nested:
+                with stage_timer("embedding"):
+                    pass
+
+        assert nested is timings
+        assert set(timings) == {"preprocess", "embedding"}
+        assert profiler.snapshot()["stages"]["preprocess"]["count"] == 3
+
+        with stage_timer("preprocess"):
+            pass
+        assert "preprocess" in timings and profiler.snapshot()["stages"]["preprocess"]["count"] == 4
+
+    def test_deshabilitado(self, profiler, monkeypatch):
+        """Test: sin PROFILING_ENABLED solo se miden las peticiones que lo piden."""
+        from src.recognize import profiling
+
+        monkeypatch.setattr(profiling, "PROFILING_ENABLED", False)
+        with profiling.stage_timer("matching"):
+            pass
+        with profiling.collect_timings() as timings:
+            with profiling.stage_timer("matching"):
+                pass
+
+        assert "matching" in timings
+        assert profiler.snapshot()["stages"] == {}
+
+
+class TestRecognizeTimings:
+    """Tests del bloque `timings` de recognize/verify."""
+
+    def _recognizer(self, monkeypatch):
+        from src.recognize.detector import FaceDetector
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        install_fake_deepface(monkeypatch)
+        detector = FaceDetector("retinaface")
+        detector._model_loaded = True
+
+        database = {"persona": [np.ones(32)], "otra": [np.arange(32.0)]}
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.detector = detector
+        gallery = EmbeddingGallery.from_database(database)
+        recognizer.registration = SimpleNamespace(database=database, gallery=gallery, snapshot=GallerySnapshot(gallery))
+        recognizer.database = database
+        return recognizer
+
+    def test_timings_por_etapa(self, profiler, monkeypatch):
+        """Test: recognize(return_timings=True) desglosa las etapas del pipeline."""
+        recognizer = self._recognizer(monkeypatch)
+
+        result = recognizer.recognize(image=face_image(seed=4), return_timings=True)
+        plain = recognizer.recognize(image=face_image(seed=5))
+
+        timings = result['timings']
+        assert {"quality", "detector", "detection", "embedding", "extract", "matching", "recognize"} <= set(timings)
+        assert timings["detection"] >= timings["detector"]
+        assert timings["recognize"] >= timings["extract"] + timings["matching"]
+        assert 'timings' not in plain
+        assert profiler.snapshot()["stages"]["recognize"]["count"] == 2
+
+    def test_timings_de_verificacion(self, profiler, monkeypatch):
+        """Test: verify() también mide matching y total."""
+        recognizer = self._recognizer(monkeypatch)
+
+        result = recognizer.verify("persona", image=face_image(seed=4), return_timings=True)
+        assert {"extract", "matching", "verify"} <= set(result['timings'])
+
+
+class TestPoolTimings:
+    """Tests de los tiempos medidos en workers del pool."""
+
+    def test_worker_devuelve_timings(self, profiler, monkeypatch):
+        """Test: la tarea del worker retorna el resultado y sus tiempos."""
+        from src.recognize import inference_pool
+        from src.recognize.profiling import stage_timer
+
+        def verify(user_key):
+            with stage_timer("matching"):
+                return {"verified": True, "claimed": user_key}
+
+        monkeypatch.setattr(inference_pool, "_worker_recognizer", SimpleNamespace(verify=verify))
+        monkeypatch.setattr(inference_pool, "_worker_version", 1)
+
+        result, timings = inference_pool._run_profiled(1, "verify", ("U1",), {})
+        assert result == {"verified": True, "claimed": "U1"}
+        assert set(timings) == {"matching"}
+
+    def test_tareas_de_registro_con_prefijo(self, profiler, monkeypatch):
+        """Test: las etapas de una tarea de registro no se mezclan con las de las marcaciones."""
+        from src.recognize import inference_pool
+        from src.recognize.profiling import stage_timer
+
+        def enrollment_candidate(image_path):
+            with stage_timer("detector"):
+                return None, "sin rostro"
+
+        monkeypatch.setattr(
+            inference_pool, "_worker_recognizer", SimpleNamespace(enrollment_candidate=enrollment_candidate)
+        )
+        monkeypatch.setattr(inference_pool, "_worker_version", 1)
+
+        _, timings = inference_pool._run_profiled(1, "enrollment_candidate", ("a.jpg",), {})
+        assert set(timings) == {"enrollment.detector"}
+
+    def test_pool_de_procesos_agrega_al_profiler(self, profiler, monkeypatch):
+        """Test: el pool registra en el proceso del servidor los tiempos del worker."""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.recognize import inference_pool
+
+        monkeypatch.setattr(
+            inference_pool, "_run_profiled",
+            lambda version, method, args, kwargs: ({"ok": True}, {"detector": 12.0, "matching": 1.0})
+        )
+        pool = inference_pool.InferencePool(num_workers=1)
+        pool._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            assert asyncio.run(pool.verify("U1")) == {"ok": True}
+        finally:
+            pool.shutdown()
+
+        stages = profiler.snapshot()["stages"]
+        assert stages["detector"]["p50_ms"] == 12.0
+        assert stages["matching"]["count"] == 1
@@ -0,0 +1,91 @@
+"""Unit Tests - Compactación de embeddings en prototipos por persona"""
+import pytest
+import numpy as np
+
+from tests.unit.test_recognize_gallery import _random_database
+
+
+def _augmented_person(shots: int = 5, variants: int = 8, dim: int = 64, seed: int = 0) -> np.ndarray:
+    """Embeddings con forma de registro: `shots` tomas x `variants` casi duplicados."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(shots, dim))
+    return np.repeat(centers, variants, axis=0) + 0.01 * rng.normal(size=(shots * variants, dim))
+
+
+class TestSelectPrototypes:
+    """Tests de selección de prototipos."""
+
+    @pytest.mark.parametrize("method", ["farthest", "kmedoids"])
+    def test_cubre_todas_las_tomas(self, method):
+        """Test: con k = número de tomas se elige un prototipo por toma."""
+        from src.recognize.prototypes import select_prototypes
+
+        embeddings = _augmented_person(shots=5, variants=8)
+        prototypes = select_prototypes(embeddings, k=5, method=method)
+
+        assert prototypes.shape == (5, 64)
+        # Cada prototipo es una fila original y pertenece a una toma distinta
+        rows = [int(np.flatnonzero((embeddings == p).all(axis=1))[0]) for p in prototypes]
+        assert sorted(row // 8 for row in rows) == [0, 1, 2, 3, 4]
+
+    def test_sin_compactar(self):
+        """Test: k=None en config o k >= N deja los embeddings intactos."""
+        from src.recognize.prototypes import select_prototypes
+
+        embeddings = _augmented_person(shots=2, variants=3)
+
+        assert len(select_prototypes(embeddings, k=10)) == 6
+        assert len(select_prototypes(embeddings, k=0)) == 6
+
+    def test_metodo_invalido(self):
+        """Test: un método desconocido es un error."""
+        from src.recognize.prototypes import select_prototypes
+
+        with pytest.raises(ValueError):
+            select_prototypes(_augmented_person(), k=3, method="random")
+
+
+class TestCompactGallery:
+    """Tests de compactación de la galería en FaceRegistration."""
+
+    @pytest.fixture
+    def registration(self, tmp_path, monkeypatch):
+        from src.recognize import registro
+        from src.recognize.registro import FaceRegistration
+
+        monkeypatch.setattr(registro, "get_detector", lambda: None)
+        monkeypatch.setattr(registro, "EMBEDDINGS_FILE", tmp_path / "embeddings.pkl")
+        monkeypatch.setattr(registro, "EMBEDDINGS_STORE_DIR", tmp_path / "store")
+        monkeypatch.setattr(registro, "METADATA_FILE", tmp_path / "metadata.json")
+        return FaceRegistration()
+
+    def test_pasada_offline(self, registration):
+        """Test: compact_gallery reduce cada persona y publica la nueva galería."""
+        registration.database.put_many(_random_database(4, 12))
+        registration.database.put("pocos", [np.ones(64), np.zeros(64) + 2])
+        before = registration.snapshot
+
+        report = registration.compact_gallery(k=5)
+
+        assert report == {
+            'persons': 5,
+            'persons_compacted': 4,
+            'embeddings_before': 4 * 12 + 2,
+            'embeddings_after': 4 * 5 + 2
+        }
+        assert registration.snapshot.gallery.num_embeddings == 22
+        assert before.gallery.num_embeddings == 50
+        assert registration.database.count("pocos") == 2
+
+    def test_registro_compacta(self, registration, monkeypatch):
+        """Test: con PROTOTYPES_PER_PERSON el registro guarda solo los prototipos."""
+        from src.recognize import registro
+
+        monkeypatch.setattr(registro, "PROTOTYPES_PER_PERSON", 4)
+        embeddings = list(_augmented_person(shots=4, variants=8))
+        registration._extract_embeddings = lambda image_paths, **kwargs: embeddings
+
+        assert registration.register_person("nueva", image_paths=["a.jpg"])
+
+        assert registration.database.count("nueva") == 4
+        assert registration.metadata['persons']['nueva']['num_embeddings'] == 4
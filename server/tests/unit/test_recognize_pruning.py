@@ -0,0 +1,131 @@
+"""Unit Tests - Poda por centroides antes del ensemble"""
+import pytest
+import numpy as np
+from types import SimpleNamespace
+
+from tests.unit.test_recognize_gallery import _random_database
+
+
+def _recognizer(database):
+    from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+    from src.recognize.reconocimiento import FaceRecognizer
+
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.registration = SimpleNamespace(
+        database=database,
+        snapshot=GallerySnapshot(EmbeddingGallery.from_database(database))
+    )
+    recognizer.database = database
+    return recognizer
+
+
+def _probes(database, seed=4):
+    """Probes genuinos (con ruido creciente) e impostores."""
+    rng = np.random.default_rng(seed)
+    names = list(database)
+    probes = []
+    for i, noise in enumerate([0.05, 0.5, 1.0, 2.0] * 5):
+        embeddings = database[names[(i * 37) % len(names)]]
+        embedding = embeddings[i % len(embeddings)]
+        probes.append(embedding + rng.normal(size=embedding.shape) * noise)
+    probes.extend(rng.normal(size=(10, 64)) * 3)
+    return probes
+
+
+class TestLowerBounds:
+    """Tests de la cota inferior por centroide y radio."""
+
+    @pytest.mark.parametrize("metric", ["cosine", "euclidean", "euclidean_l2"])
+    def test_cota_menor_o_igual_al_minimo(self, metric):
+        """Test: la cota nunca supera la distancia mínima exacta de la persona."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(40, 9, variable=True, seed=6)
+        gallery = EmbeddingGallery.from_database(database)
+
+        for query in _probes(database):
+            bounds = gallery.lower_bounds(query, metric=metric)
+            exact = gallery.segment_min(gallery.distances(query, metric=metric))
+            assert np.all(bounds <= exact)
+
+    def test_cota_ajustada_para_personas_lejanas(self):
+        """Test: la cota separa a la persona correcta del resto."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(50, 8, seed=2)
+        gallery = EmbeddingGallery.from_database(database)
+        query = database["persona_3"][0] + 0.05
+
+        bounds = gallery.lower_bounds(query, metric="cosine")
+
+        assert int(np.argmin(bounds)) == gallery.index_of("persona_3")
+        assert np.median(bounds) > 0.2
+
+    @pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+    def test_bloques_que_cortan_personas(self, monkeypatch, metric):
+        """Test: con bloques que parten segmentos, centroides y cotas siguen siendo válidos."""
+        from src.recognize import gallery as gallery_module
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(40, 9, variable=True, seed=6)
+        expected = EmbeddingGallery.from_database(database).centroids()
+        monkeypatch.setattr(gallery_module, "_CENTROID_BLOCK_ROWS", 7)
+        gallery = EmbeddingGallery.from_database(database)
+
+        for name, values in gallery.centroids().items():
+            assert np.allclose(values, expected[name], atol=1e-6), name
+        for query in _probes(database):
+            bounds = gallery.lower_bounds(query, metric=metric)
+            assert np.all(bounds <= gallery.segment_min(gallery.distances(query, metric=metric)))
+
+
+class TestCentroidPruning:
+    """Tests de la decisión con poda en dos etapas."""
+
+    @pytest.mark.parametrize("strategy", ["ensemble", "min_distance", "voting"])
+    def test_misma_decision_que_sin_poda(self, monkeypatch, strategy):
+        """Test: persona, confianza y distancia coinciden con la galería completa."""
+        from src.recognize import reconocimiento
+
+        monkeypatch.setattr(reconocimiento, "MATCHING_STRATEGY", strategy)
+        monkeypatch.setattr(reconocimiento, "PRUNING_MIN_PERSONS", 10)
+        monkeypatch.setattr(reconocimiento, "PRUNING_CANDIDATES", 4)
+        database = _random_database(300, 8, variable=True, seed=1)
+        recognizer = _recognizer(database)
+
+        for query in _probes(database):
+            monkeypatch.setattr(reconocimiento, "CENTROID_PRUNING", True)
+            pruned = recognizer._compare_with_database(query)
+            monkeypatch.setattr(reconocimiento, "CENTROID_PRUNING", False)
+            full = recognizer._compare_with_database(query)
+
+            assert pruned[0] == full[0]
+            assert pruned[1] == pytest.approx(full[1])
+            assert pruned[2]['distance'] == pytest.approx(full[2]['distance'])
+            assert pruned[2]['best_match'] == full[2]['best_match']
+            assert pruned[2]['adjusted_threshold'] == pytest.approx(full[2]['adjusted_threshold'])
+
+    def test_desglose_solo_de_candidatos(self, monkeypatch):
+        """Test: un probe claro se decide con pocos candidatos."""
+        from src.recognize import reconocimiento
+
+        monkeypatch.setattr(reconocimiento, "PRUNING_MIN_PERSONS", 10)
+        database = _random_database(300, 8, seed=3)
+        recognizer = _recognizer(database)
+
+        person, _, details = recognizer._compare_with_database(database["persona_42"][1] + 0.05, details_level="full")
+
+        assert person == "persona_42"
+        assert details['pruning'] == {'persons': 300, 'candidates': reconocimiento.PRUNING_CANDIDATES}
+        assert len(details['all_distances']) == reconocimiento.PRUNING_CANDIDATES
+        assert "persona_42" in details['all_distances']
+
+    def test_galeria_pequena_sin_poda(self):
+        """Test: por debajo de PRUNING_MIN_PERSONS se calcula la galería completa."""
+        database = _random_database(20, 4, seed=3)
+        recognizer = _recognizer(database)
+
+        _, _, details = recognizer._compare_with_database(database["persona_1"][0], details_level="full")
+
+        assert 'pruning' not in details
+        assert len(details['all_distances']) == 20
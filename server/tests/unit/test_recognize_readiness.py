@@ -0,0 +1,150 @@
+"""Unit Tests - Carga en segundo plano del sistema de reconocimiento"""
+import asyncio
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def loaders(monkeypatch):
+    """Reemplaza la carga real por funciones controlables."""
+    from src.recognize import reconocimiento, registro, inference_pool
+
+    release = threading.Event()
+    calls = []
+
+    def initialize():
+        calls.append("models")
+        release.wait(5)
+
+    monkeypatch.setattr(reconocimiento, "initialize_recognizer", initialize)
+    monkeypatch.setattr(registro, "get_registration", lambda: calls.append("gallery"))
+    monkeypatch.setattr(inference_pool, "NUM_WORKERS", 0)
+    inference_pool.shutdown_inference_pool()
+    yield release, calls
+    release.set()
+    inference_pool.shutdown_inference_pool()
+
+
+class TestRecognitionReadiness:
+    """Tests del estado de carga."""
+
+    def test_no_bloquea_el_event_loop(self, loaders):
+        """Test: start() retorna de inmediato y el loop sigue atendiendo mientras carga."""
+        from src.recognize.readiness import RecognitionReadiness
+
+        release, calls = loaders
+        readiness = RecognitionReadiness()
+
+        async def scenario():
+            task = readiness.start()
+            await asyncio.sleep(0.05)
+            during = (readiness.state, readiness.models_ready)
+            release.set()
+            await task
+            return during
+
+        during = asyncio.run(scenario())
+
+        assert during == ("loading", False)
+        assert readiness.ready
+        assert calls == ["gallery", "models"]  # Sin procesos los modelos se cargan en el servidor
+        assert readiness.status()["workers"] is True
+        assert readiness.wait(0)
+
+    def test_con_procesos_no_carga_modelos_en_el_servidor(self, loaders, monkeypatch):
+        """Test: con NUM_WORKERS > 0 el servidor solo carga la galería (antes de los workers); los modelos los cargan los workers."""
+        from src.recognize import inference_pool
+        from src.recognize.readiness import RecognitionReadiness
+
+        _, calls = loaders
+
+        async def wait_ready(self):
+            calls.append("workers")
+
+        monkeypatch.setattr(inference_pool, "NUM_WORKERS", 2)
+        monkeypatch.setattr(inference_pool.InferencePool, "start", lambda self: calls.append("start"))
+        monkeypatch.setattr(inference_pool.InferencePool, "wait_ready", wait_ready)
+        inference_pool.shutdown_inference_pool()
+
+        readiness = RecognitionReadiness()
+        asyncio.run(readiness.load())
+
+        assert calls == ["gallery", "start", "workers"]
+        assert readiness.ready
+        assert readiness.status()["models"] is True and readiness.status()["workers"] is True
+
+    def test_error_de_carga(self, loaders, monkeypatch):
+        """Test: un error al cargar deja el estado en failed con el mensaje."""
+        from src.recognize import registro
+        from src.recognize.readiness import RecognitionReadiness
+
+        release, _ = loaders
+        release.set()
+
+        def broken():
+            raise RuntimeError("pesos corruptos")
+
+        monkeypatch.setattr(registro, "get_registration", broken)
+        readiness = RecognitionReadiness()
+        asyncio.run(readiness.load())
+
+        status = readiness.status()
+        assert status["state"] == "failed"
+        assert status["models"] is False and status["gallery"] is False
+        assert "pesos corruptos" in status["error"]
+
+    def test_descarta_muestras_del_calentamiento(self, loaders):
+        """Test: los tiempos del calentamiento no quedan en el profiler."""
+        from src.recognize.profiling import get_profiler
+        from src.recognize.readiness import RecognitionReadiness
+
+        release, _ = loaders
+        release.set()
+        get_profiler().record("embedding", 9000.0)
+
+        asyncio.run(RecognitionReadiness().load())
+        assert get_profiler().snapshot()["stages"] == {}
+
+
+class TestRequireRecognitionReady:
+    """Tests de la dependencia de las rutas faciales."""
+
+    @pytest.mark.parametrize("state", ["pending", "loading", "failed"])
+    def test_503_con_retry_after(self, state, monkeypatch):
+        """Test: sin el sistema listo se responde 503 con Retry-After."""
+        from fastapi import HTTPException
+        from src.recognize.readiness import get_readiness, reset_readiness
+        from src.utils.readiness import require_recognition_ready
+
+        reset_readiness()
+        monkeypatch.setattr(get_readiness(), "state", state)
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(require_recognition_ready())
+        assert exc.value.status_code == 503
+        assert int(exc.value.headers["Retry-After"]) > 0
+        reset_readiness()
+
+
+class TestWarmUp:
+    """Tests de la inferencia de calentamiento."""
+
+    def test_calienta_embedding_y_galeria(self, monkeypatch):
+        """Test: warm_up ejecuta una pasada del modelo sin propagar errores."""
+        import numpy as np
+        from types import SimpleNamespace
+        from tests.unit.recognize_helpers import install_fake_deepface
+        from src.recognize.gallery import EmbeddingGallery, GallerySnapshot
+        from src.recognize.reconocimiento import FaceRecognizer
+
+        fake = install_fake_deepface(monkeypatch)
+        gallery = EmbeddingGallery.from_database({"persona": [np.ones(32)]})
+        recognizer = FaceRecognizer.__new__(FaceRecognizer)
+        recognizer.registration = SimpleNamespace(snapshot=GallerySnapshot(gallery))
+
+        recognizer.warm_up()
+        assert fake.represent_calls == 1
+
+        monkeypatch.setattr(fake, "represent", None)
+        recognizer.warm_up()  # No debe lanzar
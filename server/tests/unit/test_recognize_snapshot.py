@@ -0,0 +1,133 @@
+"""Unit Tests - Snapshots inmutables de la galería (read-copy-update)"""
+import json
+import threading
+
+import pytest
+import numpy as np
+
+from tests.unit.test_recognize_gallery import _random_database
+
+
+@pytest.fixture
+def registration(tmp_path, monkeypatch):
+    """FaceRegistration sobre un almacén temporal, con extracción simulada."""
+    from src.recognize import registro
+    from src.recognize.registro import FaceRegistration
+
+    monkeypatch.setattr(registro, "get_detector", lambda: None)
+    monkeypatch.setattr(registro, "EMBEDDINGS_FILE", tmp_path / "embeddings.pkl")
+    monkeypatch.setattr(registro, "EMBEDDINGS_STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(registro, "METADATA_FILE", tmp_path / "metadata.json")
+
+    registration = FaceRegistration()
+    registration.database.put_many(_random_database(20, 3))
+
+    rng = np.random.default_rng(1)
+    registration._extract_embeddings = lambda image_paths, **kwargs: [
+        rng.normal(size=64) for _ in image_paths
+    ]
+    return registration
+
+
+class TestGallerySnapshot:
+    """Tests de publicación de snapshots."""
+
+    def test_snapshot_inmutable(self, registration):
+        """Test: un snapshot publicado no se puede modificar."""
+        snapshot = registration.snapshot
+
+        with pytest.raises(AttributeError):
+            snapshot.gallery = None
+        assert registration.gallery is snapshot.gallery
+
+    def test_escritura_publica_nueva_version(self, registration):
+        """Test: registrar publica un snapshot nuevo sin tocar el anterior."""
+        before = registration.snapshot
+
+        assert registration.register_person("nueva", image_paths=["a.jpg", "b.jpg"])
+        after = registration.snapshot
+
+        assert after.version > before.version
+        assert after.gallery.index_of("nueva") is not None
+        assert before.gallery.index_of("nueva") is None
+        assert len(before.gallery) == 20
+
+        assert registration.remove_person("persona_0")
+        assert registration.snapshot.gallery.index_of("persona_0") is None
+        assert after.gallery.index_of("persona_0") is not None
+
+    def test_lectores_concurrentes_con_escritor(self, registration):
+        """Test: los lectores siempre ven galerías consistentes durante un registro masivo."""
+        errors = []
+        versions = []
+        stop = threading.Event()
+        query = np.random.default_rng(2).normal(size=64)
+
+        def reader():
+            last = 0
+            try:
+                while not stop.is_set():
+                    snapshot = registration.snapshot
+                    gallery = snapshot.gallery
+                    assert snapshot.version >= last
+                    last = snapshot.version
+                    assert len(gallery.keys) == len(gallery.offsets) - 1
+                    assert gallery.matrix.shape[0] == gallery.num_embeddings
+                    scores = gallery.score(query)
+                    assert len(scores['min_distance']) == len(gallery)
+                versions.append(last)
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+
+        removed = 0
+        for i in range(30):
+            assert registration.register_person(f"alta_{i}", image_paths=["a.jpg"])
+            if i % 3 == 0:
+                removed += registration.remove_person(f"persona_{i}")
+
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        assert errors == []
+        assert len(readers) == len(versions)
+        assert len(registration.snapshot.gallery) == 20 + 30 - removed
+
+    def test_ivf_se_publica_con_la_galeria(self, registration, monkeypatch, tmp_path):
+        """Test: el índice del snapshot corresponde a su misma versión de la galería."""
+        from src.recognize import registro
+
+        monkeypatch.setattr(registro, "SEARCH_ENGINE", "ivf")
+        monkeypatch.setattr(registro, "ANN_INDEX_FILE", tmp_path / "ann_index.npz")
+        registration._snapshot = None
+
+        before = registration.snapshot
+        assert registration.register_person("nueva", image_paths=["a.jpg"])
+        after = registration.snapshot
+
+        assert "nueva" in after.ann_index.person_counts()
+        assert "nueva" not in before.ann_index.person_counts()
+        assert len(after.ann_index) == len(after.gallery)
+
+
+class TestAtomicWrite:
+    """Tests de persistencia con archivo temporal + rename."""
+
+    def test_error_conserva_archivo_anterior(self, tmp_path):
+        """Test: un fallo a mitad de la escritura deja intacto el archivo previo."""
+        from src.recognize.utils import atomic_open, save_json
+
+        path = tmp_path / "metadata.json"
+        assert save_json({"version": 1}, path)
+
+        with pytest.raises(RuntimeError):
+            with atomic_open(path, 'w', encoding='utf-8') as f:
+                f.write('{"version": ')
+                raise RuntimeError("corte")
+
+        assert json.loads(path.read_text(encoding='utf-8')) == {"version": 1}
+        assert [p.name for p in tmp_path.iterdir()] == ["metadata.json"]
@@ -0,0 +1,357 @@
+"""Unit Tests - Almacén memmap de embeddings"""
+import pickle
+import pytest
+import numpy as np
+
+from tests.unit.test_recognize_gallery import _random_database
+
+
+@pytest.fixture
+def store(tmp_path):
+    from src.recognize.embedding_store import EmbeddingStore
+    return EmbeddingStore(tmp_path / "store")
+
+
+class TestEmbeddingStore:
+    """Tests de escritura append-only, tombstones y lectura sin copia."""
+
+    def test_roundtrip(self, store):
+        """Test: los embeddings leídos son los guardados (precisión float32)."""
+        database = _random_database(5, 4, variable=True)
+        assert store.put_many(database)
+
+        assert set(store) == set(database)
+        for key, embeddings in database.items():
+            assert store.count(key) == len(embeddings)
+            assert np.allclose(store[key], np.asarray(embeddings), rtol=1e-5, atol=1e-5)
+
+    def test_galeria_sin_copia(self, store):
+        """Test: sin tombstones la galería usa la matriz memmap y puntúa igual que from_database."""
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(6, 3, seed=2)
+        store.put_many(database)
+        gallery = store.gallery()
+
+        assert isinstance(gallery.matrix, np.memmap)
+        reference = EmbeddingGallery.from_database(database)
+        query = database["persona_1"][0] + 0.1
+        for name in ("min_distance", "average", "median", "voting"):
+            assert np.allclose(gallery.score(query)[name], reference.score(query)[name], atol=1e-6)
+
+    def test_tombstones_y_sobrescritura(self, store):
+        """Test: remove/put marcan tombstones y la galería solo ve filas vivas."""
+        database = _random_database(4, 3)
+        store.put_many(database)
+        store.remove("persona_1")
+        store.put("persona_2", [np.ones(64)] * 2)
+
+        assert "persona_1" not in store
+        assert store.count("persona_2") == 2
+        assert store.dead_rows == 6
+        assert store.rows == 14
+
+        gallery = store.gallery()
+        assert sorted(gallery.keys) == ["persona_0", "persona_2", "persona_3"]
+        assert gallery.num_embeddings == 8
+        assert not store.remove("persona_1")
+
+    def test_persistencia_y_rename(self, store, tmp_path):
+        """Test: reabrir el directorio recupera el estado, incluido rename."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        database = _random_database(3, 2)
+        store.put_many(database)
+        store.remove("persona_0")
+        assert store.rename("persona_1", "U1")
+
+        reopened = EmbeddingStore(tmp_path / "store")
+        assert sorted(reopened) == ["U1", "persona_2"]
+        assert np.allclose(reopened["U1"], np.asarray(database["persona_1"]), atol=1e-5)
+
+    def test_filas_huerfanas_se_descartan(self, store, tmp_path):
+        """Test: filas escritas sin actualizar el índice (corte) no aparecen ni corrompen."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        store.put("a", [np.ones(8)])
+        with open(store._vectors_path(store.generation), 'ab') as f:
+            f.write(np.zeros((5, 8), dtype=np.float32).tobytes())
+
+        reopened = EmbeddingStore(tmp_path / "store")
+        assert reopened.rows == 1
+        reopened.put("b", [np.full(8, 2.0)])
+        assert np.allclose(reopened["b"], np.full((1, 8), 2.0))
+        assert reopened.gallery().num_embeddings == 2
+
+    def test_version_del_indice(self, store, tmp_path):
+        """Test: cada escritura incrementa la versión del índice, legible sin parsear los segmentos."""
+        from src.recognize.embedding_store import EmbeddingStore, read_index_version
+
+        assert read_index_version(store.index_path) == 0
+        store.put_many(_random_database(3, 2))
+        store.put("a", [np.ones(64)])
+        store.remove("a")
+
+        assert read_index_version(store.index_path) == store.version == 3
+        assert EmbeddingStore(tmp_path / "store").version == 3
+
+    def test_dimension_distinta(self, store):
+        """Test: no se mezclan dimensiones distintas."""
+        store.put("a", [np.ones(8)])
+        assert not store.put("b", [np.ones(4)])
+        assert "b" not in store
+
+
+class TestCompaction:
+    """Tests de la compactación de tombstones."""
+
+    def test_compactar(self, store):
+        """Test: compact() elimina filas muertas y cambia de generación."""
+        database = _random_database(6, 3)
+        store.put_many(database)
+        for p in range(3):
+            store.remove(f"persona_{p}")
+        old_file = store._vectors_path(store.generation)
+
+        assert store.compact()
+        assert store.rows == 9
+        assert store.dead_rows == 0
+        assert old_file.exists()  # Se conserva hasta la próxima compactación
+        assert isinstance(store.gallery().matrix, np.memmap)
+        assert np.allclose(store["persona_4"], np.asarray(database["persona_4"]), atol=1e-5)
+
+        assert store.compact()
+        assert not old_file.exists()
+        assert store._vectors_path(1).exists()
+
+    def test_compactacion_en_segundo_plano(self, store, monkeypatch):
+        """Test: superar el umbral de filas muertas lanza la compactación."""
+        from src.recognize import embedding_store
+
+        monkeypatch.setattr(embedding_store, "STORE_COMPACTION_MIN_ROWS", 1)
+        store.put_many(_random_database(4, 2))
+        store.remove("persona_0")
+        store.remove("persona_1")
+        store.wait_for_compaction(timeout=5)
+
+        assert store.generation == 1
+        assert store.rows == 4
+
+    @pytest.mark.parametrize("compactions", [1, 2])
+    def test_lector_durante_compactacion(self, store, tmp_path, monkeypatch, compactions):
+        """Test: un lector que leyó el índice anterior a una o dos compactaciones carga sin FileNotFoundError."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        database = _random_database(4, 3)
+        store.put_many(database)
+        store.remove("persona_0")
+
+        original = EmbeddingStore._map_files
+        interleaved = []
+
+        def map_files(reader):
+            # Entre la lectura del índice del lector y su mapeo, el escritor compacta
+            if reader is not store and not interleaved:
+                interleaved.append(reader.generation)
+                for _ in range(compactions):
+                    store.put("extra", [np.ones(64)])
+                    store.remove("extra")
+                    assert store.compact()
+            original(reader)
+
+        monkeypatch.setattr(EmbeddingStore, "_map_files", map_files)
+        reader = EmbeddingStore(tmp_path / "store")
+
+        assert interleaved == [0]
+        assert reader.generation == (0 if compactions == 1 else compactions)
+        assert sorted(reader) == ["persona_1", "persona_2", "persona_3"]
+        assert np.allclose(reader["persona_2"], np.asarray(database["persona_2"]), atol=1e-5)
+
+
+class TestReadOnly:
+    """Tests del almacén en solo lectura (workers de inferencia)."""
+
+    def test_escrituras_rechazadas(self, store, tmp_path):
+        """Test: un lector ve los datos del escritor pero no puede modificar el almacén."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        store.put_many(_random_database(3, 2))
+        reader = EmbeddingStore(tmp_path / "store", read_only=True)
+
+        assert sorted(reader) == ["persona_0", "persona_1", "persona_2"]
+        for write in (
+            lambda: reader.put("nueva", [np.ones(64)]),
+            lambda: reader.remove("persona_0"),
+            lambda: reader.rename("persona_0", "otra"),
+            reader.compact,
+            lambda: reader.convert("int8")
+        ):
+            with pytest.raises(PermissionError):
+                write()
+        assert EmbeddingStore(tmp_path / "store").rows == 6
+
+    def test_worker_no_migra_ni_convierte(self, tmp_path, monkeypatch):
+        """Test: en solo lectura FaceRegistration no migra el pickle ni convierte la precisión."""
+        from src.recognize import registro
+        from src.recognize.embedding_store import EmbeddingStore
+
+        pickle_path = tmp_path / "embeddings.pkl"
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(_random_database(2, 2), f)
+        monkeypatch.setattr(registro, "EMBEDDINGS_STORE_DIR", tmp_path / "store")
+        monkeypatch.setattr(registro, "EMBEDDINGS_FILE", pickle_path)
+        monkeypatch.setattr(registro, "GALLERY_PRECISION", "int8")
+
+        registration = registro.FaceRegistration.__new__(registro.FaceRegistration)
+        registration.read_only = True
+        database = registration._load_database()
+
+        assert len(database) == 0 and database.read_only
+        assert pickle_path.exists()
+        assert not (tmp_path / "store").exists()
+
+    def test_worker_de_inferencia_abre_en_solo_lectura(self, monkeypatch):
+        """Test: el inicializador de los workers marca el proceso como lector del almacén."""
+        from src.recognize import inference_pool, reconocimiento, registro
+
+        monkeypatch.setattr(registro, "_read_only_store", False)
+        monkeypatch.setattr(reconocimiento, "initialize_recognizer", lambda: None)
+        monkeypatch.setattr(inference_pool, "_worker_recognizer", None)
+        monkeypatch.setattr(inference_pool, "_worker_version", None)
+
+        inference_pool._init_worker()
+
+        assert registro._read_only_store is True
+
+
+class TestMigration:
+    """Tests del migrador desde embeddings.pkl."""
+
+    def test_migrar_pickle(self, store, tmp_path):
+        """Test: el pickle se migra una vez y queda un respaldo."""
+        from src.recognize.embedding_store import migrate_pickle
+
+        database = _random_database(3, 4)
+        database["vacia"] = []
+        pickle_path = tmp_path / "embeddings.pkl"
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(database, f)
+
+        assert migrate_pickle(pickle_path, store) == 3
+        assert sorted(store) == ["persona_0", "persona_1", "persona_2"]
+        assert not pickle_path.exists()
+        assert (tmp_path / "embeddings.pkl.bak").exists()
+        assert migrate_pickle(pickle_path, store) == 0
+
+    def test_registro_migra_al_cargar(self, tmp_path, monkeypatch):
+        """Test: FaceRegistration migra automáticamente el pickle antiguo."""
+        from src.recognize import registro
+        from src.recognize.registro import FaceRegistration
+
+        pickle_path = tmp_path / "embeddings.pkl"
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(_random_database(2, 2), f)
+        monkeypatch.setattr(registro, "EMBEDDINGS_FILE", pickle_path)
+        monkeypatch.setattr(registro, "EMBEDDINGS_STORE_DIR", tmp_path / "store")
+
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.read_only = False
+        store = registration._load_database()
+
+        assert len(store) == 2
+        assert len(store.gallery()) == 2
+        assert (tmp_path / "embeddings.pkl.bak").exists()
+
+
+class TestCompactPrecision:
+    """Tests de la copia compacta float16/int8 del almacén."""
+
+    @pytest.mark.parametrize("precision", ["float16", "int8"])
+    def test_galeria_compacta(self, tmp_path, precision):
+        """Test: la galería recorre la copia compacta y el mejor match es exacto."""
+        from src.recognize.embedding_store import EmbeddingStore
+        from src.recognize.gallery import EmbeddingGallery
+
+        database = _random_database(30, 6, seed=7)
+        store = EmbeddingStore(tmp_path / "store", precision=precision)
+        store.put_many(database)
+        gallery = store.gallery()
+
+        assert gallery.precision == precision
+        assert isinstance(gallery.codes, np.memmap)
+        reference = EmbeddingGallery.from_database(database)
+        query = database["persona_9"][2] + 0.1
+        scores, expected = gallery.score(query), reference.score(query)
+        best = int(np.argmin(expected['min_distance']))
+        assert int(np.argmin(scores['min_distance'])) == best
+        for name in ("min_distance", "average", "median"):
+            assert scores[name][best] == pytest.approx(expected[name][best], abs=1e-6)
+            assert np.allclose(scores[name], expected[name], atol=1e-2)
+
+    def test_tombstones_y_compactacion(self, tmp_path):
+        """Test: con tombstones la galería no copia la matriz float32; compact() reescribe los códigos."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        store = EmbeddingStore(tmp_path / "store", precision="int8")
+        database = _random_database(5, 3)
+        store.put_many(database)
+        store.remove("persona_1")
+
+        gallery = store.gallery()
+        assert gallery.codes.shape == (12, 64)
+        assert isinstance(gallery.matrix, np.memmap)
+        assert np.allclose(gallery.exact(np.arange(3, 6)), store.gallery().subset([1]).matrix)
+
+        assert store.compact()
+        reopened = EmbeddingStore(tmp_path / "store")
+        assert reopened.precision == "int8"
+        assert reopened.gallery().codes.shape == (12, 64)
+        assert (tmp_path / "store" / "codes-0.i8").exists()  # Generación anterior, hasta la próxima compactación
+
+        assert store.compact()
+        assert not (tmp_path / "store" / "codes-0.i8").exists()
+
+    def test_convertir_almacen_existente(self, store, tmp_path):
+        """Test: convert() genera la copia compacta sin tocar las filas float32."""
+        from src.recognize.embedding_store import EmbeddingStore
+
+        database = _random_database(4, 5)
+        store.put_many(database)
+        vectors = np.array(store._vectors)
+
+        assert store.convert("float16")
+        assert not store.convert("float16")
+        assert store.convert("int8")
+
+        reopened = EmbeddingStore(tmp_path / "store")
+        assert reopened.precision == "int8"
+        assert np.array_equal(np.asarray(reopened._vectors), vectors)
+        assert reopened.gallery().scan_nbytes < vectors.nbytes / 3
+
+        reopened.put("nueva", [np.ones(64)])
+        assert reopened.gallery().codes.shape == (21, 64)
+
+        assert (tmp_path / "store" / "codes-0.f16").exists()  # Copia anterior, hasta el próximo cambio
+        assert reopened.convert("float32")
+        assert not (tmp_path / "store" / "codes-0.f16").exists()
+
+        with pytest.raises(ValueError):
+            reopened.convert("float64")
+
+    def test_registro_convierte_al_cargar(self, tmp_path, monkeypatch):
+        """Test: FaceRegistration convierte el almacén a GALLERY_PRECISION."""
+        from src.recognize import registro
+        from src.recognize.embedding_store import EmbeddingStore
+        from src.recognize.registro import FaceRegistration
+
+        EmbeddingStore(tmp_path / "store").put_many(_random_database(3, 2))
+        monkeypatch.setattr(registro, "EMBEDDINGS_FILE", tmp_path / "embeddings.pkl")
+        monkeypatch.setattr(registro, "EMBEDDINGS_STORE_DIR", tmp_path / "store")
+        monkeypatch.setattr(registro, "GALLERY_PRECISION", "float16")
+
+        registration = FaceRegistration.__new__(FaceRegistration)
+        registration.read_only = False
+        store = registration._load_database()
+
+        assert store.precision == "float16"
+        assert store.gallery().precision == "float16"
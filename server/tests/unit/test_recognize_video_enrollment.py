@@ -0,0 +1,160 @@
+"""Unit Tests - Registro facial desde video"""
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+
+def _write_video(path, frames, fps=10):
+    """Escribe un video MJPG con los frames dados."""
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    assert writer.isOpened()
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def _textured(seed, size=(240, 320), sharpness=1.0):
+    """Frame con textura gruesa; `sharpness` < 1 lo mezcla con gris plano."""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(20, 236, size=(size[0] // 8, size[1] // 8, 1), dtype=np.uint8)
+    texture = cv2.resize(blocks, (size[1], size[0]), interpolation=cv2.INTER_NEAREST).astype(np.float32)
+    frame = sharpness * texture + (1.0 - sharpness) * 128.0
+    return np.repeat(frame[:, :, None], 3, axis=2).astype(np.uint8)
+
+
+def _fake_detect(calls):
+    """Detector falso: rostro = recorte central; marca el grupo de pose en el píxel (0, 0)."""
+    def detect(name, frame):
+        calls.append(name)
+        index = int(name.split("_")[1])
+        face = frame[60:180, 100:220].copy()
+        face[0, 0] = index // 10
+        return {"image": name, "face_img": face, "confidence": 0.99, "face_size": 160}, None
+    return detect
+
+
+def _group_embed(faces):
+    """Embedding falso: un eje por grupo de pose."""
+    vectors = []
+    for face in faces:
+        vector = np.full(8, 0.01)
+        vector[int(face[0, 0, 0])] = 1.0
+        vectors.append(vector)
+    return vectors
+
+
+class TestIterVideoFrames:
+    """Tests de la decodificación en streaming."""
+
+    def test_entrega_uno_de_cada_step(self, tmp_path):
+        """Test: con step=3 solo se convierten los frames 0, 3, 6, 9."""
+        from src.recognize.video_enrollment import iter_video_frames
+
+        path = _write_video(tmp_path / "clip.avi", [_textured(i) for i in range(10)])
+        frames = iter_video_frames(path, step=3)
+
+        assert isinstance(frames, types.GeneratorType)
+        assert [index for index, _ in frames] == [0, 3, 6, 9]
+
+    def test_tope_de_frames(self, tmp_path):
+        """Test: max_frames corta la decodificación."""
+        from src.recognize.video_enrollment import iter_video_frames
+
+        path = _write_video(tmp_path / "clip.avi", [_textured(i) for i in range(10)])
+
+        assert [index for index, _ in iter_video_frames(path, max_frames=4)] == [0, 1, 2, 3]
+
+    def test_video_invalido(self, tmp_path):
+        """Test: un archivo que no es video lanza ValueError."""
+        from src.recognize.video_enrollment import iter_video_frames
+
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(b"no es un video")
+
+        with pytest.raises(ValueError):
+            next(iter_video_frames(str(path)))
+
+
+class TestIterCandidateFrames:
+    """Tests del filtro barato previo a la detección."""
+
+    def test_descarta_borrosos_movidos_y_cercanos(self):
+        """Test: se saltan frames planos, con mucho movimiento o a menos de min_gap."""
+        from src.recognize.video_enrollment import iter_candidate_frames
+
+        base = _textured(0)
+        moved = _textured(99)
+        frames = [
+            (0, base),
+            (1, base),                          # Demasiado cerca del candidato anterior
+            (2, _textured(0, sharpness=0.02)),  # Casi plano (borroso)
+            (3, moved),                         # Cambio brusco respecto al anterior (movimiento)
+            (4, moved),
+            (5, moved),                         # Demasiado cerca del candidato anterior
+        ]
+        stats = {}
+        candidates = list(iter_candidate_frames(frames, min_sharpness=40, max_motion=20, min_gap=2, stats=stats))
+
+        assert [index for index, _, _ in candidates] == [0, 4]
+        assert stats == {"frames_analyzed": 6, "candidate_frames": 2}
+
+
+class TestExtractEnrollmentFrames:
+    """Tests de la selección de frames de registro."""
+
+    @pytest.fixture
+    def permissive(self, monkeypatch):
+        from src.recognize import video_enrollment
+
+        monkeypatch.setattr(video_enrollment, "VIDEO_FRAME_STEP", 1)
+        monkeypatch.setattr(video_enrollment, "VIDEO_MIN_SHARPNESS", 0.0)
+        monkeypatch.setattr(video_enrollment, "VIDEO_MAX_MOTION", 255.0)
+        monkeypatch.setattr(video_enrollment, "VIDEO_MIN_FRAME_INTERVAL", 0.0)
+        return video_enrollment
+
+    def test_elige_poses_diversas(self, tmp_path, permissive):
+        """Test: entre 40 frames de 4 poses guarda uno por pose, en orden del video."""
+        from src.recognize.video_enrollment import extract_enrollment_frames
+
+        path = _write_video(tmp_path / "clip.avi", [_textured(i) for i in range(40)])
+        calls = []
+
+        report = extract_enrollment_frames(
+            path, str(tmp_path / "U1"), detect=_fake_detect(calls), embed=_group_embed, num_frames=4
+        )
+
+        assert report["frames_read"] == 40 and report["faces"] == 40 and len(calls) == 40
+        frames = [int(p.rsplit("_", 1)[1].split(".")[0]) for p in report["image_paths"]]
+        assert sorted(frame // 10 for frame in frames) == [0, 1, 2, 3]
+        assert frames == sorted(frames)
+        assert all(cv2.imread(p) is not None for p in report["image_paths"])
+
+    def test_retiene_los_mas_nitidos(self, tmp_path, permissive, monkeypatch):
+        """Test: con VIDEO_MAX_CANDIDATES solo se retienen los frames más nítidos."""
+        from src.recognize.video_enrollment import extract_enrollment_frames
+
+        monkeypatch.setattr(permissive, "VIDEO_MAX_CANDIDATES", 3)
+        sharpness = [0.5, 1.0, 0.6, 0.95, 0.55, 0.9, 0.65]
+        path = _write_video(tmp_path / "clip.avi", [_textured(0, sharpness=s) for s in sharpness])
+
+        report = extract_enrollment_frames(path, str(tmp_path / "U1"), detect=_fake_detect([]), num_frames=3)
+
+        assert [p.rsplit("/", 1)[1] for p in report["image_paths"]] == [
+            "video_frame_00001.jpg", "video_frame_00003.jpg", "video_frame_00005.jpg"
+        ]
+
+    def test_sin_rostros(self, tmp_path, permissive):
+        """Test: si el detector no encuentra rostros no se guarda ningún frame."""
+        from src.recognize.video_enrollment import extract_enrollment_frames
+
+        path = _write_video(tmp_path / "clip.avi", [_textured(i) for i in range(5)])
+
+        report = extract_enrollment_frames(
+            path, str(tmp_path / "U1"), detect=lambda name, frame: (None, "No se detectó rostro")
+        )
+
+        assert report["image_paths"] == [] and report["faces"] == 0
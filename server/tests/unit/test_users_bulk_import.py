@@ -0,0 +1,144 @@
+"""Unit Tests - Importación masiva de usuarios"""
+import asyncio
+import io
+import tarfile
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Carpeta de subidas temporal y límites pequeños para las fotos."""
+    from src.users import bulk_import
+    from src.utils import file_handler
+
+    monkeypatch.setattr(file_handler, "settings", SimpleNamespace(UPLOAD_DIR=str(tmp_path)))
+    monkeypatch.setattr(bulk_import, "settings", SimpleNamespace(ALLOWED_IMAGE_EXTENSIONS={".jpg", ".png"}, MAX_FILE_SIZE=100))
+    monkeypatch.setattr(bulk_import, "MAX_IMAGES_PER_PERSON", 3)
+    return tmp_path
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+class TestParseUsersCsv:
+    """Tests de la lectura del CSV."""
+
+    def test_filas_validas_e_invalidas(self):
+        """Test: cada fila se valida con UserCreate; role_id vacío usa el default."""
+        from src.users.bulk_import import parse_users_csv
+
+        csv_bytes = (
+            "\ufeffname,email,codigo_user,password,role_id\n"
+            "Ana,ana@test.com,E1,password123,\n"
+            "Luis,no-es-email,E2,password123,2\n"
+            "Eva,eva@test.com,E3,corta,2\n"
+        ).encode()
+        rows = parse_users_csv(io.BytesIO(csv_bytes), default_role_id=5)
+
+        assert [row.status for row in rows] == ["pending", "failed", "failed"]
+        assert rows[0].user_data.role_id == 5 and rows[0].line == 2
+        assert "email" in rows[1].error
+        assert "8 caracteres" in rows[2].error
+
+    def test_columnas_faltantes(self):
+        """Test: un CSV sin las columnas requeridas se rechaza completo."""
+        from src.users.bulk_import import parse_users_csv
+
+        with pytest.raises(HTTPException) as exc:
+            parse_users_csv(io.BytesIO(b"name,email\nAna,ana@test.com\n"), default_role_id=1)
+        assert exc.value.status_code == 400
+        assert "codigo_user" in exc.value.detail
+
+
+class TestExtractPhotoArchive:
+    """Tests de la extracción de fotos."""
+
+    @pytest.mark.parametrize("build", [_zip, _tar])
+    def test_extrae_por_codigo(self, upload_dir, build):
+        """Test: solo extrae imágenes de los códigos pedidos, con tope y tamaño máximo."""
+        from src.users.bulk_import import extract_photo_archive
+
+        members = {f"sucursal/E1/foto{i}.jpg": b"x" * 10 for i in range(5)}
+        members.update({
+            "E2/grande.jpg": b"x" * 500,
+            "E2/ok.PNG": b"x" * 10,
+            "E2/notas.txt": b"texto",
+            "OTRO/foto.jpg": b"x",
+            "../../E2/escape.jpg": b"x",
+        })
+        saved = extract_photo_archive(build(members), "fotos", {"E1", "E2"})
+
+        assert len(saved["E1"]) == 3
+        assert [path.rsplit("/", 1)[-1] for path in saved["E2"]] == ["image_1.png", "image_2.jpg"]
+        assert not (upload_dir / "OTRO").exists()
+        assert sorted(p.name for p in (upload_dir / "E2").iterdir()) == ["image_1.png", "image_2.jpg"]
+
+    def test_archivo_invalido(self, upload_dir):
+        """Test: un archivo que no es zip ni tar responde 400."""
+        from src.users.bulk_import import extract_photo_archive
+
+        with pytest.raises(HTTPException) as exc:
+            extract_photo_archive(io.BytesIO(b"no es un archivo"), "fotos.tar", {"E1"})
+        assert exc.value.status_code == 400
+
+
+class TestBulkImporter:
+    """Tests del registro facial de una importación."""
+
+    def test_registra_con_concurrencia_acotada(self, monkeypatch):
+        """Test: no más de `concurrency` registros a la vez y reporte por fila."""
+        from src.users import bulk_import
+        from src.users.bulk_import import BulkImport, BulkImporter, ImportRow
+
+        running = {"now": 0, "max": 0}
+
+        async def process(self, job):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            if job.codigo_user == "E3":
+                raise ValueError("sin rostro")
+
+        async def emit(self, event, job):
+            pass
+
+        manager = bulk_import.EnrollmentJobManager
+        monkeypatch.setattr(manager, "_process", process)
+        monkeypatch.setattr(manager, "_emit", emit)
+        monkeypatch.setattr(manager, "_with_session", lambda self, fn, *args: None)
+
+        rows = []
+        for i in range(6):
+            row = ImportRow(i + 2, {"codigo_user": f"E{i}", "name": f"P{i}", "email": f"p{i}@test.com"})
+            row.status, row.user_id = "created", i
+            rows.append(row)
+        rows[5].fail("El email ya está registrado")
+
+        bulk = asyncio.run(BulkImporter(concurrency=2).enroll(BulkImport(rows)))
+
+        assert running["max"] == 2
+        assert bulk.status == "completed"
+        assert bulk.summary() == {"total": 6, "pending": 0, "created": 0, "enrolled": 4, "failed": 2}
+        assert "sin rostro" in rows[3].error
@@ -0,0 +1,278 @@
+"""Unit Tests - Jobs de registro facial en segundo plano"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+
+def _face(value=None, seed=0):
+    """Rostro sintético: ruido nítido y bien expuesto, o plano si se da `value`."""
+    if value is not None:
+        return np.full((160, 160, 3), value, dtype=np.uint8)
+    gray = np.random.default_rng(seed).integers(20, 236, size=(160, 160, 1), dtype=np.uint8)
+    return np.repeat(gray, 3, axis=2)
+
+
+class FakePool:
+    """Pool de inferencia con detección por nombre de imagen y embeddings fijos por rostro."""
+
+    def __init__(self, per_image=2, queue_full=0):
+        self.per_image = per_image
+        self.queue_full = queue_full
+        self.calls = []
+
+    async def run(self, method, arg, *args):
+        from src.recognize.inference_pool import InferenceQueueFull
+
+        if self.queue_full:
+            self.queue_full -= 1
+            raise InferenceQueueFull("llena")
+        self.calls.append((method, len(arg) if method == "enrollment_embeddings" else arg))
+        if method == "enrollment_video_frames":
+            frames = [f"{args[0]}/video_frame_{i:05d}.jpg" for i in (3, 17)]
+            return {"image_paths": frames, "frames_read": 40, "frames_analyzed": 20, "candidate_frames": 9, "faces": 8}
+        if method == "enrollment_candidate":
+            if "sin_rostro" in arg:
+                return None, "No se detectó rostro"
+            face = _face(value=128) if "plana" in arg else _face(seed=len(self.calls))
+            return {"image": arg, "face_img": face, "confidence": 0.99, "face_size": 160}, None
+        return [np.ones(4) for _ in range(self.per_image * len(arg))]
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """Reemplaza pool, galería, servicio de usuarios y Socket.IO."""
+    from src.recognize.registro import FaceRegistration
+    from src.users import enrollment
+
+    events = []
+    registered = {}
+    done = {"completed": [], "discarded": []}
+
+    async def emit(event, data, room=None):
+        events.append((event, dict(data), room))
+
+    def register_embeddings(key, embeddings, image_paths, display_name=None):
+        registered[key] = (len(embeddings), display_name)
+        return True
+
+    registration = SimpleNamespace(
+        database={"EXISTE": []},
+        register_embeddings=register_embeddings,
+        select_candidates=lambda candidates, rejected: FaceRegistration.select_candidates(None, candidates, rejected)
+    )
+    pool = FakePool()
+
+    monkeypatch.setattr(enrollment, "sio", SimpleNamespace(emit=emit))
+    monkeypatch.setattr(enrollment, "get_registration", lambda: registration)
+    monkeypatch.setattr(enrollment, "get_inference_pool", lambda: pool)
+    monkeypatch.setattr(enrollment, "ENROLLMENT_RETRY_DELAY", 0)
+    monkeypatch.setattr(
+        enrollment.user_service, "complete_face_enrollment",
+        lambda db, user_id: done["completed"].append(user_id)
+    )
+    monkeypatch.setattr(
+        enrollment.user_service, "discard_pending_user",
+        lambda db, user_id, codigo: done["discarded"].append(user_id)
+    )
+    return SimpleNamespace(events=events, registered=registered, done=done, pool=pool)
+
+
+def _run_job(**kwargs):
+    from src.users.enrollment import EnrollmentJobManager
+
+    manager = EnrollmentJobManager(session_factory=MagicMock)
+
+    async def scenario():
+        job = manager.submit(**kwargs)
+        await manager.wait_all()
+        return job
+
+    return manager, asyncio.run(scenario())
+
+
+class TestEnrollmentJobs:
+    """Tests del procesamiento de los jobs."""
+
+    def test_registro_completo_con_progreso(self, env, monkeypatch):
+        """Test: detecta imagen por imagen, embebe las seleccionadas por lotes, guarda y marca al usuario."""
+        from src.users import enrollment
+
+        monkeypatch.setattr(enrollment, "ENROLLMENT_FACES_PER_TASK", 2)
+        images = [f"img_{i}.jpg" for i in range(3)]
+        manager, job = _run_job(user_id=7, codigo_user="U7", display_name="Ana", image_paths=images)
+
+        assert job.status == "completed" and job.finished_at is not None
+        assert env.pool.calls == (
+            [("enrollment_candidate", path) for path in images]
+            + [("enrollment_embeddings", 2), ("enrollment_embeddings", 1)]
+        )
+        assert env.registered == {"U7": (6, "Ana")}
+        assert env.done == {"completed": [7], "discarded": []}
+
+        names = [event for event, _, _ in env.events]
+        assert names == ["enrollment-progress"] * 6 + ["enrollment-complete"]
+        assert [data["processed"] for _, data, _ in env.events] == [0, 1, 2, 3, 3, 3, 3]
+        assert [data["embedded"] for _, data, _ in env.events] == [0, 0, 0, 0, 2, 3, 3]
+        assert env.events[-1][1]["stage"] == "embedding" and env.events[-1][1]["selected"] == 3
+        assert all(room == f"enrollment:{job.job_id}" for _, _, room in env.events)
+        assert manager.get(job.job_id) is job
+
+    def test_rechaza_imagenes_antes_de_embeber(self, env):
+        """Test: las imágenes sin rostro o de baja calidad no llegan al embedding y se reportan."""
+        images = ["buena.jpg", "sin_rostro.jpg", "plana.jpg"]
+        _, job = _run_job(user_id=11, codigo_user="U11", image_paths=images)
+
+        assert job.status == "completed"
+        assert [call for call in env.pool.calls if call[0] == "enrollment_embeddings"] == [("enrollment_embeddings", 1)]
+        assert job.selected == 1 and env.registered == {"U11": (2, "U11")}
+        rejected = {item["image"]: item["reasons"] for item in job.to_dict()["rejected"]}
+        assert rejected["sin_rostro.jpg"] == ["No se detectó rostro"]
+        assert "Imagen borrosa" in rejected["plana.jpg"]
+
+    def test_registro_desde_video(self, env, tmp_path):
+        """Test: el video se reemplaza por sus mejores frames, se elimina y el registro continúa."""
+        video = tmp_path / "enrollment.mp4"
+        video.write_bytes(b"video")
+        _, job = _run_job(user_id=12, codigo_user="U12", video_path=str(video))
+
+        assert job.status == "completed"
+        assert env.pool.calls[0] == ("enrollment_video_frames", str(video))
+        assert [call[1] for call in env.pool.calls[1:3]] == [
+            f"{tmp_path}/video_frame_00003.jpg", f"{tmp_path}/video_frame_00017.jpg"
+        ]
+        assert not video.exists()
+        assert job.to_dict()["video"] == {"frames_read": 40, "frames_analyzed": 20, "candidate_frames": 9, "faces": 8}
+        assert env.events[1][1]["stage"] == "video"
+        assert env.registered == {"U12": (4, "U12")}
+
+    def test_sin_rostros_descarta_usuario(self, env):
+        """Test: sin embeddings el job falla y el usuario pendiente se elimina."""
+        env.pool.per_image = 0
+        _, job = _run_job(user_id=8, codigo_user="U8", image_paths=["a.jpg", "b.jpg"])
+
+        assert job.status == "failed"
+        assert "No se detectaron rostros válidos" in job.error
+        assert env.registered == {}
+        assert env.done == {"completed": [], "discarded": [8]}
+        assert env.events[-1][0] == "enrollment-complete"
+        assert env.events[-1][1]["status"] == "failed"
+
+    def test_clave_ya_registrada(self, env):
+        """Test: no sobrescribe una persona ya registrada en la galería."""
+        _, job = _run_job(user_id=9, codigo_user="EXISTE", image_paths=["a.jpg"])
+
+        assert job.status == "failed" and "ya está registrada" in job.error
+        assert env.pool.calls == []
+
+    def test_reintenta_con_cola_llena(self, env):
+        """Test: si la cola de inferencia está llena espera y reintenta."""
+        env.pool.queue_full = 2
+        _, job = _run_job(user_id=10, codigo_user="U10", image_paths=["a.jpg"])
+
+        assert job.status == "completed"
+        assert len(env.pool.calls) == 2
+
+    def test_historial_acotado(self, env):
+        """Test: solo se conservan los últimos `history` jobs terminados."""
+        from src.users.enrollment import EnrollmentJobManager
+
+        manager = EnrollmentJobManager(history=2, session_factory=MagicMock)
+
+        async def scenario():
+            jobs = []
+            for i in range(4):
+                jobs.append(manager.submit(user_id=i, codigo_user=f"H{i}", image_paths=["a.jpg"]))
+                await manager.wait_all()
+            return jobs
+
+        jobs = asyncio.run(scenario())
+        assert [manager.get(job.job_id) for job in jobs] == [None, None, jobs[2], jobs[3]]
+
+
+class TestRecoverPending:
+    """Tests de la recuperación de registros interrumpidos por un reinicio."""
+
+    @pytest.fixture
+    def pending(self, env, monkeypatch, tmp_path):
+        """Usuarios del registro en segundo plano con distintos restos en la carpeta de datos."""
+        from src.users import enrollment, service
+
+        monkeypatch.setattr(enrollment, "DATA_DIR", tmp_path)
+        (tmp_path / "IMG").mkdir()
+        (tmp_path / "IMG" / "image_1.jpg").write_bytes(b"img")
+        (tmp_path / "VID").mkdir()
+        (tmp_path / "VID" / "enrollment.mp4").write_bytes(b"video")
+        (tmp_path / "VACIO").mkdir()
+        (tmp_path / "EXISTE").mkdir()
+        users = [
+            SimpleNamespace(id=i, codigo_user=codigo, name=name)
+            for i, codigo, name in [(1, "IMG", "Ana"), (2, "VID", "Beto"), (3, "VACIO", "Caro"), (4, "EXISTE", "Dani"), (5, "SIN_CARPETA", "Eva")]
+        ]
+        backfilled = []
+        monkeypatch.setattr(service, "get_registration", enrollment.get_registration)
+        monkeypatch.setattr(enrollment.user_service, "get_pending_face_enrollments", lambda db: users)
+        monkeypatch.setattr(enrollment.user_service, "backfill_facial_recognize", lambda db: backfilled.append(db) or 7)
+        return backfilled
+
+    def test_reencola_completa_o_descarta(self, env, pending, tmp_path):
+        """Test: reencola a quien conserva imágenes o video, completa al que ya está en la galería y descarta el resto."""
+        from src.users.enrollment import EnrollmentJobManager
+
+        manager = EnrollmentJobManager(session_factory=MagicMock)
+
+        async def scenario():
+            counts = await manager.recover_pending()
+            await manager.wait_all()
+            return counts
+
+        counts = asyncio.run(scenario())
+
+        assert counts == {"backfilled": 7, "requeued": 2, "completed": 1, "discarded": 2}
+        assert len(pending) == 1
+        jobs = {job.codigo_user: job for job in manager._jobs.values()}
+        assert set(jobs) == {"IMG", "VID"}
+        assert jobs["VID"].to_dict()["video"] is not None
+        assert env.pool.calls[0] == ("enrollment_candidate", str(tmp_path / "IMG" / "image_1.jpg"))
+        assert sorted(env.done["completed"]) == [1, 2, 4]
+        assert sorted(env.done["discarded"]) == [3, 5]
+
+    def test_clave_legada_por_nombre(self, env, pending, monkeypatch):
+        """Test: un pendiente cuya galería está indexada por nombre se completa sin reencolarlo."""
+        from src.users import enrollment
+        from src.users.enrollment import EnrollmentJobManager
+
+        enrollment.get_registration().database["Ana"] = []
+        manager = EnrollmentJobManager(session_factory=MagicMock)
+
+        async def scenario():
+            counts = await manager.recover_pending()
+            await manager.wait_all()
+            return counts
+
+        counts = asyncio.run(scenario())
+
+        assert counts["completed"] == 2
+        assert "IMG" not in {job.codigo_user for job in manager._jobs.values()}
+
+    def test_espera_al_sistema_listo(self, env, pending):
+        """Test: si la carga del reconocimiento falla no se toca a ningún pendiente."""
+        from src.users.enrollment import EnrollmentJobManager
+
+        class FailedReadiness:
+            ready = False
+
+            async def start(self):
+                return None
+
+        manager = EnrollmentJobManager(session_factory=MagicMock)
+
+        async def scenario():
+            await manager.start_recovery(FailedReadiness())
+
+        asyncio.run(scenario())
+
+        assert manager._jobs == {}
+        assert env.done == {"completed": [], "discarded": []}
@@ -49,3 +49,71 @@ class TestUserService:
             mock.return_value = True
             resultado = user_service.email_exists(mock_db, "test@test.com")
             assert resultado is True
+    
+    def test_clave_facial_por_codigo(self, user_service):
+        """Test: la galería facial se indexa por codigo_user."""
+        registration = Mock(database={"U1": []})
+        with patch('src.users.service.get_registration', return_value=registration):
+            user = Mock(codigo_user="U1")
+            user.name = "John"
+            assert user_service.get_face_key(user) == "U1"
+    
+    def test_clave_facial_legado_por_nombre(self, user_service):
+        """Test: registros antiguos indexados por nombre siguen funcionando."""
+        registration = Mock(database={"John": []})
+        with patch('src.users.service.get_registration', return_value=registration):
+            user = Mock(codigo_user="U1")
+            user.name = "John"
+            assert user_service.get_face_key(user) == "John"
+    
+    def test_descartar_solo_usuarios_pendientes(self, user_service):
+        """Test: el rollback de un registro fallido no elimina usuarios ya registrados."""
+        mock_db = MagicMock()
+        with patch.object(user_service, 'get_by_field') as get, \
+             patch.object(user_service, 'delete_with_transaction') as delete, \
+             patch('src.users.service.delete_user_folder') as delete_folder:
+            get.return_value = Mock(facial_recognize=True, face_enrollment_pending=False)
+            user_service.discard_pending_user(mock_db, 1, "U1")
+            assert not delete.called
+            
+            # Usuario anterior al registro en segundo plano (sin galería): no se toca
+            get.return_value = Mock(facial_recognize=False, face_enrollment_pending=False)
+            user_service.discard_pending_user(mock_db, 1, "U1")
+            assert not delete.called and not delete_folder.called
+            
+            get.return_value = Mock(facial_recognize=False, face_enrollment_pending=True)
+            user_service.discard_pending_user(mock_db, 1, "U1")
+            assert delete.call_count == 1
+            assert delete_folder.call_count == 1
+    
+    def test_usuario_nuevo_queda_pendiente(self, user_service):
+        """Test: los usuarios del registro en segundo plano se crean marcados como pendientes."""
+        from src.users.schemas import UserCreate
+        
+        data = UserCreate(
+            name="Ana", email="ana@test.com", codigo_user="U1", password="Clave123!",
+            confirm_password="Clave123!", role_id=1
+        )
+        with patch('src.users.service.User') as user_model:
+            user_service._new_user(data, "hash")
+        fields = user_model.call_args.kwargs
+        assert fields["face_enrollment_pending"] is True and fields["facial_recognize"] is False
+    
+    def test_backfill_usuarios_con_galeria(self, user_service):
+        """Test: los usuarios anteriores que ya están en la galería se marcan como registrados."""
+        legacy_by_name = Mock(codigo_user="U1", facial_recognize=False)
+        legacy_by_name.name = "John"
+        by_code = Mock(codigo_user="U2", facial_recognize=False)
+        by_code.name = "Ana"
+        without_face = Mock(codigo_user="U3", facial_recognize=False)
+        without_face.name = "Admin"
+        mock_db = MagicMock()
+        mock_db.query.return_value.filter.return_value.all.return_value = [legacy_by_name, by_code, without_face]
+        registration = Mock(database={"John": [], "U2": []})
+        
+        with patch('src.users.service.get_registration', return_value=registration):
+            assert user_service.backfill_facial_recognize(mock_db) == 2
+        
+        assert legacy_by_name.facial_recognize is True and by_code.facial_recognize is True
+        assert without_face.facial_recognize is False
+        assert mock_db.commit.called